@@ -13,12 +13,21 @@ Formato esperado para cada linha do JSONL:
 """
 
 import os
+import sys
 import json
 import re
 from pathlib import Path
 from typing import List, Dict, Optional
 import docx
-from PyPDF2 import PdfReader
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(REPO_ROOT, "src", "main", "python")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from application.services.pdf_extraction import get_pdf_extractor
+from domain.usecase.utils import legal_citations
+from rag.chunker import chunk_text
 
 def extract_text_from_docx(file_path: str) -> str:
     """Extrai texto de arquivo DOCX"""
@@ -35,16 +44,16 @@ def extract_text_from_docx(file_path: str) -> str:
 
 def extract_text_from_pdf(file_path: str) -> str:
     """Extrai texto de arquivo PDF"""
-    try:
-        with open(file_path, 'rb') as file:
-            pdf_reader = PdfReader(file)
-            text = []
-            for page in pdf_reader.pages:
-                text.append(page.extract_text())
-        return "\n".join(text)
-    except Exception as e:
-        print(f"Erro ao processar {file_path}: {e}")
-        return ""
+    return extract_texts_from_pdfs([file_path])[str(file_path)]
+
+def extract_texts_from_pdfs(file_paths: List[str]) -> Dict[str, str]:
+    """Extrai texto de vários arquivos PDF em paralelo"""
+    texts = {}
+    for path, result in get_pdf_extractor().extract_files(file_paths).items():
+        if not result.ok:
+            print(f"Erro ao processar {path}: {result.error}")
+        texts[path] = result.text
+    return texts
 
 def extract_text_from_txt(file_path: str) -> str:
     """Extrai texto de arquivo TXT"""
@@ -56,26 +65,8 @@ def extract_text_from_txt(file_path: str) -> str:
         return ""
 
 def extract_citations(text: str) -> List[str]:
-    """Extrai citações de normas legais do texto"""
-    citations = []
-    
-    # Padrões para identificar normas legais
-    patterns = [
-        r'Lei\s+(?:Federal\s+)?(?:nº\s*)?(\d+(?:\.\d+)*\/\d{4})',
-        r'Decreto\s+(?:nº\s*)?(\d+(?:\.\d+)*\/\d{4})',
-        r'Portaria\s+(?:nº\s*)?(\d+(?:\.\d+)*\/\d{4})',
-        r'Resolução\s+(?:nº\s*)?(\d+(?:\.\d+)*\/\d{4})',
-        r'Instrução\s+Normativa\s+(?:nº\s*)?(\d+(?:\.\d+)*\/\d{4})'
-    ]
-    
-    for pattern in patterns:
-        matches = re.finditer(pattern, text, re.IGNORECASE)
-        for match in matches:
-            full_match = match.group(0)
-            if full_match not in citations:
-                citations.append(full_match)
-    
-    return citations
+    """Extrai citações de normas legais do texto, na forma canônica (ex.: "Lei 14.133/2021")"""
+    return [citation.label for citation in legal_citations.extract_citations(text, unique=True) if citation.year]
 
 def identify_section_type(content: str) -> str:
     """Identifica o tipo de seção baseado no conteúdo"""
@@ -118,13 +109,15 @@ def generate_objective_slug(filename: str, content: str) -> str:
     # Fallback: usar base do nome do arquivo
     return re.sub(r'[^a-z0-9_]', '_', base_name)
 
-def parse_etp_document(file_path: str) -> List[Dict]:
-    """Processa um documento ETP e retorna lista de seções"""
+def parse_etp_document(file_path: str, text: Optional[str] = None) -> List[Dict]:
+    """Processa um documento ETP e retorna lista de seções (``text`` evita reextrair um PDF já extraído)"""
     filename = os.path.basename(file_path)
     file_ext = Path(file_path).suffix.lower()
     
     # Extrair texto baseado na extensão
-    if file_ext == '.docx':
+    if text is not None:
+        pass
+    elif file_ext == '.docx':
         text = extract_text_from_docx(file_path)
     elif file_ext == '.pdf':
         text = extract_text_from_pdf(file_path)
@@ -138,24 +131,24 @@ def parse_etp_document(file_path: str) -> List[Dict]:
         print(f"Nenhum texto extraído de {filename}")
         return []
     
-    # Dividir em seções (por parágrafo ou seção)
+    # Dividir em seções (chunks por título, cláusula e frase; ver rag/chunker.py)
     sections = []
-    paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
+    chunks = chunk_text(text)
     
     objective_slug = generate_objective_slug(filename, text)
     
-    for paragraph in paragraphs:
-        if len(paragraph) < 50:  # Ignorar parágrafos muito curtos
+    for chunk in chunks:
+        if len(chunk) < 50:  # Ignorar trechos muito curtos
             continue
             
-        section_type = identify_section_type(paragraph)
-        citations = extract_citations(paragraph)
+        section_type = identify_section_type(chunk)
+        citations = extract_citations(chunk)
         
         section_data = {
             "doc": filename,
             "section_type": section_type,
             "objective_slug": objective_slug,
-            "content": paragraph
+            "content": chunk
         }
         
         if citations:
@@ -185,12 +178,17 @@ def process_all_etps():
     processed_count = 0
     total_sections = 0
     
+    # Extrair todos os PDFs de uma vez, em paralelo
+    raw_files = sorted(raw_dir.glob("*"))
+    pdf_texts = extract_texts_from_pdfs(
+        [str(p) for p in raw_files if p.is_file() and p.suffix.lower() == '.pdf'])
+    
     # Processar arquivos na pasta raw/
-    for file_path in raw_dir.glob("*"):
+    for file_path in raw_files:
         if file_path.is_file() and file_path.suffix.lower() in ['.docx', '.pdf', '.txt']:
             print(f"Processando: {file_path.name}")
             
-            sections = parse_etp_document(str(file_path))
+            sections = parse_etp_document(str(file_path), pdf_texts.get(str(file_path)))
             if sections:
                 # Gerar arquivo JSONL
                 output_file = parsed_dir / f"{file_path.stem}.jsonl"
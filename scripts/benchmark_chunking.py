@@ -0,0 +1,213 @@
+"""
+Benchmark offline da divisão em chunks: estratégias antigas x rag.chunker.
+
+Compara, sobre o mesmo corpus:
+
+    legado_ingestao  ETPIngestor._split_content anterior (corte em '.', até 2000 caracteres)
+    legado_kb        KbController.chunk_text anterior (janelas de 1000 caracteres, 200 de sobreposição)
+    chunker          rag.chunker.chunk_text (tokens, títulos, cláusulas e frases)
+
+e informa, para cada uma: quantidade de chunks, tokens enviados ao provedor de
+embeddings (total, médio e máximo por chunk), recall@k e tokens de contexto no
+prompt (soma dos k primeiros chunks) na busca BM25 e vetorial.
+
+Os casos de recall são frases sorteadas do corpus; a consulta usa parte das
+palavras da frase e o caso conta como acerto se algum dos k primeiros chunks
+contém a frase inteira (ignorando espaços). Os embeddings são os do
+StubEmbeddingClient, sem acesso à rede.
+
+Uso:
+    python scripts/benchmark_chunking.py                      # PDFs de knowledge/etps/raw
+    python scripts/benchmark_chunking.py --corpus synthetic --documents 200 --max-tokens 300 --overlap 40
+"""
+
+import os
+import sys
+import random
+import argparse
+import statistics
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(REPO_ROOT, "src", "main", "python")
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+for path in (SRC_DIR, SCRIPTS_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import numpy as np
+
+from rag.bm25_index import BM25Index
+from rag.chunker import chunk_text, count_tokens, split_blocks, split_sentences
+from rag.embeddings import StubEmbeddingClient, prepare_embedding_input
+
+RAW_DIR = os.path.join(REPO_ROOT, "knowledge", "etps", "raw")
+
+
+def legacy_ingestion_split(content: str, max_chars: int = 2000):
+    """Divisão usada antes pelo ETPIngestor (mantida aqui só como referência)"""
+    if len(content) <= max_chars:
+        return [content]
+    chunks = []
+    current_chunk = ""
+    for sentence in content.split('.'):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if not sentence.endswith('.'):
+            sentence += '.'
+        if len(current_chunk) + len(sentence) + 1 > max_chars:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+                current_chunk = sentence
+            else:
+                chunks.append(sentence[:max_chars])
+                current_chunk = sentence[max_chars:]
+        else:
+            current_chunk += " " + sentence if current_chunk else sentence
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+    return chunks
+
+
+def legacy_kb_windows(text: str, chunk_size: int = 1000, overlap: int = 200):
+    """Janelas de caracteres usadas antes pelo upload de PDFs na KB"""
+    chunks = []
+    for i in range(0, len(text), chunk_size - overlap):
+        chunk = text[i:i + chunk_size]
+        if chunk.strip():
+            chunks.append(chunk.strip())
+        if i + chunk_size >= len(text):
+            break
+    return chunks
+
+
+def load_raw_corpus():
+    """Textos dos PDFs de knowledge/etps/raw (extração paralela, como na ingestão)"""
+    from application.services.pdf_extraction import get_pdf_extractor
+
+    if not os.path.isdir(RAW_DIR):
+        return []
+    paths = [os.path.join(RAW_DIR, name) for name in sorted(os.listdir(RAW_DIR)) if name.lower().endswith('.pdf')]
+    return [result.text for result in get_pdf_extractor().extract_files(paths).values() if result.ok and result.text]
+
+
+def load_synthetic_corpus(documents: int, seed: int):
+    """Documentos sintéticos (scripts/synthetic_kb.py) com um título numerado por seção"""
+    from synthetic_kb import CHUNKS_PER_DOCUMENT, generate_documents
+
+    texts = []
+    for _, chunks in generate_documents(documents * CHUNKS_PER_DOCUMENT, seed=seed):
+        texts.append("\n\n".join(f"{i}. {chunk['section_type'].replace('_', ' ').upper()}\n{chunk['content_text']}"
+                                 for i, chunk in enumerate(chunks, start=1)))
+    return texts
+
+
+def sample_cases(texts, count: int, seed: int):
+    """Frases do corpus (12 a 60 palavras) e a consulta formada por metade das palavras de cada uma"""
+    rng = random.Random(seed)
+    candidates = []
+    for text in texts:
+        for block, heading in split_blocks(text):
+            if heading:
+                continue
+            candidates.extend(s for s in split_sentences(block) if 12 <= len(s.split()) <= 60)
+    candidates = sorted(set(candidates))
+    rng.shuffle(candidates)
+    cases = []
+    for sentence in candidates:
+        if len(cases) >= count:
+            break
+        words = [w for w in sentence.split() if len(w) > 3]
+        if len(words) < 6:
+            continue
+        query = " ".join(sorted(rng.sample(words, len(words) // 2), key=words.index))
+        cases.append((query, "".join(sentence.split())))
+    return cases
+
+
+def tokenize(text: str):
+    """Mesma tokenização do BM25 em RAGRetrieval._tokenize"""
+    import re
+    return [token for token in re.sub(r'[^\w\s]', ' ', text.lower()).split() if len(token) > 2]
+
+
+def evaluate(chunks, cases, ks, client):
+    """recall@k e tokens de contexto (média dos k primeiros) nas buscas BM25 e vetorial"""
+    compact = ["".join(chunk.split()) for chunk in chunks]
+    tokens = [count_tokens(chunk) for chunk in chunks]
+    bm25 = BM25Index.build([(i, None, '', tokenize(chunk)) for i, chunk in enumerate(chunks)])
+    vectors = np.vstack([client.vector(prepare_embedding_input(chunk)) for chunk in chunks])
+
+    top_k = max(ks)
+    results = {}
+    for method in ('bm25', 'vetorial'):
+        hits = {k: 0 for k in ks}
+        context = {k: [] for k in ks}
+        for query, sentence in cases:
+            if method == 'bm25':
+                ranked = [position for position, _ in bm25.search(tokenize(query), top_k)]
+            else:
+                scores = vectors @ client.vector(query)
+                ranked = list(np.argsort(-scores)[:top_k])
+            for k in ks:
+                if any(sentence in compact[i] for i in ranked[:k]):
+                    hits[k] += 1
+                context[k].append(sum(tokens[i] for i in ranked[:k]))
+        for k in ks:
+            results[f"{method}_recall@{k}"] = hits[k] / len(cases) if cases else 0.0
+            results[f"{method}_contexto@{k}"] = statistics.mean(context[k]) if context[k] else 0.0
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunks, tokens de embedding e recall: estratégias antigas x rag.chunker")
+    parser.add_argument("--corpus", choices=("raw", "synthetic"), default="raw",
+                        help="raw = PDFs de knowledge/etps/raw (sintético se a pasta estiver vazia)")
+    parser.add_argument("--documents", type=int, default=100, help="Documentos sintéticos")
+    parser.add_argument("--max-tokens", type=int, help="Limite do chunker (padrão CHUNK_MAX_TOKENS)")
+    parser.add_argument("--overlap", type=int, help="Sobreposição do chunker (padrão CHUNK_OVERLAP_TOKENS)")
+    parser.add_argument("--cases", type=int, default=300, help="Frases sorteadas para o recall")
+    parser.add_argument("--k", default="3,5", help="Valores de k separados por vírgula")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    texts = load_raw_corpus() if args.corpus == "raw" else []
+    if not texts:
+        if args.corpus == "raw":
+            print("Nenhum PDF com texto em knowledge/etps/raw; usando corpus sintético.")
+        texts = load_synthetic_corpus(args.documents, args.seed)
+    ks = sorted({int(k) for k in args.k.split(",") if k.strip()})
+    cases = sample_cases(texts, args.cases, args.seed)
+
+    strategies = {
+        'legado_ingestao': legacy_ingestion_split,
+        'legado_kb': legacy_kb_windows,
+        'chunker': lambda text: chunk_text(text, max_tokens=args.max_tokens, overlap_tokens=args.overlap),
+    }
+    client = StubEmbeddingClient()
+    report = {}
+    for name, split in strategies.items():
+        chunks = [chunk for text in texts for chunk in split(text)]
+        tokens = [count_tokens(chunk) for chunk in chunks]
+        report[name] = {
+            'chunks': len(chunks),
+            'tokens_embedding': sum(tokens),
+            'tokens_medio': statistics.mean(tokens) if tokens else 0.0,
+            'tokens_max': max(tokens, default=0),
+            **evaluate(chunks, cases, ks, client),
+        }
+
+    print(f"{len(texts)} documentos, {len(cases)} casos de recall\n")
+    columns = list(next(iter(report.values())))
+    width = max(len(column) for column in columns) + 2
+    print(f"{'':<{width}}" + "".join(f"{name:>17}" for name in report))
+    for column in columns:
+        cells = []
+        for metrics in report.values():
+            value = metrics[column]
+            cells.append(f"{value:>17.3f}" if 'recall' in column else f"{value:>17,.0f}")
+        print(f"{column:<{width}}" + "".join(cells))
+
+
+if __name__ == "__main__":
+    main()
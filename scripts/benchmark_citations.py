@@ -0,0 +1,121 @@
+"""
+Benchmark do extrator de citações de normas legais.
+
+Compara a abordagem anterior (uma passada por padrão, ~15 padrões não
+compilados sobre o texto em minúsculas, com deduplicação ao final) com o
+extrator único (uma alternação compilada, uma passada). O corpus é formado
+pelos documentos da base de conhecimento (JSONL em knowledge/etps/parsed e
+arquivos .txt/.md informados), replicados até o tamanho pedido.
+
+Uso:
+    python scripts/benchmark_citations.py --mb 20
+    python scripts/benchmark_citations.py --mb 50 --source /caminho/para/etps_txt
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(REPO_ROOT, "src", "main", "python")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from domain.usecase.utils.legal_citations import extract_citations
+
+DEFAULT_SOURCE = os.path.join(REPO_ROOT, "knowledge", "etps", "parsed")
+
+# Texto de referência com citações nos formatos comuns em ETPs
+SAMPLE_TEXT = (
+    "A contratação observará a Lei nº 14.133, de 1º de abril de 2021, o Decreto nº 10.024/2019 e a "
+    "IN SEGES/ME nº 65/2021. Aplicam-se subsidiariamente a Lei Complementar 123/2006 e a Lei 8.666/93. "
+    "O fornecimento deverá atender às normas técnicas da ABNT e aos requisitos de sustentabilidade, "
+    "com garantia mínima de 12 meses e atendimento em até 24 horas para chamados críticos.\n"
+)
+
+# Padrões da implementação anterior (LegalNormProcessor), executados um a um
+LEGACY_PATTERNS = [
+    r'lei\s+(?:federal\s+)?(?:complementar\s+)?n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
+    r'lei\s+(\d+(?:[\.\/\-]\d+)*)',
+    r'l\.?\s*(\d+(?:[\.\/\-]\d+)*)',
+    r'decreto\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
+    r'decreto\s+(\d+(?:[\.\/\-]\d+)*)',
+    r'd\.?\s*(\d+(?:[\.\/\-]\d+)*)',
+    r'portaria\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
+    r'portaria\s+(\d+(?:[\.\/\-]\d+)*)',
+    r'resolu[cç][aã]o\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
+    r'resolu[cç][aã]o\s+(\d+(?:[\.\/\-]\d+)*)',
+    r'instru[cç][aã]o\s+normativa\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
+    r'in\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
+    r'medida\s+provis[oó]ria\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
+    r'mp\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
+]
+
+
+def legacy_extract(text):
+    text_lower = text.lower()
+    found = []
+    for index, pattern in enumerate(LEGACY_PATTERNS):
+        for match in re.finditer(pattern, text_lower, re.IGNORECASE):
+            found.append((index, match.group(1), match.start()))
+    seen = set()
+    unique = []
+    for index, number, start in found:
+        if (index, number) not in seen:
+            seen.add((index, number))
+            unique.append((index, number, start))
+    unique.sort(key=lambda item: item[2])
+    return unique
+
+
+def load_corpus(sources):
+    texts = []
+    for source in sources:
+        for path in sorted(Path(source).rglob('*')) if os.path.isdir(source) else [Path(source)]:
+            if path.suffix == '.jsonl':
+                for line in path.read_text(encoding='utf-8').splitlines():
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    texts.extend(section.get('content', '') for section in record.get('sections', []))
+                    texts.append(record.get('content', ''))
+            elif path.suffix in ('.txt', '.md'):
+                texts.append(path.read_text(encoding='utf-8', errors='ignore'))
+    return "\n".join(t for t in texts if t) or SAMPLE_TEXT
+
+
+def measure(label, func, text, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - start)
+    mb = len(text.encode('utf-8')) / 1e6
+    print(f"{label:<12} {best:8.3f}s  {mb / best:8.1f} MB/s  {len(result):6d} citações")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do extrator de citações legais")
+    parser.add_argument("--mb", type=float, default=10.0, help="Tamanho do corpus (MB)")
+    parser.add_argument("--source", action="append", help="Diretório/arquivo com documentos da base (.jsonl, .txt, .md)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições (vale o melhor tempo)")
+    args = parser.parse_args()
+
+    base = load_corpus(args.source or [DEFAULT_SOURCE]) + "\n" + SAMPLE_TEXT
+    copies = max(1, int(args.mb * 1e6 / len(base.encode('utf-8'))))
+    text = base * copies
+    print(f"Corpus: {len(text.encode('utf-8')) / 1e6:.1f} MB ({copies} cópias da base)")
+
+    legacy = measure("Anterior", legacy_extract, text, args.repeat)
+    single = measure("Passada única", lambda t: extract_citations(t, unique=True), text, args.repeat)
+    print(f"Ganho: {legacy / single:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
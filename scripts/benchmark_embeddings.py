@@ -0,0 +1,70 @@
+"""
+Benchmark offline do pipeline de embeddings.
+
+Compara a geração sequencial (uma requisição por chunk) com o EmbeddingPipeline
+(lotes concorrentes) usando o StubEmbeddingClient, que simula a latência de rede.
+
+Uso:
+    python scripts/benchmark_embeddings.py --chunks 2000 --latency 0.05
+"""
+
+import os
+import sys
+import time
+import argparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(REPO_ROOT, "src", "main", "python")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from rag.embeddings import EmbeddingPipeline, StubEmbeddingClient
+
+SAMPLE_SENTENCES = [
+    "A contratada deverá prestar manutenção preventiva e corretiva dos equipamentos.",
+    "O atendimento a chamados críticos deve ocorrer em até 4 horas úteis.",
+    "A contratação observará a Lei nº 14.133/2021 e demais normas aplicáveis.",
+    "Os veículos deverão possuir seguro total e rastreamento por GPS.",
+    "Relatórios mensais de desempenho serão entregues ao fiscal do contrato.",
+]
+
+
+def synthetic_texts(count: int):
+    return [
+        f"{SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)]} Item {i}. " * 4
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de embeddings (offline)")
+    parser.add_argument("--chunks", type=int, default=1000, help="Quantidade de chunks sintéticos")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência simulada por requisição (s)")
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--skip-sequential", action="store_true", help="Não medir a abordagem uma-a-uma")
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.chunks)
+
+    if not args.skip_sequential:
+        client = StubEmbeddingClient(latency=args.latency)
+        start = time.perf_counter()
+        for text in texts:
+            client.embeddings.create(model="stub", input=text)
+        elapsed = time.perf_counter() - start
+        print(f"Sequencial: {len(texts)} chunks, {client.calls} requisições, "
+              f"{elapsed:.2f}s ({len(texts) / elapsed:.1f} chunks/s)")
+
+    client = StubEmbeddingClient(latency=args.latency)
+    pipeline = EmbeddingPipeline(client, batch_size=args.batch_size, max_concurrency=args.concurrency)
+    start = time.perf_counter()
+    vectors = pipeline.embed_texts(texts)
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for v in vectors if v is not None)
+    print(f"Pipeline:   {ok} chunks, {client.calls} requisições, "
+          f"{elapsed:.2f}s ({ok / elapsed:.1f} chunks/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Benchmark do tempo de inicialização de um worker da aplicação.
+
+Cada medição roda num processo novo (imports inclusos) e registra:
+
+    import_s      importação de application.config.FlaskConfig
+    create_api_s  create_api() até devolver o app (o que atrasa o primeiro request)
+    ready_s       do início do processo até /api/ready responder 200
+    wall_s        do disparo do processo até o worker informar que está pronto
+    rss_mb        memória residente ao ficar pronto
+
+para cada modo de carga pedido (KB_BOOTSTRAP_MODE). Os resultados, mediana de
+--runs execuções, são comparados com as referências de scripts/benchmark_baselines.json
+(chaves ``startup_<modo>``), como na suíte principal; regressões retornam código 1.
+
+Requer um PostgreSQL (create_api só aceita PostgreSQL); com --init-schema o esquema é
+criado antes por scripts/init_db.py e os workers sobem com DB_INIT_ON_STARTUP=false.
+
+Uso:
+    python scripts/benchmark_startup.py --database-url postgresql+psycopg2://... --modes background,sync
+    python scripts/benchmark_startup.py --init-schema --runs 5 --save-baseline
+"""
+
+import time
+
+PROCESS_STARTED = time.perf_counter()
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(REPO_ROOT, "src", "main", "python")
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+RESULT_PREFIX = "STARTUP_RESULT "
+
+
+def child(timeout: float) -> None:
+    """Mede a inicialização neste processo e imprime o resultado em uma linha JSON"""
+    sys.path.insert(0, SRC_DIR)
+    sys.path.insert(0, SCRIPTS_DIR)
+
+    metrics = {}
+    started = time.perf_counter()
+    from application.config.FlaskConfig import create_api
+    metrics['import_s'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    app = create_api()
+    metrics['create_api_s'] = time.perf_counter() - started
+
+    client = app.test_client()
+    deadline = time.perf_counter() + timeout
+    status = None
+    while time.perf_counter() < deadline:
+        status = client.get('/api/ready').status_code
+        if status == 200:
+            break
+        time.sleep(0.05)
+    if status != 200:
+        raise SystemExit(f"/api/ready não respondeu 200 em {timeout:.0f}s (último status: {status})")
+    metrics['ready_s'] = time.perf_counter() - PROCESS_STARTED
+    # Importado só agora para não entrar no tempo de importação medido
+    from benchmark_suite import rss_mb
+    metrics['rss_mb'] = rss_mb()
+    print(RESULT_PREFIX + json.dumps(metrics), flush=True)
+
+
+def measure(mode: str, env: dict, timeout: float) -> dict:
+    """Sobe um processo filho no modo informado; retorna as métricas dele mais o tempo de relógio"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--child", "--timeout", str(timeout)],
+        env=dict(env, KB_BOOTSTRAP_MODE=mode), cwd=REPO_ROOT,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    metrics = None
+    for line in process.stdout:
+        if line.startswith(RESULT_PREFIX):
+            metrics = json.loads(line[len(RESULT_PREFIX):])
+            metrics['wall_s'] = time.perf_counter() - started
+            break
+    process.kill()
+    process.wait()
+    if metrics is None:
+        raise RuntimeError(f"Worker no modo {mode} não ficou pronto (código {process.returncode})")
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de inicialização de um worker da aplicação")
+    parser.add_argument("--modes", default="background,sync", help="Modos de KB_BOOTSTRAP_MODE separados por vírgula")
+    parser.add_argument("--runs", type=int, default=3, help="Execuções por modo (vale a mediana)")
+    parser.add_argument("--database-url", help="PostgreSQL (padrão: DATABASE_URL)")
+    parser.add_argument("--init-schema", action="store_true",
+                        help="Cria o esquema uma vez (scripts/init_db.py) e sobe os workers com DB_INIT_ON_STARTUP=false")
+    parser.add_argument("--timeout", type=float, default=600, help="Espera máxima por /api/ready (s)")
+    parser.add_argument("--baseline", help="Arquivo JSON de referências (padrão: o da suíte principal)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Aumento tolerado sobre a referência (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Grava os resultados como novas referências")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.timeout)
+        return
+
+    sys.path.insert(0, SRC_DIR)
+    sys.path.insert(0, SCRIPTS_DIR)
+    from benchmark_suite import BASELINE_PATH, compare
+    from fake_openai_server import start_fake_openai
+
+    server, base_url = start_fake_openai()
+    env = dict(os.environ)
+    if args.database_url:
+        env['DATABASE_URL'] = args.database_url
+    env.setdefault('SECRET_KEY', 'benchmark')
+    env.setdefault('EMBEDDINGS_PROVIDER', 'openai')
+    env.setdefault('RAG_FAISS_PATH', 'rag/index/faiss')
+    env.update({
+        'OPENAI_API_KEY': 'sk-benchmark',
+        'OPENAI_API_BASE': base_url,
+        'LEXML_REFRESH_ENABLED': 'false',
+        'PYTHONPATH': SRC_DIR,
+    })
+    if not env.get('DATABASE_URL'):
+        parser.error("informe --database-url ou DATABASE_URL (PostgreSQL)")
+
+    try:
+        if args.init_schema:
+            subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, "init_db.py")], env=env, cwd=REPO_ROOT,
+                           check=True, stdout=subprocess.DEVNULL)
+            env['DB_INIT_ON_STARTUP'] = 'false'
+
+        results = {}
+        for mode in [mode.strip() for mode in args.modes.split(",") if mode.strip()]:
+            print(f"Medindo inicialização no modo {mode} ({args.runs} execuções)...")
+            runs = [measure(mode, env, args.timeout) for _ in range(args.runs)]
+            results[f"startup_{mode}"] = {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+    finally:
+        server.shutdown()
+
+    baseline_path = args.baseline or BASELINE_PATH
+    baselines = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path, encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    regressions = compare(results, baselines, args.tolerance)
+
+    if args.save_baseline:
+        baselines.update({key: {name: round(value, 3) for name, value in metrics.items()}
+                          for key, metrics in results.items()})
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nReferências gravadas em {baseline_path}")
+    elif regressions:
+        print(f"\n{len(regressions)} métricas acima da referência (tolerância {args.tolerance:.0%})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
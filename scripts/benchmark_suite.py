@@ -0,0 +1,274 @@
+"""
+Suíte de benchmarks da recuperação (RAG) e do fluxo conversacional.
+
+Para cada tamanho de base pedido, gera uma base sintética (scripts/synthetic_kb.py),
+sobe o servidor OpenAI simulado (scripts/fake_openai_server.py) e mede:
+
+    index_build_s          RAGRetrieval.build_indices (BM25 + índice vetorial)
+    rss_mb / peak_rss_mb   memória residente após a construção / pico do processo
+    hybrid_p50_ms/p99_ms   _hybrid_search em uma seção
+    stage_p50_ms/p99_ms    retrieve_for_stage (várias seções, fusão por estágio)
+    turn_p50_ms/p99_ms     um turno de /chat-stage (Flask test client)
+    walkthrough_s          conversa completa, da necessidade à prévia
+
+Os resultados são comparados com as referências gravadas em
+scripts/benchmark_baselines.json; métricas acima da referência além da
+tolerância são apontadas como regressão (código de saída 1).
+
+Sem --database-url cada tamanho usa um arquivo SQLite temporário (JSONB gravado
+como JSON); com --database-url (PostgreSQL) a base existente é reaproveitada se
+já estiver populada.
+
+Uso:
+    python scripts/benchmark_suite.py --chunks 10000,50000
+    python scripts/benchmark_suite.py --chunks 100000 --database-url postgresql+psycopg2://... --save-baseline
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(REPO_ROOT, "src", "main", "python")
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+for path in (SRC_DIR, SCRIPTS_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from fake_openai_server import start_fake_openai
+from synthetic_kb import DEFAULT_DIMENSION, OBJECTIVES, SECTION_WEIGHTS, create_kb_app, populate
+
+BASELINE_PATH = os.path.join(SCRIPTS_DIR, "benchmark_baselines.json")
+
+STAGES = ['suggest_requirements', 'solution_strategies', 'legal_norms', 'summary']
+
+# Conversa roteirizada: uma mensagem por etapa, da necessidade à prévia
+WALKTHROUGH = [
+    "Precisamos contratar {objeto} para atender as unidades regionais durante os próximos 30 meses",
+    "Os requisitos estão ok, pode seguir",
+    "Quais estratégias de contratação você sugere?",
+    "1",
+    "Sim, a demanda está prevista no PCA deste ano",
+    "Pode manter as normas sugeridas",
+    "Estimamos 120 unidades com valor total de R$ 850.000,00",
+    "Não haverá parcelamento",
+    "ok",
+]
+
+
+def rss_mb() -> float:
+    """Memória residente atual do processo (MB)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Pico de memória residente do processo (MB; ru_maxrss é em KB no Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def percentiles(samples):
+    values = np.array(samples) * 1000
+    return float(np.percentile(values, 50)), float(np.percentile(values, 99))
+
+
+def synthetic_queries(count: int, seed: int):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        objeto, itens, servicos = OBJECTIVES[rng.choice(list(OBJECTIVES))]
+        queries.append(rng.choice([
+            f"requisitos para {objeto} com {rng.choice(servicos)}",
+            f"{rng.choice(itens)} garantia mínima e atendimento a chamados críticos",
+            f"fundamentação legal da contratação de {objeto}",
+            f"estratégia de contratação de {rng.choice(servicos)} com pagamento por resultado",
+        ]))
+    return queries
+
+
+def bench_retrieval(app, queries, k: int):
+    from application.ai.llm_gateway import get_openai_client
+    from domain.interfaces.dataprovider.DatabaseConfig import db
+    from rag import retrieval as retrieval_module
+    from rag.retrieval import RAGRetrieval, retrieve_for_stage
+
+    metrics = {}
+    with app.app_context():
+        started = time.perf_counter()
+        retrieval = RAGRetrieval(db_session=db.session, openai_client=get_openai_client())
+        if not retrieval.build_indices():
+            raise RuntimeError("Falha ao construir os índices")
+        metrics['index_build_s'] = time.perf_counter() - started
+        metrics['rss_mb'] = rss_mb()
+        # retrieve_for_stage e /chat-stage usam a instância global
+        retrieval_module._retrieval_instance = retrieval
+
+        sections = list(SECTION_WEIGHTS)
+        samples = []
+        for i, query in enumerate(queries):
+            start = time.perf_counter()
+            retrieval._hybrid_search(sections[i % len(sections)], '', query, k)
+            samples.append(time.perf_counter() - start)
+        metrics['hybrid_p50_ms'], metrics['hybrid_p99_ms'] = percentiles(samples)
+
+        samples = []
+        for i, query in enumerate(queries):
+            start = time.perf_counter()
+            retrieve_for_stage(query, STAGES[i % len(STAGES)], k=12)
+            samples.append(time.perf_counter() - start)
+        metrics['stage_p50_ms'], metrics['stage_p99_ms'] = percentiles(samples)
+    return metrics
+
+
+def bench_walkthroughs(app, conversations: int, seed: int):
+    from adapter.entrypoint.etp.EtpDynamicController import etp_dynamic_bp
+    from domain.interfaces.dataprovider.DatabaseConfig import db
+    from domain.repositories.ConversationRepository import ConversationRepo
+
+    if 'etp_dynamic' not in app.blueprints:
+        app.register_blueprint(etp_dynamic_bp, url_prefix='/api/etp-dynamic')
+    client = app.test_client()
+    rng = random.Random(seed)
+
+    turns, totals, stages = [], [], set()
+    for _ in range(conversations):
+        objeto = OBJECTIVES[rng.choice(list(OBJECTIVES))][0]
+        with app.app_context():
+            conversation_id = ConversationRepo.create(user_id='benchmark').id
+            db.session.commit()
+        started = time.perf_counter()
+        for message in WALKTHROUGH:
+            start = time.perf_counter()
+            response = client.post('/api/etp-dynamic/chat-stage',
+                                   json={'conversation_id': conversation_id, 'message': message.format(objeto=objeto)})
+            turns.append(time.perf_counter() - start)
+            stages.add((response.get_json(silent=True) or {}).get('stage'))
+        totals.append(time.perf_counter() - started)
+        # A etapa de prévia grava static/previews/<conversa>.html; não deixar resíduos do benchmark
+        for extension in ('html', 'pdf'):
+            path = os.path.join(REPO_ROOT, 'static', 'previews', f"{conversation_id}.{extension}")
+            if os.path.exists(path):
+                os.remove(path)
+
+    metrics = {}
+    metrics['turn_p50_ms'], metrics['turn_p99_ms'] = percentiles(turns)
+    metrics['walkthrough_s'] = float(np.mean(totals))
+    return metrics, sorted(s for s in stages if s)
+
+
+def run_size(chunks: int, args, workdir: str):
+    from domain.interfaces.dataprovider.DatabaseConfig import db
+    from domain.dto.KbDto import KbChunk
+
+    database_url = args.database_url or os.path.join(workdir, f"kb_{chunks}.sqlite3")
+    app = create_kb_app(database_url)
+    os.environ['RAG_INDEX_DIR'] = os.path.join(workdir, f"indices_{chunks}")
+    os.environ['RAG_BM25_DIR'] = os.path.join(workdir, f"bm25_{chunks}")
+
+    with app.app_context():
+        existing = db.session.query(KbChunk).count()
+        if existing == 0:
+            started = time.perf_counter()
+            populate(db.session, chunks, seed=args.seed, dimension=args.dim)
+            print(f"  base sintética: {chunks} chunks em {time.perf_counter() - started:.1f}s")
+        else:
+            print(f"  base existente reaproveitada: {existing} chunks")
+
+    metrics = bench_retrieval(app, synthetic_queries(args.queries, args.seed), args.k)
+    walkthrough, stages = bench_walkthroughs(app, args.conversations, args.seed)
+    metrics.update(walkthrough)
+    metrics['peak_rss_mb'] = peak_rss_mb()
+    print(f"  etapas percorridas: {', '.join(stages)}")
+    return metrics
+
+
+def compare(results, baselines, tolerance: float):
+    """Imprime as métricas contra as referências; retorna as regressões encontradas"""
+    regressions = []
+    for size, metrics in results.items():
+        reference = baselines.get(size, {})
+        print(f"\n{size} chunks" if str(size).isdigit() else f"\n{size}")
+        print(f"  {'métrica':<16}{'atual':>12}{'referência':>12}{'variação':>10}")
+        for name, value in metrics.items():
+            base = reference.get(name)
+            if base:
+                delta = (value - base) / base
+                flag = "  REGRESSÃO" if delta > tolerance else ""
+                print(f"  {name:<16}{value:>12.2f}{base:>12.2f}{delta:>+9.0%}{flag}")
+                if flag:
+                    regressions.append((size, name, value, base))
+            else:
+                print(f"  {name:<16}{value:>12.2f}{'-':>12}{'':>10}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de recuperação e do fluxo /chat-stage")
+    parser.add_argument("--chunks", default="10000", help="Tamanhos da base separados por vírgula (ex.: 10000,100000)")
+    parser.add_argument("--queries", type=int, default=200, help="Consultas por medição de latência")
+    parser.add_argument("--conversations", type=int, default=3, help="Conversas completas em /chat-stage")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIMENSION, help="Dimensão dos embeddings")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Latência simulada do provedor (s)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--database-url", help="Banco já existente (PostgreSQL); padrão: SQLite temporário")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Arquivo JSON de referências")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Aumento tolerado sobre a referência (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Grava os resultados como novas referências")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.chunks.split(",") if size.strip()]
+    if args.database_url and len(sizes) > 1:
+        parser.error("--database-url aceita um único tamanho de base")
+
+    server, base_url = start_fake_openai(latency=args.llm_latency, dimension=args.dim)
+    workdir = tempfile.mkdtemp(prefix="etp-bench-")
+    # Antes de importar a aplicação: provedor simulado e caches desligados (cada consulta paga o custo real)
+    os.environ.update({
+        'OPENAI_API_KEY': 'sk-benchmark',
+        'OPENAI_API_BASE': base_url,
+        'EMBEDDINGS_CACHE_ENABLED': 'false',
+        'ANSWER_CACHE_ENABLED': 'false',
+        'LEXML_SRU_URL': f"{base_url}/sru",
+        'LEXML_REFRESH_ENABLED': 'false',
+    })
+
+    results = {}
+    try:
+        for size in sizes:
+            print(f"Medindo base com {size} chunks...")
+            results[str(size)] = run_size(size, args, workdir)
+    finally:
+        server.shutdown()
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    regressions = compare(results, baselines, args.tolerance)
+
+    if args.save_baseline:
+        baselines.update({size: {name: round(value, 3) for name, value in metrics.items()}
+                          for size, metrics in results.items()})
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nReferências gravadas em {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} métricas acima da referência (tolerância {args.tolerance:.0%})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
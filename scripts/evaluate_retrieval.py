@@ -0,0 +1,57 @@
+"""
+Avaliação offline da busca híbrida: recall@k e MRR por método de fusão.
+
+Uso:
+    python scripts/evaluate_retrieval.py casos.jsonl --methods minmax,zscore,rrf,raw --k 3,5,8,12
+
+O formato do arquivo de casos está descrito em ``rag/evaluation.py``.
+"""
+
+import os
+import sys
+import argparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(REPO_ROOT, "src", "main", "python")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from application.ai.llm_gateway import get_openai_client
+from application.config.FlaskConfig import create_api
+from domain.interfaces.dataprovider.DatabaseConfig import db
+from rag.evaluation import load_cases, evaluate_retrieval
+from rag.fusion import FUSION_METHODS
+from rag.retrieval import RAGRetrieval
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k e MRR da busca híbrida por método de fusão")
+    parser.add_argument("cases", help="Arquivo JSONL com consultas rotuladas")
+    parser.add_argument("--methods", default=",".join(FUSION_METHODS))
+    parser.add_argument("--k", default="3,5,8,12", help="Valores de k separados por vírgula")
+    args = parser.parse_args()
+
+    methods = [m.strip() for m in args.methods.split(",") if m.strip()]
+    ks = sorted({int(k) for k in args.k.split(",") if k.strip()})
+    cases = load_cases(args.cases)
+    if not cases:
+        print("Nenhum caso de avaliação encontrado.")
+        return
+
+    app = create_api(kb_bootstrap='off')
+    with app.app_context():
+        retrieval = RAGRetrieval(db_session=db.session, openai_client=get_openai_client())
+        if not retrieval.bm25_indices:
+            retrieval.build_indices()
+
+        report = evaluate_retrieval(retrieval, cases, methods, ks)
+
+    columns = [f"recall@{k}" for k in ks] + ["mrr"]
+    print(f"{len(cases)} casos\n")
+    print(f"{'método':<10}" + "".join(f"{c:>11}" for c in columns))
+    for method, metrics in report.items():
+        print(f"{method:<10}" + "".join(f"{metrics[c]:>11.3f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Servidor local compatível com a API da OpenAI, para benchmarks e desenvolvimento offline.
+
+Atende /v1/chat/completions (JSON ou SSE com ``stream=true``) e /v1/embeddings
+(vetores determinísticos do StubEmbeddingClient). As completions devolvem um JSON
+com os campos que o gerador e os parsers de intenção esperam em cada etapa
+(intro, requisitos, estratégias, normas, resumo), de modo que o fluxo de
+/chat-stage percorra as etapas sem depender do modelo real. ``latency`` simula o
+tempo de resposta do provedor.
+
+Uso:
+    python scripts/fake_openai_server.py --port 8089 --latency 0.3
+    OPENAI_API_BASE=http://127.0.0.1:8089/v1 OPENAI_API_KEY=sk-local python -m ...
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(REPO_ROOT, "src", "main", "python")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from rag.embeddings import StubEmbeddingClient
+
+CHAT_CONTENT = {
+    "intro": "Com base na necessidade informada e nas referências da base, proponho os requisitos abaixo.",
+    "requirements": [
+        "R1 — A contratada deverá prestar o serviço com disponibilidade mínima de 99,5% ao mês.",
+        "R2 — Os chamados críticos deverão ser atendidos em até 4 horas úteis.",
+        "R3 — A contratada deverá comprovar experiência anterior por atestados de capacidade técnica.",
+        "R4 — Relatórios mensais de desempenho deverão ser entregues ao fiscal do contrato.",
+        "R5 — Os materiais empregados deverão atender a critérios de sustentabilidade ambiental.",
+    ],
+    "justification": "Requisitos alinhados às práticas observadas em ETPs de objetos semelhantes.",
+    "strategies": [
+        {"titulo": "Contratação por serviço com pagamento por resultado",
+         "quando_indicado": "Demanda contínua com níveis de serviço mensuráveis",
+         "vantagens": ["Gestão por indicadores"], "riscos": ["Dependência do fornecedor"],
+         "pontos_de_requisito_afetados": ["R1", "R2"]},
+        {"titulo": "Aquisição com garantia estendida",
+         "quando_indicado": "Bens duráveis com uso intensivo",
+         "vantagens": ["Patrimônio próprio"], "riscos": ["Obsolescência"],
+         "pontos_de_requisito_afetados": ["R5"]},
+    ],
+    "legal": [
+        {"norma": "Lei nº 14.133/2021", "aplicacao": "Regime geral de licitações e contratos"},
+        {"norma": "Decreto nº 10.024/2019", "aplicacao": "Pregão na forma eletrônica"},
+    ],
+    "summary": "Estudo técnico preliminar consolidado a partir das respostas da conversa.",
+    "intent": "confirm",
+    "confidence": 0.9,
+}
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        with server.lock:
+            server.calls[self.path] = server.calls.get(self.path, 0) + 1
+
+        if self.path.endswith('/embeddings'):
+            self._embeddings(payload)
+        elif self.path.endswith('/chat/completions'):
+            self._chat(payload)
+        else:
+            self._json(404, {"error": {"message": f"Rota desconhecida: {self.path}"}})
+
+    def _embeddings(self, payload):
+        texts = payload.get('input')
+        texts = [texts] if isinstance(texts, str) else list(texts or [])
+        data = [{"object": "embedding", "index": i, "embedding": self.server.embedder.vector(text).tolist()}
+                for i, text in enumerate(texts)]
+        self._json(200, {"object": "list", "data": data, "model": payload.get('model', 'stub'),
+                         "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+
+    def _chat(self, payload):
+        content = json.dumps(CHAT_CONTENT, ensure_ascii=False)
+        model = payload.get('model', 'gpt-fake')
+        if not payload.get('stream'):
+            self._json(200, {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for start in range(0, len(content), 64):
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0, "model": model,
+                     "choices": [{"index": 0, "delta": {"content": content[start:start + 64]}, "finish_reason": None}]}
+            self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+    def _json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_openai(port: int = 0, latency: float = 0.0,
+                      dimension: int = 384) -> Tuple[ThreadingHTTPServer, str]:
+    """Inicia o servidor em uma thread; retorna (servidor, URL base ``http://127.0.0.1:<porta>/v1``)"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.embedder = StubEmbeddingClient(dimension=dimension)
+    server.lock = threading.Lock()
+    server.calls = {}
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local compatível com a API da OpenAI")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latência simulada por requisição (s)")
+    parser.add_argument("--dim", type=int, default=384, help="Dimensão dos embeddings")
+    args = parser.parse_args()
+
+    server, base_url = start_fake_openai(args.port, args.latency, args.dim)
+    print(f"Servidor OpenAI simulado em {base_url} (Ctrl+C para encerrar)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
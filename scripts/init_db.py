@@ -0,0 +1,71 @@
+"""
+Inicialização única do banco, antes de subir os workers da aplicação.
+
+Cria as tabelas e índices que faltam e os usuários demo (o que cada processo fazia
+no startup). Com --load-kb também executa a ingestão inicial da base de conhecimento
+se ela estiver vazia, e com --build-indices grava os índices BM25 e vetorial, de modo
+que os workers apenas os abram.
+
+Uso (com DB_INIT_ON_STARTUP=false nos workers):
+    python scripts/init_db.py
+    python scripts/init_db.py --load-kb --build-indices
+"""
+
+import os
+import sys
+import time
+import argparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(REPO_ROOT, "src", "main", "python")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from dotenv import load_dotenv
+from flask import Flask
+
+from domain.interfaces.dataprovider.DatabaseConfig import init_database, init_schema
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cria o esquema do banco e, opcionalmente, carrega a base de conhecimento")
+    parser.add_argument("--load-kb", action="store_true", help="Ingestão inicial se a base de conhecimento estiver vazia")
+    parser.add_argument("--build-indices", action="store_true", help="Constrói e grava os índices RAG")
+    parser.add_argument("--database-url", help="URL do banco (padrão: DATABASE_URL)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    app = Flask(__name__)
+    init_database(app, REPO_ROOT, create_schema=False)
+
+    exit_code = 0
+    with app.app_context():
+        started = time.perf_counter()
+        init_schema()
+        print(f"Esquema verificado em {time.perf_counter() - started:.1f}s")
+
+        if args.load_kb:
+            from application.services.kb_bootstrap import auto_load_knowledge_base
+
+            started = time.perf_counter()
+            if not auto_load_knowledge_base():
+                exit_code = 1
+            print(f"Base de conhecimento verificada em {time.perf_counter() - started:.1f}s")
+
+        if args.build_indices:
+            from application.ai.llm_gateway import get_openai_client
+            from rag.retrieval import get_retrieval_instance
+
+            started = time.perf_counter()
+            if not get_retrieval_instance(openai_client=get_openai_client()).build_indices():
+                exit_code = 1
+            print(f"Índices RAG construídos em {time.perf_counter() - started:.1f}s")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
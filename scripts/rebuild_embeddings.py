@@ -14,7 +14,7 @@ from infrastructure.embedding.openai_embedder import OpenAIEmbedder
 
 
 def main():
-    app = create_api()
+    app = create_api(kb_bootstrap='off')
     embedder = OpenAIEmbedder()
     with app.app_context():
         chunks = db.session.query(KbChunk).filter(KbChunk.embedding == None).all()
@@ -0,0 +1,261 @@
+"""
+Gerador de base de conhecimento sintética para benchmarks.
+
+Produz documentos e chunks (KbDocument/KbChunk) com texto em português no
+estilo dos ETPs reais - necessidade, requisitos, normas legais, estratégias e
+marco legal - distribuídos por objetos de contratação, com embeddings
+determinísticos (StubEmbeddingClient) já gravados em KbChunk.embedding.
+
+O gerador é determinístico para uma mesma semente: duas execuções produzem
+exatamente os mesmos textos, o que torna comparáveis as medições entre versões.
+
+Uso (popula o banco informado; sem --database-url usa um arquivo SQLite local):
+    python scripts/synthetic_kb.py --chunks 100000 --database-url postgresql+psycopg2://...
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(REPO_ROOT, "src", "main", "python")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+
+from rag.embeddings import StubEmbeddingClient
+
+DEFAULT_DIMENSION = 384
+CHUNKS_PER_DOCUMENT = 24
+
+# Distribuição aproximada das seções na base de ETPs
+SECTION_WEIGHTS = {
+    'requisito': 0.60,
+    'norma_legal': 0.25,
+    'necessidade': 0.10,
+    'estrategia': 0.04,
+    'marco_legal': 0.01,
+}
+
+# Objetos de contratação: slug -> (objeto, itens, serviços associados)
+OBJECTIVES = {
+    'locacao_veiculos': ('locação de veículos', ['veículos leves', 'caminhonetes', 'vans de passageiros'],
+                         ['manutenção preventiva', 'rastreamento por GPS', 'seguro total']),
+    'servicos_limpeza': ('serviços de limpeza e conservação', ['materiais de limpeza', 'equipamentos de higienização'],
+                         ['limpeza de áreas comuns', 'coleta seletiva', 'higienização de sanitários']),
+    'vigilancia_patrimonial': ('vigilância patrimonial armada e desarmada', ['postos de vigilância', 'rádios comunicadores'],
+                               ['rondas periódicas', 'controle de acesso', 'monitoramento por CFTV']),
+    'solucao_ti': ('solução de tecnologia da informação', ['licenças de software', 'servidores', 'estações de trabalho'],
+                   ['suporte técnico', 'sustentação de sistemas', 'treinamento de usuários']),
+    'computacao_nuvem': ('serviços de computação em nuvem', ['máquinas virtuais', 'armazenamento de objetos'],
+                         ['backup gerenciado', 'alta disponibilidade', 'migração de cargas']),
+    'manutencao_predial': ('manutenção predial preventiva e corretiva', ['sistemas de climatização', 'quadros elétricos'],
+                           ['manutenção de elevadores', 'reparos hidráulicos', 'pintura de fachadas']),
+    'material_expediente': ('aquisição de material de expediente', ['papel A4', 'toners', 'pastas de arquivo'],
+                            ['entrega parcelada', 'reposição programada']),
+    'obras_reforma': ('obras de reforma de edificações', ['projeto executivo', 'materiais de construção'],
+                      ['fiscalização de obra', 'gestão de resíduos', 'as built']),
+    'alimentacao': ('fornecimento de refeições', ['refeições prontas', 'kits de lanche'],
+                    ['controle de qualidade nutricional', 'logística de distribuição']),
+    'medicamentos': ('aquisição de medicamentos', ['medicamentos da atenção básica', 'insumos hospitalares'],
+                     ['armazenamento refrigerado', 'rastreabilidade de lotes']),
+    'energia_solar': ('instalação de usinas de energia solar', ['painéis fotovoltaicos', 'inversores'],
+                      ['monitoramento de geração', 'manutenção de módulos']),
+    'telefonia': ('serviços de telefonia fixa e móvel', ['linhas móveis', 'aparelhos corporativos'],
+                  ['gestão de consumo', 'portabilidade numérica']),
+}
+
+LAWS = [
+    ('Lei', '14.133', '2021'), ('Lei', '8.666', '1993'), ('Decreto', '10.024', '2019'),
+    ('Lei Complementar', '123', '2006'), ('Lei', '13.709', '2018'), ('Decreto', '7.746', '2012'),
+    ('Instrução Normativa', '65', '2021'), ('Instrução Normativa', '5', '2017'), ('Lei', '12.527', '2011'),
+    ('Decreto', '11.462', '2023'), ('Lei', '10.520', '2002'), ('Portaria', '938', '2022'),
+]
+
+UNITS = ['horas', 'dias úteis', 'dias corridos', 'meses']
+SLAS = ['99,5%', '99,9%', '98%', '95%']
+
+TEMPLATES = {
+    'necessidade': [
+        "A contratação de {objeto} é necessária para garantir a continuidade das atividades administrativas do órgão, "
+        "que hoje dependem de {item} em quantidade insuficiente para a demanda anual.",
+        "Foi identificada a necessidade de {objeto} em razão do aumento da demanda das unidades regionais "
+        "e do término do contrato vigente, sem possibilidade de prorrogação.",
+        "O levantamento realizado pela área demandante indica que a ausência de {servico} compromete "
+        "o atendimento ao público e a execução das metas previstas no planejamento estratégico.",
+    ],
+    'requisito': [
+        "A contratada deverá fornecer {item} com garantia mínima de {n} {unidade}, contados do recebimento definitivo.",
+        "O serviço de {servico} deverá ser prestado com disponibilidade mínima de {sla} ao mês, "
+        "medida pelo fiscal do contrato por meio de relatórios mensais.",
+        "Os chamados classificados como críticos deverão ser atendidos em até {n} {unidade}, "
+        "sob pena de aplicação das glosas previstas no instrumento de medição de resultado.",
+        "A contratada deverá comprovar experiência anterior na execução de {servico}, por meio de atestados "
+        "de capacidade técnica compatíveis com o objeto.",
+        "Todos os {item} deverão atender aos critérios de sustentabilidade ambiental e possuir certificação "
+        "de conformidade emitida por organismo acreditado.",
+    ],
+    'norma_legal': [
+        "A presente contratação fundamenta-se na {lei} e observará o disposto no {lei2}, "
+        "no que couber à modalidade adotada.",
+        "Aplicam-se ao contrato as regras de {lei}, inclusive quanto à gestão e à fiscalização da execução, "
+        "bem como as orientações da {lei2}.",
+        "O tratamento de dados pessoais eventualmente realizado durante a execução observará a {lei}.",
+    ],
+    'estrategia': [
+        "Foram avaliadas as alternativas de aquisição direta, locação e contratação por serviço; a contratação de "
+        "{servico} com pagamento por resultado mostrou-se mais vantajosa no ciclo de vida do objeto.",
+        "Recomenda-se o parcelamento do objeto em lotes regionais, ampliando a competitividade sem perda "
+        "de economia de escala na contratação de {objeto}.",
+        "A adesão a ata de registro de preços vigente foi considerada, mas o quantitativo disponível "
+        "não atende à demanda estimada de {item}.",
+    ],
+    'marco_legal': [
+        "O marco legal aplicável compreende a {lei}, seus regulamentos e as normas internas do órgão "
+        "sobre planejamento das contratações.",
+        "A instrução processual seguirá o {lei2} e as orientações consolidadas pelos órgãos de controle.",
+    ],
+}
+
+
+@compiles(JSONB, 'sqlite')
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    # Banco local de benchmark: a coluna KbChunk.embedding (JSONB no PostgreSQL) é gravada como JSON
+    return 'JSON'
+
+
+def _law(rng):
+    tipo, numero, ano = rng.choice(LAWS)
+    return f"{tipo} nº {numero}/{ano}"
+
+
+def chunk_text(rng: random.Random, section: str, slug: str) -> str:
+    """Texto de um chunk: 2 a 5 frases da seção, sobre o objeto informado"""
+    objeto, itens, servicos = OBJECTIVES[slug]
+    sentences = []
+    for _ in range(rng.randint(2, 5)):
+        template = rng.choice(TEMPLATES[section])
+        sentences.append(template.format(
+            objeto=objeto, item=rng.choice(itens), servico=rng.choice(servicos),
+            n=rng.choice([2, 4, 8, 12, 24, 30]), unidade=rng.choice(UNITS), sla=rng.choice(SLAS),
+            lei=_law(rng), lei2=_law(rng),
+        ))
+    return " ".join(sentences)
+
+
+def generate_documents(count: int, seed: int = 7):
+    """
+    Gera ``count`` chunks agrupados em documentos (um objeto de contratação por documento).
+
+    Yields:
+        (documento, chunks): documento = {filename, objective_slug}; chunks = [{section_type, content_text}]
+    """
+    rng = random.Random(seed)
+    sections, weights = list(SECTION_WEIGHTS), list(SECTION_WEIGHTS.values())
+    slugs = list(OBJECTIVES)
+    produced = 0
+    doc_number = 0
+    while produced < count:
+        doc_number += 1
+        slug = slugs[doc_number % len(slugs)]
+        size = min(CHUNKS_PER_DOCUMENT, count - produced)
+        chunks = [{'section_type': section, 'content_text': chunk_text(rng, section, slug)}
+                  for section in rng.choices(sections, weights, k=size)]
+        produced += size
+        yield {'filename': f'etp_sintetico_{doc_number:06d}.pdf', 'objective_slug': slug}, chunks
+
+
+def create_kb_app(database_url: str):
+    """
+    App Flask mínima com o banco informado (URL SQLAlchemy ou caminho de arquivo SQLite)
+    e as tabelas da aplicação criadas.
+    """
+    from flask import Flask
+    from domain.interfaces.dataprovider.DatabaseConfig import db
+    # Registrar todos os modelos antes do create_all
+    from domain.dto.UserDto import User  # noqa: F401
+    from domain.dto.EtpOrm import EtpSession, EtpDocument  # noqa: F401
+    from domain.dto.KbDto import KbDocument, KbChunk, LegalNormCache  # noqa: F401
+    from domain.dto.ConversationModels import Conversation, Message  # noqa: F401
+
+    if '://' not in database_url:
+        os.makedirs(os.path.dirname(os.path.abspath(database_url)), exist_ok=True)
+        database_url = f"sqlite:///{os.path.abspath(database_url)}"
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def populate(session, count: int, seed: int = 7, dimension: int = DEFAULT_DIMENSION,
+             batch_size: int = 5000, progress: bool = False) -> int:
+    """
+    Insere a base sintética no banco da sessão (em lotes, sem materializar objetos ORM).
+
+    Returns:
+        Quantidade de chunks inseridos
+    """
+    from domain.dto.KbDto import KbDocument, KbChunk
+
+    embedder = StubEmbeddingClient(dimension=dimension)
+    chunk_table = KbChunk.__table__
+    rows = []
+    inserted = 0
+    started = time.perf_counter()
+
+    def flush():
+        nonlocal inserted
+        if rows:
+            session.execute(chunk_table.insert(), rows)
+            session.commit()
+            inserted += len(rows)
+            rows.clear()
+            if progress:
+                print(f"  {inserted} chunks ({time.perf_counter() - started:.1f}s)", flush=True)
+
+    for document, chunks in generate_documents(count, seed):
+        doc = KbDocument(**document)
+        session.add(doc)
+        session.flush()
+        for chunk in chunks:
+            rows.append({
+                'kb_document_id': doc.id,
+                'section_type': chunk['section_type'],
+                'content_text': chunk['content_text'],
+                'objective_slug': document['objective_slug'],
+                'citations_json': None,
+                'embedding': embedder.vector(chunk['content_text']).tolist(),
+            })
+        if len(rows) >= batch_size:
+            flush()
+    flush()
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Popula o banco com uma base de conhecimento sintética")
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIMENSION, help="Dimensão dos embeddings")
+    parser.add_argument("--database-url", default=os.path.join(REPO_ROOT, "data", "benchmarks", "kb.sqlite3"),
+                        help="URL SQLAlchemy ou caminho de um arquivo SQLite")
+    args = parser.parse_args()
+
+    from domain.interfaces.dataprovider.DatabaseConfig import db
+
+    app = create_kb_app(args.database_url)
+    with app.app_context():
+        total = populate(db.session, args.chunks, args.seed, args.dim, progress=True)
+    print(f"{total} chunks inseridos")
+
+
+if __name__ == "__main__":
+    main()
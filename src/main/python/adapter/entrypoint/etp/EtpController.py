@@ -9,6 +9,7 @@ from flask_cors import cross_origin
 from domain.interfaces.dataprovider.DatabaseConfig import db
 from domain.dto.EtpOrm import EtpSession
 from domain.dto.UserDto import User
+from adapter.entrypoint.jobs.JobController import async_job
 
 etp_bp = Blueprint('etp', __name__)
 
@@ -229,6 +230,7 @@ def save_answer(session_id):
 
 @etp_bp.route('/session/<session_id>/generate', methods=['POST'])
 @cross_origin()
+@async_job('etp.generate_legacy')
 def generate_etp_legacy(session_id):
     """Gera ETP usando método legado (redirecionamento interno para API dinâmica)"""
     try:
@@ -287,6 +289,7 @@ def generate_etp_legacy(session_id):
 # Adicionar endpoints ausentes que o frontend está chamando
 @etp_bp.route('/generate-preview', methods=['POST'])
 @cross_origin()
+@async_job('etp.preview_legacy')
 def generate_etp_preview():
     """Gera preview do ETP (compatibilidade com frontend)"""
     try:
@@ -346,6 +349,7 @@ def generate_etp_preview():
 
 @etp_bp.route('/generate-final-document', methods=['POST'])
 @cross_origin()
+@async_job('etp.final_document')
 def generate_final_document():
     """Gera documento final do ETP (compatibilidade com frontend)"""
     try:
@@ -1,13 +1,16 @@
 import os
 import json
 import uuid
+import queue
 import tempfile
 import logging
+import threading
 import traceback
+from contextvars import copy_context
 from datetime import datetime
 from pathlib import Path
 from typing import Any, List, Optional, Tuple
-from flask import Blueprint, request, jsonify, send_file, g
+from flask import Blueprint, Response, request, jsonify, send_file, g, current_app, copy_current_request_context
 from flask_cors import cross_origin
 import re
 import unicodedata
@@ -19,7 +22,6 @@ from domain.dto.ConversationModels import Conversation, Message
 from domain.repositories.ConversationRepository import ConversationRepo, MessageRepo
 from domain.usecase.etp.verify_federal import resolve_lexml, summarize_for_user, parse_legal_norm_string
 from application.config.LimiterConfig import limiter
-from rag.retrieval import search_requirements
 from domain.services.etp_dynamic import init_etp_dynamic
 from domain.usecase.etp.legal_norms_interpreter import parse_legal_norms
 from domain.usecase.etp.price_research_interpreter import parse_price_research
@@ -33,6 +35,7 @@ from application.ai.generator import (
     generate_text_with_model,
 )
 from application.ai.hybrid_models import OpenAIChatConsultive, OpenAIFinalWriter, OpenAIIntentParser
+from application.ai.llm_gateway import get_openai_client, token_stream
 from application.nlu.intent_requirements import (
     ACCEPT as REQ_ACCEPT,
     EDIT as REQ_EDIT,
@@ -40,7 +43,10 @@ from application.nlu.intent_requirements import (
     detect_intent as detect_requirements_intent,
 )
 from application.ai import intents
-from application.services.preview_builder import build_preview, build_etp_markdown
+from application.nlu.intent_engine import get_intent_engine
+from application.services.preview_builder import build_preview, build_etp_markdown, section_stream
+from application.services.telemetry import set_stage, span
+from adapter.entrypoint.jobs.JobController import async_job
 from domain.usecase.etp.state_machine import (
     is_user_confirmed, validate_state_transition, can_generate_etp,
     handle_other_intent, handle_http_error, validate_generator_exists,
@@ -48,7 +54,6 @@ from domain.usecase.etp.state_machine import (
 )
 from domain.usecase.etp import conversational_state_machine as csm
 from io import BytesIO
-from docx import Document as DocxDocument
 
 etp_dynamic_bp = Blueprint('etp_dynamic', __name__)
 
@@ -303,24 +308,17 @@ def _apply_requirements_edit(requirements: List[Any], user_text: str) -> Tuple[O
     )
 
 def _get_openai_client():
-    """Get or create OpenAI client"""
+    """Get the process-wide OpenAI client from the LLM gateway"""
     global _openai_client
     if _openai_client is None:
-        api_key = os.getenv('OPENAI_API_KEY')
-        if api_key:
-            import openai
-            _openai_client = openai.OpenAI(api_key=api_key)
+        _openai_client = get_openai_client()
     return _openai_client
 
 def get_llm_client():
     """Helper to ensure llm_client is always available (never None)"""
     client = _get_openai_client()
     if client is None:
-        logger.warning("[CLIENT] OpenAI client not initialized, creating fallback")
-        api_key = os.getenv('OPENAI_API_KEY')
-        if api_key:
-            import openai
-            client = openai.OpenAI(api_key=api_key)
+        logger.warning("[CLIENT] OpenAI client not initialized (OPENAI_API_KEY ausente)")
     return client
 
 def get_model_name():
@@ -1164,23 +1162,61 @@ def create_new_conversation():
             'error': f'Erro ao criar nova conversa: {str(e)}'
         }), 500
 
+CONVERSATION_LIST_LIMIT = 100
+CONVERSATION_PREVIEW_CHARS = 120
+
+
+def _encode_conversation_cursor(conv) -> str:
+    """Cursor keyset da listagem: updated_at e id da última conversa da página"""
+    return f"{conv.updated_at.isoformat()}|{conv.id}"
+
+
+def _decode_conversation_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverso de _encode_conversation_cursor; ValueError para cursores inválidos"""
+    updated_at, sep, conv_id = cursor.partition('|')
+    if not sep or not conv_id:
+        raise ValueError(cursor)
+    return datetime.fromisoformat(updated_at), conv_id
+
+
 @etp_dynamic_bp.route('/list', methods=['GET'])
 @cross_origin()
 def list_conversations():
-    """List all conversations for the current user with message preview"""
+    """
+    List conversations for the current user with message preview.
+
+    Query params:
+        limit: page size (default and max 100)
+        cursor: next_cursor returned by the previous page (keyset on updated_at)
+    """
     try:
         user_id = get_current_user_id()
         
-        # Get conversations ordered by updated_at DESC
-        conversations_list = ConversationRepo.list_by_user(user_id=user_id, limit=100)
+        try:
+            limit = min(max(int(request.args.get('limit', CONVERSATION_LIST_LIMIT)), 1), CONVERSATION_LIST_LIMIT)
+            cursor = request.args.get('cursor')
+            before = _decode_conversation_cursor(cursor) if cursor else None
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Parâmetros de paginação inválidos'
+            }), 400
+        
+        # Conversas por updated_at DESC com a última mensagem, em uma única consulta
+        rows = ConversationRepo.list_with_last_message(
+            user_id=user_id,
+            limit=limit + 1,
+            before=before,
+            preview_chars=CONVERSATION_PREVIEW_CHARS
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
         result = []
-        for conv in conversations_list:
-            # Get last message for preview
-            last_msg = MessageRepo.get_last_message(conv.id)
-            preview = ""
-            if last_msg:
-                preview = last_msg.content[:120] + "..." if len(last_msg.content) > 120 else last_msg.content
+        for conv, last_content in rows:
+            preview = last_content or ""
+            if len(preview) > CONVERSATION_PREVIEW_CHARS:
+                preview = preview[:CONVERSATION_PREVIEW_CHARS] + "..."
             
             result.append({
                 'id': conv.id,
@@ -1194,7 +1230,8 @@ def list_conversations():
         
         return jsonify({
             'success': True,
-            'conversations': result
+            'conversations': result,
+            'next_cursor': _encode_conversation_cursor(rows[-1][0]) if has_more else None
         }), 200
         
     except Exception as e:
@@ -1237,6 +1274,7 @@ def chat_stage_based():
         necessity = session.necessity or ''
         requirements = session.get_requirements() or []
         answers = session.get_answers() or {}
+        set_stage(current_stage)
         
         logger.info(f"[STAGE_CHAT] conversation={conversation_id}, stage={current_stage}, message={user_message[:50]}")
         
@@ -2351,10 +2389,8 @@ def preview_etp_document(session_id):
         # Initialize LLM client if needed
         global _openai_client, _simple_generator
         if _openai_client is None:
-            api_key = os.getenv('OPENAI_API_KEY')
-            if api_key:
-                import openai
-                _openai_client = openai.OpenAI(api_key=api_key)
+            _openai_client = get_openai_client()
+            if _openai_client:
                 logger.info("[PREVIEW] OpenAI client initialized")
         
         if _simple_generator is None:
@@ -2537,6 +2573,7 @@ def save_answer(session_id):
 @etp_dynamic_bp.route('/session/<session_id>/generate', methods=['POST'])
 @limiter.limit("10 per minute")
 @cross_origin()
+@async_job('etp_dynamic.generate')
 def generate_etp(session_id):
     """Gera ETP completo usando prompts dinâmicos"""
     try:
@@ -2641,45 +2678,47 @@ def generate_etp(session_id):
 
 @etp_dynamic_bp.route('/session/<session_id>/preview', methods=['POST'])
 @cross_origin()
+@async_job('etp_dynamic.preview')
 def generate_preview(session_id):
-    """Gera preview do ETP usando prompts dinâmicos"""
+    """
+    Gera preview do ETP (multipass) a partir da sessão.
+    Passagens cujas entradas não mudaram desde a última prévia vêm do cache de seções;
+    só as passagens que recebem as respostas alteradas chamam o LLM.
+    """
     try:
         _ensure_initialized()
-        if not etp_generator:
-            return jsonify({'error': 'Gerador ETP não configurado'}), 500
 
         # Buscar sessão
         session = EtpSession.query.filter_by(session_id=session_id).first()
         if not session:
             return jsonify({'error': 'Sessão não encontrada'}), 404
 
-        # Preparar dados da sessão
-        session_data = {
-            'session_id': session_id,
-            'answers': session.get_answers(),
-            'user_id': session.user_id
+        # Preparar contexto da sessão
+        context_data = {
+            'necessity': session.necessity or 'Não informada',
+            'requirements': session.requirements or session.get_requirements(),
+            'answers': session.get_answers()
         }
 
-        # Gerar preview usando sistema dinâmico
-        preview_content = etp_generator.generate_complete_etp(
-            session_data=session_data,
-            context_data=None,
-            is_preview=True
-        )
+        preview_content = build_etp_markdown(context_data)
+
+        session.preview_content = preview_content
+        db.session.commit()
 
         return jsonify({
             'success': True,
             'preview_content': preview_content,
-            'message': 'Preview gerado com sucesso usando sistema dinâmico',
-            'generation_method': 'dynamic_prompts',
+            'message': 'Preview gerado com sucesso',
+            'generation_method': 'multipass',
             'is_preview': True
         })
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'success': False,
             'error': str(e),
-            'generation_method': 'dynamic_prompts'
+            'generation_method': 'multipass'
         }), 500
 
 @etp_dynamic_bp.route('/session/<session_id>', methods=['GET'])
@@ -2916,14 +2955,28 @@ def chat_endpoint():
         }), 500
 
 
+# Intenções que, com necessidade já definida, dispensam o analisador via LLM (perguntas
+# ficam de fora: podem trazer uma nova necessidade, ex.: "preciso de X, pode ser?")
+_ANALYZER_LOCAL_INTENTS = frozenset({'confirm', 'remove', 'keep_only', 'edit', 'add'})
+
+
 def call_analyzer_prompt(user_message, conversation_history, current_need):
     """
     Analyzer (Prompt 1): Detects if user message contains a new necessity.
     Returns: {"contains_need": bool, "need_description": str}
     """
+    # Com necessidade já definida, ajustes e confirmações inequívocos não definem nova necessidade
+    if current_need:
+        engine = get_intent_engine()
+        match = engine.classify_requirements_command(user_message)
+        resolved = engine.resolves(match) and match.intent in _ANALYZER_LOCAL_INTENTS
+        engine.record('analyzer', resolved)
+        if resolved:
+            return {"contains_need": False, "need_description": ""}
+
     try:
         _ensure_initialized()
-        
+
         messages = [
             {
                 "role": "system",
@@ -3002,6 +3055,7 @@ def call_dialogue_model(dialogue_input):
         kb_context = ""
         if need:
             try:
+                from rag.retrieval import search_requirements
                 rag_results = search_requirements("generic", need, k=5)
                 if rag_results:
                     kb_context = "\n\nConteúdo recuperado da base de conhecimento:\n"
@@ -3283,6 +3337,7 @@ def chat_conversational():
                 
                 # Generate requirements using RAG (dynamic count based on complexity)
                 try:
+                    from rag.retrieval import search_requirements
                     rag_results = search_requirements("generic", user_message, k=12)
                     if rag_results and len(rag_results) > 0:
                         # Extract requirements from RAG (use up to 12 results)
@@ -3677,10 +3732,8 @@ def etp_conversation():
         global _openai_client, _simple_generator
         try:
             if _openai_client is None:
-                api_key = os.getenv('OPENAI_API_KEY')
-                if api_key:
-                    import openai
-                    _openai_client = openai.OpenAI(api_key=api_key)
+                _openai_client = get_openai_client()
+                if _openai_client:
                     logger.info("[CLIENT] OpenAI client initialized")
             
             if _simple_generator is None:
@@ -4598,6 +4651,80 @@ Não repita informações já coletadas."""
             'error': f'Erro na conversa: {str(e)}'
         }), 500
 
+# ===================== Streaming (SSE) =====================
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _stream_json_view(view):
+    """
+    Executa uma view JSON em outra thread e transmite a resposta como Server-Sent Events.
+
+    Eventos:
+        token  {"text": ...}        trechos do LLM à medida que são gerados
+        section {"index", "title", "content"} passagens da prévia multipass já concluídas
+        done   {"status": ..., ...} payload final da view (o mesmo JSON do endpoint síncrono)
+        error  {"status": ..., ...} quando a view falha ou responde com status >= 400
+
+    A view roda inalterada (persistência via MessageRepo.add no fim, como no endpoint síncrono).
+    """
+    request.get_json(silent=True)  # lê o corpo antes de a resposta começar
+    request_globals = dict(vars(g))
+    events = queue.Queue()
+
+    @copy_current_request_context
+    def run():
+        vars(g).update(request_globals)
+        try:
+            with token_stream(lambda text: events.put(('token', {'text': text}))), \
+                    section_stream(lambda index, title, content: events.put(
+                        ('section', {'index': index, 'title': title, 'content': content}))):
+                response = current_app.make_response(view())
+            payload = response.get_json(silent=True) or {}
+            event = 'done' if response.status_code < 400 else 'error'
+            events.put((event, {'status': response.status_code, **payload}))
+        except Exception as e:
+            logger.error(f"[SSE] Error streaming {view.__name__}: {e}")
+            events.put(('error', {'status': 500, 'success': False, 'error': str(e)}))
+        finally:
+            events.put(None)
+
+    # Cópia do contexto: os spans da view entram na árvore de telemetria da requisição
+    threading.Thread(target=copy_context().run, args=(run,), name=f"sse-{view.__name__}", daemon=True).start()
+
+    def generate():
+        yield ": stream\n\n"
+        while True:
+            try:
+                item = events.get(timeout=SSE_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if item is None:
+                return
+            yield _sse_event(*item)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@etp_dynamic_bp.route('/chat-stage/stream', methods=['POST'])
+@cross_origin()
+def chat_stage_stream():
+    """Versão SSE de /chat-stage: tokens do LLM enquanto são gerados e o payload final no evento 'done'"""
+    return _stream_json_view(chat_stage_based)
+
+
+@etp_dynamic_bp.route('/conversation/stream', methods=['POST'])
+@cross_origin()
+def etp_conversation_stream():
+    """Versão SSE de /conversation: tokens do LLM enquanto são gerados e o payload final no evento 'done'"""
+    return _stream_json_view(etp_conversation)
+
+
 @etp_dynamic_bp.route('/confirm-requirements', methods=['POST'])
 @cross_origin()
 def confirm_requirements():
@@ -4738,6 +4865,7 @@ def suggest_requirements():
             return jsonify({'error': 'Necessidade é obrigatória'}), 400
 
         # Usar RAG para encontrar requisitos similares
+        from rag.retrieval import search_requirements
         rag_results = search_requirements("generic", necessity, k=5)
         
         # Gerar requisitos no formato R# — descrição (sem justificativas)
@@ -4816,6 +4944,7 @@ def analyze_response_stub():
 
 @etp_dynamic_bp.route('/generate-document', methods=['POST'])
 @cross_origin()
+@async_job('etp_dynamic.document')
 def generate_document():
     data = request.get_json(silent=True) or {}
     sid = (data.get("session_id") or "").strip() or None
@@ -4840,7 +4969,8 @@ def generate_document():
     
     # Compor e renderizar
     doc_json = compose_etp_document(session)
-    html = render_etp_html(doc_json)
+    with span('render.etp_html'):
+        html = render_etp_html(doc_json)
     etp_doc = EtpDocument(session_id=sid, doc_json=doc_json, html=html)
     db.session.add(etp_doc); db.session.commit()
     return jsonify(_text_payload(session, f"Perfeito. Requisitos confirmados. Vou gerar o ETP com base neles.\n\nDocumento gerado com sucesso (ID: {etp_doc.id}).",
@@ -4860,28 +4990,31 @@ def download_docx(doc_id: int):
     etp_doc = EtpDocument.query.get(doc_id)
     if not etp_doc:
         return jsonify({'success': False, 'error': 'Documento não encontrado'}), 404
-    d = DocxDocument()
-    d.add_heading(etp_doc.doc_json.get('title', 'Documento'), level=1)
-    for s in etp_doc.doc_json.get('sections', []):
-        d.add_heading(s.get('title', ''), level=2)
-        if s.get('content'):
-            d.add_paragraph(str(s['content']))
-        if s.get('items'):
-            for it in s['items']:
-                d.add_paragraph(f"- {it}")
-        for key in ['details', 'method', 'supplier_count']:
-            if s.get(key) is not None:
-                d.add_paragraph(f"{key}: {s.get(key)}")
-        if s.get('evidence_links'):
-            d.add_paragraph("Evidências:")
-            for link in s['evidence_links']:
-                d.add_paragraph(f"* {link}")
-        if s.get('notes'):
-            d.add_paragraph("Observações:")
-            for note in s['notes']:
-                d.add_paragraph(f"* {note}")
-    buf = BytesIO()
-    d.save(buf); buf.seek(0)
+    from docx import Document as DocxDocument
+
+    with span('render.docx'):
+        d = DocxDocument()
+        d.add_heading(etp_doc.doc_json.get('title', 'Documento'), level=1)
+        for s in etp_doc.doc_json.get('sections', []):
+            d.add_heading(s.get('title', ''), level=2)
+            if s.get('content'):
+                d.add_paragraph(str(s['content']))
+            if s.get('items'):
+                for it in s['items']:
+                    d.add_paragraph(f"- {it}")
+            for key in ['details', 'method', 'supplier_count']:
+                if s.get(key) is not None:
+                    d.add_paragraph(f"{key}: {s.get(key)}")
+            if s.get('evidence_links'):
+                d.add_paragraph("Evidências:")
+                for link in s['evidence_links']:
+                    d.add_paragraph(f"* {link}")
+            if s.get('notes'):
+                d.add_paragraph("Observações:")
+                for note in s['notes']:
+                    d.add_paragraph(f"* {note}")
+        buf = BytesIO()
+        d.save(buf); buf.seek(0)
     return send_file(
         buf,
         as_attachment=True,
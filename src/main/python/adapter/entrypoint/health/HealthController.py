@@ -2,6 +2,7 @@ import os
 from datetime import datetime
 from flask import Blueprint, jsonify
 from flask_cors import cross_origin
+from application.config.LimiterConfig import limiter
 
 health_bp = Blueprint('health', __name__)
 
@@ -37,6 +38,17 @@ def health_check():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@health_bp.route('/ready', methods=['GET'])
+@cross_origin()
+@limiter.exempt
+def readiness_check():
+    """Prontidão do processo: 200 quando a carga da base e dos índices terminou e o banco responde; 503 antes disso"""
+    from application.services.kb_bootstrap import readiness
+
+    ready, details = readiness()
+    details['timestamp'] = datetime.now().isoformat()
+    return jsonify(details), 200 if ready else 503
+
 @health_bp.route('/version', methods=['GET'])
 @cross_origin()
 def get_version():
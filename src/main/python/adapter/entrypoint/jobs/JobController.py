@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import logging
+import functools
+
+from flask import Blueprint, Response, current_app, jsonify, request, url_for
+from flask_cors import cross_origin
+
+from application.services.job_queue import (
+    CANCELLED, FAILED, SUCCEEDED, TERMINAL_STATUSES, JobError, get_job_queue, register_job_handler,
+)
+
+logger = logging.getLogger(__name__)
+
+jobs_bp = Blueprint('jobs', __name__)
+
+SSE_KEEPALIVE_SECONDS = 15
+JOB_EVENTS_POLL_SECONDS = float(os.getenv('JOB_EVENTS_POLL_SECONDS', '1'))
+
+# Cabeçalhos da requisição original repassados ao job
+_FORWARDED_HEADERS = ('X-User-Id', 'Accept-Language')
+
+
+def _current_user_id() -> str:
+    from adapter.entrypoint.etp.EtpDynamicController import get_current_user_id
+    return get_current_user_id()
+
+
+def _wants_async() -> bool:
+    """Cliente pediu execução em segundo plano: ``Prefer: respond-async`` ou ``?async=true``"""
+    prefer = request.headers.get('Prefer', '')
+    return 'respond-async' in prefer.lower() or request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+
+def _replay_view(view):
+    """Handler de job que executa a view com os dados da requisição original"""
+
+    def handler(payload, context):
+        with current_app.test_request_context(
+            payload['path'],
+            method=payload['method'],
+            query_string=payload.get('query'),
+            json=payload.get('json'),
+            headers=payload.get('headers'),
+        ):
+            context.raise_if_cancelled()
+            response = current_app.make_response(view(**payload.get('view_args', {})))
+        result = {'status': response.status_code, 'body': response.get_json(silent=True)}
+        if response.status_code >= 400:
+            body = result['body'] or {}
+            raise JobError(body.get('error') or f"HTTP {response.status_code}", result=result,
+                           retryable=response.status_code >= 500)
+        return result
+
+    return handler
+
+
+def async_job(kind: str):
+    """
+    Permite que o cliente execute a view como job em segundo plano.
+
+    Com ``Prefer: respond-async`` (ou ``?async=true``), a requisição é gravada na fila e a
+    resposta é 202 com o id do job; o resultado (o mesmo JSON do endpoint síncrono) fica em
+    /api/jobs/<id>/result, com progresso por polling em /api/jobs/<id> ou SSE em
+    /api/jobs/<id>/events. Sem o cabeçalho, a view roda na própria requisição, como antes.
+
+    Deve ser o decorator mais interno: o job executa a view sem o rate limit e o CORS da rota.
+    """
+
+    def decorator(view):
+        register_job_handler(kind, _replay_view(view))
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _wants_async():
+                return view(*args, **kwargs)
+
+            query = request.args.to_dict()
+            query.pop('async', None)
+            payload = {
+                'path': request.path,
+                'method': request.method,
+                'query': query,
+                'json': request.get_json(silent=True),
+                'headers': {name: request.headers[name] for name in _FORWARDED_HEADERS if name in request.headers},
+                'view_args': kwargs,
+            }
+            job = get_job_queue().submit(kind, payload, user_id=_current_user_id())
+            return jsonify({
+                'success': True,
+                'job_id': job['id'],
+                'status': job['status'],
+                'status_url': url_for('jobs.get_job', job_id=job['id']),
+                'result_url': url_for('jobs.get_job_result', job_id=job['id']),
+                'events_url': url_for('jobs.job_events', job_id=job['id']),
+            }), 202
+
+        return wrapper
+
+    return decorator
+
+
+def _job_payload(job: dict) -> dict:
+    payload = {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'attempts': job['attempts'],
+        'max_attempts': job['max_attempts'],
+        'cancel_requested': bool(job['cancel_requested']),
+        'error': job['error'],
+    }
+    for field in ('created_at', 'started_at', 'finished_at'):
+        payload[field] = job[field].isoformat() if job[field] else None
+    return payload
+
+
+def _load_job(job_id: str):
+    """Job do usuário atual, ou None (jobs de outros usuários são tratados como inexistentes)"""
+    job = get_job_queue().get(job_id)
+    if job is None or (job['user_id'] is not None and job['user_id'] != _current_user_id()):
+        return None
+    return job
+
+
+def _result_response(job: dict):
+    """Resposta final do job: o JSON e o status que o endpoint síncrono teria devolvido"""
+    result = job['result'] or {}
+    if job['status'] == SUCCEEDED or (job['status'] == FAILED and result.get('body') is not None):
+        return result.get('body'), result.get('status', 200)
+    if job['status'] == CANCELLED:
+        return {'success': False, 'error': 'Job cancelado', 'job_id': job['id']}, 409
+    return {'success': False, 'error': job['error'] or 'Falha ao executar o job', 'job_id': job['id']}, 500
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+@cross_origin()
+def get_job(job_id):
+    """Situação do job (queued, running, succeeded, failed, cancelled)"""
+    job = _load_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job não encontrado'}), 404
+    return jsonify({'success': True, **_job_payload(job)})
+
+
+@jobs_bp.route('/<job_id>/result', methods=['GET'])
+@cross_origin()
+def get_job_result(job_id):
+    """Resultado do job; 202 enquanto ainda não terminou"""
+    job = _load_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job não encontrado'}), 404
+    if job['status'] not in TERMINAL_STATUSES:
+        return jsonify({'success': True, **_job_payload(job)}), 202
+    body, status = _result_response(job)
+    return jsonify(body), status
+
+
+@jobs_bp.route('/<job_id>/events', methods=['GET'])
+@cross_origin()
+def job_events(job_id):
+    """
+    Acompanha o job por Server-Sent Events.
+
+    Eventos:
+        status {"status", "attempts", ...}  a cada mudança de situação
+        done   {"status": ..., ...}         resultado final (o mesmo JSON do endpoint síncrono)
+        error  {"status": ..., ...}         quando o job falha ou é cancelado
+    """
+    job = _load_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job não encontrado'}), 404
+    queue = get_job_queue()
+
+    def generate():
+        current = job
+        last_state = None
+        last_sent = time.monotonic()
+        while True:
+            state = (current['status'], current['attempts'])
+            if state != last_state:
+                yield _sse_event('status', _job_payload(current))
+                last_state = state
+                last_sent = time.monotonic()
+            if current['status'] in TERMINAL_STATUSES:
+                body, status = _result_response(current)
+                event = 'done' if current['status'] == SUCCEEDED else 'error'
+                yield _sse_event(event, {'status': status, **(body or {})})
+                return
+            if time.monotonic() - last_sent >= SSE_KEEPALIVE_SECONDS:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            time.sleep(JOB_EVENTS_POLL_SECONDS)
+            current = queue.get(job_id) or current
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@jobs_bp.route('/<job_id>/cancel', methods=['POST'])
+@cross_origin()
+def cancel_job(job_id):
+    """Cancela o job: imediatamente se ainda na fila; ao fim da etapa atual se em execução"""
+    job = _load_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job não encontrado'}), 404
+    if job['status'] in TERMINAL_STATUSES:
+        return jsonify({'success': False, 'error': 'Job já finalizado', **_job_payload(job)}), 409
+    job = get_job_queue().cancel(job_id)
+    return jsonify({'success': True, **_job_payload(job)})
@@ -2,11 +2,12 @@ from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
 import os
 import hashlib
-import PyPDF2
-import pdfplumber
+import tempfile
 import logging
 from domain.interfaces.dataprovider.DatabaseConfig import db
 from domain.dto.KbDto import KbDocument, KbChunk
+from application.services.pdf_extraction import get_pdf_extractor
+from rag.chunker import chunk_text as split_into_chunks
 from datetime import datetime
 import json
 
@@ -24,87 +25,81 @@ def allowed_file(filename):
 
 def extract_text_from_pdf(file_path):
     """Extrai texto de um arquivo PDF usando pdfplumber"""
-    text = []
-    try:
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:  # Skip pages with no text
-                    text.append(page_text)
-    except Exception as e:
-        print(f"Erro ao extrair texto do PDF: {e}")
-        return None
-    return "\n".join(text) if text else None
+    return extract_texts_from_pdfs([file_path])[file_path]
 
-def chunk_text(text, chunk_size=1000, overlap=200):
-    """Divide o texto em chunks com sobreposição"""
-    chunks = []
-    text_length = len(text)
-    
-    for i in range(0, text_length, chunk_size - overlap):
-        chunk = text[i:i + chunk_size]
-        if chunk.strip():
-            chunks.append(chunk.strip())
-        
-        if i + chunk_size >= text_length:
-            break
-    
-    return chunks
+def extract_texts_from_pdfs(file_paths):
+    """Extrai o texto de vários PDFs em paralelo (pdfplumber); None para arquivos sem texto ou com erro"""
+    texts = {}
+    for path, result in get_pdf_extractor('pdfplumber').extract_files(file_paths).items():
+        if not result.ok:
+            logger.error(f"Erro ao extrair texto do PDF {os.path.basename(path)}: {result.error}")
+        texts[path] = result.text or None
+    return texts
 
-def process_single_pdf(file, objective_slug):
-    """Process a single PDF file and return result data"""
+def chunk_text(text, max_tokens=None, overlap_tokens=None):
+    """Divide o texto em chunks com sobreposição (mesmo chunker da ingestão de ETPs)"""
+    return split_into_chunks(text, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+def save_upload(file):
+    """Salva um arquivo enviado em um caminho temporário único e retorna (filename, caminho)"""
     if not allowed_file(file.filename):
         raise ValueError(f"Tipo de arquivo não permitido: {file.filename}. Apenas PDFs são aceitos.")
     
-    # Salvar arquivo temporariamente
     filename = secure_filename(file.filename)
-    temp_path = f"/tmp/{filename}"
+    fd, temp_path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
     file.save(temp_path)
+    return filename, temp_path
+
+def process_single_pdf(file, objective_slug):
+    """Process a single PDF file and return result data"""
+    filename, temp_path = save_upload(file)
     
     try:
-        # Extrair texto do PDF
-        extracted_text = extract_text_from_pdf(temp_path)
-        if not extracted_text:
-            raise ValueError(f"Não foi possível extrair texto do PDF: {filename}")
-        
-        # Criar documento na base de conhecimento
-        kb_doc = KbDocument(
-            filename=filename,
-            objective_slug=objective_slug,
-            created_at=datetime.utcnow()
-        )
-        
-        db.session.add(kb_doc)
-        db.session.flush()  # Para obter o ID
-        
-        # Dividir texto em chunks e salvar
-        chunks = chunk_text(extracted_text)
-        chunk_count = 0
-        
-        for text_chunk in chunks:
-            kb_chunk = KbChunk(
-                kb_document_id=kb_doc.id,
-                section_type='content',
-                content_text=text_chunk,
-                objective_slug=objective_slug,
-                created_at=datetime.utcnow()
-            )
-            db.session.add(kb_chunk)
-            chunk_count += 1
-        
-        logger.info(f"Processed PDF: {filename} - Document ID: {kb_doc.id} - Chunks: {chunk_count}")
-        
-        return {
-            'filename': filename,
-            'document_id': kb_doc.id,
-            'chunks_created': chunk_count
-        }
-        
+        return store_pdf_text(filename, extract_text_from_pdf(temp_path), objective_slug)
     finally:
         # Remover arquivo temporário
         if os.path.exists(temp_path):
             os.remove(temp_path)
 
+def store_pdf_text(filename, extracted_text, objective_slug):
+    """Cria o documento e os chunks de um PDF já extraído e retorna os dados do resultado"""
+    if not extracted_text:
+        raise ValueError(f"Não foi possível extrair texto do PDF: {filename}")
+    
+    # Criar documento na base de conhecimento
+    kb_doc = KbDocument(
+        filename=filename,
+        objective_slug=objective_slug,
+        created_at=datetime.utcnow()
+    )
+    
+    db.session.add(kb_doc)
+    db.session.flush()  # Para obter o ID
+    
+    # Dividir texto em chunks e salvar
+    chunks = chunk_text(extracted_text)
+    chunk_count = 0
+    
+    for text_chunk in chunks:
+        kb_chunk = KbChunk(
+            kb_document_id=kb_doc.id,
+            section_type='content',
+            content_text=text_chunk,
+            objective_slug=objective_slug,
+            created_at=datetime.utcnow()
+        )
+        db.session.add(kb_chunk)
+        chunk_count += 1
+    
+    logger.info(f"Processed PDF: {filename} - Document ID: {kb_doc.id} - Chunks: {chunk_count}")
+    
+    return {
+        'filename': filename,
+        'document_id': kb_doc.id,
+        'chunks_created': chunk_count
+    }
+
 @kb_blueprint.route("/upload", methods=["POST"])
 def upload_pdf():
     """
@@ -133,19 +128,29 @@ def upload_pdf():
             if not allowed_file(file.filename):
                 return jsonify({"error": f"Arquivo {file.filename} não é um PDF válido. Apenas arquivos .pdf são aceitos."}), 400
         
-        # Processar todos os arquivos
-        docs_info = []
-        for f in files_to_process:
-            try:
-                result = process_single_pdf(f, objective_slug)
-                docs_info.append(result)
-            except ValueError as ve:
-                db.session.rollback()
-                return jsonify({"error": str(ve)}), 400
-            except Exception as e:
-                db.session.rollback()
-                logger.error(f"Erro ao processar arquivo {f.filename}: {e}")
-                return jsonify({"error": f"Erro ao processar arquivo {f.filename}"}), 500
+        # Salvar todos os arquivos e extrair o texto em paralelo
+        saved = []
+        try:
+            for f in files_to_process:
+                saved.append((f.filename,) + save_upload(f))
+            texts = extract_texts_from_pdfs([temp_path for _, _, temp_path in saved])
+            
+            docs_info = []
+            for original_name, filename, temp_path in saved:
+                try:
+                    docs_info.append(store_pdf_text(filename, texts.get(temp_path), objective_slug))
+                except ValueError as ve:
+                    db.session.rollback()
+                    return jsonify({"error": str(ve)}), 400
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Erro ao processar arquivo {original_name}: {e}")
+                    return jsonify({"error": f"Erro ao processar arquivo {original_name}"}), 500
+        finally:
+            # Remover arquivos temporários
+            for _, _, temp_path in saved:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
         
         db.session.commit()
         
@@ -0,0 +1,15 @@
+from flask import Blueprint, Response, jsonify
+
+from application.config.LimiterConfig import limiter
+from application.services import telemetry
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+@limiter.exempt
+def metrics():
+    """Métricas do processo no formato texto do Prometheus (desligado com METRICS_ENABLED=false)"""
+    if not telemetry.enabled():
+        return jsonify({'success': False, 'error': 'Métricas desativadas'}), 404
+    return Response(telemetry.registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
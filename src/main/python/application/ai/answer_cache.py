@@ -0,0 +1,279 @@
+"""
+Cache semântico das respostas de ``generate_answer``.
+
+Necessidades quase idênticas ("manutenção de ar-condicionado", "manutenção de
+ar condicionado") produzem a mesma lista de requisitos; em vez de pagar uma
+chamada completa ao LLM, a resposta é reaproveitada quando:
+
+- o estágio é o mesmo e tem limiar configurado (ANSWER_CACHE_STAGE_THRESHOLDS);
+- a similaridade de cosseno entre os embeddings da necessidade atinge o limiar do estágio;
+- os trechos RAG usados no prompt se sobrepõem o suficiente (ANSWER_CACHE_RAG_MIN_OVERLAP,
+  índice de Jaccard sobre os trechos);
+- o restante da entrada (histórico, requisitos já definidos) é idêntico.
+
+As entradas ficam em memória, por processo, com TTL e limite de tamanho (LRU).
+Acertos e erros por estágio, o tamanho e as remoções aparecem em /metrics
+(etp_answer_cache_requests_total{stage,result}, etp_answer_cache_entries e
+etp_answer_cache_evictions_total{reason}).
+O embedding da necessidade passa pelo cache persistente de embeddings, então
+consultas repetidas não chamam o provedor.
+
+Configuração (variáveis de ambiente):
+    ANSWER_CACHE_ENABLED            true/false (padrão false)
+    ANSWER_CACHE_STAGE_THRESHOLDS   limiar por estágio (padrão collect_need:0.95)
+    ANSWER_CACHE_RAG_MIN_OVERLAP    sobreposição mínima dos trechos RAG (0.5)
+    ANSWER_CACHE_TTL_SECONDS        validade das entradas (86400)
+    ANSWER_CACHE_MAX_ENTRIES        número máximo de entradas (1000)
+"""
+
+import os
+import copy
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence
+
+import numpy as np
+
+from application.services.telemetry import registry
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = registry.counter('etp_answer_cache_requests_total', 'Consultas ao cache semântico de respostas',
+                                  ('stage', 'result'))
+CACHE_ENTRIES = registry.gauge('etp_answer_cache_entries', 'Entradas no cache semântico de respostas')
+CACHE_EVICTIONS = registry.counter('etp_answer_cache_evictions_total',
+                                   'Entradas removidas do cache semântico de respostas', ('reason',))
+
+DEFAULT_STAGE_THRESHOLDS = "collect_need:0.95"
+
+
+def parse_stage_thresholds(value: str) -> Dict[str, float]:
+    """Converte 'collect_need:0.95,refine:0.97' em {'collect_need': 0.95, 'refine': 0.97}"""
+    thresholds = {}
+    for item in (value or "").split(","):
+        stage, _, threshold = item.partition(":")
+        if not stage.strip() or not threshold.strip():
+            continue
+        try:
+            thresholds[stage.strip()] = float(threshold)
+        except ValueError:
+            logger.warning(f"[ANSWER_CACHE] Limiar inválido ignorado: {item!r}")
+    return thresholds
+
+
+def rag_fingerprint(chunks: Sequence[Dict], limit: int = 8) -> FrozenSet[str]:
+    """Identidade dos trechos RAG que entram no prompt (os ``limit`` primeiros, como em generate_answer)"""
+    keys = set()
+    for chunk in chunks[:limit]:
+        chunk_id = chunk.get('id') or chunk.get('chunk_id')
+        if chunk_id is not None:
+            keys.add(f"id:{chunk_id}")
+        else:
+            keys.add("text:" + hashlib.sha256((chunk.get('text') or chunk.get('content') or '').encode('utf-8')).hexdigest())
+    return frozenset(keys)
+
+
+def exact_key(history: List[Dict], rag_context: Dict) -> str:
+    """Parte da entrada que precisa ser idêntica: histórico e requisitos já definidos"""
+    payload = {
+        'history': [(m.get('role'), m.get('content')) for m in history[-10:]],
+        'requirements': rag_context.get('requirements') or [],
+    }
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class _Entry:
+    stage: str
+    key: str
+    vector: np.ndarray
+    rag: FrozenSet[str]
+    result: Dict[str, Any]
+    expires_at: float
+
+
+@dataclass
+class _StageStats:
+    hits: int = 0
+    misses: int = 0
+    similarities: List[float] = field(default_factory=list)
+
+
+class SemanticAnswerCache:
+    """
+    Cache em memória de respostas por similaridade semântica da necessidade.
+
+    Args:
+        embed: Função texto -> vetor (ou None se o embedding falhar)
+        thresholds: Limiar de similaridade por estágio; estágios ausentes não são cacheados
+        min_rag_overlap: Índice de Jaccard mínimo entre os trechos RAG
+        ttl: Validade das entradas, em segundos
+        max_entries: Tamanho máximo; as entradas menos usadas recentemente são removidas
+    """
+
+    def __init__(self, embed: Callable[[str], Optional[Sequence[float]]],
+                 thresholds: Optional[Dict[str, float]] = None, min_rag_overlap: Optional[float] = None,
+                 ttl: Optional[float] = None, max_entries: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.embed = embed
+        self.thresholds = thresholds if thresholds is not None else parse_stage_thresholds(
+            os.getenv('ANSWER_CACHE_STAGE_THRESHOLDS', DEFAULT_STAGE_THRESHOLDS))
+        self.min_rag_overlap = min_rag_overlap if min_rag_overlap is not None else float(
+            os.getenv('ANSWER_CACHE_RAG_MIN_OVERLAP', '0.5'))
+        self.ttl = ttl or float(os.getenv('ANSWER_CACHE_TTL_SECONDS', '86400'))
+        self.max_entries = max_entries or int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', '1000'))
+        self.clock = clock
+
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _StageStats] = {}
+        self.evictions = 0
+        self.expirations = 0
+
+    def enabled_for(self, stage: str) -> bool:
+        return stage in self.thresholds
+
+    def _vector(self, text: str) -> Optional[np.ndarray]:
+        try:
+            vector = self.embed(text)
+        except Exception as e:
+            logger.warning(f"[ANSWER_CACHE] Falha ao gerar embedding da necessidade: {e}")
+            return None
+        if vector is None:
+            return None
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def lookup(self, stage: str, necessity: str, history: List[Dict], rag_context: Dict):
+        """
+        Procura uma resposta reaproveitável.
+
+        Returns:
+            (resultado ou None, consulta) - a consulta deve ser repassada a ``store`` em caso de miss
+        """
+        if not self.enabled_for(stage):
+            return None, None
+        vector = self._vector(necessity)
+        if vector is None:
+            return None, None
+        query = (stage, exact_key(history, rag_context), vector, rag_fingerprint(rag_context.get('chunks', [])))
+
+        best, best_similarity = None, -1.0
+        now = self.clock()
+        with self._lock:
+            stats = self._stats.setdefault(stage, _StageStats())
+            for entry_id, entry in list(self._entries.items()):
+                if entry.expires_at <= now:
+                    del self._entries[entry_id]
+                    self.expirations += 1
+                    CACHE_EVICTIONS.inc(reason='ttl')
+                    continue
+                if entry.stage != stage or entry.key != query[1]:
+                    continue
+                if _jaccard(entry.rag, query[3]) < self.min_rag_overlap:
+                    continue
+                similarity = float(np.dot(entry.vector, vector))
+                if similarity > best_similarity:
+                    best, best_similarity = entry_id, similarity
+
+            if best is not None and best_similarity >= self.thresholds[stage]:
+                self._entries.move_to_end(best)
+                stats.hits += 1
+                stats.similarities.append(best_similarity)
+                del stats.similarities[:-100]
+                CACHE_REQUESTS.inc(stage=stage, result='hit')
+                CACHE_ENTRIES.set(len(self._entries))
+                logger.info(f"[ANSWER_CACHE] Hit stage={stage} similarity={best_similarity:.3f}")
+                return copy.deepcopy(self._entries[best].result), None
+            stats.misses += 1
+            CACHE_REQUESTS.inc(stage=stage, result='miss')
+            CACHE_ENTRIES.set(len(self._entries))
+        return None, query
+
+    def store(self, query, result: Dict[str, Any]) -> None:
+        """Guarda a resposta gerada para a consulta obtida em ``lookup``"""
+        if query is None:
+            return
+        stage, key, vector, rag = query
+        with self._lock:
+            self._entries[self._next_id] = _Entry(stage, key, vector, rag, copy.deepcopy(result),
+                                                  self.clock() + self.ttl)
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                CACHE_EVICTIONS.inc(reason='lru')
+            CACHE_ENTRIES.set(len(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            CACHE_ENTRIES.set(0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de uso: acertos/erros e taxa de acerto por estágio"""
+        with self._lock:
+            stages = {}
+            for stage, stats in self._stats.items():
+                total = stats.hits + stats.misses
+                stages[stage] = {
+                    'hits': stats.hits,
+                    'misses': stats.misses,
+                    'hit_rate': round(stats.hits / total, 4) if total else 0.0,
+                    'avg_hit_similarity': round(sum(stats.similarities) / len(stats.similarities), 4)
+                    if stats.similarities else None,
+                }
+            hits = sum(s.hits for s in self._stats.values())
+            total = hits + sum(s.misses for s in self._stats.values())
+            return {
+                'entries': len(self._entries),
+                'hits': hits,
+                'misses': total - hits,
+                'hit_rate': round(hits / total, 4) if total else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'stages': stages,
+            }
+
+
+def _embed_with_gateway(text: str) -> Optional[List[float]]:
+    """Embedding da necessidade pelo pool do LLM gateway, com o cache persistente de embeddings"""
+    from application.ai.llm_gateway import get_openai_client
+    from rag.embedding_cache import get_embedding_cache
+    from rag.embeddings import EmbeddingPipeline
+
+    client = get_openai_client()
+    if client is None:
+        return None
+    return EmbeddingPipeline(client, cache=get_embedding_cache(), max_retries=1).embed_texts([text])[0]
+
+
+_cache_instance: Optional[SemanticAnswerCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Cache do processo, ou None se desabilitado (ANSWER_CACHE_ENABLED, padrão false)"""
+    global _cache_instance
+
+    if os.getenv('ANSWER_CACHE_ENABLED', 'false').lower() not in ('1', 'true', 'yes'):
+        return None
+
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                _cache_instance = SemanticAnswerCache(_embed_with_gateway)
+    return _cache_instance
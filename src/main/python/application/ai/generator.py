@@ -6,6 +6,9 @@ import traceback
 import hashlib
 from typing import List, Dict, Any, Protocol, Optional
 from config.models import MODEL, TEMP
+from application.ai.llm_gateway import get_openai_client, complete_chat
+from application.ai.answer_cache import get_answer_cache
+from application.services.telemetry import traced
 
 logger = logging.getLogger(__name__)
 
@@ -64,13 +67,10 @@ def generate_text_with_model(
                 temperature=base_temp,
             )
         else:
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
+            client = get_openai_client()
+            if client is None:
                 raise RuntimeError("OPENAI_API_KEY não configurada para geração de texto")
 
-            import openai
-
-            client = openai.OpenAI(api_key=api_key)
             response = client.chat.completions.create(
                 model=base_model,
                 temperature=base_temp,
@@ -301,6 +301,7 @@ Tarefa: Monte um texto corrido consolidado pronto para prévia do documento."""
     
     return base
 
+@traced('generator.answer')
 def generate_answer(stage: str, history: List[Dict], user_input: str, rag_context: Dict) -> Dict:
     """
     Função unificada de geração por etapa.
@@ -323,15 +324,22 @@ def generate_answer(stage: str, history: List[Dict], user_input: str, rag_contex
     """
     logger.info(f"[GEN:NO_TEMPLATES] Generating for stage={stage}")
     
-    # Get OpenAI client
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
+    # Get OpenAI client (pool compartilhado do gateway)
+    client = get_openai_client()
+    if client is None:
         logger.error("[GENERATOR] No OpenAI API key available")
         return _fallback_response(stage, user_input, rag_context)
     
+    # Cache semântico opcional (ANSWER_CACHE_ENABLED): necessidade parecida, mesmo estágio e contexto
+    answer_cache = get_answer_cache()
+    cache_query = None
+    if answer_cache is not None:
+        cached, cache_query = answer_cache.lookup(stage, rag_context.get('necessity') or user_input,
+                                                  history, rag_context)
+        if cached is not None:
+            return cached
+    
     try:
-        import openai
-        client = openai.OpenAI(api_key=api_key)
         
         # Use unified model configuration
         logger.info(f"[MODELS] using model={MODEL} temp={TEMP}")
@@ -357,14 +365,15 @@ def generate_answer(stage: str, history: List[Dict], user_input: str, rag_contex
         # Add current user input
         messages.append({"role": "user", "content": user_prompt})
         
-        response = client.chat.completions.create(
+        # Em um endpoint SSE (token_stream ativo) os tokens são repassados enquanto chegam
+        content = complete_chat(
+            client,
             model=MODEL,
             messages=messages,
             temperature=TEMP,
             max_tokens=2500
         )
         
-        content = response.choices[0].message.content if response.choices else ""
         # Ensure non-empty content with regeneration fallback
         content = _safe_nonempty(content, stage, client, messages)
         content = content.strip()
@@ -418,6 +427,10 @@ def generate_answer(stage: str, history: List[Dict], user_input: str, rag_contex
                     ", ".join(sectors)
                 )
 
+        # Respostas de fallback não são reaproveitadas
+        if answer_cache is not None and not fallback_payload:
+            answer_cache.store(cache_query, result)
+
         return result
         
     except Exception as e:
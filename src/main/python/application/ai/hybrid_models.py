@@ -1,12 +1,10 @@
 from __future__ import annotations
 import os
-import httpx
 import logging
 
-logger = logging.getLogger(__name__)
+from application.ai.llm_gateway import get_llm_gateway
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-BASE_URL = "https://api.openai.com/v1/chat/completions"
+logger = logging.getLogger(__name__)
 
 # Unified model and temperature for all stages
 MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1")
@@ -14,8 +12,6 @@ TEMP = float(os.getenv("ETP_TEMP", "0.7"))
 
 logger.info(f"[MODELS] using model={MODEL} temp={TEMP}")
 
-HEADERS = {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}
-
 SYSTEM_CHAT = (
   "Você é um consultor de ETP. Explique, proponha alternativas, faça perguntas abertas, "
   "aceite incertezas do usuário e ajude a decidir. Evite menu rígido."
@@ -29,34 +25,20 @@ SYSTEM_FINAL = (
 class OpenAIChatConsultive:
     def generate(self, user_prompt: str) -> str:
         logger.info(f"[GENERATOR] stage=consultoria using model={MODEL} temp={TEMP}")
-        payload = {
-            "model": MODEL,
-            "temperature": TEMP,
-            "messages": [
-                {"role":"system","content":SYSTEM_CHAT},
-                {"role":"user","content":user_prompt}
-            ]
-        }
-        with httpx.Client(timeout=60) as cli:
-            r = cli.post(BASE_URL, headers=HEADERS, json=payload)
-            r.raise_for_status()
-            return r.json()["choices"][0]["message"]["content"]
+        messages = [
+            {"role":"system","content":SYSTEM_CHAT},
+            {"role":"user","content":user_prompt}
+        ]
+        return get_llm_gateway().chat(messages, model=MODEL, temperature=TEMP, timeout=60)
 
 class OpenAIFinalWriter:
     def generate(self, user_prompt: str) -> str:
         logger.info(f"[GENERATOR] stage=resumo_etp using model={MODEL} temp={TEMP}")
-        payload = {
-            "model": MODEL,
-            "temperature": TEMP,
-            "messages": [
-                {"role":"system","content":SYSTEM_FINAL},
-                {"role":"user","content":user_prompt}
-            ]
-        }
-        with httpx.Client(timeout=120) as cli:
-            r = cli.post(BASE_URL, headers=HEADERS, json=payload)
-            r.raise_for_status()
-            return r.json()["choices"][0]["message"]["content"]
+        messages = [
+            {"role":"system","content":SYSTEM_FINAL},
+            {"role":"user","content":user_prompt}
+        ]
+        return get_llm_gateway().chat(messages, model=MODEL, temperature=TEMP, timeout=120)
 
 class OpenAIIntentParser:
     """
@@ -122,22 +104,13 @@ class OpenAIIntentParser:
         
         # Fallback to LLM for complex cases
         logger.info(f"[GENERATOR] stage=parsing using model={MODEL} temp={TEMP}")
-        payload = {
-            "model": MODEL,
-            "temperature": TEMP,
-            "messages": [
-                {"role":"system","content":self.INTENT_SCHEMA},
-                {"role":"user","content":user_text}
-            ],
-            "response_format": {"type":"json_object"}
-        }
+        messages = [
+            {"role":"system","content":self.INTENT_SCHEMA},
+            {"role":"user","content":user_text}
+        ]
         
         try:
-            with httpx.Client(timeout=30) as cli:
-                r = cli.post(BASE_URL, headers=HEADERS, json=payload)
-                r.raise_for_status()
-                content = r.json()["choices"][0]["message"]["content"]
-                return __import__("json").loads(content)
+            return get_llm_gateway().chat_json(messages, model=MODEL, temperature=TEMP, timeout=30)
         except Exception as e:
             logger.error(f"Intent parsing failed: {e}")
             return {"intent":"none"}
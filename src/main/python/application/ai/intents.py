@@ -6,7 +6,10 @@ numeric selections, and strategy name selections.
 
 import re
 from typing import Optional
-import unicodedata
+
+from application.nlu.intent_engine import (
+    PENDING_RE, SELECT_NUMBER_RE, UNCERTAIN_RE, VAGUE_ACK_RE, normalize,
+)
 
 
 def _normalize_text(text: str) -> str:
@@ -22,19 +25,7 @@ def _normalize_text(text: str) -> str:
     Returns:
         Normalized text string
     """
-    # Convert to lowercase
-    text = text.lower()
-    
-    # Remove accents using Unicode normalization
-    text = ''.join(
-        c for c in unicodedata.normalize('NFD', text)
-        if unicodedata.category(c) != 'Mn'
-    )
-    
-    # Collapse whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text
+    return normalize(text)
 
 
 def is_vague_ack(text: str) -> bool:
@@ -58,10 +49,7 @@ def is_vague_ack(text: str) -> bool:
     
     normalized = _normalize_text(text)
     
-    # Pattern for vague acknowledgments (must match entire string or be very short)
-    vague_pattern = r'^\s*(ok(ay)?|vamos|pode\s+(seguir|continuar)|segue|blz|beleza|ta\s+bom|certo|uai|partiu|entendido|perfeito|manda)\s*\.?!?\s*$'
-    
-    return bool(re.match(vague_pattern, normalized, re.IGNORECASE))
+    return bool(VAGUE_ACK_RE.match(normalized))
 
 
 def is_uncertain_value(text: str) -> bool:
@@ -90,26 +78,7 @@ def is_uncertain_value(text: str) -> bool:
     
     normalized = _normalize_text(text)
     
-    # Patterns for uncertainty expressions
-    uncertainty_keywords = [
-        r'nao\s+sei',
-        r'n\s+sei',
-        r'\bns\b',
-        r'desconheco',
-        r'nao\s+tenho\s+(certeza|ideia|nocao)',
-        r'sem\s+(nocao|ideia|base)',
-        r'dificil\s+estimar',
-        r'nao\s+faco\s+ideia',
-        r'ainda\s+nao\s+sei',
-        r'por\s+enquanto\s+nada',
-        r'nao\s+tenho\s+isso',
-    ]
-    
-    for pattern in uncertainty_keywords:
-        if re.search(pattern, normalized):
-            return True
-    
-    return False
+    return bool(UNCERTAIN_RE.search(normalized))
 
 
 def is_select_number(text: str) -> Optional[int]:
@@ -127,8 +96,7 @@ def is_select_number(text: str) -> Optional[int]:
     
     normalized = text.strip()
     
-    # Pattern for single digit selection
-    match = re.match(r'^\s*([1-9])\s*$', normalized)
+    match = SELECT_NUMBER_RE.match(normalized)
     
     if match:
         return int(match.group(1))
@@ -219,18 +187,4 @@ def is_explicit_pending_request(text: str) -> bool:
     
     normalized = _normalize_text(text)
     
-    # Patterns for explicit pending requests
-    pending_patterns = [
-        r'(pode\s+)?deixar\s+pendente',
-        r'aceito?\s+pendente',
-        r'registr(e|ar)\s+(como\s+)?pendente',
-        r'marqu(e|ar)\s+(como\s+)?pendente',
-        r'fica\s+pendente',
-        r'deixa\s+pendente',
-    ]
-    
-    for pattern in pending_patterns:
-        if re.search(pattern, normalized):
-            return True
-    
-    return False
+    return bool(PENDING_RE.search(normalized))
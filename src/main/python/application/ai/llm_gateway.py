@@ -0,0 +1,333 @@
+"""
+LLM Gateway
+Ponto único de acesso ao provedor de LLM (API compatível com OpenAI) para todo o processo.
+
+Todas as chamadas - chat, geração de seções, parser de intenções, embeddings - compartilham
+um único ``httpx.Client`` com keep-alive (HTTP/2 quando o pacote ``h2`` está instalado).
+Assim o handshake TLS e o pool de conexões são reaproveitados entre turnos, em vez de
+recriados a cada chamada.
+
+O transporte é plugável: ``configure_llm_gateway(transport=httpx.MockTransport(...))`` ou
+``OPENAI_API_BASE=http://127.0.0.1:8089/v1`` apontam o gateway para um servidor simulado.
+Qualquer que seja o transporte, cada chamada é medida (span ``llm.chat``/``llm.embeddings``
+e tokens informados pelo provedor; ver application/services/telemetry.py).
+
+Streaming: dentro de ``with token_stream(callback):`` as completions de texto feitas
+por ``LLMGateway.chat`` e ``complete_chat`` usam ``stream=True`` e repassam cada trecho
+ao callback à medida que chega (usado pelos endpoints SSE); o texto completo continua
+sendo retornado ao chamador.
+
+Configuração (variáveis de ambiente):
+    OPENAI_API_KEY               chave da API
+    OPENAI_API_BASE              URL base da API (padrão https://api.openai.com/v1)
+    LLM_TIMEOUT_SECONDS          timeout padrão de leitura por chamada (60)
+    LLM_CONNECT_TIMEOUT_SECONDS  timeout de conexão (5)
+    LLM_MAX_CONNECTIONS          conexões simultâneas no pool (20)
+    LLM_MAX_KEEPALIVE            conexões ociosas mantidas abertas (10)
+    LLM_HTTP2                    true/false (padrão true; requer httpx[http2])
+    LLM_MAX_RETRIES              novas tentativas do SDK OpenAI (2)
+"""
+
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+_token_sink: ContextVar[Optional[Callable[[str], None]]] = ContextVar('llm_token_sink', default=None)
+
+
+@contextmanager
+def token_stream(callback: Callable[[str], None]) -> Iterator[None]:
+    """Repassa ao callback os trechos das completions de texto feitas neste contexto"""
+    token = _token_sink.set(callback)
+    try:
+        yield
+    finally:
+        _token_sink.reset(token)
+
+
+def complete_chat(client, stream_tokens: bool = True, **kwargs) -> str:
+    """
+    ``client.chat.completions.create(**kwargs)`` retornando o texto da primeira escolha.
+
+    Com um ``token_stream`` ativo (e ``stream_tokens``), a completion é feita com
+    ``stream=True`` e cada trecho é repassado ao callback assim que chega.
+    """
+    sink = _token_sink.get()
+    if sink is None or not stream_tokens:
+        response = client.chat.completions.create(**kwargs)
+        return (response.choices[0].message.content or "") if response.choices else ""
+
+    parts = []
+    for chunk in client.chat.completions.create(stream=True, **kwargs):
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            parts.append(delta)
+            sink(delta)
+    return "".join(parts)
+
+
+class _TimedStream(httpx.SyncByteStream):
+    """Corpo de resposta em streaming que fecha o span da chamada ao ser encerrado"""
+
+    def __init__(self, stream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._on_close()
+
+
+class _InstrumentedTransport(httpx.BaseTransport):
+    """
+    Transporte que mede cada chamada ao provedor (span ``llm.<operação>``) e
+    contabiliza os tokens de ``usage`` das respostas JSON. Cobre igualmente as
+    chamadas do gateway e as do SDK OpenAI, que compartilham o mesmo cliente HTTP.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        from application.services import telemetry
+
+        path = request.url.path
+        operation = 'chat' if path.endswith('/chat/completions') else (
+            'embeddings' if path.endswith('/embeddings') else 'other')
+        try:
+            model = json.loads(request.content or b'{}').get('model') or ''
+        except (ValueError, AttributeError, httpx.RequestNotRead):
+            model = ''
+
+        opened = telemetry.open_span(f"llm.{operation}")
+        try:
+            response = self._transport.handle_request(request)
+        except Exception as e:
+            opened.attrs['error'] = type(e).__name__
+            telemetry.record_llm_call(operation, model, 'error', target=opened)
+            telemetry.close_span(opened)
+            raise
+
+        status = str(response.status_code)
+        if response.headers.get('content-type', '').startswith('text/event-stream'):
+            telemetry.record_llm_call(operation, model, status, target=opened)
+            response.stream = _TimedStream(response.stream, lambda: telemetry.close_span(opened))
+            return response
+
+        try:
+            usage = None
+            if response.headers.get('content-type', '').startswith('application/json'):
+                response.read()
+                usage = response.json().get('usage')
+            telemetry.record_llm_call(operation, model, status, usage if isinstance(usage, dict) else None,
+                                      target=opened)
+        except ValueError:
+            telemetry.record_llm_call(operation, model, status, target=opened)
+        finally:
+            telemetry.close_span(opened)
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class LLMGateway:
+    """Cliente HTTP compartilhado e clientes OpenAI construídos sobre ele"""
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 timeout: Optional[float] = None, connect_timeout: Optional[float] = None,
+                 max_connections: Optional[int] = None, max_keepalive: Optional[int] = None,
+                 http2: Optional[bool] = None, transport: Optional[httpx.BaseTransport] = None,
+                 max_retries: Optional[int] = None):
+        # Sem chave explícita, OPENAI_API_KEY é lida a cada uso (rotação ou remoção da chave
+        # vale sem recriar o gateway do processo)
+        self._api_key = api_key
+        self.base_url = (base_url or os.getenv('OPENAI_API_BASE') or DEFAULT_BASE_URL).rstrip('/')
+        self.timeout = timeout or float(os.getenv('LLM_TIMEOUT_SECONDS', '60'))
+        self.connect_timeout = connect_timeout or float(os.getenv('LLM_CONNECT_TIMEOUT_SECONDS', '5'))
+        self.max_connections = max_connections or int(os.getenv('LLM_MAX_CONNECTIONS', '20'))
+        self.max_keepalive = max_keepalive or int(os.getenv('LLM_MAX_KEEPALIVE', '10'))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('LLM_MAX_RETRIES', '2'))
+        if http2 is None:
+            http2 = os.getenv('LLM_HTTP2', 'true').lower() == 'true'
+        self.http2 = http2 and transport is None and _http2_available()
+        if http2 and transport is None and not self.http2:
+            logger.info("[LLM_GATEWAY] Pacote h2 não instalado; usando HTTP/1.1 com keep-alive")
+        self.transport = transport
+
+        self._lock = threading.Lock()
+        self._http: Optional[httpx.Client] = None
+        self._pid: Optional[int] = None
+        self._openai_clients: Dict[str, Any] = {}
+
+    @property
+    def api_key(self) -> str:
+        """Chave explícita do gateway ou, sem ela, o valor atual de OPENAI_API_KEY"""
+        return self._api_key if self._api_key is not None else os.getenv('OPENAI_API_KEY', '')
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def http(self) -> httpx.Client:
+        """Cliente HTTP do processo, criado na primeira chamada (e recriado após fork)"""
+        if self._http is None or self._pid != os.getpid():
+            with self._lock:
+                if self._http is None or self._pid != os.getpid():
+                    # Um pool herdado de outro processo (fork de workers) não pode ser reaproveitado
+                    transport = self.transport or httpx.HTTPTransport(
+                        http2=self.http2,
+                        limits=httpx.Limits(max_connections=self.max_connections,
+                                            max_keepalive_connections=self.max_keepalive),
+                    )
+                    self._http = httpx.Client(
+                        transport=_InstrumentedTransport(transport),
+                        timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                    )
+                    self._openai_clients = {}
+                    self._pid = os.getpid()
+        return self._http
+
+    def openai_client(self, api_key: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        Cliente ``openai.OpenAI`` sobre o pool compartilhado; None sem chave configurada.
+
+        Args:
+            api_key: Chave alternativa (padrão: OPENAI_API_KEY); o pool continua compartilhado
+            timeout: Timeout desta chamada, em segundos (padrão: LLM_TIMEOUT_SECONDS)
+        """
+        key = api_key or self.api_key
+        if not key:
+            return None
+        http = self.http
+        client = self._openai_clients.get(key)
+        if client is None:
+            import openai
+            with self._lock:
+                client = self._openai_clients.get(key)
+                if client is None:
+                    client = openai.OpenAI(
+                        api_key=key,
+                        base_url=self.base_url,
+                        http_client=http,
+                        max_retries=self.max_retries,
+                        timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                    )
+                    self._openai_clients[key] = client
+        if timeout:
+            return client.with_options(timeout=httpx.Timeout(timeout, connect=self.connect_timeout))
+        return client
+
+    def chat_completion(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """POST /chat/completions com o payload informado; levanta httpx.HTTPStatusError em erro"""
+        response = self.http.post(
+            f"{self.base_url}/chat/completions",
+            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            json=payload,
+            timeout=httpx.Timeout(timeout or self.timeout, connect=self.connect_timeout),
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def stream_chat_completion(self, payload: Dict[str, Any], on_token: Callable[[str], None],
+                               timeout: Optional[float] = None) -> str:
+        """POST /chat/completions com ``stream=True``; repassa cada trecho e retorna o texto completo"""
+        parts = []
+        with self.http.stream(
+            "POST",
+            f"{self.base_url}/chat/completions",
+            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            json={**payload, "stream": True},
+            timeout=httpx.Timeout(timeout or self.timeout, connect=self.connect_timeout),
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                if delta:
+                    parts.append(delta)
+                    on_token(delta)
+        return "".join(parts)
+
+    def chat(self, messages: List[Dict[str, str]], model: str, temperature: Optional[float] = None,
+             timeout: Optional[float] = None, stream_tokens: bool = True, **params) -> str:
+        """Chat completion retornando apenas o conteúdo da primeira escolha (em streaming dentro de token_stream)"""
+        payload = {"model": model, "messages": messages, **params}
+        if temperature is not None:
+            payload["temperature"] = temperature
+        sink = _token_sink.get()
+        if sink is not None and stream_tokens:
+            return self.stream_chat_completion(payload, sink, timeout=timeout)
+        return self.chat_completion(payload, timeout=timeout)["choices"][0]["message"]["content"]
+
+    def chat_json(self, messages: List[Dict[str, str]], model: str, temperature: Optional[float] = None,
+                  timeout: Optional[float] = None, **params) -> Dict[str, Any]:
+        """Chat completion em modo JSON, com o conteúdo já decodificado (nunca transmitido como tokens)"""
+        content = self.chat(messages, model, temperature, timeout, stream_tokens=False,
+                            response_format={"type": "json_object"}, **params)
+        return json.loads(content)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._http is not None and self._pid == os.getpid():
+                self._http.close()
+            self._http = None
+            self._openai_clients = {}
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Gateway do processo, configurado pelas variáveis de ambiente"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
+
+
+def configure_llm_gateway(**kwargs) -> LLMGateway:
+    """Substitui o gateway do processo (ex.: transporte simulado em testes); aceita os argumentos de LLMGateway"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is not None:
+            _gateway.close()
+        _gateway = LLMGateway(**kwargs)
+    return _gateway
+
+
+def get_openai_client(api_key: Optional[str] = None, timeout: Optional[float] = None):
+    """Atalho para ``get_llm_gateway().openai_client(...)``"""
+    return get_llm_gateway().openai_client(api_key=api_key, timeout=timeout)
@@ -43,54 +43,25 @@ from flask import Flask, send_from_directory, request, g, current_app
 from flask_cors import CORS
 from application.config.LimiterConfig import limiter
 from domain.interfaces.dataprovider.DatabaseConfig import init_database, db
-from domain.dto.KnowledgeBaseDto import KbDocument, KbChunk
-from rag.ingest_etps import ETPIngestor
+from application.services.kb_bootstrap import init_kb_bootstrap
 from pathlib import Path
 
-def auto_load_knowledge_base():
+def create_api(kb_bootstrap=None):
     """
-    Verifica se a base de conhecimento está vazia e executa a ingestão automaticamente se necessário.
-    Esta função deve ser chamada após a inicialização do banco de dados.
-    """
-    try:
-        # Verificar se existem documentos na base
-        document_count = db.session.query(KbDocument).count()
-        chunk_count = db.session.query(KbChunk).count()
-        
-        if document_count > 0:
-            # Base já populada
-            logging.info(f"📚 Base de conhecimento já populada com {document_count} documentos e {chunk_count} chunks")
-            return True
-        
-        # Base vazia, executar ingestão automática
-        logging.info("⚡ Nenhum documento encontrado, rodando ingestão inicial...")
-        
-        # Criar instância do ingestor e executar ingestão inicial
-        ingestor = ETPIngestor()
-        success = ingestor.ingest_initial_docs()
-        
-        if success:
-            # Verificar novamente após a ingestão
-            final_document_count = db.session.query(KbDocument).count()
-            final_chunk_count = db.session.query(KbChunk).count()
-            logging.info(f"✅ Ingestão concluída: {final_document_count} documentos / {final_chunk_count} chunks")
-            return True
-        else:
-            logging.error(f"❌ Erro na ingestão automática")
-            return False
-            
-    except Exception as e:
-        logging.error(f"❌ Erro verificando/carregando base de conhecimento: {str(e)}")
-        return False
+    Cria e configura a aplicação Flask.
 
-def create_api():
-    """Cria e configura a aplicação Flask"""
+    Args:
+        kb_bootstrap: Modo da carga da base de conhecimento e dos índices RAG
+            (background | sync | off; padrão KB_BOOTSTRAP_MODE). Scripts que fazem a
+            própria ingestão usam 'off'.
+    """
     
     # Validar variáveis de ambiente obrigatórias
     validate_environment_variables()
     
     # Configurar logging seguro (sem chaves de API)
     log_level = os.getenv('LOG_LEVEL', 'INFO')
+    os.makedirs('logs', exist_ok=True)
     logging.basicConfig(
         level=getattr(logging, log_level),
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -131,13 +102,13 @@ def create_api():
     # Configurar CORS para permitir requisições do frontend
     CORS(app, origins="*")
     
+    # Spans por requisição, métricas e log de requisições lentas (antes dos demais hooks)
+    from application.services.telemetry import init_telemetry
+    init_telemetry(app)
+    
     # Configurar banco de dados
     init_database(app, basedir)
     
-    # Carregar base de conhecimento automaticamente se necessário
-    with app.app_context():
-        auto_load_knowledge_base()
-    
     # Inicializar rate limiting
     limiter.init_app(app)
     
@@ -178,6 +149,10 @@ def create_api():
     from adapter.entrypoint.health.HealthController import health_bp
     from adapter.entrypoint.admin.AdminController import admin_bp
     from adapter.entrypoint.kb.KbController import kb_blueprint
+    from adapter.entrypoint.jobs.JobController import jobs_bp
+    from adapter.entrypoint.metrics.MetricsController import metrics_bp
+    from application.services.job_queue import init_job_queue
+    from application.services.norm_refresher import init_norm_refresher
     
     # Registrar blueprints (rotas)
     app.register_blueprint(health_bp, url_prefix='/api')
@@ -187,6 +162,17 @@ def create_api():
     app.register_blueprint(chat_bp, url_prefix='/api/chat')
     app.register_blueprint(kb_blueprint)  # KB blueprint already has url_prefix='/api/kb' defined
     app.register_blueprint(admin_bp)  # Admin blueprint already has url_prefix='/administracao' defined
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+    app.register_blueprint(metrics_bp)  # /metrics (formato Prometheus)
+    
+    # Fila de jobs dos endpoints de geração (Prefer: respond-async)
+    init_job_queue(app)
+
+    # Revalidação em segundo plano do cache de normas federais (LexML)
+    init_norm_refresher(app)
+
+    # Base de conhecimento (ingestão se vazia) e índices RAG; em background, /api/ready responde 503 até o fim
+    init_kb_bootstrap(app, mode=kb_bootstrap)
     
     # Rotas de favicon dedicadas (e isentas)
     @app.route('/favicon.ico')
@@ -0,0 +1,265 @@
+"""
+Motor de intenções determinístico.
+
+Reconhece localmente as intenções mais comuns do fluxo (confirmações, respostas
+vagas, incertezas, pedidos de pendência e comandos de edição de requisitos) com
+padrões compilados uma única vez e texto normalizado uma única vez por mensagem.
+Cada classificação tem uma confiança; só as mensagens ambíguas (abaixo de
+INTENT_ENGINE_MIN_CONFIDENCE) seguem para o parser via LLM.
+
+Os contadores (``stats()`` e a métrica ``etp_intent_resolutions_total{site,result}``
+em /metrics) mostram quantas mensagens foram resolvidas localmente e quantas
+chamadas ao LLM foram evitadas em cada ponto de decisão.
+
+Configuração (variáveis de ambiente):
+    INTENT_ENGINE_ENABLED          true/false (padrão true); false envia tudo ao LLM, como antes
+    INTENT_ENGINE_MIN_CONFIDENCE   confiança mínima para resolver sem LLM (0.8)
+"""
+
+import os
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from application.services.telemetry import registry
+
+INTENT_RESOLUTIONS = registry.counter(
+    'etp_intent_resolutions_total', 'Mensagens resolvidas pelo motor de intenções (local) ou enviadas ao LLM',
+    ('site', 'result'))
+
+
+@lru_cache(maxsize=2048)
+def normalize(text: str) -> str:
+    """Minúsculas, sem acentos e com espaços colapsados"""
+    text = (text or "").lower()
+    text = ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _words(*alternatives: str) -> str:
+    return r'\b(?:' + '|'.join(alternatives) + r')\b'
+
+
+# Confirmações explícitas (state_machine.is_user_confirmed), sobre o texto normalizado
+CONFIRMATION_RE = re.compile(_words(
+    r'ok', r'seguir', r'prosseguir', r'manter', r'aceito', r'acordado', r'concordo', r'fechou',
+    r'pode gerar', r'pode seguir', r'segue', r'confirmo', r'confirmado', r'confirmar', r'aprovado',
+    r'aprovada', r'aprove', r'pode prosseguir', r'pode continuar', r'sem alteracoes', r'sem ajustes',
+    r'manter assim', r'esta bom', r'ta bom', r'pode manter', r'perfeito', r'correto', r'certo',
+))
+
+# Respostas vagas que não devem gravar dados nem avançar etapa (a mensagem inteira)
+VAGUE_ACK_RE = re.compile(
+    r'^\s*(ok(ay)?|vamos|pode\s+(seguir|continuar)|segue|blz|beleza|ta\s+bom|certo|uai|partiu|entendido|perfeito|manda)\s*\.?!?\s*$',
+    re.IGNORECASE,
+)
+
+UNCERTAIN_RE = re.compile('|'.join([
+    r'nao\s+sei', r'n\s+sei', r'\bns\b', r'desconheco', r'nao\s+tenho\s+(certeza|ideia|nocao)',
+    r'sem\s+(nocao|ideia|base)', r'dificil\s+estimar', r'nao\s+faco\s+ideia', r'ainda\s+nao\s+sei',
+    r'por\s+enquanto\s+nada', r'nao\s+tenho\s+isso',
+]))
+
+PENDING_RE = re.compile('|'.join([
+    r'(pode\s+)?deixar\s+pendente', r'aceito?\s+pendente', r'registr(e|ar)\s+(como\s+)?pendente',
+    r'marqu(e|ar)\s+(como\s+)?pendente', r'fica\s+pendente', r'deixa\s+pendente',
+]))
+
+SELECT_NUMBER_RE = re.compile(r'^\s*([1-9])\s*$')
+
+# Comandos sobre a lista de requisitos
+_RESTART_RE = re.compile(_words(
+    r'reiniciar', r'recomecar', r'nova necessidade', r'novo objeto', r'redefinir necessidade',
+    r'volta\w* (?:pro|para o|ao) (?:comeco|inicio)',
+))
+_NEGATED_CHANGE_RE = re.compile(_words(
+    r'sem (?:alteracoes|ajustes|mudancas|modificacoes)', r'nenhuma? (?:alteracao|ajuste|mudanca|modificacao)',
+))
+_QUESTION_RE = re.compile(
+    r'\?|^(?:como|por que|porque|qual|quais|quando|onde|quem|o que)\b'
+    + '|' + _words(r'pode explicar', r'nao entendi', r'duvida', r'me explica', r'explique', r'que significa')
+)
+# Pergunta "pura": começa com interrogativo ou é curta; se citar uma necessidade ou
+# contratação ("..., pode ser?"), pode estar trazendo uma nova necessidade e segue para o LLM
+_QUESTION_OPENER_RE = re.compile(r'^(?:como|por que|porque|qual|quais|quando|onde|quem|o que)\b')
+_QUESTION_MAX_WORDS = 8
+_NEED_RE = re.compile(_words(
+    r'precis\w*', r'necessit\w*', r'necessidade', r'contrat\w*', r'adquir\w*', r'aquisic\w*', r'compr\w*',
+    r'loca[cr]\w*', r'quero', r'queremos', r'gostaria',
+))
+_REMOVE_RE = re.compile(_words(r'remov\w*', r'tir[ae]\w*', r'exclu\w*', r'delet\w*', r'retir\w*', r'apag\w*'))
+_KEEP_ONLY_RE = re.compile(r'\b(?:mant\w*|deix\w*|fic\w*|so)\s+(?:apenas|so|somente)\b|\bso manter\b')
+_EDIT_RE = re.compile(_words(
+    r'troc\w*', r'mud[ae]\w*', r'alter[ae]\w*', r'modifi\w*', r'ajust[ae]\w*', r'corrig\w*', r'corrij\w*',
+    r'atualiz\w*', r'edit[ae]\w*', r'substitu\w*', r'refaz\w*', r'refac\w*', r'nao gostei',
+    r'gere? outros?', r'mas', r'porem', r'entretanto', r'contudo', r'todavia',
+))
+_ADD_RE = re.compile(_words(r'adicion\w*', r'inclu\w*', r'acrescent\w*', r'inser\w*', r'insir\w*',
+                            r'novo requisito', r'mais um'))
+# Confirmação só é resolvida localmente quando a mensagem inteira é curta e só confirma
+# ("ok", "sem alterações, pode seguir"); negação ou conteúdo extra seguem para o LLM
+_CONFIRM_MAX_WORDS = 6
+_CONFIRM_FILLER_RE = re.compile(_words(
+    r'sim', r'pode', r'tudo', r'assim', r'entao', r'esta', r'ficou', r'bom', r'otimo', r'isso', r'e isso',
+    r'por favor', r'obrigad[oa]', r'(?:n?os|dos) requisitos', r'(?:n?a|da) lista',
+))
+_NEGATION_RE = re.compile(_words(r'nao', r'nem', r'nunca', r'n'))
+# Referência a requisito: "R3", ordinal, ou número logo após o verbo, um artigo ou "item"
+# ("remover 2", "tirar o 3", "manter apenas 1 e 3"); o número de "exige 5 anos" não é índice
+_INDEX_LEAD_RE = (r'\b(?:remov\w*|tir[ae]\w*|exclu\w*|delet\w*|retir\w*|apag\w*|mant\w*|deix\w*|troc\w*|'
+                  r'mud[ae]\w*|alter[ae]\w*|modifi\w*|ajust[ae]\w*|corrig\w*|corrij\w*|atualiz\w*|edit[ae]\w*|'
+                  r'substitu\w*|refaz\w*|refac\w*|o|a|os|as|do|da|dos|das|no|na|nos|nas|itens|item|requisitos?|'
+                  r'numeros?|n|apenas|so|somente)\s+\d+\b')
+_REFERENCE_RE = re.compile(r'\br\d+\b|' + _INDEX_LEAD_RE + '|' + _words(r'primeir[oa]', r'ultim[oa]', r'penultim[oa]'))
+# Número seguido de unidade ou substantivo ("5 anos", "24 meses", "30 dias", "10%"): é conteúdo
+# do requisito, não índice; a mensagem segue para o LLM
+_QUANTITY_RE = re.compile(
+    r'\b\d+(?:[.,]\d+)?\s*(?:%|(?!(?:e|ou|a|ate|por|para|pois|porque|que|tambem|so|apenas|r\d+)\b)[a-z])')
+# Texto novo delimitado (depois de ':' ou entre aspas), fora da parte de comando da mensagem
+_DELIMITED_TEXT_RE = re.compile(r':|["\'“”]')
+
+
+def command_text(text: str) -> str:
+    """Parte de comando da mensagem, antes do texto novo delimitado por ':' ou aspas"""
+    return _DELIMITED_TEXT_RE.split(text or '', maxsplit=1)[0]
+
+
+def _is_bare_confirmation(n: str) -> bool:
+    """Mensagem (normalizada) curta, sem negação e formada só por confirmação e palavras de preenchimento"""
+    if len(n.split()) > _CONFIRM_MAX_WORDS or _NEGATION_RE.search(n):
+        return False
+    rest = _CONFIRM_FILLER_RE.sub(' ', _NEGATED_CHANGE_RE.sub(' ', CONFIRMATION_RE.sub(' ', n)))
+    return not re.sub(r'[\W_]+', '', rest)
+
+
+@dataclass(frozen=True)
+class IntentMatch:
+    """Intenção reconhecida localmente, com a confiança da classificação"""
+    intent: str
+    confidence: float
+    slots: Dict[str, Any] = field(default_factory=dict)
+
+
+class IntentEngine:
+    """Classificador compilado com contadores de resoluções locais e escalonamentos ao LLM"""
+
+    def __init__(self, min_confidence: Optional[float] = None, enabled: Optional[bool] = None):
+        self.min_confidence = min_confidence if min_confidence is not None else float(
+            os.getenv('INTENT_ENGINE_MIN_CONFIDENCE', '0.8'))
+        if enabled is None:
+            enabled = os.getenv('INTENT_ENGINE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    # Reconhecedores simples -------------------------------------------------
+    def is_confirmation(self, text: str) -> bool:
+        return bool(text) and bool(CONFIRMATION_RE.search(normalize(text)))
+
+    def is_vague_ack(self, text: str) -> bool:
+        return bool(text) and bool(VAGUE_ACK_RE.match(normalize(text)))
+
+    def is_uncertain(self, text: str) -> bool:
+        return bool(text) and bool(UNCERTAIN_RE.search(normalize(text)))
+
+    def is_pending_request(self, text: str) -> bool:
+        return bool(text) and bool(PENDING_RE.search(normalize(text)))
+
+    def select_number(self, text: str) -> Optional[int]:
+        match = SELECT_NUMBER_RE.match((text or '').strip())
+        return int(match.group(1)) if match else None
+
+    # Comandos sobre requisitos ----------------------------------------------
+    def classify_requirements_command(self, text: str) -> IntentMatch:
+        """
+        Classifica um comando de revisão de requisitos.
+
+        Intenções: confirm, restart_necessity, ask, remove, keep_only, edit, add, unclear, other.
+        Mensagens com mais de uma ação, sem referência explícita ao requisito (ex.: "tira
+        manutenção"), com números que são conteúdo e não índice ("o que exige 5 anos"), com texto novo sem delimitador, com confirmação acompanhada de
+        negação ou de outro conteúdo ("Certo. Agora preciso de...") ou perguntas que citam
+        uma necessidade ("Na verdade preciso contratar X, pode ser?") recebem confiança baixa.
+        """
+        n = normalize(text)
+        if not n:
+            return IntentMatch('unclear', 1.0)
+        if _RESTART_RE.search(n):
+            return IntentMatch('restart_necessity', 0.95)
+
+        # "sem alterações" é confirmação, não edição
+        remainder = _NEGATED_CHANGE_RE.sub(' ', n)
+        negated = remainder != n
+        actions = [name for name, pattern in (('keep_only', _KEEP_ONLY_RE), ('remove', _REMOVE_RE),
+                                              ('edit', _EDIT_RE), ('add', _ADD_RE))
+                   if pattern.search(remainder)]
+        command = normalize(command_text(text))
+        has_reference = bool(_REFERENCE_RE.search(command))
+        has_quantity = bool(_QUANTITY_RE.search(command))
+        has_delimited_text = ':' in text or bool(re.search(r'["\'“”].+["\'“”]', text))
+
+        if _QUESTION_RE.search(n):
+            bare = ((_QUESTION_OPENER_RE.match(n) or len(n.split()) <= _QUESTION_MAX_WORDS)
+                    and not _NEED_RE.search(n))
+            return IntentMatch('ask', 0.9 if bare and not actions else 0.5)
+
+        if not actions:
+            if negated or CONFIRMATION_RE.search(n):
+                bare = _is_bare_confirmation(n)
+                return IntentMatch('confirm', 0.95 if bare and not has_reference else 0.5)
+            return IntentMatch('other', 0.3)
+
+        if len(actions) > 1:
+            return IntentMatch(actions[0], 0.5, {'actions': actions})
+
+        action = actions[0]
+        if action in ('remove', 'keep_only'):
+            return IntentMatch(action, 0.9 if has_reference and not has_quantity else 0.5)
+        if action == 'edit':
+            if not has_reference or has_quantity or ' por ' in f' {n} ':
+                return IntentMatch('edit', 0.5)
+            # Sem ':' ou aspas não há como separar o texto novo; o parser via LLM extrai
+            return IntentMatch('edit', 0.9 if has_delimited_text else 0.5)
+        # add
+        return IntentMatch('add', 0.9 if ':' in text else 0.5, {'delimited': has_delimited_text})
+
+    def resolves(self, match: IntentMatch) -> bool:
+        """A classificação é confiável o bastante para dispensar o LLM"""
+        return self.enabled and match.confidence >= self.min_confidence
+
+    # Métricas ---------------------------------------------------------------
+    def record(self, site: str, resolved_locally: bool) -> None:
+        """Registra, no ponto de decisão ``site``, se a mensagem foi resolvida sem LLM"""
+        with self._lock:
+            counters = self._counters.setdefault(site, {'resolved_locally': 0, 'escalated': 0})
+            counters['resolved_locally' if resolved_locally else 'escalated'] += 1
+        INTENT_RESOLUTIONS.inc(site=site, result='local' if resolved_locally else 'llm')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sites = {site: dict(counters) for site, counters in self._counters.items()}
+        avoided = sum(c['resolved_locally'] for c in sites.values())
+        escalated = sum(c['escalated'] for c in sites.values())
+        total = avoided + escalated
+        return {
+            'llm_calls_avoided': avoided,
+            'llm_escalations': escalated,
+            'local_resolution_rate': round(avoided / total, 4) if total else 0.0,
+            'sites': sites,
+        }
+
+
+_engine: Optional[IntentEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_intent_engine() -> IntentEngine:
+    """Motor de intenções do processo"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = IntentEngine()
+    return _engine
@@ -0,0 +1,387 @@
+"""
+Job Queue
+Fila de jobs em processo para os endpoints de geração demorados (ETP completo,
+documento final, prévia multipass).
+
+O endpoint registra o job e responde imediatamente com o id; um pool de threads
+do próprio processo executa o job e grava o resultado. O estado fica em uma
+tabela (``etp_jobs``) para que qualquer worker do servidor responda ao polling
+e para que jobs pendentes sobrevivam a um reinício.
+
+Backends (JOB_QUEUE_BACKEND):
+    database  tabela no banco da aplicação (PostgreSQL, DATABASE_URL)
+    sqlite    arquivo local (JOB_QUEUE_SQLITE_PATH), para desenvolvimento
+
+Demais configurações (variáveis de ambiente):
+    JOB_WORKERS                threads executoras por processo (2)
+    JOB_MAX_PER_USER           jobs em execução simultânea por usuário (2)
+    JOB_MAX_ATTEMPTS           tentativas por job antes de falhar (3)
+    JOB_RETRY_BACKOFF_SECONDS  espera antes da 1ª nova tentativa, dobrada a cada falha (5)
+    JOB_POLL_SECONDS           intervalo de busca por jobs de outros processos (1)
+    JOB_STALE_SECONDS          jobs "running" há mais tempo são devolvidos à fila no início (1800)
+"""
+
+import os
+import json
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import (
+    Boolean, Column, DateTime, Index, Integer, MetaData, String, Table, Text,
+    create_engine, func, select, update,
+)
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+TERMINAL_STATUSES = frozenset({SUCCEEDED, FAILED, CANCELLED})
+
+metadata = MetaData()
+
+# Handlers por tipo de job, compartilhados pelas filas do processo (ver register_job_handler)
+_handlers: Dict[str, Callable[[Dict[str, Any], 'JobContext'], Any]] = {}
+
+jobs_table = Table(
+    'etp_jobs', metadata,
+    Column('id', String(36), primary_key=True),
+    Column('kind', String(64), nullable=False),
+    Column('user_id', String(255), nullable=True),
+    Column('status', String(16), nullable=False),
+    Column('payload', Text, nullable=False),
+    Column('result', Text, nullable=True),
+    Column('error', Text, nullable=True),
+    Column('attempts', Integer, nullable=False, default=0),
+    Column('max_attempts', Integer, nullable=False),
+    Column('cancel_requested', Boolean, nullable=False, default=False),
+    Column('run_after', DateTime, nullable=False),
+    Column('created_at', DateTime, nullable=False),
+    Column('started_at', DateTime, nullable=True),
+    Column('finished_at', DateTime, nullable=True),
+    Index('idx_etp_jobs_status_run_after', 'status', 'run_after'),
+    Index('idx_etp_jobs_user_status', 'user_id', 'status'),
+)
+
+
+class JobError(Exception):
+    """
+    Falha de um job com resultado associado (ex.: resposta de erro do endpoint).
+
+    Args:
+        message: Descrição do erro
+        result: Resultado gravado no job mesmo em caso de falha
+        retryable: Se False, o job falha sem novas tentativas
+    """
+
+    def __init__(self, message: str, result: Any = None, retryable: bool = True):
+        super().__init__(message)
+        self.result = result
+        self.retryable = retryable
+
+
+class JobCancelled(Exception):
+    """Levantada pelo handler (via JobContext.raise_if_cancelled) quando o cancelamento foi pedido"""
+
+
+def _job_dict(row) -> Dict[str, Any]:
+    job = dict(row._mapping)
+    job['payload'] = json.loads(job['payload']) if job['payload'] else {}
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+class JobStore:
+    """Persistência dos jobs sobre um engine SQLAlchemy (PostgreSQL ou SQLite)"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        metadata.create_all(engine, checkfirst=True)
+
+    @classmethod
+    def sqlite(cls, path: Optional[str] = None) -> 'JobStore':
+        project_root = Path(__file__).parent.parent.parent.parent.parent.parent
+        path = Path(path or os.getenv('JOB_QUEUE_SQLITE_PATH', project_root / "data" / "jobs" / "jobs.sqlite3"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        engine = create_engine(f"sqlite:///{path}", connect_args={'check_same_thread': False, 'timeout': 30})
+        return cls(engine)
+
+    def create(self, kind: str, payload: Dict[str, Any], user_id: Optional[str], max_attempts: int) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        job_id = str(uuid.uuid4())
+        with self.engine.begin() as conn:
+            conn.execute(jobs_table.insert().values(
+                id=job_id, kind=kind, user_id=user_id, status=QUEUED,
+                payload=json.dumps(payload, ensure_ascii=False), attempts=0,
+                max_attempts=max_attempts, cancel_requested=False, run_after=now, created_at=now,
+            ))
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            row = conn.execute(select(jobs_table).where(jobs_table.c.id == job_id)).first()
+        return _job_dict(row) if row else None
+
+    def claim(self, per_user_limit: int) -> Optional[Dict[str, Any]]:
+        """
+        Marca como "running" o job mais antigo pronto para execução cujo usuário
+        ainda não atingiu o limite de jobs simultâneos; None se não houver.
+        """
+        now = datetime.utcnow()
+        with self.engine.connect() as conn:
+            candidates = conn.execute(
+                select(jobs_table.c.id, jobs_table.c.user_id)
+                .where(jobs_table.c.status == QUEUED, jobs_table.c.run_after <= now)
+                .order_by(jobs_table.c.created_at)
+                .limit(50)
+            ).all()
+            running = dict(conn.execute(
+                select(jobs_table.c.user_id, func.count())
+                .where(jobs_table.c.status == RUNNING)
+                .group_by(jobs_table.c.user_id)
+            ).all())
+
+        for job_id, user_id in candidates:
+            if user_id is not None and running.get(user_id, 0) >= per_user_limit:
+                continue
+            # A condição status='queued' garante que só um worker (de qualquer processo) pegue o job
+            with self.engine.begin() as conn:
+                claimed = conn.execute(
+                    update(jobs_table)
+                    .where(jobs_table.c.id == job_id, jobs_table.c.status == QUEUED)
+                    .values(status=RUNNING, started_at=now, attempts=jobs_table.c.attempts + 1)
+                ).rowcount
+            if claimed:
+                return self.get(job_id)
+        return None
+
+    def finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(update(jobs_table).where(jobs_table.c.id == job_id).values(
+                status=status, finished_at=datetime.utcnow(), error=error,
+                result=json.dumps(result, ensure_ascii=False) if result is not None else None,
+            ))
+
+    def retry(self, job_id: str, error: str, delay: float) -> None:
+        """Devolve o job à fila para nova tentativa após ``delay`` segundos"""
+        with self.engine.begin() as conn:
+            conn.execute(update(jobs_table).where(jobs_table.c.id == job_id).values(
+                status=QUEUED, error=error, run_after=datetime.utcnow() + timedelta(seconds=delay),
+            ))
+
+    def request_cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancela um job na fila, ou sinaliza o cancelamento de um job em execução"""
+        with self.engine.begin() as conn:
+            conn.execute(update(jobs_table)
+                         .where(jobs_table.c.id == job_id, jobs_table.c.status == QUEUED)
+                         .values(status=CANCELLED, cancel_requested=True, finished_at=datetime.utcnow()))
+            conn.execute(update(jobs_table)
+                         .where(jobs_table.c.id == job_id, jobs_table.c.status == RUNNING)
+                         .values(cancel_requested=True))
+        return self.get(job_id)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self.engine.connect() as conn:
+            return bool(conn.execute(
+                select(jobs_table.c.cancel_requested).where(jobs_table.c.id == job_id)
+            ).scalar())
+
+    def requeue_stale(self, older_than: float) -> int:
+        """Devolve à fila jobs "running" abandonados (ex.: processo encerrado durante a execução)"""
+        limit = datetime.utcnow() - timedelta(seconds=older_than)
+        with self.engine.begin() as conn:
+            return conn.execute(
+                update(jobs_table)
+                .where(jobs_table.c.status == RUNNING, jobs_table.c.started_at < limit)
+                .values(status=QUEUED, run_after=datetime.utcnow())
+            ).rowcount
+
+
+class JobContext:
+    """Contexto passado ao handler: permite checar se o cancelamento foi pedido"""
+
+    def __init__(self, job: Dict[str, Any], store: JobStore):
+        self.job = job
+        self.store = store
+
+    @property
+    def cancelled(self) -> bool:
+        return self.store.is_cancel_requested(self.job['id'])
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise JobCancelled(self.job['id'])
+
+
+class JobQueue:
+    """
+    Pool de threads que executa os jobs registrados no JobStore.
+
+    Handlers são registrados por tipo com ``register_job_handler(kind, handler)`` e chamados como
+    ``handler(payload, context)``; o valor retornado (serializável em JSON) é o resultado
+    do job. Exceções geram novas tentativas com backoff exponencial até ``max_attempts``;
+    ``JobError(retryable=False)`` falha o job imediatamente.
+    """
+
+    def __init__(self, store: JobStore, workers: Optional[int] = None, per_user_limit: Optional[int] = None,
+                 max_attempts: Optional[int] = None, retry_backoff: Optional[float] = None,
+                 poll_interval: Optional[float] = None, app=None,
+                 handlers: Optional[Dict[str, Callable[[Dict[str, Any], JobContext], Any]]] = None):
+        self.store = store
+        self.app = app
+        self.workers = workers or int(os.getenv('JOB_WORKERS', '2'))
+        self.per_user_limit = per_user_limit or int(os.getenv('JOB_MAX_PER_USER', '2'))
+        self.max_attempts = max_attempts or int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+        self.retry_backoff = retry_backoff if retry_backoff is not None else float(os.getenv('JOB_RETRY_BACKOFF_SECONDS', '5'))
+        self.poll_interval = poll_interval or float(os.getenv('JOB_POLL_SECONDS', '1'))
+        self.handlers = _handlers if handlers is None else handlers
+
+        self._lock = threading.Lock()
+        self._claim_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._pid: Optional[int] = None
+
+    def submit(self, kind: str, payload: Dict[str, Any], user_id: Optional[str] = None,
+               max_attempts: Optional[int] = None) -> Dict[str, Any]:
+        """Registra o job e acorda um executor; retorna o job recém-criado"""
+        if kind not in self.handlers:
+            raise ValueError(f"Tipo de job desconhecido: {kind}")
+        job = self.store.create(kind, payload, user_id, max_attempts or self.max_attempts)
+        self.start()
+        self._wake.set()
+        logger.info(f"[JOBS] Job {job['id']} ({kind}) enfileirado para usuário {user_id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.request_cancel(job_id)
+
+    def start(self) -> None:
+        """Inicia os executores deste processo (de novo após fork, se necessário)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stopping.clear()
+            self._threads = [
+                threading.Thread(target=self._worker_loop, name=f"etp-job-{n}", daemon=True)
+                for n in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pid = None
+
+    def _worker_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                # Serializa as buscas do processo para que o limite por usuário seja respeitado
+                with self._claim_lock:
+                    job = self.store.claim(self.per_user_limit)
+            except Exception as e:
+                logger.warning(f"[JOBS] Falha ao buscar jobs: {e}")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._run(job)
+            # Um job concluído pode liberar a vez de outro job do mesmo usuário
+            self._wake.set()
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        handler = self.handlers.get(job['kind'])
+        if handler is None:
+            self.store.finish(job['id'], FAILED, error=f"Tipo de job desconhecido: {job['kind']}")
+            return
+
+        context = JobContext(job, self.store)
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    result = handler(job['payload'], context)
+            else:
+                result = handler(job['payload'], context)
+        except JobCancelled:
+            self.store.finish(job['id'], CANCELLED)
+            logger.info(f"[JOBS] Job {job['id']} cancelado durante a execução")
+            return
+        except Exception as e:
+            retryable = getattr(e, 'retryable', True)
+            if retryable and job['attempts'] < job['max_attempts'] and not context.cancelled:
+                delay = self.retry_backoff * (2 ** (job['attempts'] - 1))
+                logger.warning(f"[JOBS] Job {job['id']} falhou (tentativa {job['attempts']}): {e}; "
+                               f"nova tentativa em {delay:.0f}s")
+                self.store.retry(job['id'], str(e), delay)
+            else:
+                logger.error(f"[JOBS] Job {job['id']} falhou definitivamente: {e}")
+                self.store.finish(job['id'], FAILED, result=getattr(e, 'result', None), error=str(e))
+            return
+
+        if context.cancelled:
+            self.store.finish(job['id'], CANCELLED)
+            logger.info(f"[JOBS] Job {job['id']} cancelado; resultado descartado")
+        else:
+            self.store.finish(job['id'], SUCCEEDED, result=result)
+            logger.info(f"[JOBS] Job {job['id']} ({job['kind']}) concluído")
+
+
+def register_job_handler(kind: str, handler: Callable[[Dict[str, Any], JobContext], Any]) -> None:
+    """Registra o handler de um tipo de job para todas as filas do processo"""
+    _handlers[kind] = handler
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def _default_store(app=None) -> JobStore:
+    backend = os.getenv('JOB_QUEUE_BACKEND', 'database').lower()
+    if backend == 'sqlite' or app is None:
+        return JobStore.sqlite()
+    from domain.interfaces.dataprovider.DatabaseConfig import db
+    with app.app_context():
+        return JobStore(db.engine)
+
+
+def init_job_queue(app) -> JobQueue:
+    """Cria a fila do processo sobre o banco da aplicação e inicia os executores"""
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.stop()
+        _queue = JobQueue(_default_store(app), app=app)
+    requeued = _queue.store.requeue_stale(float(os.getenv('JOB_STALE_SECONDS', '1800')))
+    if requeued:
+        logger.info(f"[JOBS] {requeued} jobs abandonados devolvidos à fila")
+    _queue.start()
+    return _queue
+
+
+def get_job_queue() -> JobQueue:
+    """Fila do processo; sem init_job_queue, usa o backend SQLite local"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue(_default_store())
+    return _queue
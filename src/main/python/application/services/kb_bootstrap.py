@@ -0,0 +1,263 @@
+"""
+KB Bootstrap
+Carga da base de conhecimento e dos índices RAG fora do caminho de inicialização.
+
+Antes, cada processo rodava ``auto_load_knowledge_base`` (ingestão completa, com
+embeddings, quando a base estava vazia) e carregava os índices antes de atender a
+primeira requisição. Com KB_BOOTSTRAP_MODE=background (padrão) essas etapas rodam
+numa thread do processo: o app sobe na hora e ``/api/ready`` responde 503 até que
+terminem. O esquema do banco e os usuários demo ficam para ``scripts/init_db.py``
+(com DB_INIT_ON_STARTUP=false).
+
+Configurações (variáveis de ambiente):
+    KB_BOOTSTRAP_MODE   background | sync (bloqueia o startup, comportamento antigo) | off
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MODES = ('background', 'sync', 'off')
+
+# Estados da carga; ``ready`` e ``degraded`` (alguma etapa falhou, o app segue sem ela) encerram
+PENDING, RUNNING, READY, DEGRADED, DISABLED = 'pending', 'running', 'ready', 'degraded', 'disabled'
+FINISHED_STATES = (READY, DEGRADED, DISABLED)
+
+
+def auto_load_knowledge_base():
+    """
+    Verifica se a base de conhecimento está vazia e executa a ingestão automaticamente se necessário.
+    Esta função deve ser chamada após a inicialização do banco de dados.
+    """
+    from domain.interfaces.dataprovider.DatabaseConfig import db
+    from domain.dto.KnowledgeBaseDto import KbDocument, KbChunk
+
+    try:
+        # Verificar se existem documentos na base
+        document_count = db.session.query(KbDocument).count()
+        chunk_count = db.session.query(KbChunk).count()
+
+        if document_count > 0:
+            # Base já populada
+            logging.info(f"📚 Base de conhecimento já populada com {document_count} documentos e {chunk_count} chunks")
+            return True
+
+        # Base vazia, executar ingestão automática
+        logging.info("⚡ Nenhum documento encontrado, rodando ingestão inicial...")
+
+        # Criar instância do ingestor e executar ingestão inicial
+        from rag.ingest_etps import ETPIngestor
+        ingestor = ETPIngestor()
+        success = ingestor.ingest_initial_docs()
+
+        if success:
+            # Verificar novamente após a ingestão
+            final_document_count = db.session.query(KbDocument).count()
+            final_chunk_count = db.session.query(KbChunk).count()
+            logging.info(f"✅ Ingestão concluída: {final_document_count} documentos / {final_chunk_count} chunks")
+            return True
+        else:
+            logging.error(f"❌ Erro na ingestão automática")
+            return False
+
+    except Exception as e:
+        logging.error(f"❌ Erro verificando/carregando base de conhecimento: {str(e)}")
+        return False
+
+
+def load_rag_indices() -> bool:
+    """Carrega os índices BM25 e vetorial na instância de retrieval do processo, se houver índice persistido"""
+    from application.ai.llm_gateway import get_openai_client
+    from rag.retrieval import get_retrieval_instance
+    from rag.vector_index import default_index_dir, read_manifest
+
+    # Índice vetorial persistido (manifesto gravado pela ingestão)
+    if read_manifest(default_index_dir()) is None:
+        logger.warning("[BOOTSTRAP] Índices RAG não encontrados; para criá-los: python -m rag.ingest_etps --rebuild")
+        return False
+
+    openai_client = None
+    try:
+        openai_client = get_openai_client()
+    except Exception as e:
+        logger.warning(f"[BOOTSTRAP] Não foi possível configurar cliente OpenAI: {e}")
+
+    if get_retrieval_instance(openai_client=openai_client).build_indices():
+        logger.info("[BOOTSTRAP] Sistema RAG inicializado")
+        return True
+    logger.warning("[BOOTSTRAP] Falha ao carregar índices RAG; a aplicação segue sem o sistema RAG")
+    return False
+
+
+def index_status() -> Dict[str, Any]:
+    """Estado dos índices da instância de retrieval do processo (sem importar o módulo se ainda não foi usado)"""
+    retrieval_module = sys.modules.get('rag.retrieval')
+    retrieval = getattr(retrieval_module, '_retrieval_instance', None)
+    if retrieval is None:
+        return {'loaded': False, 'bm25_sections': 0, 'vectors': 0}
+    return {
+        'loaded': bool(retrieval.bm25_indices),
+        'bm25_sections': len(retrieval.bm25_indices),
+        'vectors': len(retrieval.faiss_documents) if retrieval.faiss_index is not None else 0,
+    }
+
+
+def kb_status() -> Dict[str, Any]:
+    """Contagem de documentos e chunks da base; ``available`` False se o banco não respondeu"""
+    from domain.interfaces.dataprovider.DatabaseConfig import db
+    from domain.dto.KbDto import KbDocument, KbChunk
+
+    try:
+        return {
+            'available': True,
+            'documents': db.session.query(KbDocument).count(),
+            'chunks': db.session.query(KbChunk).count(),
+        }
+    except Exception as e:
+        db.session.rollback()
+        return {'available': False, 'error': str(e)}
+
+
+class KbBootstrap:
+    """
+    Executa as etapas de carga (base de conhecimento, depois índices) uma vez por processo.
+
+    Cada etapa é uma função sem argumentos que retorna True/False; uma etapa que falha
+    não impede as seguintes e deixa o estado final em ``degraded``.
+    """
+
+    def __init__(self, app=None, mode: Optional[str] = None,
+                 steps: Optional[List[Tuple[str, Callable[[], bool]]]] = None):
+        self.app = app
+        mode = (mode or os.getenv('KB_BOOTSTRAP_MODE', 'background')).lower()
+        if mode not in MODES:
+            logger.warning(f"[BOOTSTRAP] KB_BOOTSTRAP_MODE inválido ({mode}); usando background")
+            mode = 'background'
+        self.mode = mode
+        self.steps = steps if steps is not None else [
+            ('knowledge_base', auto_load_knowledge_base),
+            ('indices', load_rag_indices),
+        ]
+
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._state = DISABLED if mode == 'off' else PENDING
+        self._steps: Dict[str, Dict[str, Any]] = {}
+        self._started_at: Optional[datetime] = None
+        self._seconds: Optional[float] = None
+        if self._state == DISABLED:
+            self._done.set()
+
+    def start(self) -> None:
+        """Inicia a carga neste processo: em thread (background) ou bloqueando (sync); de novo após fork, se inacabada"""
+        if self._state in FINISHED_STATES or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._state in FINISHED_STATES or self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            if self.mode == 'sync':
+                self._thread = None
+            else:
+                self._thread = threading.Thread(target=self.run, name="kb-bootstrap", daemon=True)
+                self._thread.start()
+        if self.mode == 'sync':
+            self.run()
+
+    def run(self) -> str:
+        """Executa as etapas em sequência; retorna o estado final"""
+        self._state = RUNNING
+        self._started_at = datetime.utcnow()
+        started = time.perf_counter()
+        failed = False
+        for name, step in self.steps:
+            step_started = time.perf_counter()
+            try:
+                ok = bool(self._in_context(step))
+                error = None
+            except Exception as e:
+                ok, error = False, str(e)
+                logger.error(f"[BOOTSTRAP] Etapa {name} falhou: {e}")
+            self._steps[name] = {'ok': ok, 'seconds': round(time.perf_counter() - step_started, 3)}
+            if error:
+                self._steps[name]['error'] = error
+            failed = failed or not ok
+        self._seconds = time.perf_counter() - started
+        self._state = DEGRADED if failed else READY
+        self._done.set()
+        logger.info(f"[BOOTSTRAP] Carga concluída em {self._seconds:.1f}s ({self._state})")
+        return self._state
+
+    def _in_context(self, func: Callable[[], Any]) -> Any:
+        if self.app is not None:
+            with self.app.app_context():
+                return func()
+        return func()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Aguarda o fim da carga; retorna True se terminou dentro do prazo"""
+        return self._done.wait(timeout)
+
+    @property
+    def finished(self) -> bool:
+        return self._state in FINISHED_STATES
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'state': self._state,
+            'mode': self.mode,
+            'steps': dict(self._steps),
+            'started_at': self._started_at.isoformat() if self._started_at else None,
+            'seconds': round(self._seconds, 3) if self._seconds is not None else None,
+        }
+
+
+_bootstrap: Optional[KbBootstrap] = None
+_bootstrap_lock = threading.Lock()
+
+
+def init_kb_bootstrap(app, mode: Optional[str] = None) -> KbBootstrap:
+    """Cria a carga do processo e a inicia conforme o modo (KB_BOOTSTRAP_MODE ou ``mode``)"""
+    global _bootstrap
+    with _bootstrap_lock:
+        _bootstrap = KbBootstrap(app=app, mode=mode)
+    bootstrap = _bootstrap
+    if bootstrap.mode == 'off':
+        logger.info("[BOOTSTRAP] Carga da base de conhecimento e dos índices desativada")
+        return bootstrap
+
+    if bootstrap.mode == 'background':
+        # Workers criados por fork antes do fim da carga a retomam na primeira requisição
+        app.before_request(bootstrap.start)
+    bootstrap.start()
+    return bootstrap
+
+
+def get_kb_bootstrap() -> Optional[KbBootstrap]:
+    """Carga do processo; None se init_kb_bootstrap não foi chamado"""
+    return _bootstrap
+
+
+def readiness() -> Tuple[bool, Dict[str, Any]]:
+    """
+    (pronto, detalhes) para o endpoint /api/ready: pronto quando a carga terminou
+    (mesmo degradada) e o banco responde.
+    """
+    bootstrap = _bootstrap
+    bootstrap_status = bootstrap.status() if bootstrap is not None else {'state': DISABLED}
+    kb = kb_status()
+    ready = bootstrap_status['state'] in FINISHED_STATES and kb['available']
+    return ready, {
+        'status': 'ready' if ready else 'starting',
+        'bootstrap': bootstrap_status,
+        'knowledge_base': kb,
+        'indices': index_status(),
+    }
@@ -0,0 +1,246 @@
+"""
+Norm Refresher
+Revalidação em segundo plano do status das normas federais (cache legal_norm_cache).
+
+resolve_lexml_batch devolve na hora as entradas expiradas, marcadas como
+``stale``/``revalidating``, e as entrega a este refresher, que consulta o LexML
+fora do caminho da requisição (stale-while-revalidate). Uma varredura periódica
+revalida, antes que expirem, as normas mais citadas na base de conhecimento
+(kb_chunk.citations_json) e nas sessões de ETP recentes.
+
+Configurações (variáveis de ambiente):
+    LEXML_REFRESH_ENABLED          liga o refresher e a varredura (true)
+    LEXML_SERVE_STALE              serve entradas expiradas enquanto revalida (true)
+    LEXML_SWEEP_INTERVAL_SECONDS   intervalo entre varreduras (21600)
+    LEXML_SWEEP_INITIAL_DELAY      espera antes da primeira varredura (60)
+    LEXML_SWEEP_TOP_N              normas mais citadas revalidadas por varredura (50)
+    LEXML_SWEEP_RECENT_DAYS        janela das sessões consideradas recentes (30)
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from domain.usecase.utils.legal_citations import iter_citations
+
+logger = logging.getLogger(__name__)
+
+Norm = Tuple[str, str, int]
+
+# Tipos verificáveis no acervo federal do LexML
+_FEDERAL_TYPES = {'lei', 'lei_complementar', 'decreto', 'medida_provisoria', 'emenda_constitucional'}
+
+
+def _citations_in(value: Any) -> Iterable[Norm]:
+    """Normas citadas em um valor JSON: textos livres ou dicionários {tipo, numero, ano}"""
+    if isinstance(value, str):
+        for citation in iter_citations(value):
+            if citation.year and citation.type in _FEDERAL_TYPES and citation.scope in (None, 'federal'):
+                yield citation.type_label, citation.number, int(citation.year)
+    elif isinstance(value, dict):
+        if {'tipo', 'numero', 'ano'} <= value.keys():
+            try:
+                yield str(value['tipo']), str(value['numero']), int(value['ano'])
+            except (TypeError, ValueError):
+                pass
+            return
+        for item in value.values():
+            yield from _citations_in(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _citations_in(item)
+
+
+def count_cited_norms(values: Iterable[Any]) -> Counter:
+    """Conta as citações por norma (chave normalizada) em uma sequência de valores JSON"""
+    from domain.usecase.etp.verify_federal import norm_key
+
+    counts: Counter = Counter()
+    norms: Dict[str, Norm] = {}
+    for value in values:
+        for norm in _citations_in(value):
+            key = norm_key(*norm)
+            norms.setdefault(key, norm)
+            counts[key] += 1
+    return Counter({norms[key]: count for key, count in counts.items()})
+
+
+def kb_citations() -> Iterable[Any]:
+    """Citações gravadas nos chunks da base de conhecimento"""
+    from domain.dto.KbDto import KbChunk
+
+    query = KbChunk.query.with_entities(KbChunk.citations_json).filter(KbChunk.citations_json.isnot(None))
+    for (raw,) in query.yield_per(500):
+        try:
+            yield json.loads(raw)
+        except (TypeError, ValueError):
+            continue
+
+
+def recent_session_citations(days: int) -> Iterable[Any]:
+    """Respostas e ETPs gerados nas sessões atualizadas nos últimos ``days`` dias"""
+    from domain.dto.EtpOrm import EtpSession
+
+    since = datetime.utcnow() - timedelta(days=days)
+    query = (EtpSession.query
+             .with_entities(EtpSession.answers, EtpSession.generated_etp)
+             .filter(EtpSession.updated_at >= since))
+    for answers, generated_etp in query.yield_per(200):
+        yield answers
+        yield generated_etp
+
+
+class NormRefresher:
+    """
+    Thread do processo que revalida normas no LexML.
+
+    ``request_refresh`` enfileira normas (deduplicadas pela chave) e acorda a thread;
+    a cada ``interval`` segundos ``sweep`` revalida as ``top_n`` normas mais citadas
+    cujo cache está ausente ou expira antes da próxima varredura.
+    """
+
+    def __init__(self, app=None, interval: Optional[float] = None, initial_delay: Optional[float] = None,
+                 top_n: Optional[int] = None, recent_days: Optional[int] = None,
+                 sources: Optional[List[Callable[[], Iterable[Any]]]] = None):
+        self.app = app
+        self.interval = interval or float(os.getenv('LEXML_SWEEP_INTERVAL_SECONDS', '21600'))
+        self.initial_delay = initial_delay if initial_delay is not None else float(os.getenv('LEXML_SWEEP_INITIAL_DELAY', '60'))
+        self.top_n = top_n or int(os.getenv('LEXML_SWEEP_TOP_N', '50'))
+        self.recent_days = recent_days or int(os.getenv('LEXML_SWEEP_RECENT_DAYS', '30'))
+        self.sources = sources if sources is not None else [
+            kb_citations, lambda: recent_session_citations(self.recent_days)
+        ]
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Norm] = {}
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._next_sweep = 0.0
+        self._stats = {'refreshed': 0, 'failed': 0, 'sweeps': 0, 'last_sweep_at': None}
+
+    def request_refresh(self, norms: Iterable[Norm]) -> None:
+        """Enfileira normas para revalidação (ignoradas as que já aguardam) e acorda a thread"""
+        from domain.usecase.etp.verify_federal import norm_key
+
+        with self._lock:
+            for tipo, numero, ano in norms:
+                self._pending.setdefault(norm_key(tipo, numero, ano), (tipo, numero, int(ano)))
+        self.start()
+        self._wake.set()
+
+    def start(self) -> None:
+        """Inicia a thread deste processo (de novo após fork, se necessário)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stopping.clear()
+            self._next_sweep = time.monotonic() + self.initial_delay
+            self._thread = threading.Thread(target=self._loop, name="lexml-refresher", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self._pid = None
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(max(0.0, self._next_sweep - time.monotonic()))
+            self._wake.clear()
+            if self._stopping.is_set():
+                break
+            try:
+                self._in_context(self.refresh_pending)
+                if time.monotonic() >= self._next_sweep:
+                    self._in_context(self.sweep)
+                    self._next_sweep = time.monotonic() + self.interval
+            except Exception as e:
+                logger.warning(f"[LEXML] Falha na revalidação em segundo plano: {e}")
+                # Evita repetir a varredura em laço quando o banco está indisponível
+                self._next_sweep = max(self._next_sweep, time.monotonic() + min(self.interval, 300))
+
+    def _in_context(self, func: Callable[[], Any]) -> Any:
+        if self.app is not None:
+            with self.app.app_context():
+                return func()
+        return func()
+
+    def refresh_pending(self) -> int:
+        """Revalida as normas enfileiradas; retorna quantas foram consultadas"""
+        with self._lock:
+            norms = list(self._pending.values())
+            self._pending.clear()
+        if not norms:
+            return 0
+        return self._refresh(norms)
+
+    def sweep(self) -> List[Norm]:
+        """Revalida as normas mais citadas cujo cache está ausente ou expira antes da próxima varredura"""
+        from domain.usecase.etp.verify_federal import norms_due_for_refresh
+
+        values = []
+        for source in self.sources:
+            try:
+                values.extend(source())
+            except Exception as e:
+                logger.warning(f"[LEXML] Fonte de citações indisponível na varredura: {e}")
+
+        most_cited = [norm for norm, _ in count_cited_norms(values).most_common(self.top_n)]
+        due = norms_due_for_refresh(most_cited, within_seconds=self.interval)
+        if due:
+            self._refresh(due)
+        self._stats['sweeps'] += 1
+        self._stats['last_sweep_at'] = datetime.utcnow().isoformat()
+        logger.info(f"[LEXML] Varredura: {len(most_cited)} normas mais citadas, {len(due)} revalidadas")
+        return due
+
+    def _refresh(self, norms: List[Norm]) -> int:
+        from domain.usecase.etp.verify_federal import resolve_lexml_batch
+
+        results = resolve_lexml_batch(norms, refresh=True)
+        failed = sum(1 for result in results if 'erro' in result.get('metadados', {}))
+        self._stats['refreshed'] += len(results) - failed
+        self._stats['failed'] += failed
+        return len(results)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return dict(self._stats, pending=pending, running=self._pid == os.getpid())
+
+
+_refresher: Optional[NormRefresher] = None
+_refresher_lock = threading.Lock()
+
+
+def init_norm_refresher(app) -> Optional[NormRefresher]:
+    """Cria e inicia o refresher do processo (desligado com LEXML_REFRESH_ENABLED=false)"""
+    global _refresher
+    with _refresher_lock:
+        if _refresher is not None:
+            _refresher.stop()
+            _refresher = None
+        if os.getenv('LEXML_REFRESH_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+            logger.info("[LEXML] Revalidação em segundo plano desativada")
+            return None
+        _refresher = NormRefresher(app=app)
+    _refresher.start()
+    return _refresher
+
+
+def get_norm_refresher() -> Optional[NormRefresher]:
+    """Refresher do processo; None se init_norm_refresher não foi chamado (revalidação síncrona)"""
+    return _refresher
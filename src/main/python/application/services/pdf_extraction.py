@@ -0,0 +1,310 @@
+"""
+PDF Extraction Service
+Extração de texto de PDFs em paralelo, compartilhada pela ingestão do RAG,
+pelo upload da base de conhecimento (/api/kb/upload) e por knowledge/parse_etps.py.
+
+As páginas de cada arquivo são divididas em faixas e distribuídas em um pool de
+processos. Cada arquivo tem um prazo (timeout) e cada worker um limite de memória;
+um PDF malformado que trava ou estoura a memória não bloqueia os demais. O texto
+das páginas é devolvido à medida que fica pronto (``iter_pages``/``iter_files``).
+
+O pool é criado na primeira extração e reaproveitado pelas seguintes no mesmo
+processo (um upload não paga a inicialização dos workers); é recriado após fork e
+descartado quando um arquivo expira, pois um worker pode ter ficado preso nele.
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+from dataclasses import dataclass, field
+from typing import List, Dict, Iterator, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ('pypdf2', 'pdfplumber')
+
+
+@dataclass
+class PageText:
+    """Texto de uma página (page_number começa em 1)"""
+    path: str
+    page_number: int
+    text: str
+
+
+@dataclass
+class ExtractionResult:
+    """Resultado da extração de um arquivo; ``pages`` em ordem, '' para páginas sem texto"""
+    path: str
+    pages: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    timed_out: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def text(self) -> str:
+        return "\n".join(page for page in self.pages if page)
+
+
+def _page_count(path: str, engine: str) -> int:
+    if engine == 'pdfplumber':
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            return len(pdf.pages)
+    from PyPDF2 import PdfReader
+    with open(path, 'rb') as f:
+        return len(PdfReader(f).pages)
+
+
+def _extract_range(path: str, engine: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Extrai as páginas [start, end) de um PDF; falhas de uma página resultam em texto vazio"""
+    results = []
+    if engine == 'pdfplumber':
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            for number in range(start, end):
+                try:
+                    results.append((number + 1, pdf.pages[number].extract_text() or ''))
+                except Exception as e:
+                    logger.warning(f"Erro extraindo texto da página {number + 1} de {path}: {e}")
+                    results.append((number + 1, ''))
+        return results
+
+    from PyPDF2 import PdfReader
+    with open(path, 'rb') as f:
+        reader = PdfReader(f)
+        for number in range(start, end):
+            try:
+                results.append((number + 1, reader.pages[number].extract_text() or ''))
+            except Exception as e:
+                logger.warning(f"Erro extraindo texto da página {number + 1} de {path}: {e}")
+                results.append((number + 1, ''))
+    return results
+
+
+def _limit_worker_memory(limit_mb: int) -> None:
+    """Inicializador dos workers: limita o espaço de endereçamento (apenas POSIX)"""
+    if not limit_mb:
+        return
+    try:
+        import resource
+        limit = limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        logger.warning(f"Não foi possível limitar a memória do worker de extração: {e}")
+
+
+# Tarefas por worker antes de ser substituído (limita o acúmulo de memória das bibliotecas de PDF)
+_TASKS_PER_WORKER = 200
+
+
+class _WorkerPool:
+    """Pool de processos compartilhado pelas extrações do processo, com contagem de usos"""
+
+    def __init__(self, key: Tuple[str, int, int]):
+        start_method, workers, memory_limit_mb = key
+        self.key = key
+        self.pid = os.getpid()
+        self.pool = multiprocessing.get_context(start_method).Pool(
+            workers, initializer=_limit_worker_memory, initargs=(memory_limit_mb,),
+            maxtasksperchild=_TASKS_PER_WORKER)
+        self.users = 0
+        self.retired = False
+
+
+_pools: Dict[Tuple[str, int, int], _WorkerPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _acquire_pool(key: Tuple[str, int, int]) -> _WorkerPool:
+    with _pools_lock:
+        shared = _pools.get(key)
+        if shared is None or shared.pid != os.getpid():
+            # Um pool herdado de outro processo (fork de workers web) não pode ser reaproveitado
+            shared = _pools[key] = _WorkerPool(key)
+        shared.users += 1
+        return shared
+
+
+def _release_pool(shared: _WorkerPool, broken: bool = False) -> None:
+    """Devolve o pool; um pool com worker possivelmente preso é retirado e encerrado após o último uso"""
+    with _pools_lock:
+        shared.users -= 1
+        if broken and not shared.retired:
+            shared.retired = True
+            if _pools.get(shared.key) is shared:
+                del _pools[shared.key]
+        terminate = shared.retired and shared.users == 0
+    if terminate:
+        shared.pool.terminate()
+        shared.pool.join()
+
+
+def close_worker_pools() -> None:
+    """Encerra os pools ociosos deste processo (os em uso são encerrados ao final da extração)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+        idle = []
+        for shared in pools:
+            shared.retired = True
+            if shared.users == 0 and shared.pid == os.getpid():
+                idle.append(shared)
+    for shared in idle:
+        shared.pool.terminate()
+        shared.pool.join()
+
+
+class PdfExtractor:
+    """
+    Extrator de texto de PDFs com pool de processos.
+
+    Configuração (argumentos ou variáveis de ambiente):
+        max_workers      PDF_EXTRACTION_WORKERS (padrão: nº de CPUs, até 4; 1 = sem pool)
+        file_timeout     PDF_EXTRACTION_TIMEOUT_SECONDS (padrão 120) - prazo por arquivo
+        memory_limit_mb  PDF_EXTRACTION_MEMORY_LIMIT_MB (padrão 1024, 0 = sem limite) - por worker
+        pages_per_task   PDF_EXTRACTION_PAGES_PER_TASK (padrão 8)
+    """
+
+    def __init__(self, engine: str = 'pypdf2', max_workers: Optional[int] = None,
+                 file_timeout: Optional[float] = None, memory_limit_mb: Optional[int] = None,
+                 pages_per_task: Optional[int] = None):
+        if engine not in ENGINES:
+            raise ValueError(f"engine deve ser um de {ENGINES}")
+        self.engine = engine
+        self.max_workers = max_workers or int(os.getenv('PDF_EXTRACTION_WORKERS', str(min(os.cpu_count() or 1, 4))))
+        self.file_timeout = file_timeout or float(os.getenv('PDF_EXTRACTION_TIMEOUT_SECONDS', '120'))
+        self.memory_limit_mb = (memory_limit_mb if memory_limit_mb is not None
+                                else int(os.getenv('PDF_EXTRACTION_MEMORY_LIMIT_MB', '1024')))
+        self.pages_per_task = max(1, pages_per_task or int(os.getenv('PDF_EXTRACTION_PAGES_PER_TASK', '8')))
+
+    def extract_text(self, path: str) -> ExtractionResult:
+        """Extrai um único arquivo"""
+        return self.extract_files([path])[str(path)]
+
+    def extract_files(self, paths: Iterable[str]) -> Dict[str, ExtractionResult]:
+        """Extrai vários arquivos em paralelo; o dicionário segue a ordem de ``paths``"""
+        paths = [str(p) for p in paths]
+        results = {result.path: result for result in self.iter_files(paths)}
+        return {path: results[path] for path in paths}
+
+    def iter_files(self, paths: Iterable[str]) -> Iterator[ExtractionResult]:
+        """Devolve cada arquivo assim que todas as suas páginas foram extraídas (ou falharam)"""
+        pending: Dict[str, Dict[int, str]] = {}
+        expected: Dict[str, int] = {}
+        for item in self._run(paths):
+            if isinstance(item, ExtractionResult):
+                pending.pop(item.path, None)
+                yield item
+                continue
+            if isinstance(item, tuple):  # ('count', path, total)
+                expected[item[1]] = item[2]
+                pending.setdefault(item[1], {})
+                if item[2] == 0:
+                    pending.pop(item[1])
+                    yield ExtractionResult(item[1])
+                continue
+            pages = pending.setdefault(item.path, {})
+            pages[item.page_number] = item.text
+            if len(pages) == expected.get(item.path):
+                pending.pop(item.path)
+                yield ExtractionResult(item.path, [pages[n] for n in range(1, len(pages) + 1)])
+
+    def iter_pages(self, paths: Iterable[str]) -> Iterator[PageText]:
+        """Devolve o texto das páginas à medida que fica pronto (em qualquer ordem); falhas são registradas no log"""
+        for item in self._run(paths):
+            if isinstance(item, PageText):
+                yield item
+            elif isinstance(item, ExtractionResult) and item.error:
+                logger.warning(f"Falha na extração de {item.path}: {item.error}")
+
+    def _run(self, paths: Iterable[str]):
+        """
+        Gera ('count', path, n) ao descobrir o número de páginas, PageText por página
+        e ExtractionResult apenas para arquivos que falharam ou expiraram.
+        """
+        paths = list(dict.fromkeys(str(p) for p in paths))
+        if not paths:
+            return
+        if self.max_workers <= 1:
+            yield from self._run_inline(paths)
+            return
+
+        events: "queue.Queue" = queue.Queue()
+        shared = _acquire_pool((os.getenv('PDF_EXTRACTION_START_METHOD', 'spawn'), self.max_workers,
+                                self.memory_limit_mb))
+        pool = shared.pool
+        stuck = False
+        deadlines: Dict[str, float] = {}
+        try:
+            deadlines = {path: time.monotonic() + self.file_timeout for path in paths}
+            remaining: Dict[str, int] = {}
+            for path in paths:
+                pool.apply_async(_page_count, (path, self.engine),
+                                 callback=lambda n, p=path: events.put(('count', p, n)),
+                                 error_callback=lambda e, p=path: events.put(('error', p, e)))
+
+            while deadlines:
+                timeout = max(0.0, min(deadlines.values()) - time.monotonic())
+                try:
+                    kind, path, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    now = time.monotonic()
+                    for path in [p for p, deadline in deadlines.items() if deadline <= now]:
+                        del deadlines[path]
+                        stuck = True
+                        logger.warning(f"Extração de {path} excedeu {self.file_timeout:.0f}s")
+                        yield ExtractionResult(path, error='timeout', timed_out=True)
+                    continue
+
+                if path not in deadlines:
+                    continue  # arquivo já expirado ou com erro
+                if kind == 'error':
+                    del deadlines[path]
+                    yield ExtractionResult(path, error=str(payload) or type(payload).__name__)
+                elif kind == 'count':
+                    yield ('count', path, payload)
+                    if payload == 0:
+                        del deadlines[path]
+                        continue
+                    ranges = [(start, min(start + self.pages_per_task, payload))
+                              for start in range(0, payload, self.pages_per_task)]
+                    remaining[path] = len(ranges)
+                    for start, end in ranges:
+                        pool.apply_async(_extract_range, (path, self.engine, start, end),
+                                         callback=lambda pages, p=path: events.put(('pages', p, pages)),
+                                         error_callback=lambda e, p=path: events.put(('error', p, e)))
+                else:
+                    for number, text in payload:
+                        yield PageText(path, number, text)
+                    remaining[path] -= 1
+                    if remaining[path] == 0:
+                        del deadlines[path]
+        finally:
+            # Workers podem estar presos em um PDF problemático: o pool é retirado e
+            # encerrado sem esperar quando a última extração que o usa terminar
+            _release_pool(shared, broken=stuck or bool(deadlines))
+
+    def _run_inline(self, paths: List[str]):
+        """Extração sequencial no próprio processo (max_workers=1), sem timeout nem limite de memória"""
+        for path in paths:
+            try:
+                total = _page_count(path, self.engine)
+                yield ('count', path, total)
+                for start in range(0, total, self.pages_per_task):
+                    for number, text in _extract_range(path, self.engine, start,
+                                                       min(start + self.pages_per_task, total)):
+                        yield PageText(path, number, text)
+            except Exception as e:
+                yield ExtractionResult(path, error=str(e) or type(e).__name__)
+
+
+def get_pdf_extractor(engine: str = 'pypdf2') -> PdfExtractor:
+    """Extrator configurado pelas variáveis de ambiente"""
+    return PdfExtractor(engine=engine)
@@ -1,35 +1,94 @@
 """
 Preview Builder Service
 Generates ETP previews with multipass generation (14-section structure).
-Uses 3-4 OpenAI calls to avoid token limits.
+Uses 5 concurrent OpenAI calls to avoid token limits. Each pass receives only the
+inputs its sections depend on (MULTIPASS_DEPENDENCIES), so passes whose inputs did
+not change are reused from the section cache (preview_cache).
 """
 import os
 import logging
-from typing import Dict, List, Any, Optional
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Callable, Iterator, Tuple
+
+from application.ai import llm_gateway
+from application.services.preview_cache import get_preview_cache, section_fingerprint
+from application.services.telemetry import traced
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 logger = logging.getLogger(__name__)
 
-def get_openai_client() -> Optional[OpenAI]:
-    """Get OpenAI client instance"""
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
+_SYSTEM_PROMPT = "Você é um especialista em elaboração de Estudos Técnicos Preliminares (ETP) para licitações públicas brasileiras."
+
+SECTION_ERROR_PLACEHOLDER = "[Erro ao gerar esta seção. Por favor, tente novamente.]"
+
+# Entradas do contexto da contratação, na ordem em que aparecem nos prompts: (chave, rótulo)
+_CONTEXT_FIELDS = (
+    ('necessity', 'Necessidade'),
+    ('strategies', 'Estratégia de contratação'),
+    ('pca', 'PCA'),
+    ('legal_norms', 'Normas'),
+    ('qty_value', 'Estimativa'),
+    ('installment', 'Parcelamento'),
+)
+
+# Entradas que o prompt de cada passagem recebe (mesma ordem de _multipass_prompts). A
+# justificativa do parcelamento (seção 8) tem passagem própria para que a decisão de
+# parcelamento só entre nas seções que a discutem (8 e o mapa de riscos/conclusão); o PCA
+# não entra no levantamento de mercado, valor, solução e parcelamento. O cache é chaveado
+# pelo prompt da passagem, então alterar uma entrada regenera só as passagens que a recebem.
+MULTIPASS_DEPENDENCIES: Tuple[Tuple[str, ...], ...] = (
+    # 1-4: introdução, objeto (inclui previsão no PCA), requisitos (inclui normativos), quantidades e valores
+    ('necessity', 'strategies', 'pca', 'legal_norms', 'qty_value', 'requirements'),
+    # 5-7: levantamento de mercado, estimativa do valor, solução como um todo
+    ('necessity', 'strategies', 'legal_norms', 'qty_value', 'requirements'),
+    # 8: justificativa do parcelamento
+    ('necessity', 'strategies', 'legal_norms', 'qty_value', 'installment', 'requirements'),
+    # 9-12: resultados, providências prévias, contratações correlatas, impactos ambientais
+    ('necessity', 'strategies', 'pca', 'legal_norms', 'qty_value', 'requirements'),
+    # 13-14: mapa de riscos e posicionamento conclusivo (todas as entradas)
+    ('necessity', 'strategies', 'pca', 'legal_norms', 'qty_value', 'installment', 'requirements'),
+)
+
+_section_sink: ContextVar[Optional[Callable[[int, str, str], None]]] = ContextVar('preview_section_sink', default=None)
+
+
+@contextmanager
+def section_stream(callback: Callable[[int, str, str], None]) -> Iterator[None]:
+    """Repassa ao callback cada passagem do multipass concluída neste contexto (usado pelos endpoints SSE)"""
+    token = _section_sink.set(callback)
+    try:
+        yield
+    finally:
+        _section_sink.reset(token)
+
+def get_openai_client() -> Optional['OpenAI']:
+    """Get OpenAI client instance (pool compartilhado do LLM gateway)"""
+    client = llm_gateway.get_openai_client()
+    if client is None:
         logger.error("[PREVIEW_BUILDER] OPENAI_API_KEY not found")
-        return None
-    return OpenAI(api_key=api_key)
+    return client
 
 def get_model_name() -> str:
     """Get model name from environment"""
     return os.getenv("OPENAI_MODEL", "gpt-4o")
 
 
-def generate_etp_multipass(context: dict) -> str:
+@traced('render.multipass')
+def generate_etp_multipass(context: dict,
+                           on_section: Optional[Callable[[int, str, str], None]] = None) -> str:
     """
-    Gera ETP completo usando multipass (3-4 chamadas) para evitar limite de tokens.
+    Gera ETP completo usando multipass (5 chamadas concorrentes) para evitar limite de tokens.
     Estrutura obrigatória de 14 seções, conteúdo rico e variável.
     
     Args:
         context: Dict com necessity, requirements, answers
+        on_section: Chamado como (índice, rótulo, conteúdo) a cada passagem concluída - primeiro
+            as reaproveitadas do cache, depois as geradas, na ordem de conclusão (padrão: o
+            callback de section_stream ativo, se houver)
         
     Returns:
         str: Documento ETP completo em markdown
@@ -66,25 +125,89 @@ def generate_etp_multipass(context: dict) -> str:
     else:
         strategy_text = "Estratégia não definida"
     
-    # Base context for all passes
-    base_context = f"""
-Contexto da contratação:
-- Necessidade: {necessity}
-- Estratégia de contratação: {strategy_text}
-- PCA: {pca}
-- Normas: {legal_norms}
-- Estimativa: {qty_value}
-- Parcelamento: {installment}
-
-Requisitos técnicos:
-{req_text}
+    inputs = {
+        'necessity': necessity,
+        'strategies': strategy_text,
+        'pca': pca,
+        'legal_norms': legal_norms,
+        'qty_value': qty_value,
+        'installment': installment,
+        'requirements': req_text,
+    }
+    
+    # Cada passagem recebe as entradas de MULTIPASS_DEPENDENCIES; a impressão digital do seu
+    # prompt identifica a passagem no cache, então alterar uma resposta regenera apenas as
+    # passagens que a recebem. As passagens restantes são geradas em paralelo e montadas na
+    # ordem das seções; cada passagem tem suas próprias tentativas
+    passes = _multipass_prompts(inputs)
+    on_section = on_section or _section_sink.get()
+    contents: List[Optional[str]] = [None] * len(passes)
+    cache = get_preview_cache()
+    fingerprints = [section_fingerprint(model, _SYSTEM_PROMPT, prompt) for _, prompt in passes]
+    
+    pending = []
+    for index, (label, _) in enumerate(passes):
+        contents[index] = cache.get(fingerprints[index]) if cache else None
+        if contents[index] is None:
+            pending.append(index)
+        elif on_section:
+            on_section(index, label, contents[index])
+    
+    workers = max(1, min(int(os.getenv('PREVIEW_MULTIPASS_WORKERS', '5')), len(passes)))
+    logger.info(f"[PREVIEW_BUILDER] Multipass - {len(passes)} passes, "
+                f"{len(passes) - len(pending)} from cache, {workers} concurrent")
+    
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(workers, len(pending)), thread_name_prefix="etp-multipass") as pool:
+            # Cada passagem roda numa cópia do contexto: as chamadas ao LLM entram na árvore de spans da requisição
+            futures = {
+                pool.submit(copy_context().run, _call_openai_with_retry, client, model,
+                            passes[index][1]): index
+                for index in pending
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                contents[index] = future.result()
+                logger.info(f"[PREVIEW_BUILDER] Multipass - Pass {index + 1}/{len(passes)} done ({passes[index][0]})")
+                # Placeholders de erro não são memorizados: a próxima prévia tenta de novo
+                if cache and contents[index] != SECTION_ERROR_PLACEHOLDER:
+                    cache.put(fingerprints[index], passes[index][0], contents[index])
+                if on_section:
+                    on_section(index, passes[index][0], contents[index])
+    
+    # Consolidate all passes
+    header = f"""# ESTUDO TÉCNICO PRELIMINAR (ETP)
+
+**Data:** {_get_current_date()}  
+**Órgão:** [Nome do Órgão]  
+**Setor Demandante:** [Setor]
+
+---
+
 """
     
-    # PASS 1: Sections 1-4
-    logger.info("[PREVIEW_BUILDER] Multipass - Pass 1/4 (Sections 1-4)")
-    pass1_prompt = f"""Você é um especialista em elaboração de ETPs (Estudos Técnicos Preliminares) conforme Lei 14.133/2021.
+    full_document = header + "\n\n".join(contents)
+    
+    logger.info(f"[PREVIEW_BUILDER] Multipass complete - Generated {len(full_document)} characters")
+    return full_document
+
+
+def _pass_context(inputs: Dict[str, str], dependencies: Tuple[str, ...]) -> str:
+    """Bloco de contexto de uma passagem, com as entradas de que ela depende"""
+    lines = [f"- {label}: {inputs[key]}" for key, label in _CONTEXT_FIELDS if key in dependencies]
+    context = "\nContexto da contratação:\n" + "\n".join(lines) + "\n"
+    if 'requirements' in dependencies:
+        context += f"\nRequisitos técnicos:\n{inputs['requirements']}\n"
+    return context
 
-{base_context}
+
+def _multipass_prompts(inputs: Dict[str, str]) -> List[Tuple[str, str]]:
+    """Prompts das passagens do multipass, em ordem de seção: [(rótulo, prompt), ...]"""
+    contexts = [_pass_context(inputs, dependencies) for dependencies in MULTIPASS_DEPENDENCIES]
+    return [
+        ("Sections 1-4", f"""Você é um especialista em elaboração de ETPs (Estudos Técnicos Preliminares) conforme Lei 14.133/2021.
+
+{contexts[0]}
 
 Gere APENAS as seções 1 a 4 do ETP com conteúdo substancial e técnico (NÃO replique falas do usuário):
 
@@ -111,15 +234,10 @@ Gere APENAS as seções 1 a 4 do ETP com conteúdo substancial e técnico (NÃO
    |------|-----------|------------|---------|------------------|------------------|
    | 1    | [Item]    | [Qtd]      | [Un]    | [Valor]          | [Total]          |
 
-Use o contexto fornecido mas redija de forma técnica, coesa e profissional. Cada seção deve ter NO MÍNIMO 2-3 parágrafos substanciais."""
-    
-    pass1_content = _call_openai_with_retry(client, model, pass1_prompt)
-    
-    # PASS 2: Sections 5-8
-    logger.info("[PREVIEW_BUILDER] Multipass - Pass 2/4 (Sections 5-8)")
-    pass2_prompt = f"""Continue o ETP. Você já gerou as seções 1-4. Agora gere as seções 5 a 8:
+Use o contexto fornecido mas redija de forma técnica, coesa e profissional. Cada seção deve ter NO MÍNIMO 2-3 parágrafos substanciais."""),
+        ("Sections 5-7", f"""Continue o ETP. Você já gerou as seções 1-4. Agora gere as seções 5 a 7:
 
-{base_context}
+{contexts[1]}
 
 5. LEVANTAMENTO DE MERCADO
    - Pesquisa de preços no PNCP
@@ -137,19 +255,19 @@ Use o contexto fornecido mas redija de forma técnica, coesa e profissional. Cad
    - Integração dos componentes
    - Cronograma estimado
 
+Mantenha coerência com as seções anteriores. Mínimo 2-3 parágrafos por seção."""),
+        ("Section 8", f"""Continue o ETP. Você já gerou as seções 1-7. Agora gere a seção 8:
+
+{contexts[2]}
+
 8. JUSTIFICATIVA DO PARCELAMENTO
    - Análise de parcelamento vs. lote único
    - Fundamentação da decisão
 
-Mantenha coerência com as seções anteriores. Mínimo 2-3 parágrafos por seção."""
-    
-    pass2_content = _call_openai_with_retry(client, model, pass2_prompt)
-    
-    # PASS 3: Sections 9-12
-    logger.info("[PREVIEW_BUILDER] Multipass - Pass 3/4 (Sections 9-12)")
-    pass3_prompt = f"""Continue o ETP. Você já gerou as seções 1-8. Agora gere as seções 9 a 12:
+Mantenha coerência com as seções anteriores. Mínimo 2-3 parágrafos."""),
+        ("Sections 9-12", f"""Continue o ETP. Você já gerou as seções 1-8. Agora gere as seções 9 a 12:
 
-{base_context}
+{contexts[3]}
 
 9. RESULTADOS PRETENDIDOS
    - Objetivos mensuráveis
@@ -171,15 +289,10 @@ Mantenha coerência com as seções anteriores. Mínimo 2-3 parágrafos por seç
     - Medidas de mitigação
     - Sustentabilidade
 
-Mínimo 2-3 parágrafos por seção. Seja específico e técnico."""
-    
-    pass3_content = _call_openai_with_retry(client, model, pass3_prompt)
-    
-    # PASS 4: Sections 13-14 + Header
-    logger.info("[PREVIEW_BUILDER] Multipass - Pass 4/4 (Sections 13-14 + Mapa de Riscos)")
-    pass4_prompt = f"""Finalize o ETP. Você já gerou as seções 1-12. Agora gere as seções finais 13-14:
+Mínimo 2-3 parágrafos por seção. Seja específico e técnico."""),
+        ("Sections 13-14 + Mapa de Riscos", f"""Finalize o ETP. Você já gerou as seções 1-12. Agora gere as seções finais 13-14:
 
-{base_context}
+{contexts[4]}
 
 13. MAPA DE RISCOS
     Incluir tabela:
@@ -197,28 +310,11 @@ Mínimo 2-3 parágrafos por seção. Seja específico e técnico."""
     - Próximos passos
     - Assinatura da equipe técnica
 
-Seja técnico e conclusivo. Cada seção com NO MÍNIMO 2-3 parágrafos."""
-    
-    pass4_content = _call_openai_with_retry(client, model, pass4_prompt)
-    
-    # Consolidate all passes
-    header = f"""# ESTUDO TÉCNICO PRELIMINAR (ETP)
-
-**Data:** {_get_current_date()}  
-**Órgão:** [Nome do Órgão]  
-**Setor Demandante:** [Setor]
+Seja técnico e conclusivo. Cada seção com NO MÍNIMO 2-3 parágrafos."""),
+    ]
 
----
 
-"""
-    
-    full_document = header + pass1_content + "\n\n" + pass2_content + "\n\n" + pass3_content + "\n\n" + pass4_content
-    
-    logger.info(f"[PREVIEW_BUILDER] Multipass complete - Generated {len(full_document)} characters")
-    return full_document
-
-
-def _call_openai_with_retry(client: OpenAI, model: str, prompt: str, max_retries: int = 2) -> str:
+def _call_openai_with_retry(client: 'OpenAI', model: str, prompt: str, max_retries: int = 2) -> str:
     """
     Chama OpenAI com retry se retornar vazio.
     
@@ -236,7 +332,7 @@ def _call_openai_with_retry(client: OpenAI, model: str, prompt: str, max_retries
             response = client.chat.completions.create(
                 model=model,
                 messages=[
-                    {"role": "system", "content": "Você é um especialista em elaboração de Estudos Técnicos Preliminares (ETP) para licitações públicas brasileiras."},
+                    {"role": "system", "content": _SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.7,
@@ -259,7 +355,16 @@ def _call_openai_with_retry(client: OpenAI, model: str, prompt: str, max_retries
                 continue
     
     # If all retries failed
-    return "[Erro ao gerar esta seção. Por favor, tente novamente.]"
+    return SECTION_ERROR_PLACEHOLDER
+
+
+def _read_text(path: str) -> Optional[str]:
+    """Conteúdo atual do arquivo, ou None se não existir"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
 
 
 def _get_current_date() -> str:
@@ -268,6 +373,7 @@ def _get_current_date() -> str:
     return datetime.now().strftime("%d/%m/%Y")
 
 
+@traced('render.preview')
 def build_preview(conversation_id: str, summary: dict) -> dict:
     """
     Gera HTML e PDF a partir do resumo/estado da conversa.
@@ -309,11 +415,13 @@ def build_preview(conversation_id: str, summary: dict) -> dict:
         # Generate HTML content
         html_content = _generate_html(necessity, requirements, answers)
         
-        # Save HTML file
-        with open(html_filepath, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        logger.info(f"[PREVIEW_BUILDER] HTML saved: {html_filepath}")
+        # Save HTML file (sem reescrever quando a prévia não mudou)
+        if _read_text(html_filepath) == html_content:
+            logger.info(f"[PREVIEW_BUILDER] HTML unchanged: {html_filepath}")
+        else:
+            with open(html_filepath, 'w', encoding='utf-8') as f:
+                f.write(html_content)
+            logger.info(f"[PREVIEW_BUILDER] HTML saved: {html_filepath}")
         
         # Generate response paths (relative URLs for frontend)
         html_path = f"/static/previews/{html_filename}"
@@ -0,0 +1,161 @@
+"""
+Cache persistente das seções geradas da prévia do ETP.
+
+Cada passagem do multipass é armazenada com uma impressão digital (sha256) do
+modelo e dos prompts da passagem, ou seja, de tudo o que é enviado ao LLM. Como o
+prompt de cada passagem contém apenas as entradas de que ela depende (ver
+``preview_builder.MULTIPASS_DEPENDENCIES``), a alteração de uma resposta (ex.: só
+``installment``) invalida apenas as passagens que a recebem; as demais são
+reaproveitadas sem nova chamada ao LLM.
+
+As entradas ficam em um arquivo SQLite (modo WAL) compartilhado entre processos,
+como o cache de embeddings.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS preview_section_cache (
+    fingerprint TEXT PRIMARY KEY,
+    label TEXT NOT NULL,
+    content TEXT NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_preview_section_cache_last_access ON preview_section_cache(last_access);
+"""
+
+
+def section_fingerprint(*parts: str) -> str:
+    """Impressão digital estável de uma passagem (ex.: modelo, prompt de sistema e prompt da passagem)."""
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+def default_cache_path() -> Path:
+    project_root = Path(__file__).parent.parent.parent.parent.parent.parent
+    return Path(os.getenv('PREVIEW_CACHE_PATH', project_root / "data" / "cache" / "preview_sections.sqlite3"))
+
+
+class PreviewSectionCache:
+    """
+    Cache LRU das seções geradas, endereçado por impressão digital.
+
+    - ``max_entries`` limita o tamanho; ao exceder, as entradas menos acessadas são removidas
+    - Falhas de SQLite nunca propagam: o cache se comporta como vazio
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_entries: Optional[int] = None):
+        self.path = Path(path) if path else default_cache_path()
+        self.max_entries = max_entries or int(os.getenv('PREVIEW_CACHE_MAX_ENTRIES', '5000'))
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, fingerprint: str) -> Optional[str]:
+        """Retorna o conteúdo da seção em cache ou None."""
+        content = None
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT content FROM preview_section_cache WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+            if row:
+                content = row[0]
+                conn.execute("UPDATE preview_section_cache SET last_access = ? WHERE fingerprint = ?",
+                             (time.time(), fingerprint))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"[PREVIEW-CACHE] Falha na leitura do cache: {e}")
+        with self._lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return content
+
+    def put(self, fingerprint: str, label: str, content: str) -> None:
+        """Armazena o conteúdo gerado de uma seção."""
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO preview_section_cache (fingerprint, label, content, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (fingerprint, label, content, time.time())
+            )
+            conn.commit()
+            self._evict(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"[PREVIEW-CACHE] Falha na escrita do cache: {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Remove as entradas menos usadas recentemente quando o limite é excedido."""
+        count = conn.execute("SELECT COUNT(*) FROM preview_section_cache").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - self.max_entries + max(1, self.max_entries // 20)
+        conn.execute(
+            "DELETE FROM preview_section_cache WHERE fingerprint IN "
+            "(SELECT fingerprint FROM preview_section_cache ORDER BY last_access ASC LIMIT ?)",
+            (excess,)
+        )
+        conn.commit()
+        logger.info(f"[PREVIEW-CACHE] {excess} entradas removidas (LRU)")
+
+    def stats(self) -> Dict:
+        """Contadores de uso desta instância."""
+        total = self.hits + self.misses
+        return {
+            'path': str(self.path),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# Instância compartilhada por processo
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_preview_cache() -> Optional[PreviewSectionCache]:
+    """
+    Retorna o cache de seções do processo, ou None se desabilitado
+    (PREVIEW_CACHE_ENABLED=false) ou indisponível.
+    """
+    global _cache_instance
+
+    if os.getenv('PREVIEW_CACHE_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+        return None
+
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                try:
+                    _cache_instance = PreviewSectionCache()
+                except (sqlite3.Error, OSError) as e:
+                    logger.warning(f"[PREVIEW-CACHE] Cache de seções indisponível: {e}")
+                    return None
+    return _cache_instance
@@ -0,0 +1,428 @@
+"""
+Telemetry
+Instrumentação leve das requisições: spans aninhados por requisição, métricas
+agregadas no processo e exposição no formato texto do Prometheus (/metrics).
+
+Cada requisição HTTP abre um span raiz; dentro dela, ``span(nome)`` (ou o
+decorador ``traced``) mede trechos como recuperação, chamadas ao LLM, consultas
+ao LexML e renderização de documentos. As consultas SQL não viram spans próprios:
+são somadas no span corrente (``db_queries``/``db_ms``) e num histograma.
+
+Requisições acima de SLOW_REQUEST_MS geram um log ``[SLOW_REQUEST]`` com a árvore
+de spans em JSON.
+
+Métricas expostas:
+    etp_requests_total, etp_request_duration_seconds   por endpoint, método, status e estágio
+    etp_span_duration_seconds                          por span, endpoint e estágio
+    etp_llm_requests_total, etp_llm_tokens_total       por operação, modelo e status / tipo de token
+    etp_db_query_duration_seconds                      por endpoint
+    etp_slow_requests_total                            por endpoint
+    etp_intent_resolutions_total                       por ponto de decisão e resultado (local/llm)
+    etp_answer_cache_requests_total                    por estágio e resultado (hit/miss)
+    etp_answer_cache_entries, etp_answer_cache_evictions_total   tamanho e remoções (lru/ttl)
+
+As métricas são por processo (cada worker do servidor expõe as suas).
+
+Configurações (variáveis de ambiente):
+    METRICS_ENABLED   liga a instrumentação e o endpoint /metrics (true)
+    SLOW_REQUEST_MS   limite para o log de requisição lenta (2000)
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class Counter:
+    """Contador monotônico com rótulos"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(name, '')) for name in self.labelnames), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value:g}" for key, value in items]
+
+
+class Gauge:
+    """Valor instantâneo com rótulos (ex.: tamanho de um cache)"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(name, '')) for name in self.labelnames), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value:g}" for key, value in items]
+
+
+class Histogram:
+    """Histograma cumulativo (buckets fixos, soma e contagem) com rótulos"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # contagens por bucket + [+Inf, soma]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(str(labels.get(name, '')) for name in self.labelnames))
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas do processo, renderizado no formato texto do Prometheus"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, tuple(labelnames), **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.counter('etp_requests_total', 'Requisições HTTP atendidas',
+                            ('endpoint', 'method', 'status', 'stage'))
+REQUEST_DURATION = registry.histogram('etp_request_duration_seconds', 'Duração das requisições HTTP',
+                                      ('endpoint', 'method', 'status', 'stage'))
+SPAN_DURATION = registry.histogram('etp_span_duration_seconds', 'Duração dos spans instrumentados',
+                                   ('span', 'endpoint', 'stage'))
+LLM_REQUESTS = registry.counter('etp_llm_requests_total', 'Chamadas ao provedor de LLM',
+                                ('operation', 'model', 'status'))
+LLM_TOKENS = registry.counter('etp_llm_tokens_total', 'Tokens informados pelo provedor de LLM',
+                              ('operation', 'model', 'type'))
+DB_QUERY_DURATION = registry.histogram('etp_db_query_duration_seconds', 'Duração das consultas SQL',
+                                       ('endpoint',))
+SLOW_REQUESTS = registry.counter('etp_slow_requests_total', 'Requisições acima de SLOW_REQUEST_MS',
+                                 ('endpoint',))
+
+
+class Span:
+    """Trecho medido de uma requisição; ``attrs`` aceita informações extras (tokens, contagens)"""
+
+    __slots__ = ('name', 'attrs', 'start', 'end', 'children', 'parent', 'trace')
+
+    def __init__(self, name: str, parent: Optional['Span'] = None, trace: Optional['Trace'] = None, **attrs):
+        self.name = name
+        self.attrs: Dict[str, Any] = dict(attrs)
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List['Span'] = []
+        self.parent = parent
+        self.trace = trace
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def add(self, key: str, amount: float) -> None:
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        node: Dict[str, Any] = {'name': self.name, 'ms': round(self.duration * 1000, 1)}
+        if self.attrs:
+            node['attrs'] = {key: round(value, 1) if isinstance(value, float) else value
+                             for key, value in self.attrs.items()}
+        if self.children:
+            node['children'] = [child.to_dict() for child in self.children]
+        return node
+
+
+class Trace:
+    """Árvore de spans de uma requisição e seus rótulos (endpoint, estágio)"""
+
+    # Limite de spans por requisição (laços longos não devem crescer a árvore indefinidamente)
+    MAX_SPANS = 500
+
+    def __init__(self, endpoint: str, method: str):
+        self.labels = {'endpoint': endpoint, 'method': method, 'stage': ''}
+        self.root = Span('request', trace=self, endpoint=endpoint, method=method)
+        self.span_count = 1
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('telemetry_span', default=None)
+
+
+def enabled() -> bool:
+    return os.getenv('METRICS_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def set_stage(stage: Optional[str]) -> None:
+    """Rotula a requisição corrente com o estágio da conversa (usado nas métricas por estágio)"""
+    active = _current_span.get()
+    if active is not None and active.trace is not None and stage:
+        active.trace.labels['stage'] = stage
+
+
+def open_span(name: str, **attrs) -> Span:
+    """
+    Abre um span filho do corrente sem torná-lo corrente (trechos que terminam em
+    outro ponto, como respostas em streaming); feche com ``close_span``.
+    """
+    parent = _current_span.get()
+    trace = parent.trace if parent is not None else None
+    opened = Span(name, parent=parent, trace=trace, **attrs)
+    if trace is not None and trace.span_count < Trace.MAX_SPANS:
+        parent.children.append(opened)
+        trace.span_count += 1
+    return opened
+
+
+def close_span(opened: Span) -> None:
+    """Fecha o span e registra a duração no histograma (idempotente)"""
+    if opened.end is not None:
+        return
+    opened.end = time.perf_counter()
+    labels = opened.trace.labels if opened.trace is not None else {}
+    SPAN_DURATION.observe(opened.duration, span=opened.name, endpoint=labels.get('endpoint', ''),
+                          stage=labels.get('stage', ''))
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Span]:
+    """
+    Mede um trecho. Dentro de uma requisição vira filho do span corrente; fora dela
+    (threads de fundo, scripts) só alimenta o histograma.
+    """
+    current = open_span(name, **attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.attrs['error'] = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        close_span(current)
+
+
+def traced(name: str, **attrs) -> Callable:
+    """Decorador: executa a função dentro de ``span(name)``"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **attrs):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_llm_call(operation: str, model: str, status: str, usage: Optional[Dict[str, Any]] = None,
+                    target: Optional[Span] = None) -> None:
+    """Contabiliza uma chamada ao LLM (e os tokens, se o provedor informou ``usage``)"""
+    LLM_REQUESTS.inc(operation=operation, model=model, status=status)
+    usage = usage or {}
+    prompt_tokens = usage.get('prompt_tokens') or 0
+    completion_tokens = usage.get('completion_tokens') or 0
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, operation=operation, model=model, type='prompt')
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, operation=operation, model=model, type='completion')
+    target = target or _current_span.get()
+    if target is not None:
+        target.attrs['model'] = model
+        target.attrs['status'] = status
+        if prompt_tokens:
+            target.add('prompt_tokens', prompt_tokens)
+        if completion_tokens:
+            target.add('completion_tokens', completion_tokens)
+
+
+def record_db_query(duration: float) -> None:
+    """Soma uma consulta SQL no span corrente e no histograma do endpoint"""
+    active = _current_span.get()
+    endpoint = ''
+    if active is not None:
+        active.add('db_queries', 1)
+        active.add('db_ms', duration * 1000)
+        if active.trace is not None:
+            endpoint = active.trace.labels['endpoint']
+    DB_QUERY_DURATION.observe(duration, endpoint=endpoint)
+
+
+def start_request(endpoint: str, method: str) -> Tuple[Trace, Any]:
+    trace = Trace(endpoint, method)
+    return trace, _current_span.set(trace.root)
+
+
+def detach_request(token: Any) -> None:
+    """Desfaz o span raiz como span corrente do contexto da requisição"""
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        # Token criado em outro contexto
+        _current_span.set(None)
+
+
+def finish_request(trace: Trace, status: int) -> float:
+    """Fecha o span raiz, registra as métricas da requisição e o log de requisição lenta"""
+    root = trace.root
+    root.end = time.perf_counter()
+    labels = dict(trace.labels, status=str(status))
+    REQUESTS.inc(**labels)
+    REQUEST_DURATION.observe(root.duration, **labels)
+
+    threshold_ms = float(os.getenv('SLOW_REQUEST_MS', '2000'))
+    if root.duration * 1000 >= threshold_ms:
+        SLOW_REQUESTS.inc(endpoint=labels['endpoint'])
+        root.attrs.update(status=status, stage=labels['stage'])
+        logger.warning(f"[SLOW_REQUEST] {labels['method']} {labels['endpoint']} "
+                       f"{root.duration * 1000:.0f}ms {json.dumps(root.to_dict(), ensure_ascii=False)}")
+    return root.duration
+
+
+def _install_db_listeners() -> None:
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if getattr(_install_db_listeners, 'installed', False):
+        return
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('telemetry_start', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('telemetry_start')
+        if starts:
+            record_db_query(time.perf_counter() - starts.pop())
+
+    _install_db_listeners.installed = True
+
+
+def init_telemetry(app) -> None:
+    """Instrumenta as requisições do app e as consultas SQL (desligado com METRICS_ENABLED=false)"""
+    if not enabled():
+        logger.info("[TELEMETRY] Instrumentação desativada")
+        return
+
+    from flask import g, request
+
+    _install_db_listeners()
+
+    @app.before_request
+    def _telemetry_start():
+        g._telemetry = start_request(request.endpoint or request.path, request.method)
+
+    @app.after_request
+    def _telemetry_finish(response):
+        started = g.pop('_telemetry', None)
+        if started is not None:
+            trace, token = started
+            detach_request(token)
+            if response.is_streamed:
+                # SSE: a requisição só termina quando o corpo acaba de ser transmitido
+                response.call_on_close(lambda: finish_request(trace, response.status_code))
+            else:
+                finish_request(trace, response.status_code)
+        return response
@@ -41,41 +41,8 @@ if __name__ == "__main__":
     # Criar aplicação Flask
     app = create_api()
     
-    # Inicializar sistema RAG
-    with app.app_context():
-        try:
-            from pathlib import Path
-            import openai
-            from rag.retrieval import get_retrieval_instance
-            
-            # Verificar se existem índices FAISS
-            index_dir = Path("src/main/python/rag/index/faiss")
-            
-            if index_dir.exists() and (index_dir / "etp_index.faiss").exists():
-                print("🔍 Carregando índices RAG...")
-                
-                # Configurar cliente OpenAI se disponível
-                openai_client = None
-                try:
-                    openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-                except Exception as e:
-                    print(f"⚠️  Aviso: Não foi possível configurar cliente OpenAI: {e}")
-                
-                # Inicializar sistema de retrieval
-                retrieval = get_retrieval_instance(openai_client=openai_client)
-                
-                if retrieval.build_indices():
-                    print("✅ Sistema RAG inicializado com sucesso!")
-                else:
-                    print("⚠️  Aviso: Falha ao carregar índices RAG")
-            else:
-                print("📋 Índices RAG não encontrados.")
-                print("   Para criar os índices, execute:")
-                print("   python -m rag.ingest_etps --rebuild")
-                
-        except Exception as e:
-            print(f"⚠️  Aviso: Erro ao inicializar sistema RAG: {e}")
-            print("   A aplicação continuará funcionando sem o sistema RAG.")
+    # Base de conhecimento e índices RAG são carregados por create_api (KB_BOOTSTRAP_MODE;
+    # em background, /api/ready informa quando terminaram)
 
     # Executar servidor Flask nativo (Docker)
     app.run(
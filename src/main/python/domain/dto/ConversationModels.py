@@ -8,6 +8,10 @@ class Conversation(db.Model):
     """SQLAlchemy ORM model for etp_conversations table."""
     
     __tablename__ = "etp_conversations"
+    __table_args__ = (
+        # Listagem da barra lateral: conversas do usuário por updated_at (paginação keyset)
+        db.Index("idx_etp_conversations_user_updated", "user_id", "updated_at", "id"),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(64), nullable=False, index=True)
@@ -37,6 +41,10 @@ class Message(db.Model):
     """SQLAlchemy ORM model for etp_messages table."""
     
     __tablename__ = "etp_messages"
+    __table_args__ = (
+        # Histórico e última mensagem de cada conversa sem ordenação adicional
+        db.Index("idx_etp_messages_conversation_created", "conversation_id", "created_at"),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     conversation_id = db.Column(
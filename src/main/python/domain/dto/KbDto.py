@@ -13,6 +13,7 @@ class KbDocument(db.Model):
     filename = db.Column(db.String(255), nullable=False)
     etp_id = db.Column(db.Integer, db.ForeignKey('etp_sessions.id'), nullable=True)
     objective_slug = db.Column(db.String(100), nullable=False, index=True)
+    content_hash = db.Column(db.String(64), nullable=True)  # sha256 da fonte (ingestão incremental)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relacionamentos
@@ -44,6 +45,7 @@ class KbChunk(db.Model):
     objective_slug = db.Column(db.String(100), nullable=False, index=True)
     citations_json = db.Column(db.Text, nullable=True)  # JSON string para citações
     embedding = Column(JSONB, nullable=True)
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # sha256(section_type + texto)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def __repr__(self):
@@ -97,6 +99,7 @@ class LegalNormCache(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     norm_urn = db.Column(db.String(500), nullable=False, unique=True, index=True)
+    norm_key = db.Column(db.String(120), nullable=True, unique=True)  # tipo:numero:ano normalizado
     norm_label = db.Column(db.String(1000), nullable=False)
     sphere = db.Column(db.String(50), nullable=False, index=True)  # federal, estadual, municipal
     status = db.Column(db.String(50), nullable=False, index=True)  # active, revoked, modified
@@ -125,6 +128,7 @@ class LegalNormCache(db.Model):
             'id': self.id,
             'norm_urn': self.norm_urn,
             'norm_label': self.norm_label,
+            'norm_key': self.norm_key,
             'sphere': self.sphere,
             'status': self.status,
             'source_data': self.get_source_data(),
@@ -4,8 +4,14 @@ from flask_sqlalchemy import SQLAlchemy
 # Instância global do SQLAlchemy
 db = SQLAlchemy()
 
-def init_database(app, basedir):
-    """Inicializa e configura o banco de dados"""
+def init_database(app, basedir, create_schema=None):
+    """
+    Inicializa e configura o banco de dados.
+
+    Com ``create_schema`` (padrão: DB_INIT_ON_STARTUP, true) também cria as tabelas,
+    índices e usuários demo; com DB_INIT_ON_STARTUP=false esse trabalho fica para
+    ``python scripts/init_db.py``, executado uma vez antes de subir os workers.
+    """
     
     # Configurar database usando DATABASE_URL
     database_url = os.getenv('DATABASE_URL')
@@ -43,16 +49,39 @@ def init_database(app, basedir):
     # Importar modelos de conversação para chat persistente
     from domain.dto.ConversationModels import Conversation, Message
 
-    with app.app_context():
-        print("🔧 Criando tabelas usando SQLAlchemy...")
-        db.create_all()
-        print("✅ Tabelas criadas com sucesso!")
-        seed_demo_users()
+    if create_schema is None:
+        create_schema = os.getenv('DB_INIT_ON_STARTUP', 'true').lower() not in ('0', 'false', 'no')
+    if create_schema:
+        with app.app_context():
+            init_schema()
+    else:
+        print("ℹ️  Criação de tabelas no startup desativada (DB_INIT_ON_STARTUP=false)")
 
     print(f"✅ Banco de dados configurado com sucesso!")
 
     return db
 
+def init_schema():
+    """Cria as tabelas e índices que faltam e os usuários demo (idempotente; requer app context)"""
+    from domain.dto.ConversationModels import Conversation, Message
+
+    print("🔧 Criando tabelas usando SQLAlchemy...")
+    db.create_all()
+    create_missing_indexes((Conversation.__table__, Message.__table__))
+    print("✅ Tabelas criadas com sucesso!")
+    seed_demo_users()
+
+def create_missing_indexes(tables):
+    """
+    Cria os índices declarados nos modelos que ainda não existem.
+    
+    db.create_all() não altera tabelas existentes, então índices adicionados
+    depois da criação da tabela precisam ser criados explicitamente.
+    """
+    for table in tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
 def seed_demo_users():
     """Popula o banco com os usuários demo pré-definidos"""
     from domain.dto.UserDto import User
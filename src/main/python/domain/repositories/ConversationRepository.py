@@ -1,6 +1,7 @@
 """Repositories for Conversation and Message CRUD operations."""
-from typing import List, Optional
-from sqlalchemy import desc
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import desc, func, select, true, tuple_
 from domain.dto.ConversationModels import Conversation, Message
 from domain.interfaces.dataprovider.DatabaseConfig import db
 
@@ -42,6 +43,41 @@ class ConversationRepo:
             .all()
         )
 
+    @staticmethod
+    def list_with_last_message(
+        user_id: str,
+        limit: int = 100,
+        before: Optional[Tuple[datetime, str]] = None,
+        preview_chars: int = 120
+    ) -> List[Tuple[Conversation, Optional[str]]]:
+        """
+        List conversations for a user with the start of their last message, in a single query.
+
+        Ordered by (updated_at, id) DESC. ``before`` is the keyset cursor: the (updated_at, id)
+        of the last conversation of the previous page. The last message comes from a LATERAL
+        subquery served by the (conversation_id, created_at) index and is cut at
+        ``preview_chars + 1`` characters, so callers can tell whether it was truncated.
+        """
+        last_message = (
+            select(func.substr(Message.content, 1, preview_chars + 1).label("content"))
+            .where(Message.conversation_id == Conversation.id)
+            .order_by(desc(Message.created_at))
+            .limit(1)
+            .lateral("last_message")
+        )
+        query = (
+            db.session.query(Conversation, last_message.c.content)
+            .outerjoin(last_message, true())
+            .filter(Conversation.user_id == user_id)
+        )
+        if before:
+            query = query.filter(tuple_(Conversation.updated_at, Conversation.id) < tuple_(*before))
+        return (
+            query.order_by(desc(Conversation.updated_at), desc(Conversation.id))
+            .limit(limit)
+            .all()
+        )
+
     @staticmethod
     def delete(conversation_id: str) -> bool:
         """Delete a conversation."""
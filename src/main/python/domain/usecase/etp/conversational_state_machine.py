@@ -109,79 +109,63 @@ def parse_user_intent(user_message: str, current_state: str, session_data: Dict[
     }
 
 
+# Padrões compilados uma única vez (alternação única por verificação)
+_GENERIC_CONFIRMATION_RE = re.compile('|'.join([
+    r'\bok\b',
+    r'\bpode seguir\b',
+    r'\bseguir\b',
+    r'\bsegue\b',
+    r'\bprosseguir\b',
+    r'\bmanter\b',
+    r'\baceito\b',
+    r'\bacordo\b',
+    r'\bconcordo\b',
+    r'\bfechou\b',
+    r'\bconfirmo\b',
+    r'\bconfirmado\b',
+    r'\bperfeito\b',
+    r'\bestá bom\b',
+    r'\btá bom\b',
+    r'\bpode manter\b',
+    r'\bsim\b',
+    r'\bcorreto\b'
+]))
+
+_GENERATE_CONFIRMATION_RE = re.compile('|'.join([
+    r'\bpode gerar\b',
+    r'\bgerar etp\b',
+    r'\bgera etp\b',
+    r'\bfechou gerar\b',
+    r'\bok gerar\b',
+    r'\bgerar\b'
+]))
+
+_SKIP_RESPONSE_RE = re.compile('|'.join([
+    r'\bnão sei\b',
+    r'\bnao sei\b',
+    r'\bpular\b',
+    r'\bdepois\b',
+    r'\bsem informação\b',
+    r'\bnão tenho\b',
+    r'\bnao tenho\b',
+    r'\bnão informado\b',
+    r'\bnao informado\b'
+]))
+
+
 def is_generic_confirmation(user_message: str) -> bool:
     """Check for generic confirmation patterns."""
-    msg_lower = user_message.lower().strip()
-    
-    patterns = [
-        r'\bok\b',
-        r'\bpode seguir\b',
-        r'\bseguir\b',
-        r'\bsegue\b',
-        r'\bprosseguir\b',
-        r'\bmanter\b',
-        r'\baceito\b',
-        r'\bacordo\b',
-        r'\bconcordo\b',
-        r'\bfechou\b',
-        r'\bconfirmo\b',
-        r'\bconfirmado\b',
-        r'\bperfeito\b',
-        r'\bestá bom\b',
-        r'\btá bom\b',
-        r'\bpode manter\b',
-        r'\bsim\b',
-        r'\bcorreto\b'
-    ]
-    
-    for pattern in patterns:
-        if re.search(pattern, msg_lower):
-            return True
-    
-    return False
+    return bool(_GENERIC_CONFIRMATION_RE.search(user_message.lower().strip()))
 
 
 def is_generate_confirmation(user_message: str) -> bool:
     """Check for ETP generation confirmation patterns."""
-    msg_lower = user_message.lower().strip()
-    
-    patterns = [
-        r'\bpode gerar\b',
-        r'\bgerar etp\b',
-        r'\bgera etp\b',
-        r'\bfechou gerar\b',
-        r'\bok gerar\b',
-        r'\bgerar\b'
-    ]
-    
-    for pattern in patterns:
-        if re.search(pattern, msg_lower):
-            return True
-    
-    return False
+    return bool(_GENERATE_CONFIRMATION_RE.search(user_message.lower().strip()))
 
 
 def is_skip_response(user_message: str) -> bool:
     """Check if user wants to skip/doesn't know."""
-    msg_lower = user_message.lower().strip()
-    
-    patterns = [
-        r'\bnão sei\b',
-        r'\bnao sei\b',
-        r'\bpular\b',
-        r'\bdepois\b',
-        r'\bsem informação\b',
-        r'\bnão tenho\b',
-        r'\bnao tenho\b',
-        r'\bnão informado\b',
-        r'\bnao informado\b'
-    ]
-    
-    for pattern in patterns:
-        if re.search(pattern, msg_lower):
-            return True
-    
-    return False
+    return bool(_SKIP_RESPONSE_RE.search(user_message.lower().strip()))
 
 
 # ============================================================================
@@ -27,14 +27,16 @@ def parse_intent_with_openai(user_message: str, current_requirements: List[Dict]
         Dict com intent e slots extraídos, ou None se falhar
     """
     if not openai_client:
-        # Tentar obter cliente OpenAI do ambiente
+        # Tentar obter o cliente compartilhado do LLM gateway
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key or api_key == 'test_api_key_for_testing':
+            return None
         try:
-            import openai
-            api_key = os.getenv('OPENAI_API_KEY')
-            if not api_key or api_key == 'test_api_key_for_testing':
-                return None
-            openai_client = openai.OpenAI(api_key=api_key)
-        except:
+            from application.ai.llm_gateway import get_openai_client
+            openai_client = get_openai_client()
+        except Exception:
+            return None
+        if openai_client is None:
             return None
     
     # Construir contexto dos requisitos atuais
@@ -229,7 +231,8 @@ def parse_update_command(user_message: str, current_requirements: List[Dict], op
     """
     Parse user commands for requirement updates usando OpenAI para interpretar linguagem natural.
     
-    Primeiro tenta usar OpenAI para interpretar a mensagem em linguagem natural.
+    Comandos inequívocos ("ok", "remover 2", "alterar R3: novo texto") são resolvidos
+    localmente pelo motor de intenções; os demais são interpretados pela OpenAI.
     Se OpenAI não estiver disponível ou falhar, usa o parser baseado em regex (fallback).
     
     Returns dict with:
@@ -238,7 +241,15 @@ def parse_update_command(user_message: str, current_requirements: List[Dict], op
     - items: list of requirement IDs or content
     - message: explanation of what was done
     """
-    # PRIORIDADE 1: Tentar usar OpenAI para interpretar linguagem natural
+    # PRIORIDADE 1: Comandos inequívocos são resolvidos pelo motor de intenções local
+    from application.nlu.intent_engine import get_intent_engine
+    engine = get_intent_engine()
+    local_command = parse_update_command_local(user_message, current_requirements, engine)
+    engine.record('requirements_command', local_command is not None)
+    if local_command is not None:
+        return local_command
+
+    # PRIORIDADE 2: Usar OpenAI para interpretar linguagem natural
     openai_intent = parse_intent_with_openai(user_message, current_requirements, openai_client)
     
     if openai_intent:
@@ -256,6 +267,65 @@ def parse_update_command(user_message: str, current_requirements: List[Dict], op
     return parse_update_command_regex(user_message, current_requirements)
 
 
+_REGENERATE_RE = re.compile(r'n[ãa]o gostei|gera? outros?|gere outros?|refaz|refa[çc]a')
+
+
+def parse_update_command_local(user_message: str, current_requirements: List[Dict], engine=None) -> Optional[Dict[str, Any]]:
+    """
+    Resolve o comando sem LLM quando o motor de intenções tem confiança suficiente.
+
+    Returns:
+        Comando no formato do controller, ou None se a mensagem for ambígua
+    """
+    from application.nlu.intent_engine import command_text
+    if engine is None:
+        from application.nlu.intent_engine import get_intent_engine
+        engine = get_intent_engine()
+
+    match = engine.classify_requirements_command(user_message or "")
+    if not engine.resolves(match):
+        return None
+
+    if match.intent == 'unclear':
+        return {'intent': 'unclear', 'items': [], 'message': 'Mensagem vazia ou inválida'}
+    if match.intent == 'ask':
+        return {'intent': 'ask', 'items': [], 'message': 'Usuário fez uma pergunta ou pediu esclarecimento.'}
+    if match.intent == 'confirm':
+        return {'intent': 'confirm', 'items': [], 'message': 'Requisitos confirmados pelo usuário.'}
+    if match.intent == 'restart_necessity':
+        return {'intent': 'restart_necessity', 'items': [],
+                'message': 'Usuario pediu para reiniciar a coleta da necessidade.'}
+
+    if match.intent == 'add':
+        new_text = extract_new_text_after_colon(user_message)
+        if not new_text:
+            return None
+        return {'intent': 'add', 'items': [new_text], 'message': f'Novo requisito adicionado: {new_text}'}
+
+    # Índices só da parte de comando: números do texto novo não são requisitos
+    req_indices = extract_requirement_indices(command_text(user_message), current_requirements)
+    if not req_indices:
+        return None
+    if match.intent == 'remove':
+        return {'intent': 'remove', 'items': req_indices,
+                'message': f'Removidos requisitos: {", ".join(req_indices)}'}
+    if match.intent == 'keep_only':
+        return {'intent': 'keep_only', 'items': req_indices,
+                'message': f'Mantidos apenas requisitos: {", ".join(req_indices)}'}
+    if match.intent == 'edit':
+        new_text = extract_delimited_text(user_message)
+        if not new_text:
+            return None
+        return {
+            'intent': 'edit',
+            'items': req_indices,
+            'new_text': new_text,
+            'message': f'Requisitos para edição: {", ".join(req_indices)}',
+            'regenerate': bool(_REGENERATE_RE.search(user_message.lower())),
+        }
+    return None
+
+
 def parse_update_command_regex(user_message: str, current_requirements: List[Dict]) -> Dict[str, Any]:
     """
     Parser legado baseado em regex - mantido como fallback.
@@ -521,6 +591,15 @@ def extract_new_text_after_colon(user_message: str) -> str:
     return ""
 
 
+def extract_delimited_text(user_message: str) -> str:
+    """Texto novo delimitado por ':' (até o fim) ou entre aspas"""
+    new_text = extract_new_text_after_colon(user_message)
+    if new_text:
+        return new_text.strip('"\'“”').strip()
+    quoted = re.search(r'["\'“”](.+)["\'“”]', user_message)
+    return quoted.group(1).strip() if quoted else ""
+
+
 def extract_add_content(user_message: str, message_lower: str) -> str:
     """Extract content to add for add commands"""
     add_patterns = ['adicionar', 'incluir', 'acrescentar', 'novo requisito']
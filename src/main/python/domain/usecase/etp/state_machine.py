@@ -3,7 +3,6 @@ State Machine Guardrails for ETP Generation
 Enforces mandatory state transitions with user confirmation
 """
 
-import re
 from typing import Tuple, Optional, Dict, Any
 
 
@@ -40,48 +39,9 @@ def is_user_confirmed(user_message: str) -> bool:
     if not user_message:
         return False
     
-    msg_lower = user_message.lower().strip()
-    
-    # Confirmation patterns as per issue spec
-    confirmation_patterns = [
-        r'\bok\b',
-        r'\bseguir\b',
-        r'\bprosseguir\b',
-        r'\bmanter\b',
-        r'\baceito\b',
-        r'\bacordado\b',
-        r'\bconcordo\b',
-        r'\bfechou\b',
-        r'\bpode gerar\b',
-        r'\bpode seguir\b',
-        r'\bsegue\b',
-        r'\bconfirmo\b',
-        r'\bconfirmado\b',
-        r'\bconfirmar\b',
-        r'\baprovado\b',
-        r'\baprovada\b',
-        r'\baprove\b',
-        r'\bpode prosseguir\b',
-        r'\bpode continuar\b',
-        r'\bsem alterações\b',
-        r'\bsem alteracoes\b',
-        r'\bsem ajustes\b',
-        r'\bmanter assim\b',
-        r'\bestá bom\b',
-        r'\besta bom\b',
-        r'\btá bom\b',
-        r'\bta bom\b',
-        r'\bpode manter\b',
-        r'\bperfeito\b',
-        r'\bcorreto\b',
-        r'\bcerto\b'
-    ]
-    
-    for pattern in confirmation_patterns:
-        if re.search(pattern, msg_lower):
-            return True
-    
-    return False
+    # Padrões pré-compilados e texto normalizado (sem acentos) no motor de intenções
+    from application.nlu.intent_engine import get_intent_engine
+    return get_intent_engine().is_confirmation(user_message)
 
 
 def validate_state_transition(
@@ -1,8 +1,13 @@
 import requests
 import json
+import re
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from lxml import etree
-from typing import Dict, Optional, Any
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterable, List, Optional, Any, Tuple
 import logging
 import os
 
@@ -13,180 +18,325 @@ from domain.dto.KbDto import LegalNormCache
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Webservice SRU do LexML e limites das consultas em lote
+LEXML_SRU_URL = os.getenv('LEXML_SRU_URL', "http://legis.senado.leg.br/dadosabertos/dados/ListaDocumentos")
+LEXML_TIMEOUT_SECONDS = float(os.getenv('LEXML_TIMEOUT_SECONDS', '8'))
+LEXML_MAX_WORKERS = int(os.getenv('LEXML_MAX_WORKERS', '8'))
+CACHE_TTL_DAYS = 7
+NEGATIVE_CACHE_TTL_DAYS = int(os.getenv('LEXML_NEGATIVE_CACHE_DAYS', '1'))
 
-def resolve_lexml(tipo: str, numero: str, ano: int) -> Dict[str, Any]:
+NOT_FOUND_STATUS = 'não encontrada'
+
+# Namespaces do SRU/XML
+SRU_NAMESPACES = {
+    'srw': 'http://www.loc.gov/zing/srw/',
+    'marc': 'http://www.loc.gov/MARC21/slim'
+}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def norm_key(tipo: str, numero: Any, ano: Any) -> str:
     """
-    Consulta o webservice SRU do LexML para verificar a vigência de uma norma federal.
-    
-    Args:
-        tipo: Tipo da norma (Lei, Decreto, etc.)
-        numero: Número da norma
-        ano: Ano da norma
-        
-    Returns:
-        Dict com urn, label, status e metadados da norma
+    Chave normalizada de uma norma: 'Lei Complementar', '101', 2000 -> 'lei_complementar:101:2000'.
+
+    É a coluna indexada (única) de legal_norm_cache usada nas buscas do cache.
     """
-    
-    # Construir identificador único para busca no cache
-    norm_identifier = f"{tipo} {numero}/{ano}"
-    
-    # Verificar cache primeiro (busca por norm_label que contém a identificação)
-    cache_entry = LegalNormCache.query.filter(
-        LegalNormCache.norm_label.contains(f"{tipo} {numero}/{ano}"),
-        LegalNormCache.sphere == "federal"
-    ).first()
-    
-    if cache_entry and cache_entry.is_recent(days=7):
-        logger.info(f"Cache hit for {tipo} {numero}/{ano}")
+    tipo = ''.join(c for c in unicodedata.normalize('NFD', str(tipo).lower())
+                   if unicodedata.category(c) != 'Mn')
+    tipo = re.sub(r'[^a-z]+', '_', tipo).strip('_')
+    numero = re.sub(r'\D', '', str(numero)).lstrip('0') or '0'
+    return f"{tipo}:{numero}:{int(ano)}"
+
+
+def _get_session() -> requests.Session:
+    """Sessão HTTP compartilhada, com pool de conexões do tamanho do lote concorrente"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(LEXML_MAX_WORKERS, 1))
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def _result_from_cache(entry: LegalNormCache, key: str) -> Dict[str, Any]:
+    # Normas sem URN no LexML são gravadas com o identificador provisório 'norma:<chave>'
+    urn = None if entry.norm_urn.startswith('norma:') else entry.norm_urn
+    return {
+        'urn': urn,
+        'label': entry.norm_label,
+        'status': entry.status,
+        'metadados': entry.get_source_data(),
+        'verified': bool(urn),
+        'cached': True,
+        'key': key
+    }
+
+
+def _is_fresh(entry: LegalNormCache) -> bool:
+    days = NEGATIVE_CACHE_TTL_DAYS if entry.status == NOT_FOUND_STATUS else CACHE_TTL_DAYS
+    return entry.is_recent(days=days)
+
+
+def _parse_sru_response(content: bytes, tipo: str, numero: str, ano: int) -> Dict[str, Any]:
+    """Converte a resposta SRU (marcxml) no resultado de resolve_lexml"""
+    root = etree.fromstring(content)
+
+    # Verificar se encontrou registros
+    num_records = root.xpath('//srw:numberOfRecords/text()', namespaces=SRU_NAMESPACES)
+    if not num_records or int(num_records[0]) == 0:
+        # Não encontrou a norma
         return {
-            'urn': cache_entry.norm_urn,
-            'label': cache_entry.norm_label,
-            'status': cache_entry.status,
-            'metadados': cache_entry.get_source_data(),
-            'verified': bool(cache_entry.norm_urn),
-            'cached': True
+            'urn': None,
+            'label': f"{tipo} {numero}/{ano}",
+            'status': NOT_FOUND_STATUS,
+            'metadados': {},
+            'verified': False,
+            'cached': False
         }
-    
-    # Se não está no cache ou expirou, consultar LexML
+
+    # Extrair dados do primeiro registro
+    record = root.xpath('//srw:record[1]', namespaces=SRU_NAMESPACES)[0]
+
+    # Extrair URN (campo 024)
+    urn_fields = record.xpath('.//marc:datafield[@tag="024"]/marc:subfield[@code="a"]/text()',
+                              namespaces=SRU_NAMESPACES)
+    urn = urn_fields[0] if urn_fields else None
+
+    # Extrair título/label (campo 245)
+    title_fields = record.xpath('.//marc:datafield[@tag="245"]/marc:subfield[@code="a"]/text()',
+                                namespaces=SRU_NAMESPACES)
+    label = title_fields[0].strip() if title_fields else f"{tipo} {numero}/{ano}"
+
+    status = 'vigente' if urn else 'status desconhecido'
+
+    # Coletar metadados adicionais
+    metadados = {
+        'fonte': 'LexML',
+        'data_consulta': datetime.utcnow().isoformat(),
+        'titulo_completo': label,
+        'urn_lexml': urn
+    }
+
+    # Extrair outros campos relevantes se disponíveis
+    ementa_fields = record.xpath('.//marc:datafield[@tag="520"]/marc:subfield[@code="a"]/text()',
+                                 namespaces=SRU_NAMESPACES)
+    if ementa_fields:
+        metadados['ementa'] = ementa_fields[0]
+
+    return {
+        'urn': urn,
+        'label': label,
+        'status': status,
+        'metadados': metadados,
+        'verified': bool(urn),
+        'cached': False
+    }
+
+
+def _query_lexml(tipo: str, numero: str, ano: int) -> Dict[str, Any]:
+    """
+    Consulta uma norma no SRU do LexML (sem acesso ao banco; roda nas threads do lote).
+
+    Falhas de rede ou de processamento viram resultados com 'erro' nos metadados,
+    que não são gravados no cache.
+    """
     logger.info(f"Querying LexML for {tipo} {numero}/{ano}")
-    
+
+    # Construir consulta CQL para o SRU do LexML, restrita ao acervo federal
+    cql_query = f'dc.type="{tipo}" AND dc.identifier="{numero}" AND dc.date="{ano}" AND dc.coverage="BR"'
+    params = {
+        'operation': 'searchRetrieve',
+        'version': '1.2',
+        'query': cql_query,
+        'recordSchema': 'marcxml',
+        'maximumRecords': '10'
+    }
+
     try:
-        # Construir consulta CQL para o SRU do LexML
-        # Restringir ao acervo federal
-        cql_query = f'dc.type="{tipo}" AND dc.identifier="{numero}" AND dc.date="{ano}" AND dc.coverage="BR"'
-        
-        # URL do webservice SRU do LexML
-        sru_url = "http://legis.senado.leg.br/dadosabertos/dados/ListaDocumentos"
-        
-        params = {
-            'operation': 'searchRetrieve',
-            'version': '1.2',
-            'query': cql_query,
-            'recordSchema': 'marcxml',
-            'maximumRecords': '10'
-        }
-        
-        # Fazer requisição HTTP
-        response = requests.get(sru_url, params=params, timeout=30)
+        response = _get_session().get(LEXML_SRU_URL, params=params, timeout=LEXML_TIMEOUT_SECONDS)
         response.raise_for_status()
-        
-        # Parsear XML usando lxml
-        root = etree.fromstring(response.content)
-        
-        # Namespaces do SRU/XML
-        namespaces = {
-            'srw': 'http://www.loc.gov/zing/srw/',
-            'marc': 'http://www.loc.gov/MARC21/slim'
-        }
-        
-        # Verificar se encontrou registros
-        num_records = root.xpath('//srw:numberOfRecords/text()', namespaces=namespaces)
-        if not num_records or int(num_records[0]) == 0:
-            # Não encontrou a norma
-            result = {
-                'urn': None,
-                'label': f"{tipo} {numero}/{ano}",
-                'status': 'não encontrada',
-                'metadados': {},
-                'verified': False,
-                'cached': False
-            }
-        else:
-            # Extrair dados do primeiro registro
-            record = root.xpath('//srw:record[1]', namespaces=namespaces)[0]
-            
-            # Extrair URN (campo 024)
-            urn_fields = record.xpath('.//marc:datafield[@tag="024"]/marc:subfield[@code="a"]/text()', 
-                                    namespaces=namespaces)
-            urn = urn_fields[0] if urn_fields else None
-            
-            # Extrair título/label (campo 245)
-            title_fields = record.xpath('.//marc:datafield[@tag="245"]/marc:subfield[@code="a"]/text()', 
-                                      namespaces=namespaces)
-            label = title_fields[0].strip() if title_fields else f"{tipo} {numero}/{ano}"
-            
-            # Extrair status/situação (campo 500 ou similar)
-            status_fields = record.xpath('.//marc:datafield[@tag="500"]/marc:subfield[@code="a"]/text()', 
-                                       namespaces=namespaces)
-            status = 'vigente' if urn else 'status desconhecido'
-            
-            # Coletar metadados adicionais
-            metadados = {
-                'fonte': 'LexML',
-                'data_consulta': datetime.utcnow().isoformat(),
-                'titulo_completo': label,
-                'urn_lexml': urn
-            }
-            
-            # Extrair outros campos relevantes se disponíveis
-            ementa_fields = record.xpath('.//marc:datafield[@tag="520"]/marc:subfield[@code="a"]/text()', 
-                                       namespaces=namespaces)
-            if ementa_fields:
-                metadados['ementa'] = ementa_fields[0]
-            
-            result = {
-                'urn': urn,
-                'label': label,
-                'status': status,
-                'metadados': metadados,
-                'verified': bool(urn),
-                'cached': False
-            }
-        
-        # Salvar no cache com o modelo existente
-        if cache_entry:
-            # Atualizar entrada existente
-            cache_entry.norm_urn = result['urn'] or ""
-            cache_entry.norm_label = result['label']
-            cache_entry.status = result['status']
-            cache_entry.set_source_data(result['metadados'])
-            cache_entry.last_verified_at = datetime.utcnow()
-        else:
-            # Criar nova entrada
-            cache_entry = LegalNormCache(
-                norm_urn=result['urn'] or f"norma:{tipo}:{numero}:{ano}",
-                norm_label=result['label'],
-                sphere="federal",
-                status=result['status'],
-                last_verified_at=datetime.utcnow()
-            )
-            cache_entry.set_source_data(result['metadados'])
-            db.session.add(cache_entry)
-        
-        db.session.commit()
-        logger.info(f"Cached result for {tipo} {numero}/{ano}")
-        
-        return result
-        
+        return _parse_sru_response(response.content, tipo, numero, ano)
+
     except requests.exceptions.RequestException as e:
         logger.error(f"Network error querying LexML for {tipo} {numero}/{ano}: {str(e)}")
-        
-        # Fallback para falha de rede
-        result = {
-            'urn': None,
-            'label': f"{tipo} {numero}/{ano}",
-            'status': 'status desconhecido',
-            'metadados': {'erro': 'Falha de rede na consulta ao LexML'},
-            'verified': False,
-            'cached': False
-        }
-        
-        return result
-        
+        erro = 'Falha de rede na consulta ao LexML'
+
     except Exception as e:
         logger.error(f"Error processing LexML response for {tipo} {numero}/{ano}: {str(e)}")
+        erro = f'Erro no processamento: {str(e)}'
+
+    return {
+        'urn': None,
+        'label': f"{tipo} {numero}/{ano}",
+        'status': 'status desconhecido',
+        'metadados': {'erro': erro},
+        'verified': False,
+        'cached': False
+    }
+
+
+def _store_results(fetched: Dict[str, Tuple[Tuple[str, str, int], Dict[str, Any]]],
+                   cached_rows: Dict[str, LegalNormCache]) -> None:
+    """Grava no cache (uma transação) os resultados consultados; não encontradas viram entradas negativas"""
+    cacheable = {key: item for key, item in fetched.items() if 'erro' not in item[1]['metadados']}
+    if not cacheable:
+        return
+
+    # Entradas antigas sem chave, com a mesma URN, são reaproveitadas
+    urns = [result['urn'] for _, result in cacheable.values() if result['urn']]
+    by_urn = {}
+    if urns:
+        by_urn = {row.norm_urn: row for row in
+                  LegalNormCache.query.filter(LegalNormCache.norm_urn.in_(urns)).all()}
+
+    now = datetime.utcnow()
+    for key, ((tipo, numero, ano), result) in cacheable.items():
+        entry = cached_rows.get(key) or by_urn.get(result['urn'])
+        if entry is None:
+            entry = LegalNormCache(sphere="federal")
+            db.session.add(entry)
+        entry.norm_key = key
+        entry.norm_urn = result['urn'] or f"norma:{key}"
+        entry.norm_label = result['label']
+        entry.status = result['status']
+        entry.set_source_data(result['metadados'])
+        entry.last_verified_at = now
+
+    try:
+        db.session.commit()
+        logger.info(f"Cached {len(cacheable)} LexML result(s)")
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Could not cache LexML results: {str(e)}")
+
+
+def resolve_lexml_batch(norms: Iterable[Tuple[str, str, int]], max_workers: Optional[int] = None,
+                        refresh: bool = False) -> List[Dict[str, Any]]:
+    """
+    Verifica a vigência de várias normas federais no LexML.
+
+    O cache é consultado uma única vez (``norm_key IN (...)``); as normas ausentes
+    são consultadas em paralelo pela sessão HTTP compartilhada e gravadas numa
+    única transação, inclusive as não encontradas (cache negativo, válido por
+    LEXML_NEGATIVE_CACHE_DAYS).
+
+    Entradas expiradas são devolvidas na hora, marcadas com ``stale`` e
+    ``revalidating``, e revalidadas em segundo plano pelo NormRefresher
+    (stale-while-revalidate). Sem o refresher em execução, ou com
+    LEXML_SERVE_STALE=false, são consultadas na hora, como as ausentes.
+
+    Args:
+        norms: Sequência de (tipo, numero, ano)
+        max_workers: Consultas simultâneas ao LexML (padrão LEXML_MAX_WORKERS)
+        refresh: Consulta o LexML mesmo para entradas em cache (usado pelo refresher)
+
+    Returns:
+        Um resultado por norma, na ordem de entrada (ver resolve_lexml)
+    """
+    norms = [(tipo, numero, int(ano)) for tipo, numero, ano in norms]
+    keys = [norm_key(*norm) for norm in norms]
+    unique: Dict[str, Tuple[str, str, int]] = {}
+    for key, norm in zip(keys, norms):
+        unique.setdefault(key, norm)
+    if not unique:
+        return []
+
+    cached_rows = {row.norm_key: row for row in
+                   LegalNormCache.query.filter(LegalNormCache.norm_key.in_(list(unique))).all()}
+    refresher = None if refresh else _stale_refresher()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = []
+    stale = []
+    for key, norm in unique.items():
+        entry = cached_rows.get(key)
+        if entry is None or refresh:
+            pending.append((key, norm))
+        elif _is_fresh(entry):
+            logger.info(f"Cache hit for {key}")
+            results[key] = _result_from_cache(entry, key)
+        elif refresher is not None:
+            logger.info(f"Stale cache hit for {key}; revalidating in background")
+            results[key] = dict(_result_from_cache(entry, key), stale=True, revalidating=True)
+            stale.append(norm)
+        else:
+            pending.append((key, norm))
+
+    if stale:
+        refresher.request_refresh(stale)
+
+    if pending:
+        from application.services.telemetry import span
+
+        workers = max(1, min(max_workers or LEXML_MAX_WORKERS, len(pending)))
+        with span('lexml.resolve', norms=len(pending)), \
+                ThreadPoolExecutor(max_workers=workers, thread_name_prefix='lexml') as pool:
+            fetched_results = list(pool.map(lambda item: _query_lexml(*item[1]), pending))
+
+        fetched = {}
+        for (key, norm), result in zip(pending, fetched_results):
+            result['key'] = key
+            results[key] = result
+            fetched[key] = (norm, result)
+        _store_results(fetched, cached_rows)
+
+    return [dict(results[key]) for key in keys]
+
+
+def _stale_refresher():
+    """Refresher em segundo plano, se ativo e se entradas expiradas podem ser servidas"""
+    if os.getenv('LEXML_SERVE_STALE', 'true').lower() in ('0', 'false', 'no'):
+        return None
+    from application.services.norm_refresher import get_norm_refresher
+    return get_norm_refresher()
+
+
+def norms_due_for_refresh(norms: Iterable[Tuple[str, str, int]], within_seconds: float = 0) -> List[Tuple[str, str, int]]:
+    """
+    Normas sem cache ou cujo cache expira nos próximos ``within_seconds``.
+
+    Usado pela varredura periódica para revalidar as normas antes que expirem.
+    """
+    unique: Dict[str, Tuple[str, str, int]] = {}
+    for tipo, numero, ano in norms:
+        unique.setdefault(norm_key(tipo, numero, ano), (tipo, numero, int(ano)))
+    if not unique:
+        return []
+
+    rows = {row.norm_key: row for row in
+            LegalNormCache.query.filter(LegalNormCache.norm_key.in_(list(unique))).all()}
+    now = datetime.utcnow()
+    due = []
+    for key, norm in unique.items():
+        row = rows.get(key)
+        if row is None or not row.last_verified_at:
+            due.append(norm)
+            continue
+        days = NEGATIVE_CACHE_TTL_DAYS if row.status == NOT_FOUND_STATUS else CACHE_TTL_DAYS
+        if row.last_verified_at + timedelta(days=days) - timedelta(seconds=within_seconds) <= now:
+            due.append(norm)
+    return due
+
+
+def resolve_lexml(tipo: str, numero: str, ano: int) -> Dict[str, Any]:
+    """
+    Consulta o webservice SRU do LexML para verificar a vigência de uma norma federal.
+    
+    Args:
+        tipo: Tipo da norma (Lei, Decreto, etc.)
+        numero: Número da norma
+        ano: Ano da norma
         
-        # Fallback para outros erros
-        result = {
-            'urn': None,
-            'label': f"{tipo} {numero}/{ano}",
-            'status': 'status desconhecido',
-            'metadados': {'erro': f'Erro no processamento: {str(e)}'},
-            'verified': False,
-            'cached': False
-        }
-        
-        return result
+    Returns:
+        Dict com urn, label, status e metadados da norma
+    """
+    return resolve_lexml_batch([(tipo, numero, ano)])[0]
 
 
 def summarize_for_user(entry: Dict[str, Any], openai_client=None) -> str:
@@ -210,11 +360,8 @@ def summarize_for_user(entry: Dict[str, Any], openai_client=None) -> str:
     
     try:
         # Verificar se já há resumo no cache
-        if 'cached' in entry and entry['cached']:
-            cache_entry = LegalNormCache.query.filter(
-                LegalNormCache.norm_label.contains(f"{entry.get('tipo', '')} {entry.get('numero', '')}/{entry.get('ano', 0)}"),
-                LegalNormCache.sphere == "federal"
-            ).first()
+        if entry.get('cached') and entry.get('key'):
+            cache_entry = LegalNormCache.query.filter_by(norm_key=entry.get('key')).first()
             if cache_entry:
                 # Como o modelo existente não tem campo ai_summary, vamos usar o source_data
                 source_data = cache_entry.get_source_data()
@@ -257,10 +404,7 @@ def summarize_for_user(entry: Dict[str, Any], openai_client=None) -> str:
         
         # Salvar resumo no cache se possível
         try:
-            cache_entry = LegalNormCache.query.filter(
-                LegalNormCache.norm_label.contains(f"{entry.get('tipo', '')} {entry.get('numero', '')}/{entry.get('ano', 0)}"),
-                LegalNormCache.sphere == "federal"
-            ).first()
+            cache_entry = LegalNormCache.query.filter_by(norm_key=entry['key']).first() if entry.get('key') else None
             if cache_entry:
                 # Salvar AI summary no source_data JSON
                 source_data = cache_entry.get_source_data()
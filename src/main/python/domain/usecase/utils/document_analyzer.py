@@ -4,21 +4,17 @@ import json
 from typing import Dict, List, Tuple, Optional, Any
 import openai
 
+from application.ai.llm_gateway import get_openai_client
+
 class AdvancedDocumentAnalyzer:
     """Analisador avançado de documentos para extração de informações de ETP"""
     
     def __init__(self, openai_api_key: str):
-        # Configurar cliente OpenAI de forma robusta
-        try:
-            # Tentar inicialização moderna
-            self.client = openai.OpenAI(api_key=openai_api_key)
-        except Exception as e:
-            try:
-                # Fallback para configuração legacy
-                openai.api_key = openai_api_key
-                self.client = None  # Usar API legacy
-            except Exception as e2:
-                raise Exception(f"Erro ao configurar OpenAI: {e}. Fallback: {e2}")
+        # Cliente OpenAI sobre o pool de conexões compartilhado do LLM gateway
+        self.client = get_openai_client(api_key=openai_api_key)
+        if self.client is None:
+            # Fallback para configuração legacy
+            openai.api_key = openai_api_key
         
         # Padrões de regex para identificar seções específicas
         self.section_patterns = {
@@ -0,0 +1,128 @@
+"""
+Extrator único de citações de normas legais.
+
+Uma única expressão regular compilada (alternação com grupos nomeados) percorre
+o texto uma vez e devolve citações tipadas e normalizadas:
+
+    Lei nº 14.133, de 1º de abril de 2021  ->  Citation(type='lei', number='14133', year='2021')
+    Lei Estadual 123/19                    ->  Citation(type='lei', number='123', year='2019', scope='estadual')
+    IN SEGES/ME nº 65/2021                 ->  Citation(type='instrucao_normativa', number='65', year='2021')
+
+É usado pelo parser de citações do domínio (utils/legal_norms), pelo
+LegalNormProcessor e pelo FederalNormVerifier do RAG e pelo script
+knowledge/parse_etps.py.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+# Rótulo canônico de cada tipo (chave = nome do grupo na expressão)
+TYPE_LABELS = {
+    'lei_complementar': 'Lei Complementar',
+    'emenda_constitucional': 'Emenda Constitucional',
+    'medida_provisoria': 'Medida Provisória',
+    'instrucao_normativa': 'Instrução Normativa',
+    'resolucao': 'Resolução',
+    'portaria': 'Portaria',
+    'decreto': 'Decreto',
+    'lei': 'Lei',
+}
+
+# A antecipação pela letra inicial dos tipos evita testar a alternação em cada posição do texto
+_CITATION_RE = re.compile(r"""
+    (?=[dilmpre])\b(?:
+        (?P<lei_complementar>lei\s+complementar|lc)
+      | (?P<emenda_constitucional>emenda\s+constitucional|ec)
+      | (?P<medida_provisoria>medida\s+provis[oó]ria|mp)
+      | (?P<instrucao_normativa>instru[cç][aã]o\s+normativa|in)
+      | (?P<resolucao>resolu[cç][aã]o)
+      | (?P<portaria>portaria)
+      | (?P<decreto>decreto)
+      | (?P<lei>lei)
+    )\b
+    (?:\s+(?P<scope>federal|estadual|municipal|distrital))?
+    (?:\s+(?-i:[A-Z]{2,}(?:/[A-Z]{2,})*))?
+    \s*(?:n\s*\.?\s*[º°o]?\s*\.?\s*)?
+    (?P<number>\d{1,3}(?:\.\d{3})+|\d{1,6})
+    (?:
+        ,?\s+de\s+\d{1,2}\s*[º°o]?\s+de\s+[a-zç]+\s+de\s+(?P<year_date>\d{4})
+      | \s*/\s*(?P<year_slash>\d{4}|\d{2})
+      | \s+de\s+(?P<year_de>\d{4}|\d{2})
+    )?
+    (?!\d)
+""", re.IGNORECASE | re.VERBOSE)
+
+
+@dataclass(frozen=True)
+class Citation:
+    """Citação normalizada de uma norma legal"""
+    type: str
+    number: str
+    year: Optional[str]
+    scope: Optional[str]
+    text: str
+    start: int
+    end: int
+
+    @property
+    def type_label(self) -> str:
+        return TYPE_LABELS[self.type]
+
+    @property
+    def key(self) -> str:
+        """Identificador 'numero/ano' (ou só o número, sem ano)"""
+        return f"{self.number}/{self.year}" if self.year else self.number
+
+    @property
+    def label(self) -> str:
+        """Forma canônica, ex.: 'Lei 14.133/2021', 'Lei Estadual 123/2019'"""
+        name = self.type_label
+        if self.scope and self.scope != 'federal':
+            name = f"{name} {self.scope.capitalize()}"
+        number = f"{int(self.number):,}".replace(',', '.')
+        return f"{name} {number}/{self.year}" if self.year else f"{name} {number}"
+
+
+def normalize_year(year: str) -> str:
+    """Anos com 2 dígitos: 00-30 -> 20xx, 31-99 -> 19xx"""
+    if len(year) == 2:
+        return ("20" if int(year) <= 30 else "19") + year
+    return year
+
+
+def iter_citations(text: str) -> Iterator[Citation]:
+    """Percorre o texto uma única vez, na ordem em que as citações aparecem"""
+    for match in _CITATION_RE.finditer(text or ""):
+        year = match.group('year_date') or match.group('year_slash') or match.group('year_de')
+        scope = match.group('scope')
+        yield Citation(
+            type=next(name for name in TYPE_LABELS if match.group(name)),
+            number=match.group('number').replace('.', '').lstrip('0') or '0',
+            year=normalize_year(year) if year else None,
+            scope=scope.lower() if scope else None,
+            text=match.group(0),
+            start=match.start(),
+            end=match.end(),
+        )
+
+
+def extract_citations(text: str, unique: bool = False) -> List[Citation]:
+    """
+    Extrai as citações de normas legais do texto.
+
+    Args:
+        text: Texto para análise
+        unique: Mantém só a primeira ocorrência de cada (tipo, número, ano)
+    """
+    citations = list(iter_citations(text))
+    if not unique:
+        return citations
+    seen = set()
+    result = []
+    for citation in citations:
+        identity = (citation.type, citation.number, citation.year)
+        if identity not in seen:
+            seen.add(identity)
+            result.append(citation)
+    return result
@@ -1,10 +1,14 @@
-import re
 from typing import List, Dict, Any, Optional
 
+from domain.usecase.utils.legal_citations import iter_citations
+
+# Tipos de norma reconhecidos por extract_citations
+_CITATION_TYPES = {"lei", "lei_complementar", "decreto", "instrucao_normativa", "portaria"}
+
 
 def extract_citations(texto: str) -> List[Dict[str, Any]]:
     """
-    Extrai citações de normas legais do texto usando regex robusta.
+    Extrai citações de normas legais do texto com o extrator único de citações.
     
     Args:
         texto (str): Texto para análise de citações legais
@@ -12,37 +16,18 @@ def extract_citations(texto: str) -> List[Dict[str, Any]]:
     Returns:
         List[Dict[str, Any]]: Lista de dicionários com {tipo, numero, ano}
     """
-    # Regex robusta para capturar diferentes formatos de normas legais
-    pattern = r"(?i)\b(Lei(?:\s+(?:Complementar|Estadual|Municipal|Distrital|Federal))?|Decreto(?:\s+(?:Estadual|Municipal|Distrital|Federal))?|Instrução\s+Normativa|Portaria)\s*(?:n[ºo.]?\s*)?(\d{1,5}(?:\.\d{3})*)\s*(?:/|\s+de\s+)(\d{2,4})"
-    
     citations = []
-    matches = re.finditer(pattern, texto)
-    
-    for match in matches:
-        tipo = match.group(1).strip()
-        numero = match.group(2).strip().replace(".", "")  # Remove dots from number
-        ano = match.group(3).strip()
-        
-        # Normalizar o tipo
-        tipo_normalizado = _normalize_legal_type(tipo)
-        
-        # Garantir que o ano tenha 4 dígitos
-        if len(ano) == 2:
-            # Assumir que anos 00-30 são 2000-2030, 31-99 são 1931-1999
-            if int(ano) <= 30:
-                ano = "20" + ano
-            else:
-                ano = "19" + ano
-        
-        citation = {
-            "tipo": tipo_normalizado,
-            "numero": numero,
-            "ano": ano,
-            "texto_original": match.group(0)
-        }
-        
-        citations.append(citation)
-    
+    for citation in iter_citations(texto):
+        # Citações sem ano e tipos fora do escopo deste parser são ignoradas
+        if not citation.year or citation.type not in _CITATION_TYPES:
+            continue
+        citations.append({
+            "tipo": citation.type_label,
+            "numero": citation.number,
+            "ano": citation.year,
+            "texto_original": citation.text
+        })
+
     return citations
 
 
@@ -183,30 +168,3 @@ def suggest_federal(objective_slug: str, k: int = 6) -> List[Dict[str, Any]]:
     unique_norms.sort(key=lambda x: x.get("relevancia", 0), reverse=True)
     
     return unique_norms[:k]
-
-
-def _normalize_legal_type(tipo: str) -> str:
-    """
-    Normaliza o tipo de norma legal para formato padrão.
-    
-    Args:
-        tipo (str): Tipo original extraído do regex
-        
-    Returns:
-        str: Tipo normalizado
-    """
-    tipo_lower = tipo.lower().strip()
-    
-    if "lei complementar" in tipo_lower:
-        return "Lei Complementar"
-    elif "lei" in tipo_lower:
-        return "Lei"
-    elif "decreto" in tipo_lower:
-        return "Decreto"
-    elif "instrução" in tipo_lower and "normativa" in tipo_lower:
-        return "Instrução Normativa"
-    elif "portaria" in tipo_lower:
-        return "Portaria"
-    else:
-        # Capitalizar primeira letra de cada palavra
-        return " ".join(word.capitalize() for word in tipo.split())
\ No newline at end of file
@@ -0,0 +1,257 @@
+"""
+Índice BM25 invertido e compacto para o sistema RAG.
+
+Substitui os objetos ``rank_bm25.BM25Okapi`` serializados com pickle. Cada índice
+guarda as listas de postings em arrays NumPy (formato CSR: termo -> documentos/tf),
+que podem ser abertos com memory-mapping. A consulta pontua apenas os documentos
+que contêm algum termo da query e seleciona o top-k com ``argpartition``.
+
+A fórmula de pontuação é a mesma do BM25Okapi (k1=1.5, b=0.75, piso de idf
+epsilon * idf médio), de modo que os scores são equivalentes aos anteriores.
+"""
+
+import os
+import re
+import json
+import shutil
+import logging
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Optional, Sequence, Tuple, Iterable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+_ARRAYS = ('term_offsets', 'posting_docs', 'posting_tfs', 'idf', 'doc_norm',
+           'chunk_ids', 'document_ids', 'slug_codes')
+
+
+class BM25Index:
+    """
+    Índice BM25 de uma seção (section_type).
+
+    Arrays:
+        term_offsets: int64[V+1] - início das postings de cada termo
+        posting_docs: int32[P]   - documento (posição no índice) de cada posting
+        posting_tfs:  uint16[P]  - frequência do termo no documento
+        idf:          float64[V] - idf de cada termo (com piso epsilon)
+        doc_norm:     float64[N] - k1 * (1 - b + b * dl / avgdl) por documento
+        chunk_ids, document_ids: int64[N] - identificação dos chunks
+        slug_codes:   int32[N]   - objective_slug codificado em ``slugs``
+    """
+
+    def __init__(self, terms: List[str], slugs: List[str], arrays: Dict[str, np.ndarray],
+                 k1: float = 1.5, b: float = 0.75):
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.slugs = slugs
+        self.slug_ids = {slug: i for i, slug in enumerate(slugs)}
+        self.k1 = k1
+        self.b = b
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def __len__(self) -> int:
+        return int(self.chunk_ids.shape[0])
+
+    @classmethod
+    def build(cls, docs: Sequence[Tuple[int, Optional[int], str, List[str]]],
+              k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25) -> 'BM25Index':
+        """
+        Constrói o índice a partir de documentos já tokenizados.
+
+        Args:
+            docs: Sequência de (chunk_id, document_id, objective_slug, tokens)
+        """
+        term_ids: Dict[str, int] = {}
+        slug_ids: Dict[str, int] = {}
+        flat_terms = array('i')
+        corpus_size = len(docs)
+        doc_len = np.zeros(corpus_size, dtype=np.int64)
+        chunk_ids = np.zeros(corpus_size, dtype=np.int64)
+        document_ids = np.zeros(corpus_size, dtype=np.int64)
+        slug_codes = np.zeros(corpus_size, dtype=np.int32)
+
+        for doc_idx, (chunk_id, document_id, slug, tokens) in enumerate(docs):
+            chunk_ids[doc_idx] = chunk_id
+            document_ids[doc_idx] = document_id if document_id is not None else -1
+            slug_codes[doc_idx] = slug_ids.setdefault(slug or '', len(slug_ids))
+            doc_len[doc_idx] = len(tokens)
+            flat_terms.extend([term_ids.setdefault(term, len(term_ids)) for term in tokens])
+
+        # Postings ordenadas por (termo, documento): chave = termo * N + documento
+        n_terms = len(term_ids)
+        token_terms = np.frombuffer(flat_terms, dtype=np.int32).astype(np.int64) if flat_terms else np.zeros(0, np.int64)
+        token_docs = np.repeat(np.arange(corpus_size, dtype=np.int64), doc_len)
+        stride = max(corpus_size, 1)
+        keys, tfs = np.unique(token_terms * stride + token_docs, return_counts=True)
+        post_terms = keys // stride
+        df = np.bincount(post_terms, minlength=n_terms)
+        term_offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(df, out=term_offsets[1:])
+
+        # idf do BM25Okapi, com piso epsilon * idf médio para termos em mais da metade dos documentos
+        idf = np.log(corpus_size - df + 0.5) - np.log(df + 0.5) if n_terms else np.zeros(0)
+        if n_terms:
+            eps = epsilon * (idf.sum() / n_terms)
+            idf = np.where(idf < 0, eps, idf)
+
+        avgdl = float(doc_len.sum()) / corpus_size if corpus_size else 0.0
+        doc_norm = k1 * (1 - b + b * doc_len / avgdl) if avgdl else np.full(corpus_size, k1 * (1 - b))
+
+        arrays = {
+            'term_offsets': term_offsets,
+            'posting_docs': (keys % stride).astype(np.int32),
+            'posting_tfs': np.minimum(tfs, 65535).astype(np.uint16),
+            'idf': idf.astype(np.float64),
+            'doc_norm': doc_norm.astype(np.float64),
+            'chunk_ids': chunk_ids,
+            'document_ids': document_ids,
+            'slug_codes': slug_codes,
+        }
+        terms = [None] * n_terms
+        for term, i in term_ids.items():
+            terms[i] = term
+        slugs = [None] * len(slug_ids)
+        for slug, i in slug_ids.items():
+            slugs[i] = slug
+        return cls(terms, slugs, arrays, k1=k1, b=b)
+
+    def scores_for(self, query_tokens: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pontua apenas os documentos que contêm termos da query.
+
+        Returns:
+            (doc_indices, scores) - documentos candidatos e seus scores BM25
+        """
+        counts = Counter(t for t in query_tokens if t in self.term_ids)
+        if not counts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+        doc_parts, score_parts = [], []
+        for term, q_count in counts.items():
+            term_id = self.term_ids[term]
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            docs = np.asarray(self.posting_docs[start:end], dtype=np.int64)
+            tf = np.asarray(self.posting_tfs[start:end], dtype=np.float64)
+            contrib = self.idf[term_id] * (tf * (self.k1 + 1) / (tf + self.doc_norm[docs]))
+            doc_parts.append(docs)
+            score_parts.append(contrib * q_count)
+
+        docs = np.concatenate(doc_parts)
+        contribs = np.concatenate(score_parts)
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        return unique_docs, np.bincount(inverse, weights=contribs)
+
+    def search(self, query_tokens: Iterable[str], k: int, objective_slug: str = '') -> List[Tuple[int, float]]:
+        """
+        Top-k documentos para a query, opcionalmente filtrados por objective_slug.
+
+        Mantém o comportamento do ranking completo anterior: se menos de ``k`` documentos
+        contêm termos da query, o resultado é completado com documentos de score 0
+        na ordem do índice.
+
+        Returns:
+            Lista de (posição do documento no índice, score), em ordem decrescente de score
+        """
+        if k <= 0 or len(self) == 0:
+            return []
+
+        slug_code = None
+        if objective_slug:
+            slug_code = self.slug_ids.get(objective_slug)
+            if slug_code is None:
+                return []
+
+        docs, scores = self.scores_for(query_tokens)
+        if slug_code is not None and docs.size:
+            mask = self.slug_codes[docs] == slug_code
+            docs, scores = docs[mask], scores[mask]
+
+        if docs.size > k:
+            # Inclui empates com o k-ésimo score para manter a ordem estável do ranking completo
+            kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+            keep = scores >= kth
+            docs, scores = docs[keep], scores[keep]
+        order = np.lexsort((docs, -scores))[:k]
+        results = [(int(docs[i]), float(scores[i])) for i in order]
+
+        if len(results) < k:
+            taken = set(int(d) for d in docs)
+            candidates = (np.arange(len(self)) if slug_code is None
+                          else np.flatnonzero(self.slug_codes == slug_code))
+            for doc in candidates:
+                if len(results) >= k:
+                    break
+                if int(doc) not in taken:
+                    results.append((int(doc), 0.0))
+        return results
+
+    def save(self, directory: Path) -> None:
+        """Grava o índice em ``directory`` (arrays .npy + meta.json)."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        with open(directory / "meta.json", 'w', encoding='utf-8') as f:
+            json.dump({'version': FORMAT_VERSION, 'k1': self.k1, 'b': self.b,
+                       'terms': self.terms, 'slugs': self.slugs}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> 'BM25Index':
+        """Abre um índice gravado por ``save``; com ``mmap`` os arrays não são copiados para a memória."""
+        directory = Path(directory)
+        with open(directory / "meta.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"versão de índice BM25 não suportada: {meta.get('version')}")
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode=mode) for name in _ARRAYS}
+        return cls(meta['terms'], meta['slugs'], arrays, k1=meta['k1'], b=meta['b'])
+
+
+def _section_dirname(section_type: str, position: int) -> str:
+    slug = re.sub(r'[^a-zA-Z0-9_-]+', '_', section_type or 'unknown')[:40]
+    return f"{position:03d}_{slug}"
+
+
+def save_bm25_indices(base_dir: Path, indices: Dict[str, BM25Index]) -> None:
+    """
+    Grava os índices de todas as seções em ``base_dir/store`` e troca o diretório
+    anterior apenas depois que a gravação terminou.
+    """
+    base_dir = Path(base_dir)
+    tmp_dir = base_dir / "store.tmp"
+    final_dir = base_dir / "store"
+    old_dir = base_dir / "store.old"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    sections = {}
+    for position, (section_type, index) in enumerate(sorted(indices.items())):
+        dirname = _section_dirname(section_type, position)
+        index.save(tmp_dir / dirname)
+        sections[section_type] = dirname
+    with open(tmp_dir / "sections.json", 'w', encoding='utf-8') as f:
+        json.dump(sections, f, ensure_ascii=False)
+
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if final_dir.exists():
+        os.replace(final_dir, old_dir)
+    os.replace(tmp_dir, final_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def load_bm25_indices(base_dir: Path, mmap: bool = True) -> Dict[str, BM25Index]:
+    """Carrega os índices gravados por ``save_bm25_indices`` (dicionário vazio se não existirem)."""
+    store = Path(base_dir) / "store"
+    sections_file = store / "sections.json"
+    if not sections_file.exists():
+        return {}
+    with open(sections_file, 'r', encoding='utf-8') as f:
+        sections = json.load(f)
+    return {section_type: BM25Index.load(store / dirname, mmap=mmap)
+            for section_type, dirname in sections.items()}
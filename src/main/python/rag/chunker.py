@@ -0,0 +1,337 @@
+"""
+Divisão de textos em chunks para a base de conhecimento.
+
+Usado por todos os caminhos de ingestão (ETPIngestor, upload de PDFs na KB e
+knowledge/parse_etps.py), de modo que os chunks tenham o mesmo formato e tamanho.
+
+Regras:
+- O tamanho é medido em tokens (tiktoken ``cl100k_base`` quando instalado; caso
+  contrário uma estimativa por palavras), não em caracteres.
+- O texto é separado em blocos por linhas em branco, títulos e cláusulas numeradas
+  ("1.2 ...", "a) ...", "IV - ...", "Art. 5º", "§ 1º"); um título inicia um chunk
+  novo, para que seções diferentes não se misturem.
+- Dentro dos blocos o corte é feito entre frases. O ponto de "Lei 14.133/2021",
+  "R$ 1.250,00" ou "3.5" não encerra frase, nem abreviações como "art." e "nº".
+- Seções menores que 1/8 do limite são unidas à seguinte, para não gerar chunks mínimos.
+- Frases maiores que o limite são divididas por ";" / ":" e, em último caso, por palavras;
+  uma "palavra" sem espaços maior que o limite (URL, base64, tabela colada) é cortada
+  em janelas de caracteres.
+- Chunks consecutivos do mesmo trecho repetem as últimas frases do anterior
+  (sobreposição de até ``overlap_tokens``), exceto depois de um título.
+
+Parâmetros padrão: CHUNK_MAX_TOKENS (300) e CHUNK_OVERLAP_TOKENS (50).
+"""
+
+import os
+import re
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TOKENS = 300
+DEFAULT_OVERLAP_TOKENS = 50
+
+# Palavras e sinais de pontuação, para a estimativa de tokens sem tiktoken
+_TOKEN_PIECE = re.compile(r"\w+|[^\w\s]")
+
+# Início de cláusula numerada ou dispositivo legal no começo da linha
+_CLAUSE_START = re.compile(
+    r"^\s*(?:"
+    r"\d{1,3}(?:[.)]|\s*[-–—])\s+\S"          # 1. / 1) / 1 -
+    r"|\d{1,3}(?:\.\d{1,3})+\.?\s+\S"          # 1.2 / 3.4.1
+    r"|[a-z]\)\s+\S"                          # a) b)
+    r"|[IVXLC]{1,6}\s*[-–—.)]\s*\S"           # IV - / IX.
+    r"|(?:Art|ART)\.?\s*\d+"                  # Art. 5º
+    r"|§\s*\d+"                               # § 1º
+    r"|Parágrafo\s+único"
+    r"|[-•*▪]\s+\S"                           # marcadores de lista
+    r")"
+)
+_HEADING_KEYWORD = re.compile(r"^\s*(?:CAP[IÍ]TULO|SE[CÇ][AÃ]O|T[IÍ]TULO|ANEXO)\b", re.IGNORECASE)
+_HEADING_MAX_WORDS = 12
+_NUMBERED_HEADING = re.compile(r"^\d{1,3}(?:\.\d{1,3})*[.)]?\s+[A-ZÀ-Ý]")
+_NUMBERED_HEADING_MAX_WORDS = 8
+
+# Fim de frase: pontuação final seguida de espaço e de início de frase
+_SENTENCE_END = re.compile(r"[.!?…]+[\"'”’)\]]*\s+(?=[\"'“(\[]?[A-ZÀ-Ý0-9§])")
+_ABBREVIATIONS = frozenset({
+    'art', 'arts', 'inc', 'incs', 'al', 'n', 'nº', 'no', 'nos', 'núm', 'num', 'fl', 'fls', 'p', 'pp', 'pág',
+    'págs', 'cap', 'sr', 'sra', 'srs', 'dr', 'dra', 'prof', 'profa', 'exmo', 'exma', 'ilmo', 'ilma', 'cf',
+    'ex', 'obs', 'aprox', 'tel', 'ref', 'doc', 'docs', 'vol', 'ed', 'id', 'ib', 'ibid', 'op', 'cit', 'min',
+    'máx', 'max', 'mín', 'séc', 'ltda', 'cia', 'av', 'res', 'dec', 'port', 'in', 'lc', 'par', 'parág',
+})
+_CLAUSE_SEPARATOR = re.compile(r"(?<=[;:])\s+")
+
+
+@dataclass
+class _Sentence:
+    text: str
+    tokens: int
+    starts_section: bool = False
+
+
+@lru_cache(maxsize=1)
+def _tiktoken_encoding():
+    """Codificação do tiktoken, se o pacote estiver instalado e a tabela disponível (senão None)"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(os.getenv('CHUNK_TOKENIZER_ENCODING', 'cl100k_base'))
+    except Exception as e:
+        logger.debug(f"tiktoken indisponível, usando estimativa de tokens: {e}")
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa de tokens sem tokenizador (~4 caracteres por token em palavras longas, 1 por sinal)"""
+    total = 0
+    for piece in _TOKEN_PIECE.findall(text or ''):
+        total += max(1, (len(piece) + 2) // 4)
+    return total
+
+
+def count_tokens(text: str) -> int:
+    """Número de tokens do texto (tiktoken quando disponível, senão ``estimate_tokens``)"""
+    if not text:
+        return 0
+    encoding = _tiktoken_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def default_max_tokens() -> int:
+    return int(os.getenv('CHUNK_MAX_TOKENS', str(DEFAULT_MAX_TOKENS)))
+
+
+def default_overlap_tokens() -> int:
+    return int(os.getenv('CHUNK_OVERLAP_TOKENS', str(DEFAULT_OVERLAP_TOKENS)))
+
+
+def is_heading(line: str) -> bool:
+    """Linha curta que funciona como título (CAPÍTULO/SEÇÃO/ANEXO, caixa alta ou item numerado sem ponto final)"""
+    line = line.strip()
+    if not line or len(line.split()) > _HEADING_MAX_WORDS or line[-1] in '.;,':
+        return False
+    if _HEADING_KEYWORD.match(line):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) >= 3 and all(c.isupper() for c in letters):
+        return True
+    # Item numerado curto ("2. Descrição da Necessidade"); linhas longas são cláusulas quebradas pelo PDF
+    return (bool(_NUMBERED_HEADING.match(line)) and len(line.split()) <= _NUMBERED_HEADING_MAX_WORDS
+            and line[-1] != ':')
+
+
+def _fragmented(lines: List[str]) -> bool:
+    """True se a maioria das linhas tem uma palavra só (PDFs cujo texto sai palavra por palavra)"""
+    filled = [line for line in lines if line]
+    return len(filled) >= 20 and sum(1 for line in filled if ' ' not in line) > len(filled) / 2
+
+
+def split_blocks(text: str) -> List[tuple]:
+    """
+    Separa o texto em blocos estruturais.
+
+    Returns:
+        Lista de (texto, é_título); linhas quebradas do mesmo parágrafo são unidas
+    """
+    blocks = []
+    current: List[str] = []
+
+    def flush():
+        if current:
+            blocks.append((" ".join(current), False))
+            current.clear()
+
+    lines = [" ".join(raw_line.split()) for raw_line in (text or '').splitlines()]
+    if _fragmented(lines):
+        # Extração que quebra a linha a cada palavra: só as linhas em branco separam blocos
+        lines = [" ".join(paragraph.split()) for paragraph in re.split(r"\n\s*\n", text)]
+        return [(paragraph, False) for paragraph in lines if paragraph]
+
+    for line in lines:
+        if not line:
+            flush()
+        elif is_heading(line):
+            flush()
+            blocks.append((line, True))
+        elif _CLAUSE_START.match(line):
+            flush()
+            current.append(line)
+        else:
+            current.append(line)
+    flush()
+    return blocks
+
+
+def split_sentences(text: str) -> List[str]:
+    """Divide um bloco em frases sem cortar números ("14.133/2021", "1.250,00") nem abreviações ("art. 75")"""
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        before = text[start:match.start()].split()
+        last_word = before[-1].lower().strip('("“[') if before else ''
+        if match.group().startswith('.') and (last_word in _ABBREVIATIONS or re.fullmatch(r"[a-zà-ý]", last_word)):
+            continue
+        sentence = text[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def _hard_split(word: str, max_tokens: int) -> List[str]:
+    """Corta uma sequência sem espaços maior que o limite em janelas de caracteres de até ``max_tokens``"""
+    # Tamanho inicial da janela pela média de caracteres por token da sequência inteira
+    window = max(1, len(word) * max_tokens // count_tokens(word))
+    pieces = []
+    start = 0
+    while start < len(word):
+        size = window
+        while size > 1 and count_tokens(word[start:start + size]) > max_tokens:
+            size = min(size - 1, size * 9 // 10)
+        pieces.append(word[start:start + size])
+        start += size
+    return pieces
+
+
+def _split_oversized(sentence: str, max_tokens: int, overlap_tokens: int) -> List[str]:
+    """Divide uma frase maior que o limite por ";"/":" e, se ainda preciso, em janelas de palavras"""
+    pieces = []
+    for part in _CLAUSE_SEPARATOR.split(sentence):
+        if count_tokens(part) <= max_tokens:
+            pieces.append(part)
+            continue
+        words = part.split()
+        window: List[str] = []
+        window_tokens = 0
+        for word in words:
+            word_tokens = count_tokens(word)
+            if word_tokens > max_tokens:
+                # Último recurso: a palavra sozinha não cabe no limite e vira janelas próprias (sem sobreposição)
+                if window:
+                    pieces.append(" ".join(window))
+                pieces.extend(_hard_split(word, max_tokens))
+                window, window_tokens = [], 0
+                continue
+            if window and window_tokens + word_tokens > max_tokens:
+                pieces.append(" ".join(window))
+                # Sobreposição por palavras dentro da frase longa
+                carried: List[str] = []
+                carried_tokens = 0
+                for previous in reversed(window):
+                    previous_tokens = count_tokens(previous)
+                    if carried_tokens + previous_tokens > overlap_tokens:
+                        break
+                    carried.insert(0, previous)
+                    carried_tokens += previous_tokens
+                window, window_tokens = carried, carried_tokens
+            window.append(word)
+            window_tokens += word_tokens
+        if window:
+            pieces.append(" ".join(window))
+    return _merge_small(pieces, max_tokens)
+
+
+def _merge_small(pieces: List[str], max_tokens: int) -> List[str]:
+    """Junta partes vizinhas enquanto couberem no limite"""
+    merged: List[str] = []
+    for piece in pieces:
+        if merged and count_tokens(merged[-1] + " " + piece) <= max_tokens:
+            merged[-1] = merged[-1] + " " + piece
+        else:
+            merged.append(piece)
+    return merged
+
+
+def _sentences(text: str, max_tokens: int, overlap_tokens: int) -> List[_Sentence]:
+    units: List[_Sentence] = []
+    pending_heading = False
+    for block, heading in split_blocks(text):
+        if heading:
+            # Títulos seguidos ficam juntos e abrem a próxima seção
+            if pending_heading and units:
+                units[-1].text += " " + block
+                units[-1].tokens = count_tokens(units[-1].text)
+            else:
+                units.append(_Sentence(block, count_tokens(block), starts_section=True))
+            pending_heading = True
+            continue
+        pending_heading = False
+        for sentence in split_sentences(block):
+            tokens = count_tokens(sentence)
+            if tokens <= max_tokens:
+                units.append(_Sentence(sentence, tokens))
+            else:
+                units.extend(_Sentence(piece, count_tokens(piece))
+                             for piece in _split_oversized(sentence, max_tokens, overlap_tokens))
+    return units
+
+
+def chunk_text(text: str, max_tokens: Optional[int] = None, overlap_tokens: Optional[int] = None) -> List[str]:
+    """
+    Divide o texto em chunks de até ``max_tokens`` tokens.
+
+    Args:
+        text: Texto a dividir
+        max_tokens: Tamanho máximo de cada chunk (padrão CHUNK_MAX_TOKENS)
+        overlap_tokens: Tokens das últimas frases repetidos no chunk seguinte (padrão CHUNK_OVERLAP_TOKENS)
+
+    Returns:
+        Lista de chunks (textos que já cabem no limite são devolvidos inteiros)
+    """
+    max_tokens = max_tokens or default_max_tokens()
+    overlap_tokens = default_overlap_tokens() if overlap_tokens is None else overlap_tokens
+    overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+
+    text = (text or '').strip()
+    if not text:
+        return []
+    if count_tokens(text) <= max_tokens:
+        return [text]
+
+    # Seções menores que isso são unidas à seguinte em vez de virarem um chunk isolado
+    min_tokens = max_tokens // 8
+    chunks: List[str] = []
+    current: List[_Sentence] = []
+    current_tokens = 0
+    # Frases do início do chunk atual que vieram por sobreposição (não justificam um chunk sozinhas)
+    carried, carried_tokens = 0, 0
+
+    def emit():
+        if len(current) > carried:
+            chunks.append(" ".join(unit.text for unit in current))
+
+    for unit in _sentences(text, max_tokens, overlap_tokens):
+        if unit.starts_section:
+            if len(current) == carried:
+                current, current_tokens, carried, carried_tokens = [], 0, 0, 0
+            elif current_tokens - carried_tokens >= min_tokens:
+                emit()
+                current, current_tokens, carried, carried_tokens = [], 0, 0, 0
+        if current and current_tokens + unit.tokens > max_tokens:
+            emit()
+            overlap: List[_Sentence] = []
+            overlap_size = 0
+            for previous in reversed(current):
+                if overlap_size + previous.tokens > overlap_tokens or previous.starts_section:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += previous.tokens
+            if unit.starts_section or overlap_size + unit.tokens > max_tokens:
+                overlap, overlap_size = [], 0
+            # O título da seção continua à frente do trecho seguinte
+            elif current[0].starts_section and current[0].tokens + overlap_size + unit.tokens <= max_tokens:
+                overlap.insert(0, current[0])
+                overlap_size += current[0].tokens
+            current, current_tokens, carried, carried_tokens = overlap, overlap_size, len(overlap), overlap_size
+        current.append(unit)
+        current_tokens += unit.tokens
+    emit()
+    return chunks
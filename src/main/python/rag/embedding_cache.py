@@ -0,0 +1,206 @@
+"""
+Cache persistente de embeddings endereçado por conteúdo.
+
+As entradas ficam em um arquivo SQLite (modo WAL) compartilhado entre processos,
+com chave estável = sha256(modelo + texto normalizado). Isso evita que cada worker
+do gunicorn gere novamente o embedding das mesmas consultas e que a chave mude a
+cada execução (como acontecia com ``hash(text)``).
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from pathlib import Path
+from typing import List, Dict, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_embedding_cache_last_access ON embedding_cache(last_access);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Normalização usada na chave: Unicode NFC, espaços colapsados e bordas removidas."""
+    text = unicodedata.normalize("NFC", text or "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def cache_key(model: str, text: str) -> str:
+    """Chave estável entre processos e execuções para (modelo, texto)."""
+    payload = f"{model}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def default_cache_path() -> Path:
+    project_root = Path(__file__).parent.parent.parent.parent.parent
+    return Path(os.getenv('EMBEDDINGS_CACHE_PATH', project_root / "data" / "cache" / "embeddings.sqlite3"))
+
+
+class EmbeddingCache:
+    """
+    Cache LRU de embeddings em disco.
+
+    - ``max_entries`` limita o tamanho; ao exceder, as entradas menos acessadas são removidas
+    - ``hits``/``misses`` contam os acessos desta instância (ver ``stats()``)
+    - Falhas de SQLite nunca propagam: o cache se comporta como vazio
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_entries: Optional[int] = None):
+        self.path = Path(path) if path else default_cache_path()
+        self.max_entries = max_entries or int(os.getenv('EMBEDDINGS_CACHE_MAX_ENTRIES', '200000'))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Retorna o embedding em cache ou None."""
+        return self.get_many(model, [text])[0]
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Consulta vários textos de uma vez; a lista retornada é alinhada com ``texts``."""
+        keys = [cache_key(model, t) for t in texts]
+        found: Dict[str, List[float]] = {}
+        try:
+            conn = self._connection()
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), 500):
+                part = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embedding_cache WHERE key IN ({placeholders})", part
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                now = time.time()
+                conn.executemany("UPDATE embedding_cache SET last_access = ? WHERE key = ?",
+                                 [(now, key) for key in found])
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"[EMBED-CACHE] Falha na leitura do cache: {e}")
+
+        results = [found.get(key) for key in keys]
+        hits = sum(1 for r in results if r is not None)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put(self, model: str, text: str, vector: Sequence[float]) -> None:
+        """Armazena um embedding."""
+        self.put_many(model, [text], [vector])
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Optional[Sequence[float]]]) -> None:
+        """Armazena vários embeddings; itens com vetor None são ignorados."""
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            if vector is None:
+                continue
+            arr = np.asarray(vector, dtype=np.float32)
+            rows.append((cache_key(model, text), model, int(arr.shape[0]), arr.tobytes(), now))
+        if not rows:
+            return
+        try:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (key, model, dim, vector, last_access) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+            self._evict(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"[EMBED-CACHE] Falha na escrita do cache: {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Remove as entradas menos usadas recentemente quando o limite é excedido."""
+        count = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Folga de 5% para não executar a remoção a cada escrita
+        excess = count - self.max_entries + max(1, self.max_entries // 20)
+        conn.execute(
+            "DELETE FROM embedding_cache WHERE key IN "
+            "(SELECT key FROM embedding_cache ORDER BY last_access ASC LIMIT ?)",
+            (excess,)
+        )
+        conn.commit()
+        with self._lock:
+            self.evictions += excess
+        logger.info(f"[EMBED-CACHE] {excess} entradas removidas (LRU)")
+
+    def __len__(self) -> int:
+        try:
+            return self._connection().execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def stats(self) -> Dict:
+        """Contadores de uso desta instância e tamanho atual do cache."""
+        total = self.hits + self.misses
+        return {
+            'path': str(self.path),
+            'entries': len(self),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# Instância compartilhada por processo
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Retorna o cache de embeddings do processo, ou None se desabilitado
+    (EMBEDDINGS_CACHE_ENABLED=false) ou indisponível.
+    """
+    global _cache_instance
+
+    if os.getenv('EMBEDDINGS_CACHE_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+        return None
+
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                try:
+                    _cache_instance = EmbeddingCache()
+                except (sqlite3.Error, OSError) as e:
+                    logger.warning(f"[EMBED-CACHE] Cache de embeddings indisponível: {e}")
+                    return None
+    return _cache_instance
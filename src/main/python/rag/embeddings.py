@@ -0,0 +1,252 @@
+"""
+Pipeline de geração de embeddings em lote para o sistema RAG.
+Agrupa textos em lotes limitados por quantidade e tamanho, envia vários lotes
+em paralelo com limite de concorrência e aplica retry com backoff exponencial.
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import List, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+DEFAULT_EMBEDDING_DIMENSION = 1536
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_embedding_model() -> str:
+    """Modelo de embedding configurado (EMBEDDINGS_MODEL, padrão text-embedding-3-small)."""
+    return os.getenv('EMBEDDINGS_MODEL', DEFAULT_EMBEDDING_MODEL)
+
+
+def prepare_embedding_input(text: str) -> str:
+    """Normaliza o texto enviado ao provedor de embeddings (mesma regra usada historicamente)."""
+    return (text or "").replace("\n", " ")
+
+
+class StubEmbeddingClient:
+    """
+    Provedor local de embeddings, compatível com ``openai.OpenAI().embeddings.create``.
+
+    Gera vetores determinísticos por hashing de tokens (bag-of-words), de modo que
+    textos com vocabulário parecido ficam próximos. Serve para testes e benchmarks
+    offline sem acesso à rede; ``latency`` simula o tempo de ida e volta por requisição.
+    """
+
+    def __init__(self, dimension: int = DEFAULT_EMBEDDING_DIMENSION, latency: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+        self.calls = 0
+        # Permite usar a instância como ``client.embeddings.create(...)``
+        self.embeddings = self
+
+    def create(self, model: str = DEFAULT_EMBEDDING_MODEL, input=None, **kwargs):
+        texts = [input] if isinstance(input, str) else list(input or [])
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        data = [
+            SimpleNamespace(index=i, embedding=self.vector(text).tolist(), object="embedding")
+            for i, text in enumerate(texts)
+        ]
+        return SimpleNamespace(data=data, model=model, usage=None)
+
+    def vector(self, text: str) -> np.ndarray:
+        """Vetor determinístico e normalizado (L2) para o texto."""
+        vec = np.zeros(self.dimension, dtype=np.float32)
+        for token in re.findall(r"\w+", (text or "").lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            idx = int.from_bytes(digest[:4], "little") % self.dimension
+            vec[idx] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec
+
+
+class EmbeddingPipeline:
+    """
+    Gera embeddings para muitos textos com poucas requisições ao provedor.
+
+    - Lotes limitados por quantidade de itens (``batch_size``) e por caracteres (``max_batch_chars``)
+    - Até ``max_concurrency`` lotes em voo simultaneamente
+    - Retry com backoff exponencial e jitter por lote; lotes que esgotam as tentativas retornam None
+
+    Se ``cache`` (EmbeddingCache) for informado, textos já embedados são lidos do cache
+    e apenas os ausentes são enviados ao provedor.
+
+    Os parâmetros podem ser definidos por variáveis de ambiente:
+    EMBEDDINGS_BATCH_SIZE, EMBEDDINGS_MAX_BATCH_CHARS, EMBEDDINGS_MAX_CONCURRENCY,
+    EMBEDDINGS_MAX_RETRIES e EMBEDDINGS_BACKOFF_SECONDS.
+    """
+
+    def __init__(self, client, model: str = None, batch_size: int = None,
+                 max_batch_chars: int = None, max_concurrency: int = None,
+                 max_retries: int = None, backoff_seconds: float = None, cache=None):
+        self.client = client
+        self.cache = cache
+        self.model = model or get_embedding_model()
+        self.batch_size = max(1, batch_size or _env_int('EMBEDDINGS_BATCH_SIZE', 128))
+        self.max_batch_chars = max(1, max_batch_chars or _env_int('EMBEDDINGS_MAX_BATCH_CHARS', 200000))
+        self.max_concurrency = max(1, max_concurrency or _env_int('EMBEDDINGS_MAX_CONCURRENCY', 4))
+        self.max_retries = max_retries if max_retries is not None else _env_int('EMBEDDINGS_MAX_RETRIES', 3)
+        self.backoff_seconds = backoff_seconds if backoff_seconds is not None else _env_float('EMBEDDINGS_BACKOFF_SECONDS', 1.0)
+
+        self.stats = {'requests': 0, 'batches': 0, 'retries': 0, 'failed_batches': 0, 'embedded': 0, 'cache_hits': 0}
+        self._stats_lock = threading.Lock()
+
+    def _bump(self, key: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def make_batches(self, texts: Sequence[str]) -> List[List[int]]:
+        """
+        Agrupa os índices dos textos não vazios em lotes respeitando os limites configurados.
+
+        Returns:
+            Lista de lotes, cada um com os índices (posição em ``texts``) dos itens do lote
+        """
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_chars = 0
+
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                continue
+            size = len(text)
+            if current and (len(current) >= self.batch_size or current_chars + size > self.max_batch_chars):
+                batches.append(current)
+                current, current_chars = [], 0
+            current.append(i)
+            current_chars += size
+
+        if current:
+            batches.append(current)
+        return batches
+
+    def embed_texts(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        Gera embeddings preservando a ordem de entrada.
+
+        Returns:
+            Lista alinhada com ``texts``; textos vazios ou lotes com falha ficam como None
+        """
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        if not self.client or not texts:
+            return results
+
+        prepared = [prepare_embedding_input(t) for t in texts]
+
+        if self.cache is not None:
+            cached = self.cache.get_many(self.model, prepared)
+            for i, vector in enumerate(cached):
+                if vector is not None:
+                    results[i] = vector
+                    prepared[i] = ""  # não reenviar ao provedor
+            self._bump('cache_hits', sum(1 for v in cached if v is not None))
+
+        batches = self.make_batches(prepared)
+        if not batches:
+            return results
+
+        logger.info(f"[EMBED] {len(prepared)} textos em {len(batches)} lotes "
+                    f"(batch_size={self.batch_size}, concorrência={self.max_concurrency})")
+
+        workers = min(self.max_concurrency, len(batches))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self._embed_batch, [prepared[i] for i in batch]) for batch in batches]
+            for batch, future in zip(batches, futures):
+                vectors = future.result()
+                if vectors is None:
+                    continue
+                for i, vector in zip(batch, vectors):
+                    results[i] = vector
+                if self.cache is not None:
+                    self.cache.put_many(self.model, [prepared[i] for i in batch], vectors)
+
+        self._bump('embedded', sum(1 for r in results if r is not None))
+        return results
+
+    def embed_chunks(self, chunks: Sequence) -> Dict[int, List[float]]:
+        """
+        Gera embeddings para objetos com ``id`` e ``content``/``content_text`` (ex.: KbChunk).
+
+        Returns:
+            Dicionário chunk_id -> embedding, apenas para os chunks embedados com sucesso
+        """
+        texts = [getattr(chunk, 'content', None) or getattr(chunk, 'content_text', None) or '' for chunk in chunks]
+        vectors = self.embed_texts(texts)
+        return {chunk.id: vector for chunk, vector in zip(chunks, vectors) if vector is not None}
+
+    def _embed_batch(self, batch_texts: List[str]) -> Optional[List[List[float]]]:
+        """Envia um lote ao provedor com retry/backoff. Retorna None se todas as tentativas falharem."""
+        self._bump('batches')
+        attempt = 0
+        while True:
+            try:
+                self._bump('requests')
+                response = self.client.embeddings.create(model=self.model, input=batch_texts)
+                data = sorted(response.data, key=lambda item: getattr(item, 'index', 0))
+                if len(data) != len(batch_texts):
+                    raise ValueError(f"resposta com {len(data)} embeddings para {len(batch_texts)} textos")
+                return [list(item.embedding) for item in data]
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    self._bump('failed_batches')
+                    logger.error(f"[EMBED] Lote de {len(batch_texts)} textos falhou após {attempt + 1} tentativas: {e}")
+                    return None
+                delay = self.backoff_seconds * (2 ** attempt) * (1 + random.random() * 0.25)
+                attempt += 1
+                self._bump('retries')
+                logger.warning(f"[EMBED] Erro no lote ({e}); tentativa {attempt}/{self.max_retries} em {delay:.2f}s")
+                time.sleep(delay)
+
+
+def write_embeddings_bulk(session, embeddings: Dict[int, List[float]], serialize: bool = False,
+                          batch_size: int = 1000) -> int:
+    """
+    Grava embeddings em ``KbChunk.embedding`` com UPDATEs em massa.
+
+    Args:
+        session: Sessão SQLAlchemy (normalmente ``db.session``)
+        embeddings: Dicionário chunk_id -> embedding
+        serialize: Se True, grava o vetor como string JSON (formato usado pelo ingestor)
+        batch_size: Quantidade de linhas por ``bulk_update_mappings``
+
+    Returns:
+        int: Número de chunks atualizados
+    """
+    from domain.dto.KbDto import KbChunk
+
+    items: List[Tuple[int, List[float]]] = list(embeddings.items())
+    for start in range(0, len(items), batch_size):
+        mappings = [
+            {'id': chunk_id, 'embedding': json.dumps(vector) if serialize else vector}
+            for chunk_id, vector in items[start:start + batch_size]
+        ]
+        session.bulk_update_mappings(KbChunk, mappings)
+    return len(items)
@@ -0,0 +1,102 @@
+"""
+Avaliação offline da recuperação (recall@k e MRR) sobre consultas rotuladas.
+
+Cada caso é um par consulta -> chunks relevantes, lido de um arquivo JSONL:
+
+    {"query": "manutenção de frota", "sections": ["requisito"], "objective_slug": "", "relevant": [12, 57]}
+
+``sections`` e ``objective_slug`` são opcionais (padrão: ``["requisito"]`` e ``""``).
+Comparando métodos de fusão e valores de ``k`` é possível reduzir o ``k`` (e o
+tamanho do prompt) sem perder recall.
+"""
+
+import json
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Dict, Sequence
+
+from rag.fusion import get_fusion_config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetrievalCase:
+    """Consulta rotulada com os chunks considerados relevantes"""
+    query: str
+    relevant: List[int]
+    sections: List[str] = field(default_factory=lambda: ['requisito'])
+    objective_slug: str = ''
+
+
+def load_cases(path: Path) -> List[RetrievalCase]:
+    """Lê os casos rotulados de um arquivo JSONL (linhas vazias e ``#`` são ignoradas)."""
+    cases = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                item = json.loads(line)
+                cases.append(RetrievalCase(
+                    query=item['query'],
+                    relevant=[int(chunk_id) for chunk_id in item['relevant']],
+                    sections=item.get('sections') or ['requisito'],
+                    objective_slug=item.get('objective_slug', ''),
+                ))
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Caso de avaliação inválido na linha {line_no}: {e}")
+    return cases
+
+
+def recall_at_k(retrieved: Sequence[int], relevant: Sequence[int], k: int) -> float:
+    """Fração dos chunks relevantes presentes entre os ``k`` primeiros recuperados."""
+    if not relevant:
+        return 0.0
+    return len(set(retrieved[:k]) & set(relevant)) / len(set(relevant))
+
+
+def reciprocal_rank(retrieved: Sequence[int], relevant: Sequence[int]) -> float:
+    """1 / posição do primeiro chunk relevante (0 se nenhum foi recuperado)."""
+    relevant = set(relevant)
+    for position, chunk_id in enumerate(retrieved, start=1):
+        if chunk_id in relevant:
+            return 1.0 / position
+    return 0.0
+
+
+def evaluate_retrieval(retrieval, cases: Sequence[RetrievalCase], methods: Sequence[str],
+                       ks: Sequence[int]) -> Dict[str, Dict[str, float]]:
+    """
+    Executa os casos para cada método de fusão e calcula as métricas médias.
+
+    Para cada caso, os resultados das seções são intercalados por ``hybrid_score``,
+    como fazem os estágios que consultam várias seções.
+
+    Args:
+        retrieval: Instância de ``RAGRetrieval`` com índices carregados
+        cases: Casos rotulados
+        methods: Métodos de fusão a comparar ('minmax', 'zscore', 'rrf', 'raw')
+        ks: Valores de k a avaliar
+
+    Returns:
+        Dicionário método -> {'recall@k': ..., 'mrr': ...}
+    """
+    max_k = max(ks)
+    report = {}
+    for method in methods:
+        fusion = get_fusion_config(method=method)
+        totals = {f'recall@{k}': 0.0 for k in ks}
+        totals['mrr'] = 0.0
+        for case in cases:
+            by_section = retrieval.search_sections(case.query, case.sections, case.objective_slug, max_k, fusion)
+            merged = sorted((r for results in by_section.values() for r in results),
+                            key=lambda r: r['hybrid_score'], reverse=True)
+            retrieved = [r['chunk_id'] for r in merged]
+            for k in ks:
+                totals[f'recall@{k}'] += recall_at_k(retrieved, case.relevant, k)
+            totals['mrr'] += reciprocal_rank(retrieved[:max_k], case.relevant)
+        report[method] = {name: round(value / len(cases), 4) if cases else 0.0 for name, value in totals.items()}
+    return report
@@ -0,0 +1,141 @@
+"""
+Fusão dos resultados BM25 e vetoriais da busca híbrida.
+
+Os scores BM25 não têm limite superior e os do índice vetorial são cossenos em
+[-1, 1]; somá-los diretamente faz o BM25 dominar a ordenação. Os métodos abaixo
+colocam as duas listas na mesma escala antes de combinar:
+
+- ``minmax``: normaliza cada lista para [0, 1] e aplica os pesos
+- ``zscore``: padroniza cada lista (média 0, desvio 1) e aplica os pesos
+- ``rrf``: Reciprocal Rank Fusion, soma de 1 / (rrf_k + posição); ignora os scores
+- ``raw``: soma ponderada dos scores brutos (comportamento anterior)
+
+O método padrão vem de RAG_FUSION_METHOD e pode ser sobrescrito por estágio em
+RAG_FUSION_STAGE_METHODS (ex.: ``legal_norms:rrf,summary:zscore``).
+"""
+
+import os
+import logging
+from dataclasses import dataclass
+from typing import List, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FUSION_METHODS = ('minmax', 'zscore', 'rrf', 'raw')
+
+
+@dataclass(frozen=True)
+class FusionConfig:
+    """Parâmetros da fusão híbrida"""
+    method: str = 'minmax'
+    bm25_weight: float = 0.7
+    faiss_weight: float = 0.3
+    rrf_k: int = 60
+
+
+def _stage_methods() -> Dict[str, str]:
+    methods = {}
+    for item in os.getenv('RAG_FUSION_STAGE_METHODS', '').split(','):
+        stage, sep, method = item.partition(':')
+        if sep and stage.strip() and method.strip():
+            methods[stage.strip()] = method.strip().lower()
+    return methods
+
+
+def get_fusion_config(stage: Optional[str] = None, method: Optional[str] = None) -> FusionConfig:
+    """
+    Configuração de fusão para um estágio, a partir das variáveis de ambiente.
+
+    Args:
+        stage: Estágio do fluxo (chave de ``RAG_FUSION_STAGE_METHODS``)
+        method: Método explícito; tem precedência sobre o ambiente
+    """
+    chosen = method or _stage_methods().get(stage or '') or os.getenv('RAG_FUSION_METHOD', 'minmax').lower()
+    if chosen not in FUSION_METHODS:
+        logger.warning(f"[RAG] Método de fusão desconhecido '{chosen}', usando minmax")
+        chosen = 'minmax'
+    return FusionConfig(
+        method=chosen,
+        bm25_weight=float(os.getenv('RAG_FUSION_BM25_WEIGHT', '0.7')),
+        faiss_weight=float(os.getenv('RAG_FUSION_FAISS_WEIGHT', '0.3')),
+        rrf_k=int(os.getenv('RAG_FUSION_RRF_K', '60')),
+    )
+
+
+def normalize_scores(scores: List[float], method: str) -> np.ndarray:
+    """
+    Normaliza uma lista de scores para ``minmax`` ([0, 1]) ou ``zscore``.
+    Listas constantes recebem 1.0 (minmax, se positivas) ou 0.0 para todos os itens.
+    """
+    values = np.asarray(scores, dtype=np.float64)
+    if values.size == 0:
+        return values
+    if method == 'minmax':
+        low, high = values.min(), values.max()
+        if high - low <= 1e-12:
+            return np.ones_like(values) if high > 0 else np.zeros_like(values)
+        return (values - low) / (high - low)
+    if method == 'zscore':
+        std = values.std()
+        if std <= 1e-12:
+            return np.zeros_like(values)
+        return (values - values.mean()) / std
+    return values
+
+
+def fuse_results(bm25_results: List[Dict], faiss_results: List[Dict], k: int,
+                 config: Optional[FusionConfig] = None) -> List[Dict]:
+    """
+    Combina os resultados BM25 e vetoriais de uma seção.
+
+    Cada resultado mantém ``bm25_score`` e ``faiss_score`` brutos e recebe
+    ``hybrid_score`` calculado pelo método configurado.
+
+    Returns:
+        Top-k resultados em ordem decrescente de ``hybrid_score``
+    """
+    config = config or get_fusion_config()
+    all_results: Dict[int, Dict] = {}
+
+    for result in bm25_results:
+        all_results[result['chunk_id']] = {**result, 'bm25_score': result['score'], 'faiss_score': 0.0}
+    for result in faiss_results:
+        chunk_id = result['chunk_id']
+        if chunk_id in all_results:
+            all_results[chunk_id]['faiss_score'] = result['score']
+        else:
+            all_results[chunk_id] = {**result, 'bm25_score': 0.0, 'faiss_score': result['score']}
+
+    fused = {chunk_id: 0.0 for chunk_id in all_results}
+    sources = ((bm25_results, config.bm25_weight), (faiss_results, config.faiss_weight))
+
+    if config.method == 'raw':
+        for chunk_id, result in all_results.items():
+            fused[chunk_id] = config.bm25_weight * result['bm25_score'] + config.faiss_weight * result['faiss_score']
+
+    elif config.method == 'rrf':
+        for results, _ in sources:
+            # BM25 completa a lista com documentos de score 0, que não são correspondências
+            ranked = [r for r in results if r['source'] != 'bm25' or r['score'] > 0]
+            for rank, result in enumerate(ranked, start=1):
+                fused[result['chunk_id']] += 1.0 / (config.rrf_k + rank)
+
+    else:
+        for results, weight in sources:
+            if not results:
+                continue
+            normalized = normalize_scores([r['score'] for r in results], config.method)
+            # Ausente da lista = 0 (minmax) ou o pior valor padronizado da lista (zscore)
+            floor = 0.0 if config.method == 'minmax' else float(normalized.min())
+            present = {r['chunk_id']: float(value) for r, value in zip(results, normalized)}
+            for chunk_id in fused:
+                fused[chunk_id] += weight * present.get(chunk_id, floor)
+
+    ranked = []
+    for chunk_id, result in all_results.items():
+        result['hybrid_score'] = fused[chunk_id]
+        ranked.append(result)
+    ranked.sort(key=lambda r: r['hybrid_score'], reverse=True)
+    return ranked[:k]
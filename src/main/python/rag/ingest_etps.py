@@ -9,13 +9,12 @@ import json
 import logging
 import argparse
 import uuid
+import hashlib
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Tuple
 import numpy as np
-import faiss
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-import PyPDF2
 
 # Adicionar src/main/python ao path para imports
 current_dir = Path(__file__).parent.parent
@@ -23,6 +22,12 @@ sys.path.insert(0, str(current_dir))
 
 from domain.dto.KnowledgeBaseDto import KbDocument, KbChunk, KnowledgeBaseDocument
 from domain.interfaces.dataprovider.DatabaseConfig import db
+from application.services.pdf_extraction import get_pdf_extractor
+from rag.embeddings import EmbeddingPipeline, write_embeddings_bulk, prepare_embedding_input, get_embedding_model
+from rag.embedding_cache import get_embedding_cache
+from rag.chunker import chunk_text
+from rag.vector_index import (default_index_dir, save_vector_index, load_vector_index, read_manifest,
+                              manifest_is_current, kb_fingerprint, partition_order)
 
 # Configurar logging
 logging.basicConfig(
@@ -31,6 +36,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+def content_hash(*parts: str) -> str:
+    """sha256 (hex) das partes de texto, separadas por NUL"""
+    return hashlib.sha256("\x00".join(part or '' for part in parts).encode('utf-8')).hexdigest()
+
+
+def file_hash(path: Path) -> str:
+    """sha256 (hex) do conteúdo binário de um arquivo"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
 class ETPIngestor:
     """Classe para ingerir ETPs na base de conhecimento"""
     
@@ -54,6 +74,10 @@ class ETPIngestor:
         
         self.openai_client = openai_client
         self.embeddings_provider = os.getenv('EMBEDDINGS_PROVIDER', 'openai')
+        self.embedding_cache = get_embedding_cache()
+        
+        # Seções com chunks adicionados/removidos na última ingestão (para atualizar o BM25)
+        self._reset_ingest_stats()
         
         # NÃO criar engine próprio - usar sempre o shared session do db
         
@@ -61,7 +85,7 @@ class ETPIngestor:
         self.project_root = Path(__file__).parent.parent.parent.parent.parent
         self.parsed_dir = self.project_root / "knowledge" / "etps" / "parsed"
         self.raw_pdfs_dir = self.project_root / "knowledge" / "etps" / "raw"
-        self.index_dir = Path("/app/data/indices")  # Caminho padrão conforme especificação
+        self.index_dir = default_index_dir()  # RAG_INDEX_DIR, padrão /app/data/indices
         
         # Criar diretórios se não existirem
         self.parsed_dir.mkdir(parents=True, exist_ok=True)
@@ -72,6 +96,11 @@ class ETPIngestor:
         """
         Ingere PDFs da pasta knowledge/etps/raw/ e arquivos JSONL da pasta knowledge/etps/parsed/
         
+        A ingestão é incremental: fontes com o mesmo hash de conteúdo são ignoradas,
+        chunks inalterados mantêm id e embedding, e apenas os chunks novos são
+        enviados ao provedor de embeddings. Documentos cujo arquivo de origem foi
+        removido das pastas são apagados junto com seus chunks.
+        
         Args:
             rebuild: Se True, limpa dados existentes antes da ingestão
             
@@ -80,10 +109,12 @@ class ETPIngestor:
         """
         try:
             logger.info("Iniciando ingestão de PDFs e arquivos JSONL...")
+            self._reset_ingest_stats()
             
             # Usar sempre o shared db.session do PostgreSQL
             if rebuild:
                 logger.info("Modo rebuild: limpando dados existentes...")
+                self.changed_sections.update(row[0] for row in db.session.query(KbChunk.section_type).distinct())
                 db.session.query(KbChunk).delete()
                 db.session.query(KbDocument).delete()
                 db.session.commit()
@@ -98,13 +129,24 @@ class ETPIngestor:
             jsonl_chunks = self._process_jsonl_files()
             total_chunks += jsonl_chunks
             
+            # Documentos de arquivos que não existem mais (só se a leitura das pastas foi completa)
+            if self.scan_failed:
+                logger.warning("Leitura das pastas incompleta, documentos sem arquivo de origem mantidos")
+            else:
+                self._prune_missing_sources()
+            
             db.session.commit()
-            logger.info(f"Ingestão concluída: {total_chunks} chunks processados")
+            stats = self.ingest_stats
+            logger.info(f"Ingestão concluída: {total_chunks} chunks processados "
+                        f"({stats['skipped_documents']} documentos inalterados, {stats['kept_chunks']} chunks mantidos, "
+                        f"{stats['added_chunks']} novos, {stats['removed_chunks']} removidos, "
+                        f"{stats['removed_documents']} documentos removidos)")
             
-            # Gerar embeddings e criar índice FAISS
+            # Gerar embeddings dos chunks novos e atualizar o índice FAISS
             if self.embeddings_provider == 'openai' and self.openai_client:
                 self._generate_embeddings_and_faiss_index()
             
+            self._refresh_retrieval_indices()
             return True
                 
         except Exception as e:
@@ -112,10 +154,62 @@ class ETPIngestor:
             db.session.rollback()
             return False
 
+    def _reset_ingest_stats(self) -> None:
+        self.changed_sections = set()
+        self.ingest_stats = {'skipped_documents': 0, 'kept_chunks': 0, 'added_chunks': 0, 'removed_chunks': 0,
+                             'removed_documents': 0}
+        # (filename, objective_slug) das fontes encontradas nas pastas nesta ingestão
+        self.seen_sources: Set[Tuple[str, str]] = set()
+        # JSONLs com linhas ilegíveis: seus documentos não são apagados
+        self.protected_filenames: Set[str] = set()
+        self.scan_failed = False
+
+    def _prune_missing_sources(self) -> None:
+        """
+        Apaga os documentos da ingestão por arquivo (com content_hash) cuja fonte não foi
+        encontrada nesta execução, junto com seus chunks; as seções afetadas entram em
+        changed_sections para que BM25 e FAISS deixem de devolvê-los.
+        
+        Documentos enviados pela API (sem content_hash) não são tocados.
+        """
+        missing = [
+            document for document in db.session.query(KbDocument).filter(KbDocument.content_hash.isnot(None)).all()
+            if (document.filename, document.objective_slug) not in self.seen_sources
+            and document.filename not in self.protected_filenames
+        ]
+        if not missing:
+            return
+        
+        document_ids = [document.id for document in missing]
+        chunks = db.session.query(KbChunk).filter(KbChunk.kb_document_id.in_(document_ids)).all()
+        self.changed_sections.update(chunk.section_type for chunk in chunks)
+        db.session.query(KbChunk).filter(KbChunk.kb_document_id.in_(document_ids)).delete(synchronize_session=False)
+        db.session.query(KbDocument).filter(KbDocument.id.in_(document_ids)).delete(synchronize_session=False)
+        
+        self.ingest_stats['removed_chunks'] += len(chunks)
+        self.ingest_stats['removed_documents'] += len(missing)
+        for document in missing:
+            logger.info(f"Documento {document.filename} ({document.objective_slug}) sem arquivo de origem, "
+                        f"removido com {sum(1 for chunk in chunks if chunk.kb_document_id == document.id)} chunks")
+
+    def _refresh_retrieval_indices(self) -> None:
+        """Reconstrói o BM25 apenas das seções alteradas e reabre o índice vetorial no retrieval"""
+        if not self.changed_sections:
+            logger.info("[RAG] Nenhuma seção alterada, índices mantidos")
+            return
+        try:
+            from rag.retrieval import get_retrieval_instance
+            get_retrieval_instance().refresh_sections(self.changed_sections)
+        except Exception as e:
+            logger.warning(f"Não foi possível atualizar os índices de busca: {e}")
+
     def _process_pdfs(self) -> int:
         """
         Processa todos os PDFs da pasta knowledge/etps/raw/
         
+        O texto dos PDFs alterados é extraído em paralelo (PdfExtractor); cada arquivo
+        é gravado no banco assim que sua extração termina.
+        
         Returns:
             int: Número de chunks processados
         """
@@ -129,17 +223,42 @@ class ETPIngestor:
             logger.info(f"Encontrados {len(pdf_files)} arquivos PDF")
             total_chunks = 0
             
+            # PDFs inalterados desde a última ingestão: não extrair novamente
+            to_extract: Dict[str, Tuple[Path, str]] = {}
             for pdf_file in pdf_files:
+                self.seen_sources.add((pdf_file.stem, "requisitos"))
                 try:
-                    logger.info(f"Processando PDF: {pdf_file.name}")
-                    
-                    # Extrair texto do PDF
-                    text_content = self._extract_pdf_text(pdf_file)
+                    source_hash = file_hash(pdf_file)
+                    existing_doc = db.session.query(KbDocument).filter_by(
+                        filename=pdf_file.stem,
+                        objective_slug="requisitos"
+                    ).first()
+                    if existing_doc is not None and existing_doc.content_hash == source_hash:
+                        logger.info(f"PDF {pdf_file.name} inalterado, ignorando")
+                        self.ingest_stats['skipped_documents'] += 1
+                        continue
+                    to_extract[str(pdf_file)] = (pdf_file, source_hash)
+                except Exception as e:
+                    logger.error(f"Erro processando PDF {pdf_file.name}: {e}")
+            
+            if not to_extract:
+                return 0
+            
+            logger.info(f"Extraindo texto de {len(to_extract)} PDFs em paralelo")
+            for result in get_pdf_extractor().iter_files(list(to_extract)):
+                pdf_file, source_hash = to_extract[result.path]
+                try:
+                    if not result.ok:
+                        logger.error(f"Erro extraindo texto do PDF {pdf_file.name}: {result.error}")
+                        continue
                     
+                    text_content = self._format_pdf_pages(result.pages)
                     if not text_content.strip():
                         logger.warning(f"PDF {pdf_file.name} está vazio ou não foi possível extrair texto")
                         continue
                     
+                    logger.info(f"Processando PDF: {pdf_file.name}")
+                    
                     # Criar KnowledgeBaseDocument
                     kb_doc = KnowledgeBaseDocument(
                         id=str(uuid.uuid4()),
@@ -149,7 +268,7 @@ class ETPIngestor:
                     )
                     
                     # Processar e salvar no banco usando db.session
-                    chunks_processed = self._process_knowledge_base_document(kb_doc, pdf_file.stem)
+                    chunks_processed = self._process_knowledge_base_document(kb_doc, pdf_file.stem, source_hash)
                     total_chunks += chunks_processed
                     
                 except Exception as e:
@@ -160,47 +279,36 @@ class ETPIngestor:
             
         except Exception as e:
             logger.error(f"Erro processando PDFs: {e}")
+            self.scan_failed = True
             return 0
 
-    def _extract_pdf_text(self, pdf_path: Path) -> str:
+    @staticmethod
+    def _format_pdf_pages(pages: List[str]) -> str:
         """
-        Extrai texto completo de um arquivo PDF
+        Junta o texto das páginas de um PDF com marcadores de página
         
         Args:
-            pdf_path: Caminho para o arquivo PDF
+            pages: Texto de cada página, em ordem
             
         Returns:
-            str: Texto extraído do PDF
+            str: Texto completo, com "--- Página N ---" antes de cada página não vazia
         """
-        try:
-            text_content = ""
-            
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                for page_num, page in enumerate(pdf_reader.pages):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text.strip():
-                            text_content += f"\n--- Página {page_num + 1} ---\n"
-                            text_content += page_text + "\n"
-                    except Exception as e:
-                        logger.warning(f"Erro extraindo texto da página {page_num + 1} do PDF {pdf_path.name}: {e}")
-                        continue
-            
-            return text_content.strip()
-            
-        except Exception as e:
-            logger.error(f"Erro extraindo texto do PDF {pdf_path}: {e}")
-            return ""
+        text_content = "".join(
+            f"\n--- Página {page_num} ---\n{page_text}\n"
+            for page_num, page_text in enumerate(pages, start=1)
+            if page_text.strip()
+        )
+        return text_content.strip()
 
-    def _process_knowledge_base_document(self, kb_doc: KnowledgeBaseDocument, filename: str) -> int:
+    def _process_knowledge_base_document(self, kb_doc: KnowledgeBaseDocument, filename: str,
+                                         source_hash: Optional[str] = None) -> int:
         """
-        Processa um KnowledgeBaseDocument e cria chunks na base de dados usando db.session
+        Processa um KnowledgeBaseDocument e sincroniza seus chunks na base de dados usando db.session
         
         Args:
             kb_doc: Documento da base de conhecimento
             filename: Nome do arquivo
+            source_hash: Hash do arquivo de origem (registrado no documento)
             
         Returns:
             int: Número de chunks processados
@@ -214,8 +322,6 @@ class ETPIngestor:
             
             if existing_doc:
                 logger.info(f"Documento {filename} já existe, atualizando...")
-                # Remover chunks existentes
-                db.session.query(KbChunk).filter_by(kb_document_id=existing_doc.id).delete()
                 document = existing_doc
             else:
                 # Criar novo documento
@@ -225,23 +331,13 @@ class ETPIngestor:
                 )
                 db.session.add(document)
                 db.session.flush()  # Para obter o ID
+            document.content_hash = source_hash or content_hash(kb_doc.content)
             
             # Dividir conteúdo em chunks
-            chunks = self._split_content(kb_doc.content, max_chars=2000)
-            chunks_processed = 0
-            
-            for chunk_index, chunk_content in enumerate(chunks):
-                kb_chunk = KbChunk(
-                    kb_document_id=document.id,
-                    section_type=kb_doc.section,
-                    content_text=chunk_content.strip(),
-                    objective_slug=kb_doc.section
-                )
-                db.session.add(kb_chunk)
-                chunks_processed += 1
+            chunks = self._split_content(kb_doc.content)
+            specs = [(kb_doc.section, chunk_content.strip()) for chunk_content in chunks]
             
-            logger.info(f"Documento {filename}: {chunks_processed} chunks criados")
-            return chunks_processed
+            return self._sync_document_chunks(document, specs, kb_doc.section, filename)
             
         except Exception as e:
             logger.error(f"Erro processando documento {filename}: {str(e)}")
@@ -287,9 +383,11 @@ class ETPIngestor:
                             
                         except json.JSONDecodeError as e:
                             logger.error(f"Erro JSON na linha {line_num} de {jsonl_file.name}: {e}")
+                            self.protected_filenames.add(jsonl_file.stem)
                             continue
                         except Exception as e:
                             logger.error(f"Erro processando linha {line_num} de {jsonl_file.name}: {e}")
+                            self.protected_filenames.add(jsonl_file.stem)
                             continue
                 
                 logger.info(f"Arquivo {jsonl_file.name}: {file_documents} documentos, {file_chunks} chunks processados")
@@ -299,6 +397,7 @@ class ETPIngestor:
             
         except Exception as e:
             logger.error(f"Erro processando JSONLs: {e}")
+            self.scan_failed = True
             return 0
 
     def ingest_jsonl_files(self, rebuild: bool = False) -> bool:
@@ -313,6 +412,7 @@ class ETPIngestor:
         """
         try:
             logger.info("Iniciando ingestão de arquivos JSONL...")
+            self._reset_ingest_stats()
             
             # Verificar se existem arquivos JSONL
             jsonl_files = list(self.parsed_dir.glob("*.jsonl"))
@@ -328,6 +428,7 @@ class ETPIngestor:
             # Usar db.session diretamente
             if rebuild:
                 logger.info("Modo rebuild: limpando dados existentes...")
+                self.changed_sections.update(row[0] for row in db.session.query(KbChunk.section_type).distinct())
                 db.session.query(KbChunk).delete()
                 db.session.query(KbDocument).delete()
                 db.session.commit()
@@ -371,6 +472,7 @@ class ETPIngestor:
             if self.embeddings_provider == 'openai' and self.openai_client:
                 self._generate_embeddings_and_faiss_index()
             
+            self._refresh_retrieval_indices()
             return True
                 
         except Exception as e:
@@ -391,6 +493,8 @@ class ETPIngestor:
         try:
             # Extrair metadados do documento
             objective_slug = data.get('objective_slug', filename)
+            self.seen_sources.add((filename, objective_slug))
+            source_hash = content_hash(json.dumps(data, sort_keys=True, ensure_ascii=False))
             
             # Verificar se o documento já existe
             existing_doc = db.session.query(KbDocument).filter_by(
@@ -398,10 +502,13 @@ class ETPIngestor:
                 objective_slug=objective_slug
             ).first()
             
+            if existing_doc and existing_doc.content_hash == source_hash:
+                logger.info(f"Documento {filename} ({objective_slug}) inalterado, ignorando")
+                self.ingest_stats['skipped_documents'] += 1
+                return 0
+            
             if existing_doc:
                 logger.info(f"Documento {filename} já existe, atualizando...")
-                # Remover chunks existentes
-                db.session.query(KbChunk).filter_by(kb_document_id=existing_doc.id).delete()
                 kb_document = existing_doc
             else:
                 # Criar novo documento - KbDocument só aceita filename, etp_id e objective_slug
@@ -411,8 +518,9 @@ class ETPIngestor:
                 )
                 db.session.add(kb_document)
                 db.session.flush()  # Para obter o ID
+            kb_document.content_hash = source_hash
             
-            chunks_processed = 0
+            specs = []
             
             # Caso 1: Estrutura atual com sections (formato complexo)
             if 'sections' in data:
@@ -426,18 +534,9 @@ class ETPIngestor:
                         continue
                     
                     # Dividir conteúdo em chunks menores se necessário
-                    chunks = self._split_content(content, max_chars=2000)
+                    chunks = self._split_content(content)
                     
-                    for chunk_index, chunk_content in enumerate(chunks):
-                        kb_chunk = KbChunk(
-                            kb_document_id=kb_document.id,
-                            section_type=section_type,
-                            content_text=chunk_content.strip(),
-                            objective_slug=objective_slug
-                        )
-                        db.session.add(kb_chunk)
-                        
-                    chunks_processed += len(chunks)
+                    specs.extend((section_type, chunk_content.strip()) for chunk_content in chunks)
             
             # Caso 2: Estrutura simples descrita na issue (need, requirements, etc.)
             else:
@@ -455,159 +554,227 @@ class ETPIngestor:
                         content = str(data[field_key]).strip()
                         if content:
                             # Dividir conteúdo em chunks se necessário
-                            chunks = self._split_content(content, max_chars=2000)
+                            chunks = self._split_content(content)
                             
-                            for chunk_content in chunks:
-                                kb_chunk = KbChunk(
-                                    kb_document_id=kb_document.id,
-                                    section_type=section_name.lower().replace(' ', '_'),
-                                    content_text=chunk_content.strip(),
-                                    objective_slug=objective_slug
-                                )
-                                db.session.add(kb_chunk)
-                                
-                            chunks_processed += len(chunks)
+                            section_type = section_name.lower().replace(' ', '_')
+                            specs.extend((section_type, chunk_content.strip()) for chunk_content in chunks)
             
-            logger.info(f"Documento {filename}: {chunks_processed} chunks criados")
-            return chunks_processed
+            return self._sync_document_chunks(kb_document, specs, objective_slug, filename)
             
         except Exception as e:
             logger.error(f"Erro processando documento {filename}: {str(e)}")
+            self.protected_filenames.add(filename)
             return 0
 
-    def _split_content(self, content: str, max_chars: int = 2000) -> List[str]:
+    def _sync_document_chunks(self, document: KbDocument, specs: List[Tuple[str, str]], objective_slug: str,
+                              filename: str) -> int:
         """
-        Divide conteúdo em chunks menores
+        Sincroniza os chunks de um documento com a nova lista (section_type, texto).
+        
+        Chunks com o mesmo hash de conteúdo são mantidos (com id e embedding);
+        apenas os novos são inseridos e os que deixaram de existir são removidos.
         
-        Args:
-            content: Conteúdo a ser dividido
-            max_chars: Número máximo de caracteres por chunk
-            
         Returns:
-            Lista de chunks
+            int: Número de chunks do documento
         """
-        if len(content) <= max_chars:
-            return [content]
-        
-        chunks = []
-        sentences = content.split('.')
-        current_chunk = ""
+        available: Dict[str, List[KbChunk]] = {}
+        for chunk in db.session.query(KbChunk).filter_by(kb_document_id=document.id).all():
+            key = chunk.content_hash or content_hash(chunk.section_type, chunk.content_text)
+            available.setdefault(key, []).append(chunk)
         
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
+        kept = added = 0
+        for section_type, text in specs:
+            key = content_hash(section_type, text)
+            matches = available.get(key)
+            if matches:
+                matches.pop().content_hash = key
+                kept += 1
                 continue
-                
-            # Adicionar ponto final se não houver
-            if not sentence.endswith('.'):
-                sentence += '.'
-            
-            # Verificar se adicionar a sentença excede o limite
-            if len(current_chunk) + len(sentence) + 1 > max_chars:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = sentence
-                else:
-                    # Sentença muito longa, dividir por caracteres
-                    chunks.append(sentence[:max_chars])
-                    current_chunk = sentence[max_chars:]
-            else:
-                current_chunk += " " + sentence if current_chunk else sentence
+            db.session.add(KbChunk(
+                kb_document_id=document.id,
+                section_type=section_type,
+                content_text=text,
+                objective_slug=objective_slug,
+                content_hash=key
+            ))
+            self.changed_sections.add(section_type)
+            added += 1
         
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        stale = [chunk for chunks in available.values() for chunk in chunks]
+        if stale:
+            self.changed_sections.update(chunk.section_type for chunk in stale)
+            db.session.query(KbChunk).filter(KbChunk.id.in_([chunk.id for chunk in stale])).delete(
+                synchronize_session=False)
+        
+        self.ingest_stats['kept_chunks'] += kept
+        self.ingest_stats['added_chunks'] += added
+        self.ingest_stats['removed_chunks'] += len(stale)
+        logger.info(f"Documento {filename}: {added} chunks criados, {kept} mantidos, {len(stale)} removidos")
+        return len(specs)
+
+    def _split_content(self, content: str, max_tokens: Optional[int] = None) -> List[str]:
+        """
+        Divide conteúdo em chunks menores (rag.chunker: por títulos, cláusulas e frases)
         
-        return chunks
+        Args:
+            content: Conteúdo a ser dividido
+            max_tokens: Número máximo de tokens por chunk (padrão CHUNK_MAX_TOKENS)
+            
+        Returns:
+            Lista de chunks
+        """
+        return chunk_text(content, max_tokens=max_tokens)
 
     def _generate_embeddings_and_faiss_index(self) -> None:
-        """Gera embeddings e cria índice FAISS usando db.session"""
+        """Gera embeddings apenas dos chunks sem embedding e atualiza o índice FAISS usando db.session"""
         try:
-            logger.info("Gerando embeddings e criando índice FAISS...")
-            
-            # Buscar todos os chunks usando db.session
-            chunks = db.session.query(KbChunk).all()
-            
-            if not chunks:
-                logger.warning("Nenhum chunk encontrado para gerar embeddings")
-                return
-            
-            logger.info(f"Processando {len(chunks)} chunks para geração de embeddings...")
-            
-            embeddings_list = []
-            chunk_ids = []
-            chunks_with_content = 0
-            chunks_with_embeddings = 0
-            
-            for chunk in chunks:
-                # Verificar se o chunk tem conteúdo válido
-                if chunk.content and chunk.content.strip():
-                    chunks_with_content += 1
-                    logger.debug(f"Chunk {chunk.id}: content extraído ({len(chunk.content)} caracteres)")
-                    
-                    # Gerar embedding
-                    embedding = self._get_embedding(chunk.content)
-                    if embedding:
-                        embeddings_list.append(np.array(embedding, dtype=np.float32))
-                        chunk_ids.append(chunk.id)
-                        chunks_with_embeddings += 1
-                        
-                        # Salvar embedding no banco
-                        chunk.embedding = json.dumps(embedding)
-                        logger.debug(f"Chunk {chunk.id}: embedding gerado com sucesso")
-                    else:
-                        logger.warning(f"Chunk {chunk.id}: falha ao gerar embedding")
-                else:
-                    logger.warning(f"Chunk {chunk.id}: conteúdo vazio ou inválido")
-            
-            logger.info(f"RESUMO DE PROCESSAMENTO:")
-            logger.info(f"- Total de chunks processados: {len(chunks)}")
-            logger.info(f"- Chunks com conteúdo válido: {chunks_with_content}")
-            logger.info(f"- Chunks com embeddings gerados: {chunks_with_embeddings}")
-            logger.info(f"- Taxa de sucesso: {chunks_with_embeddings/len(chunks)*100:.1f}%" if chunks else "0%")
-            
-            db.session.commit()
+            logger.info("Gerando embeddings e atualizando índice FAISS...")
+            
+            # Chunks novos ou alterados (os inalterados mantêm o embedding salvo)
+            chunks = (
+                db.session.query(KbChunk.id, KbChunk.content_text)
+                .filter(KbChunk.embedding.is_(None))
+                .order_by(KbChunk.id)
+                .all()
+            )
             
-            if embeddings_list:
-                # Criar índice FAISS
-                embeddings_matrix = np.vstack(embeddings_list)
-                dimension = embeddings_matrix.shape[1]
-                
-                # Normalizar para cosine similarity
-                faiss.normalize_L2(embeddings_matrix)
-                
-                # Criar índice
-                index = faiss.IndexFlatIP(dimension)
-                index.add(embeddings_matrix)
+            new_embeddings = {}
+            if chunks:
+                logger.info(f"Processando {len(chunks)} chunks sem embedding...")
                 
-                # Salvar índice FAISS conforme especificação
-                index_path = self.index_dir / "faiss.index"
-                faiss.write_index(index, str(index_path))
+                chunks_with_content = [chunk for chunk in chunks if chunk.content_text and chunk.content_text.strip()]
+                if len(chunks_with_content) < len(chunks):
+                    logger.warning(f"{len(chunks) - len(chunks_with_content)} chunks com conteúdo vazio ou inválido")
                 
-                # Salvar mapeamento de IDs para FAISS
-                mapping_path = self.index_dir / "faiss_mapping.json"
-                with open(mapping_path, 'w') as f:
-                    json.dump(chunk_ids, f)
+                # Gerar embeddings em lotes concorrentes
+                pipeline = EmbeddingPipeline(self.openai_client, cache=self.embedding_cache)
+                new_embeddings = pipeline.embed_chunks(chunks_with_content)
                 
-                # Nota: Índice BM25 é criado pelo módulo rag.retrieval.build_indices()
-                # Não criar aqui para evitar duplicação de responsabilidade
+                # Salvar embeddings no banco em massa
+                write_embeddings_bulk(db.session, new_embeddings, serialize=True)
+                db.session.commit()
                 
-                logger.info(f"Índice FAISS criado: {len(embeddings_list)} vetores, dimensão {dimension}")
-                logger.info(f"Salvo em: {index_path}")
+                logger.info(f"RESUMO DE PROCESSAMENTO:")
+                logger.info(f"- Chunks sem embedding: {len(chunks)}")
+                logger.info(f"- Chunks com conteúdo válido: {len(chunks_with_content)}")
+                logger.info(f"- Chunks com embeddings gerados: {len(new_embeddings)}")
+                logger.info(f"- Requisições ao provedor: {pipeline.stats['requests']} ({pipeline.stats['retries']} retries)")
+            else:
+                logger.info("Todos os chunks já possuem embedding")
+            
+            self._update_vector_index(new_embeddings)
                 
         except Exception as e:
             logger.error(f"Erro gerando embeddings/FAISS: {str(e)}")
 
+    def _update_vector_index(self, new_embeddings: Dict[int, List[float]]) -> None:
+        """
+        Atualiza o índice vetorial persistido: reaproveita os vetores do índice atual
+        para os chunks inalterados, acrescenta os novos e descarta os removidos.
+        Só lê embeddings do banco para chunks ausentes do índice atual.
+        """
+        model = get_embedding_model()
+        fingerprint = kb_fingerprint(db.session)
+        if not new_embeddings and manifest_is_current(read_manifest(self.index_dir), fingerprint, model):
+            logger.info("Índice FAISS já corresponde à base, nada a atualizar")
+            return
+        
+        rows = (
+            db.session.query(KbChunk.id, KbChunk.kb_document_id, KbChunk.section_type, KbDocument.objective_slug)
+            .join(KbDocument, KbChunk.kb_document_id == KbDocument.id)
+            .filter(KbChunk.embedding.isnot(None))
+            .order_by(KbChunk.id)
+            .all()
+        )
+        if not rows:
+            logger.warning("Nenhum chunk com embedding para indexar")
+            return
+        
+        wanted = {row.id for row in rows}
+        vectors: Dict[int, np.ndarray] = {}
+        
+        current = load_vector_index(self.index_dir)
+        if current is not None and current[2].get('embedding_model') == model:
+            index, documents, _ = current
+            for position, doc in enumerate(documents):
+                chunk_id = doc['chunk_id']
+                if chunk_id in wanted and chunk_id not in new_embeddings:
+                    vectors[chunk_id] = np.array(index.vectors[position], dtype=np.float32)
+        reused = len(vectors)
+        
+        for chunk_id, embedding in new_embeddings.items():
+            vectors[chunk_id] = np.asarray(embedding, dtype=np.float32)
+        
+        missing = [chunk_id for chunk_id in wanted if chunk_id not in vectors]
+        vectors.update(self._load_stored_embeddings(missing))
+        
+        # Metadados de cada vetor; linhas ordenadas por seção/objetivo para a busca filtrada
+        documents = [
+            {
+                'chunk_id': row.id,
+                'document_id': row.kb_document_id,
+                'section_type': row.section_type,
+                'objective_slug': row.objective_slug or '',
+            }
+            for row in rows if row.id in vectors
+        ]
+        order = partition_order(documents)
+        documents = [documents[i] for i in order]
+        
+        embeddings_matrix = np.vstack([vectors[doc['chunk_id']] for doc in documents]).astype(np.float32)
+        dimension = embeddings_matrix.shape[1]
+        
+        # Normalizar para cosine similarity (idempotente para os vetores reaproveitados)
+        import faiss
+        faiss.normalize_L2(embeddings_matrix)
+        
+        if len(documents) != fingerprint['chunk_count']:
+            logger.warning(f"{fingerprint['chunk_count'] - len(documents)} embeddings inválidos não foram indexados")
+        
+        # Salvar vetores (abertos via mmap pelo RAGRetrieval), mapeamento e manifesto
+        save_vector_index(self.index_dir, embeddings_matrix, documents, model, fingerprint['content_checksum'])
+        
+        # Nota: Índice BM25 é atualizado por seção em rag.retrieval.refresh_sections()
+        
+        logger.info(f"Índice FAISS atualizado: {len(documents)} vetores, dimensão {dimension} "
+                    f"({reused} reaproveitados, {len(new_embeddings)} novos, {len(missing)} lidos do banco)")
+        logger.info(f"Salvo em: {self.index_dir}")
+
+    def _load_stored_embeddings(self, chunk_ids: List[int], batch_size: int = 1000) -> Dict[int, np.ndarray]:
+        """Lê do banco os embeddings já salvos dos chunks informados"""
+        vectors = {}
+        for start in range(0, len(chunk_ids), batch_size):
+            batch = chunk_ids[start:start + batch_size]
+            for chunk_id, embedding in (db.session.query(KbChunk.id, KbChunk.embedding)
+                                        .filter(KbChunk.id.in_(batch)).all()):
+                try:
+                    if isinstance(embedding, str):
+                        embedding = json.loads(embedding)
+                    if embedding:
+                        vectors[chunk_id] = np.asarray(embedding, dtype=np.float32)
+                except (ValueError, TypeError) as e:
+                    logger.warning(f"Embedding inválido no chunk {chunk_id}: {e}")
+        return vectors
+
     def _get_embedding(self, text: str) -> Optional[List[float]]:
-        """Gera embedding usando OpenAI API"""
+        """Gera embedding usando OpenAI API (com cache persistente)"""
         if not self.openai_client:
             return None
         
+        if self.embedding_cache is not None:
+            cached = self.embedding_cache.get(get_embedding_model(), text)
+            if cached is not None:
+                return cached
+        
         try:
             response = self.openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text.replace("\n", " ")
+                model=get_embedding_model(),
+                input=prepare_embedding_input(text)
             )
-            return response.data[0].embedding
+            embedding = response.data[0].embedding
+            if self.embedding_cache is not None:
+                self.embedding_cache.put(get_embedding_model(), text, embedding)
+            return embedding
             
         except Exception as e:
             logger.error(f"Erro ao gerar embedding: {str(e)}")
@@ -689,8 +856,8 @@ class ETPIngestor:
             openai_client = None
             if os.getenv('OPENAI_API_KEY') and os.getenv('OPENAI_API_KEY') != 'test_key':
                 try:
-                    import openai
-                    openai_client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+                    from application.ai.llm_gateway import get_openai_client
+                    openai_client = get_openai_client()
                     logger.info("Cliente OpenAI configurado para ingestão inicial")
                 except ImportError:
                     logger.warning("Biblioteca openai não encontrada para ingestão inicial")
@@ -699,8 +866,8 @@ class ETPIngestor:
             if openai_client:
                 self.openai_client = openai_client
             
-            # Executar ingestão inicial (rebuild=True para garantir dados atualizados)
-            return self.ingest_pdfs_and_jsonl(rebuild=True)
+            # Ingestão incremental: fontes inalteradas são ignoradas e só chunks novos geram embeddings
+            return self.ingest_pdfs_and_jsonl(rebuild=False)
             
         except Exception as e:
             logger.error(f"Erro na ingestão inicial: {str(e)}")
@@ -722,14 +889,14 @@ def main():
     try:
         from application.config.FlaskConfig import create_api
 
-        app = create_api()
+        app = create_api(kb_bootstrap='off')
 
         # Configurar cliente OpenAI se disponível
         openai_client = None
         if os.getenv('OPENAI_API_KEY') and os.getenv('OPENAI_API_KEY') != 'test_key':
             try:
-                import openai
-                openai_client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+                from application.ai.llm_gateway import get_openai_client
+                openai_client = get_openai_client()
                 logger.info("Cliente OpenAI configurado")
             except ImportError:
                 logger.warning("Biblioteca openai não encontrada")
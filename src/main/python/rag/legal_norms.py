@@ -3,11 +3,12 @@ Módulo para processamento e validação de normas legais no sistema RAG.
 Fornece funcionalidades para categorizar e validar normas jurídicas.
 """
 
-import re
 import logging
 from typing import List, Dict, Optional, Tuple
 from enum import Enum
 
+from domain.usecase.utils.legal_citations import extract_citations
+
 logger = logging.getLogger(__name__)
 
 class LegalNormType(Enum):
@@ -29,39 +30,18 @@ class LegalScope(Enum):
     MUNICIPAL = "municipal"
     UNKNOWN = "unknown"
 
+# Qualificador explícito na citação ("Lei Estadual 123/2019") dispensa a análise do contexto
+_EXPLICIT_SCOPES = {
+    'federal': LegalScope.FEDERAL,
+    'estadual': LegalScope.ESTADUAL,
+    'distrital': LegalScope.ESTADUAL,
+    'municipal': LegalScope.MUNICIPAL,
+}
+
 class LegalNormProcessor:
     """Processador de normas legais"""
     
     def __init__(self):
-        self.norm_patterns = {
-            LegalNormType.LEI: [
-                r'lei\s+(?:federal\s+)?(?:complementar\s+)?n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
-                r'lei\s+(\d+(?:[\.\/\-]\d+)*)',
-                r'l\.?\s*(\d+(?:[\.\/\-]\d+)*)'
-            ],
-            LegalNormType.DECRETO: [
-                r'decreto\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
-                r'decreto\s+(\d+(?:[\.\/\-]\d+)*)',
-                r'd\.?\s*(\d+(?:[\.\/\-]\d+)*)'
-            ],
-            LegalNormType.PORTARIA: [
-                r'portaria\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
-                r'portaria\s+(\d+(?:[\.\/\-]\d+)*)'
-            ],
-            LegalNormType.RESOLUCAO: [
-                r'resolu[cç][aã]o\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
-                r'resolu[cç][aã]o\s+(\d+(?:[\.\/\-]\d+)*)'
-            ],
-            LegalNormType.INSTRUCAO_NORMATIVA: [
-                r'instru[cç][aã]o\s+normativa\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
-                r'in\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)'
-            ],
-            LegalNormType.MEDIDA_PROVISORIA: [
-                r'medida\s+provis[oó]ria\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
-                r'mp\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)'
-            ]
-        }
-        
         self.federal_indicators = [
             'federal', 'união', 'republica', 'brasil', 'cgu', 'tcu', 'tcf',
             'congresso nacional', 'senado federal', 'camara dos deputados',
@@ -79,28 +59,19 @@ class LegalNormProcessor:
             Lista de normas legais encontradas
         """
         norms = []
-        text_lower = text.lower()
-        
-        for norm_type, patterns in self.norm_patterns.items():
-            for pattern in patterns:
-                matches = re.finditer(pattern, text_lower, re.IGNORECASE)
-                
-                for match in matches:
-                    norm_info = {
-                        'type': norm_type,
-                        'number': match.group(1),
-                        'full_match': match.group(0),
-                        'start_pos': match.start(),
-                        'end_pos': match.end(),
-                        'scope': self._determine_scope(text, match.start(), match.end()),
-                        'context': self._extract_context(text, match.start(), match.end())
-                    }
-                    norms.append(norm_info)
-        
-        # Remover duplicatas e ordenar por posição
-        norms = self._remove_duplicates(norms)
-        norms.sort(key=lambda x: x['start_pos'])
-        
+        for citation in extract_citations(text, unique=True):
+            norms.append({
+                'type': LegalNormType(citation.type),
+                'number': citation.number,
+                'year': citation.year,
+                'full_match': citation.text,
+                'start_pos': citation.start,
+                'end_pos': citation.end,
+                'scope': _EXPLICIT_SCOPES.get(citation.scope)
+                         or self._determine_scope(text, citation.start, citation.end),
+                'context': self._extract_context(text, citation.start, citation.end)
+            })
+
         return norms
 
     def _determine_scope(self, text: str, start_pos: int, end_pos: int) -> LegalScope:
@@ -132,19 +103,6 @@ class LegalNormProcessor:
         context_end = min(len(text), end_pos + context_chars)
         return text[context_start:context_end].strip()
 
-    def _remove_duplicates(self, norms: List[Dict]) -> List[Dict]:
-        """Remove normas duplicadas baseado no número e tipo"""
-        seen = set()
-        unique_norms = []
-        
-        for norm in norms:
-            key = (norm['type'], norm['number'])
-            if key not in seen:
-                seen.add(key)
-                unique_norms.append(norm)
-        
-        return unique_norms
-
     def categorize_by_subject(self, text: str) -> List[str]:
         """
         Categoriza o texto por assunto jurídico.
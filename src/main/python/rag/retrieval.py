@@ -5,16 +5,20 @@ Implementa busca híbrida usando BM25 e FAISS para consultas em requisitos e nor
 
 import os
 import json
-import pickle
 import logging
 import re
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 import numpy as np
-from rank_bm25 import BM25Okapi
-import faiss
-from rapidfuzz import fuzz
 from domain.interfaces.dataprovider.DatabaseConfig import db
+from rag.embeddings import EmbeddingPipeline, write_embeddings_bulk, prepare_embedding_input, get_embedding_model
+from rag.embedding_cache import get_embedding_cache
+from application.services.telemetry import traced
+from rag.fusion import FusionConfig, fuse_results, get_fusion_config
+from rag.bm25_index import BM25Index, save_bm25_indices, load_bm25_indices
+from rag.vector_index import (MmapVectorIndex, default_index_dir, load_vector_index, save_vector_index,
+                              kb_fingerprint, manifest_is_current, content_checksum, partition_order,
+                              partition_rows)
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -43,24 +47,29 @@ class RAGRetrieval:
         # Configurar diretórios para índices
         self.project_root = Path(__file__).parent.parent.parent.parent.parent
         self.index_dir = self.project_root / "src" / "main" / "python" / "rag" / "index"
-        self.bm25_dir = self.index_dir / "bm25"
+        self.bm25_dir = Path(os.getenv('RAG_BM25_DIR') or self.index_dir / "bm25")
         
         # Criar diretórios se não existirem
         self.bm25_dir.mkdir(parents=True, exist_ok=True)
         
-        # Índices BM25 por section_type
+        # Índices BM25 por section_type (postings em arrays NumPy, abertos via mmap)
         self.bm25_indices = {}
-        self.bm25_documents = {}  # Mapear documentos para índices BM25
         
         # Índice FAISS
         self.faiss_index = None
         self.faiss_documents = []  # Lista de documentos correspondentes aos vetores FAISS
+        self.faiss_manifest = None
+        self.faiss_filter_rows = {}  # (section_type, objective_slug) -> linhas do índice
+        self.vector_index_dir = default_index_dir()
         
-        # Cache de embeddings
-        self.embedding_cache = {}
+        # Cache de embeddings (persistente e compartilhado entre processos)
+        self.embedding_cache = get_embedding_cache()
         
         # Tentar carregar índices BM25 existentes
         self._load_bm25_indices()
+        
+        # Tentar abrir o índice vetorial persistido (memory-mapped) se estiver atualizado
+        self._load_faiss_index()
 
     def build_indices(self) -> bool:
         """
@@ -75,52 +84,30 @@ class RAGRetrieval:
             # Importar modelos aqui para evitar import circular
             from domain.dto.KbDto import KbChunk
             
-            # Buscar todos os chunks da base de conhecimento
-            chunks = KbChunk.query.all()
+            docs_by_type = self._bm25_documents()
             
-            if not chunks:
+            if not docs_by_type:
                 logger.warning("Nenhum chunk encontrado na base de conhecimento")
                 return False
             
-            logger.info(f"Encontrados {len(chunks)} chunks para indexação")
-            
-            # Agrupar chunks por section_type para BM25
-            chunks_by_type = {}
-            for chunk in chunks:
-                if chunk.section_type not in chunks_by_type:
-                    chunks_by_type[chunk.section_type] = []
-                chunks_by_type[chunk.section_type].append(chunk)
+            logger.info(f"Encontrados {sum(len(docs) for docs in docs_by_type.values())} chunks para indexação")
             
             # Construir índices BM25 por section_type
-            for section_type, type_chunks in chunks_by_type.items():
-                logger.info(f"Construindo índice BM25 para {section_type}: {len(type_chunks)} chunks")
-                
-                # Tokenizar documentos para BM25
-                tokenized_docs = []
-                doc_mapping = []
-                
-                for chunk in type_chunks:
-                    tokens = self._tokenize(chunk.content)
-                    tokenized_docs.append(tokens)
-                    doc_mapping.append({
-                        'chunk_id': chunk.id,
-                        'document_id': chunk.kb_document_id,
-                        'content': chunk.content,
-                        'section_title': chunk.section_type,
-                        'objective_slug': getattr(chunk.kb_document, 'objective_slug', ''),
-                        'chunk': chunk
-                    })
-                
-                # Criar índice BM25
-                if tokenized_docs:
-                    bm25 = BM25Okapi(tokenized_docs)
-                    self.bm25_indices[section_type] = bm25
-                    self.bm25_documents[section_type] = doc_mapping
+            bm25_indices = {}
+            for section_type, docs in docs_by_type.items():
+                logger.info(f"Construindo índice BM25 para {section_type}: {len(docs)} chunks")
+                bm25_indices[section_type] = BM25Index.build(docs)
+            self.bm25_indices = bm25_indices
             
-            # Construir índice FAISS se provider for OpenAI
+            # Construir índice FAISS se provider for OpenAI (reutilizando o índice persistido se válido)
             if self.embeddings_provider == 'openai' and self.openai_client:
-                logger.info("Construindo índice FAISS com embeddings OpenAI...")
-                self._build_faiss_index(chunks)
+                if self._load_faiss_index():
+                    logger.info("Índice FAISS persistido reutilizado (manifesto atualizado)")
+                else:
+                    logger.info("Construindo índice FAISS com embeddings OpenAI...")
+                    from sqlalchemy.orm import joinedload
+                    chunks = KbChunk.query.options(joinedload(KbChunk.kb_document)).order_by(KbChunk.id).all()
+                    self._build_faiss_index(chunks)
             
             logger.info("Índices RAG construídos com sucesso!")
             
@@ -133,12 +120,53 @@ class RAGRetrieval:
             logger.error(f"Erro ao construir índices: {str(e)}")
             return False
 
+    def refresh_sections(self, section_types) -> None:
+        """
+        Atualiza os índices após uma ingestão incremental: reconstrói o BM25 apenas
+        das seções alteradas (o idf é por seção) e reabre o índice vetorial persistido.
+        """
+        sections = set(section_types)
+        if not self.bm25_indices:
+            sections = None  # Sem índices em disco: construir todas as seções
+        
+        docs_by_type = self._bm25_documents(sections)
+        for section_type in (sections if sections is not None else docs_by_type):
+            if section_type in docs_by_type:
+                self.bm25_indices[section_type] = BM25Index.build(docs_by_type[section_type])
+            else:
+                self.bm25_indices.pop(section_type, None)
+        logger.info(f"[RAG] BM25 reconstruído para as seções: {', '.join(sorted(docs_by_type)) or '-'}")
+        self._save_bm25_indices()
+        
+        self._load_faiss_index()
+
+    def _bm25_documents(self, section_types=None) -> Dict[str, List[Tuple]]:
+        """Documentos tokenizados para o BM25, agrupados por section_type (opcionalmente só algumas seções)"""
+        from domain.dto.KbDto import KbChunk, KbDocument
+        
+        # Buscar apenas as colunas usadas pelo BM25 (sem materializar objetos ORM)
+        query = (
+            self.db_session.query(KbChunk.id, KbChunk.kb_document_id, KbChunk.section_type,
+                                  KbChunk.content_text, KbDocument.objective_slug)
+            .outerjoin(KbDocument, KbChunk.kb_document_id == KbDocument.id)
+        )
+        if section_types is not None:
+            query = query.filter(KbChunk.section_type.in_(list(section_types)))
+        
+        docs_by_type = {}
+        for row in query.order_by(KbChunk.id).all():
+            docs_by_type.setdefault(row.section_type, []).append(
+                (row.id, row.kb_document_id, row.objective_slug or '', self._tokenize(row.content_text or ''))
+            )
+        return docs_by_type
+
     def _build_faiss_index(self, chunks: List) -> None:
         """Constrói o índice FAISS com embeddings"""
         embeddings_list = []
         documents_list = []
         chunks_with_embeddings = 0
         chunks_without_embeddings = 0
+        missing_chunks = []
         
         logger.info(f"Processando {len(chunks)} chunks para construção do índice FAISS...")
         
@@ -159,15 +187,7 @@ class RAGRetrieval:
                     
                     if embedding and len(embedding) > 0:
                         embeddings_list.append(np.array(embedding, dtype=np.float32))
-                        documents_list.append({
-                            'chunk_id': chunk.id,
-                            'document_id': chunk.kb_document_id,
-                            'content': chunk.content,
-                            'section_type': chunk.section_type,
-                            'section_title': chunk.section_type,
-                            'objective_slug': getattr(chunk.kb_document, 'objective_slug', ''),
-                            'chunk': chunk
-                        })
+                        documents_list.append(self._faiss_document(chunk))
                         chunks_with_embeddings += 1
                     else:
                         logger.warning(f"Embedding vazio para chunk {chunk.id}")
@@ -179,57 +199,132 @@ class RAGRetrieval:
                     continue
             else:
                 chunks_without_embeddings += 1
-                # Gerar embedding usando OpenAI
-                embedding = self._get_embedding(chunk.content)
+                missing_chunks.append(chunk)
+        
+        # Gerar embeddings faltantes em lote e persistir em KbChunk.embedding
+        if missing_chunks and self.openai_client:
+            generated = EmbeddingPipeline(self.openai_client, cache=self.embedding_cache).embed_chunks(missing_chunks)
+            for chunk in missing_chunks:
+                embedding = generated.get(chunk.id)
                 if embedding is not None:
                     embeddings_list.append(np.array(embedding, dtype=np.float32))
-                    documents_list.append({
-                        'chunk_id': chunk.id,
-                        'document_id': chunk.kb_document_id,
-                        'content': chunk.content,
-                        'section_type': chunk.section_type,
-                        'section_title': chunk.section_type,
-                        'objective_slug': getattr(chunk.kb_document, 'objective_slug', ''),
-                        'chunk': chunk
-                    })
+                    documents_list.append(self._faiss_document(chunk))
+            if generated:
+                try:
+                    write_embeddings_bulk(self.db_session, generated)
+                    self.db_session.commit()
+                    logger.info(f"[RAG] {len(generated)} embeddings gerados e salvos no banco")
+                except Exception as e:
+                    logger.warning(f"Não foi possível salvar embeddings gerados: {e}")
+                    self.db_session.rollback()
         
         logger.info(f"Embeddings encontrados: {chunks_with_embeddings}, Sem embeddings: {chunks_without_embeddings}")
         
         if embeddings_list:
-            # Criar índice FAISS
-            embeddings_matrix = np.vstack(embeddings_list)
+            # Criar índice FAISS (linhas ordenadas por seção/objetivo para busca filtrada sem cópia)
+            order = partition_order(documents_list)
+            documents_list = [documents_list[i] for i in order]
+            embeddings_matrix = np.vstack([embeddings_list[i] for i in order])
             dimension = embeddings_matrix.shape[1]
             
             # Normalize vectors before adding to FAISS index
+            import faiss
             faiss.normalize_L2(embeddings_matrix)
             
-            self.faiss_index = faiss.IndexFlatIP(dimension)  # Inner Product para similaridade
-            self.faiss_index.add(embeddings_matrix)
-            self.faiss_documents = documents_list
+            # Inner Product exato (equivalente a IndexFlatIP), com suporte a busca filtrada
+            self._set_faiss_index(MmapVectorIndex(embeddings_matrix), documents_list)
             
             logger.info(f"Índice FAISS criado com {len(embeddings_list)} vetores de dimensão {dimension}")
+            
+            # Persistir para que outros workers/reinícios abram o índice via mmap
+            checksum = content_checksum([(doc['chunk_id'], doc['content']) for doc in documents_list])
+            if save_vector_index(self.vector_index_dir, embeddings_matrix, documents_list,
+                                 get_embedding_model(), checksum):
+                self.faiss_manifest = {'chunk_count': len(documents_list), 'content_checksum': checksum}
         else:
             logger.warning("Nenhum embedding válido encontrado - índice FAISS não será criado")
 
+    def _load_faiss_index(self) -> bool:
+        """
+        Abre o índice vetorial persistido com memory-mapping, validando o manifesto
+        (quantidade de chunks, dimensão, modelo de embedding e checksum do conteúdo).
+        
+        Returns:
+            bool: True se o índice persistido está atualizado e foi carregado
+        """
+        try:
+            loaded = load_vector_index(self.vector_index_dir)
+            if loaded is None:
+                return False
+            
+            index, documents, manifest = loaded
+            fingerprint = kb_fingerprint(self.db_session)
+            if not manifest_is_current(manifest, fingerprint, get_embedding_model()):
+                logger.info(f"[RAG] Índice vetorial persistido desatualizado "
+                            f"(manifesto: {manifest.get('chunk_count')} chunks, base: {fingerprint['chunk_count']})")
+                return False
+            
+            self._set_faiss_index(index, documents, manifest)
+            logger.info(f"[RAG] Índice vetorial carregado via mmap: {index.ntotal} vetores, dimensão {index.d}")
+            return True
+            
+        except Exception as e:
+            logger.warning(f"Não foi possível carregar o índice vetorial persistido: {e}")
+            return False
+
+    def _set_faiss_index(self, index, documents: List[Dict], manifest: Optional[Dict] = None) -> None:
+        """Ativa um índice vetorial e pré-calcula as partições por seção/objetivo"""
+        self.faiss_index = index
+        self.faiss_documents = documents
+        self.faiss_manifest = manifest
+        self.faiss_filter_rows = partition_rows(documents)
+
+    def _fill_contents(self, results: List[Dict]) -> None:
+        """Completa o conteúdo dos resultados vindos do índice persistido (que guarda só metadados)"""
+        missing = [r['chunk_id'] for r in results if r.get('content') is None]
+        if not missing:
+            return
+        from domain.dto.KbDto import KbChunk
+        rows = self.db_session.query(KbChunk.id, KbChunk.content_text).filter(KbChunk.id.in_(missing)).all()
+        contents = {row.id: row.content_text for row in rows}
+        for result in results:
+            if result.get('content') is None:
+                result['content'] = contents.get(result['chunk_id'], '')
+
+    @staticmethod
+    def _faiss_document(chunk) -> Dict:
+        """Metadados de um chunk associados a um vetor do índice FAISS"""
+        return {
+            'chunk_id': chunk.id,
+            'document_id': chunk.kb_document_id,
+            'content': chunk.content,
+            'section_type': chunk.section_type,
+            'section_title': chunk.section_type,
+            'objective_slug': getattr(chunk.kb_document, 'objective_slug', ''),
+            'chunk': chunk
+        }
+
     def _get_embedding(self, text: str) -> Optional[List[float]]:
         """Gera embedding usando OpenAI API"""
         if not self.openai_client:
             return None
             
         # Verificar cache
-        text_hash = str(hash(text))
-        if text_hash in self.embedding_cache:
-            return self.embedding_cache[text_hash]
+        if self.embedding_cache is not None:
+            cached = self.embedding_cache.get(get_embedding_model(), text)
+            if cached is not None:
+                return cached
         
         try:
             response = self.openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text.replace("\n", " ")
+                model=get_embedding_model(),
+                input=prepare_embedding_input(text)
             )
             embedding = response.data[0].embedding
             
             # Salvar no cache
-            self.embedding_cache[text_hash] = embedding
+            if self.embedding_cache is not None:
+                self.embedding_cache.put(get_embedding_model(), text, embedding)
             return embedding
             
         except Exception as e:
@@ -256,7 +351,7 @@ class RAGRetrieval:
         Returns:
             Lista de trechos com score híbrido
         """
-        return self._hybrid_search('requisito', objective_slug, query, k)
+        return self.search_sections(query, ['requisito'], objective_slug, k).get('requisito', [])
 
     def search_legal(self, objective_slug: str, query: str, k: int = 8) -> List[Dict]:
         """
@@ -270,75 +365,82 @@ class RAGRetrieval:
         Returns:
             Lista de trechos com score híbrido
         """
-        return self._hybrid_search('norma_legal', objective_slug, query, k)
+        return self.search_sections(query, ['norma_legal'], objective_slug, k).get('norma_legal', [])
 
-    def _hybrid_search(self, section_type: str, objective_slug: str, query: str, k: int) -> List[Dict]:
+    @traced('retrieval.search')
+    def search_sections(self, query: str, section_types: List[str], objective_slug: str = '',
+                        k: int = 5, fusion: Optional[FusionConfig] = None) -> Dict[str, List[Dict]]:
         """
-        Implementa busca híbrida combinando BM25 e FAISS.
+        Busca híbrida em várias seções com uma única consulta.
+        
+        A query é tokenizada e convertida em embedding uma única vez; cada seção é
+        pontuada no seu índice BM25 e na sua partição do índice vetorial, e o conteúdo
+        de todos os resultados é carregado em uma única consulta ao banco.
         
         Args:
-            section_type: Tipo de seção ('requisito', 'norma_legal', etc.)
-            objective_slug: Slug do objetivo
             query: Query de busca
-            k: Número de resultados
+            section_types: Seções a consultar ('requisito', 'norma_legal', etc.)
+            objective_slug: Slug do objetivo ('' para não filtrar)
+            k: Número de resultados por seção
+            fusion: Configuração da fusão BM25 + vetorial (padrão: ``get_fusion_config()``)
             
         Returns:
-            Lista de resultados ordenados por score híbrido
+            Dicionário seção -> resultados ordenados por score híbrido (top-k)
         """
-        results = []
+        sections = list(dict.fromkeys(section_types))
+        results: Dict[str, List[Dict]] = {section: [] for section in sections}
+        if not sections:
+            return results
+        
+        fusion = fusion or get_fusion_config()
         
         try:
-            # Busca BM25
-            bm25_results = self._search_bm25(section_type, objective_slug, query, k * 2)
+            query_tokens = self._tokenize(query)
             
-            # Busca FAISS (se disponível)
-            faiss_results = []
+            query_vector = None
             if self.faiss_index is not None:
-                faiss_results = self._search_faiss(section_type, objective_slug, query, k * 2)
-            
-            # Combinar resultados
-            all_results = {}
-            
-            # Adicionar resultados BM25
-            for result in bm25_results:
-                chunk_id = result['chunk_id']
-                all_results[chunk_id] = {
-                    **result,
-                    'bm25_score': result['score'],
-                    'faiss_score': 0.0
-                }
-            
-            # Adicionar/combinar resultados FAISS
-            for result in faiss_results:
-                chunk_id = result['chunk_id']
-                if chunk_id in all_results:
-                    all_results[chunk_id]['faiss_score'] = result['score']
+                query_embedding = self._get_embedding(query)
+                if query_embedding is None:
+                    logger.warning("Não foi possível gerar embedding para a query")
                 else:
-                    all_results[chunk_id] = {
-                        **result,
-                        'bm25_score': 0.0,
-                        'faiss_score': result['score']
-                    }
+                    import faiss
+                    query_vector = np.array([query_embedding], dtype=np.float32)
+                    faiss.normalize_L2(query_vector)
             
-            # Calcular score híbrido e ordenar
-            for chunk_id, result in all_results.items():
-                # Score híbrido: 70% BM25 + 30% FAISS
-                hybrid_score = (0.7 * result['bm25_score']) + (0.3 * result['faiss_score'])
-                result['hybrid_score'] = hybrid_score
-                results.append(result)
-            
-            # Ordenar por score híbrido
-            results.sort(key=lambda x: x['hybrid_score'], reverse=True)
+            for section in sections:
+                try:
+                    bm25_results = self._search_bm25(section, objective_slug, query_tokens, k * 2)
+                    faiss_results = []
+                    if query_vector is not None:
+                        faiss_results = self._search_faiss(section, objective_slug, query_vector, k * 2)
+                    results[section] = fuse_results(bm25_results, faiss_results, k, fusion)
+                except Exception as e:
+                    logger.warning(f"Erro na busca híbrida da seção {section}: {e}")
             
-            # Retornar top-k resultados
-            return results[:k]
+            self._fill_contents([r for section_results in results.values() for r in section_results])
+            return results
             
         except Exception as e:
             logger.error(f"Erro na busca híbrida: {str(e)}")
-            return []
+            return {section: [] for section in sections}
+
+    def _hybrid_search(self, section_type: str, objective_slug: str, query: str, k: int) -> List[Dict]:
+        """
+        Busca híbrida (BM25 + FAISS) em uma seção.
+        
+        Args:
+            section_type: Tipo de seção ('requisito', 'norma_legal', etc.)
+            objective_slug: Slug do objetivo
+            query: Query de busca
+            k: Número de resultados
+            
+        Returns:
+            Lista de resultados ordenados por score híbrido
+        """
+        return self.search_sections(query, [section_type], objective_slug, k).get(section_type, [])
 
-    def _search_bm25(self, section_type: str, objective_slug: str, query: str, k: int) -> List[Dict]:
-        """Busca usando BM25"""
+    def _search_bm25(self, section_type: str, objective_slug: str, query_tokens: List[str], k: int) -> List[Dict]:
+        """Busca usando BM25 (query já tokenizada; conteúdo preenchido pelo chamador)"""
         if section_type not in self.bm25_indices:
             logger.warning(f"Índice BM25 não encontrado para {section_type}")
             logger.info("[RAG] Tentando reconstruir índices automaticamente...")
@@ -355,55 +457,40 @@ class RAGRetrieval:
                 return []
         
         bm25 = self.bm25_indices[section_type]
-        documents = self.bm25_documents[section_type]
         
-        # Tokenizar query
-        query_tokens = self._tokenize(query)
+        # Pontuar apenas documentos que contêm os termos
+        hits = bm25.search(query_tokens, k, objective_slug=objective_slug)
         
-        # Buscar com BM25
-        scores = bm25.get_scores(query_tokens)
-        
-        # Criar lista de resultados
         results = []
-        for i, score in enumerate(scores):
-            doc = documents[i]
-            
-            # Filtrar por objective_slug se especificado
-            if objective_slug and doc['objective_slug'] != objective_slug:
-                continue
-                
+        for doc_idx, score in hits:
+            slug = bm25.slugs[bm25.slug_codes[doc_idx]]
+            document_id = int(bm25.document_ids[doc_idx])
             results.append({
-                'chunk_id': doc['chunk_id'],
-                'document_id': doc['document_id'],
-                'content': doc['content'],
-                'section_title': doc['section_title'],
+                'chunk_id': int(bm25.chunk_ids[doc_idx]),
+                'document_id': document_id if document_id >= 0 else None,
+                'content': None,
+                'section_title': section_type,
                 'section_type': section_type,
-                'objective_slug': doc['objective_slug'],
-                'score': float(score),
+                'objective_slug': slug,
+                'score': score,
                 'source': 'bm25'
             })
         
-        # Ordenar por score e retornar top-k
-        results.sort(key=lambda x: x['score'], reverse=True)
-        return results[:k]
+        return results
 
-    def _search_faiss(self, section_type: str, objective_slug: str, query: str, k: int) -> List[Dict]:
-        """Busca usando FAISS"""
+    def _search_faiss(self, section_type: str, objective_slug: str, query_vector: np.ndarray, k: int) -> List[Dict]:
+        """Busca usando FAISS (vetor da query já normalizado; conteúdo preenchido pelo chamador)"""
         if self.faiss_index is None:
             logger.warning("Índice FAISS não disponível")
             return []
         
-        # Gerar embedding da query
-        query_embedding = self._get_embedding(query)
-        if query_embedding is None:
-            logger.warning("Não foi possível gerar embedding para a query")
+        # Buscar apenas nas linhas da seção (e do objetivo, se informado): retorna até k resultados
+        # elegíveis sem sobreamostrar o índice global
+        rows = self.faiss_filter_rows.get((section_type, objective_slug or ''))
+        if rows is None:
             return []
         
-        # Buscar no FAISS
-        query_vector = np.array([query_embedding], dtype=np.float32)
-        faiss.normalize_L2(query_vector)
-        
-        scores, indices = self.faiss_index.search(query_vector, min(k * 2, len(self.faiss_documents)))
+        scores, indices = self.faiss_index.search(query_vector, k, rows=rows)
         
         # Criar lista de resultados
         results = []
@@ -412,18 +499,10 @@ class RAGRetrieval:
                 continue
                 
             doc = self.faiss_documents[idx]
-            
-            # Filtrar por section_type e objective_slug
-            if doc['section_type'] != section_type:
-                continue
-                
-            if objective_slug and doc['objective_slug'] != objective_slug:
-                continue
-            
             results.append({
                 'chunk_id': doc['chunk_id'],
                 'document_id': doc['document_id'],
-                'content': doc['content'],
+                'content': doc.get('content'),
                 'section_title': doc['section_title'],
                 'section_type': section_type,
                 'objective_slug': doc['objective_slug'],
@@ -431,23 +510,13 @@ class RAGRetrieval:
                 'source': 'faiss'
             })
         
-        return results[:k]
+        return results
 
     def _load_bm25_indices(self) -> None:
-        """Carrega índices BM25 existentes do disco"""
+        """Carrega índices BM25 existentes do disco (memory-mapped)"""
         try:
-            indices_file = self.bm25_dir / "bm25_indices.pkl"
-            documents_file = self.bm25_dir / "bm25_documents.pkl"
-            
-            if indices_file.exists() and documents_file.exists():
-                logger.info("[RAG] Carregando índices BM25 existentes...")
-                
-                with open(indices_file, 'rb') as f:
-                    self.bm25_indices = pickle.load(f)
-                    
-                with open(documents_file, 'rb') as f:
-                    self.bm25_documents = pickle.load(f)
-                
+            self.bm25_indices = load_bm25_indices(self.bm25_dir)
+            if self.bm25_indices:
                 logger.info(f"[RAG] Índice BM25 carregado com sucesso - {len(self.bm25_indices)} seções")
             else:
                 logger.info("[RAG] Índice BM25 não encontrado, reconstruindo...")
@@ -456,7 +525,6 @@ class RAGRetrieval:
             logger.error(f"Erro ao carregar índices BM25: {e}")
             logger.info("[RAG] Índice BM25 não encontrado, reconstruindo...")
             self.bm25_indices = {}
-            self.bm25_documents = {}
 
     def _save_bm25_indices(self) -> None:
         """Salva índices BM25 no disco"""
@@ -464,16 +532,8 @@ class RAGRetrieval:
             if not self.bm25_indices:
                 logger.warning("Nenhum índice BM25 para salvar")
                 return
-                
-            indices_file = self.bm25_dir / "bm25_indices.pkl"
-            documents_file = self.bm25_dir / "bm25_documents.pkl"
             
-            with open(indices_file, 'wb') as f:
-                pickle.dump(self.bm25_indices, f)
-                
-            with open(documents_file, 'wb') as f:
-                pickle.dump(self.bm25_documents, f)
-                
+            save_bm25_indices(self.bm25_dir, self.bm25_indices)
             logger.info(f"[RAG] Índices BM25 salvos com sucesso - {len(self.bm25_indices)} seções")
             
         except Exception as e:
@@ -559,6 +619,12 @@ def search_legal(objective_slug: str, query: str, k: int = 8) -> List[Dict]:
     retrieval = get_retrieval_instance()
     return retrieval.search_legal(objective_slug, query, k)
 
+def search_sections(query: str, section_types: List[str], objective_slug: str = '', k: int = 5) -> Dict[str, List[Dict]]:
+    """Função de conveniência para busca híbrida em várias seções com uma única consulta"""
+    retrieval = get_retrieval_instance()
+    return retrieval.search_sections(query, section_types, objective_slug, k)
+
+@traced('retrieval.stage')
 def retrieve_for_stage(necessity: str, stage: str, k: int = 12) -> List[Dict]:
     """Recupera chunks do RAG priorizando seções relevantes para o estágio."""
 
@@ -579,29 +645,16 @@ def retrieve_for_stage(necessity: str, stage: str, k: int = 12) -> List[Dict]:
 
     priority_sections = stage_section_map.get(stage, ['requisito'])
 
-    results = []
     chunks_per_section = max(k // len(priority_sections), 3)
 
-    for section in priority_sections:
-        try:
-            section_results = retrieval._hybrid_search(
-                section_type=section,
-                objective_slug='',
-                query=necessity,
-                k=chunks_per_section
-            )
-            results.extend(section_results)
-        except Exception as e:
-            logger.warning(f"Error searching section {section}: {e}")
+    # Uma única consulta para todas as seções do estágio (tokenização e embedding feitos uma vez)
+    fusion = get_fusion_config(stage)
+    by_section = retrieval.search_sections(necessity, priority_sections, '', chunks_per_section, fusion)
+    results = [r for section in priority_sections for r in by_section.get(section, [])]
 
     if not results:
         try:
-            results = retrieval._hybrid_search(
-                section_type='requisito',
-                objective_slug='',
-                query=necessity,
-                k=k
-            )
+            results = retrieval.search_sections(necessity, ['requisito'], '', k, fusion).get('requisito', [])
         except Exception as e:
             logger.error(f"Error in fallback search: {e}")
 
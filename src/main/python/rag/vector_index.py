@@ -0,0 +1,278 @@
+"""
+Persistência do índice vetorial (FAISS) do sistema RAG.
+
+Os vetores normalizados são gravados como matriz NumPy (``faiss_vectors.npy``) e
+abertos com memory-mapping, de modo que workers no mesmo host compartilham o
+page cache e o tempo de inicialização não cresce com o tamanho da base.
+O ``IndexFlat`` do FAISS 1.8 copia os vetores para a memória mesmo com
+``IO_FLAG_MMAP``; por isso a busca exata por produto interno é feita aqui sobre a
+matriz mapeada, com a mesma interface ``search`` de ``faiss.IndexFlatIP``.
+
+Um manifesto (``faiss_manifest.json``) descreve o índice: quantidade de chunks,
+dimensão, modelo de embedding e checksum do conteúdo. O índice só é reutilizado
+se o manifesto bater com o estado atual da tabela ``kb_chunk``.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "faiss_vectors.npy"
+MAPPING_FILE = "faiss_mapping.json"
+MANIFEST_FILE = "faiss_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def default_index_dir() -> Path:
+    """Diretório dos índices persistidos (RAG_INDEX_DIR, padrão /app/data/indices)."""
+    return Path(os.getenv('RAG_INDEX_DIR', '/app/data/indices'))
+
+
+class MmapVectorIndex:
+    """
+    Índice exato por produto interno sobre uma matriz (possivelmente memory-mapped).
+
+    Compatível com o subconjunto de ``faiss.IndexFlatIP`` usado pelo RAG:
+    ``ntotal``, ``d`` e ``search(queries, k) -> (scores, indices)``. O argumento
+    opcional ``rows`` restringe a busca a um subconjunto de linhas (busca filtrada).
+    """
+
+    def __init__(self, vectors: np.ndarray):
+        if vectors.ndim != 2:
+            raise ValueError("vectors deve ser uma matriz 2D")
+        self.vectors = vectors
+
+    @property
+    def ntotal(self) -> int:
+        return int(self.vectors.shape[0])
+
+    @property
+    def d(self) -> int:
+        return int(self.vectors.shape[1])
+
+    def search(self, queries: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retorna os ``k`` vetores de maior produto interno para cada consulta.
+
+        Args:
+            queries: Matriz (nq, d) de consultas já normalizadas
+            k: Número de vizinhos
+            rows: Subconjunto opcional de linhas elegíveis (busca filtrada)
+
+        Returns:
+            (scores, indices) no formato do FAISS; posições vazias têm índice -1
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        if rows is None:
+            candidates = self.vectors
+        elif rows.size and rows[-1] - rows[0] + 1 == rows.size:
+            # Partição contígua (índice ordenado por seção/objetivo): fatia sem cópia
+            candidates = self.vectors[rows[0]:rows[-1] + 1]
+        else:
+            candidates = self.vectors[rows]
+        n = candidates.shape[0]
+        scores_out = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        indices_out = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        if n == 0 or k <= 0:
+            return scores_out, indices_out
+
+        kk = min(k, n)
+        all_scores = candidates @ queries.T  # (n, nq)
+        for q in range(queries.shape[0]):
+            col = all_scores[:, q]
+            top = np.argpartition(-col, kk - 1)[:kk] if kk < n else np.arange(n)
+            top = top[np.argsort(-col[top], kind='stable')]
+            scores_out[q, :kk] = col[top]
+            indices_out[q, :kk] = top if rows is None else rows[top]
+        return scores_out, indices_out
+
+
+def partition_order(documents: Sequence[Dict]) -> np.ndarray:
+    """
+    Ordem das linhas por (section_type, objective_slug, chunk_id). Gravar o índice nessa
+    ordem torna cada partição de ``partition_rows`` um intervalo contíguo da matriz.
+    """
+    keys = [(doc.get('section_type') or '', doc.get('objective_slug') or '', doc.get('chunk_id') or 0)
+            for doc in documents]
+    return np.asarray(sorted(range(len(keys)), key=keys.__getitem__), dtype=np.int64)
+
+
+def partition_rows(documents: Sequence[Dict]) -> Dict[Tuple[str, str], np.ndarray]:
+    """
+    Agrupa as linhas do índice por section_type e por (section_type, objective_slug),
+    para que a busca filtrada percorra apenas as linhas elegíveis.
+
+    Returns:
+        Dicionário (section_type, '') -> linhas da seção e
+        (section_type, objective_slug) -> linhas da seção naquele objetivo
+    """
+    groups: Dict[Tuple[str, str], List[int]] = {}
+    for row, doc in enumerate(documents):
+        section = doc.get('section_type')
+        groups.setdefault((section, ''), []).append(row)
+        slug = doc.get('objective_slug') or ''
+        if slug:
+            groups.setdefault((section, slug), []).append(row)
+    return {key: np.asarray(rows, dtype=np.int64) for key, rows in groups.items()}
+
+
+def content_checksum(items: Sequence[Tuple[int, str]]) -> str:
+    """
+    Checksum do conteúdo indexado: md5 de "id:md5(conteúdo)" em ordem de id, separados por vírgula.
+    A mesma fórmula é calculada no PostgreSQL em ``kb_fingerprint``.
+    """
+    digest = hashlib.md5()
+    first = True
+    for chunk_id, content in sorted(items, key=lambda item: item[0]):
+        part = f"{chunk_id}:{hashlib.md5((content or '').encode('utf-8')).hexdigest()}"
+        digest.update((part if first else "," + part).encode('utf-8'))
+        first = False
+    return digest.hexdigest()
+
+
+def kb_fingerprint(session) -> Dict:
+    """
+    Estado atual dos chunks com embedding na base (quantidade e checksum de conteúdo).
+    No PostgreSQL o checksum é calculado no servidor, sem trafegar o texto dos chunks.
+    """
+    from sqlalchemy import text
+    from domain.dto.KbDto import KbChunk
+
+    bind = session.get_bind()
+    if bind is not None and bind.dialect.name == 'postgresql':
+        row = session.execute(text(
+            "SELECT count(*), coalesce(md5(string_agg(id::text || ':' || md5(content_text), ',' ORDER BY id)), "
+            "md5('')) FROM kb_chunk WHERE embedding IS NOT NULL"
+        )).one()
+        return {'chunk_count': int(row[0]), 'content_checksum': row[1]}
+
+    rows = session.query(KbChunk.id, KbChunk.content_text).filter(KbChunk.embedding.isnot(None)).all()
+    return {'chunk_count': len(rows), 'content_checksum': content_checksum(rows)}
+
+
+def save_vector_index(index_dir: Path, vectors: np.ndarray, documents: List[Dict], embedding_model: str,
+                      checksum: str) -> bool:
+    """
+    Grava vetores, mapeamento e manifesto. O manifesto é gravado por último, e cada
+    arquivo é substituído atomicamente, para que leitores nunca vejam um índice parcial.
+
+    Args:
+        index_dir: Diretório de destino
+        vectors: Matriz (n, d) float32 já normalizada
+        documents: Metadados alinhados com as linhas de ``vectors``
+        embedding_model: Modelo que gerou os embeddings
+        checksum: ``content_checksum`` dos chunks indexados
+    """
+    try:
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+        mapping = {
+            'chunk_ids': [int(doc['chunk_id']) for doc in documents],
+            'document_ids': [doc.get('document_id') for doc in documents],
+            'section_types': [doc.get('section_type') for doc in documents],
+            'objective_slugs': [doc.get('objective_slug') or '' for doc in documents],
+        }
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'chunk_count': int(vectors.shape[0]),
+            'dimension': int(vectors.shape[1]),
+            'embedding_model': embedding_model,
+            'content_checksum': checksum,
+            'created_at': datetime.utcnow().isoformat(),
+        }
+
+        tmp_vectors = index_dir / (VECTORS_FILE + ".tmp")
+        with open(tmp_vectors, 'wb') as f:
+            np.save(f, vectors)
+        os.replace(tmp_vectors, index_dir / VECTORS_FILE)
+
+        for name, payload in ((MAPPING_FILE, mapping), (MANIFEST_FILE, manifest)):
+            tmp = index_dir / (name + ".tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp, index_dir / name)
+
+        logger.info(f"[RAG] Índice vetorial salvo em {index_dir} ({manifest['chunk_count']} vetores)")
+        return True
+
+    except Exception as e:
+        logger.warning(f"Não foi possível salvar o índice vetorial em {index_dir}: {e}")
+        return False
+
+
+def read_manifest(index_dir: Path) -> Optional[Dict]:
+    path = Path(index_dir) / MANIFEST_FILE
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Manifesto do índice inválido ({path}): {e}")
+        return None
+
+
+def manifest_is_current(manifest: Optional[Dict], fingerprint: Dict, embedding_model: str) -> bool:
+    """Verifica se o manifesto corresponde à base atual e ao modelo de embedding configurado."""
+    if not manifest or manifest.get('version') != MANIFEST_VERSION:
+        return False
+    return (
+        manifest.get('embedding_model') == embedding_model
+        and manifest.get('chunk_count') == fingerprint.get('chunk_count')
+        and manifest.get('content_checksum') == fingerprint.get('content_checksum')
+    )
+
+
+def load_vector_index(index_dir: Path) -> Optional[Tuple[MmapVectorIndex, List[Dict], Dict]]:
+    """
+    Abre o índice persistido com memory-mapping.
+
+    Returns:
+        (índice, documentos, manifesto) ou None se ausente/inconsistente
+    """
+    index_dir = Path(index_dir)
+    manifest = read_manifest(index_dir)
+    if manifest is None:
+        return None
+
+    try:
+        vectors = np.load(index_dir / VECTORS_FILE, mmap_mode='r')
+        with open(index_dir / MAPPING_FILE, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Falha ao abrir índice vetorial em {index_dir}: {e}")
+        return None
+
+    if not isinstance(mapping, dict) or vectors.ndim != 2:
+        logger.info("[RAG] Índice vetorial em formato antigo, será reconstruído")
+        return None
+
+    chunk_ids = mapping.get('chunk_ids', [])
+    if (len(chunk_ids) != vectors.shape[0] or vectors.shape[0] != manifest.get('chunk_count')
+            or vectors.shape[1] != manifest.get('dimension')):
+        logger.warning("[RAG] Índice vetorial não confere com o manifesto, será reconstruído")
+        return None
+
+    documents = [
+        {
+            'chunk_id': chunk_id,
+            'document_id': document_id,
+            'section_type': section_type,
+            'section_title': section_type,
+            'objective_slug': objective_slug,
+        }
+        for chunk_id, document_id, section_type, objective_slug in zip(
+            chunk_ids, mapping['document_ids'], mapping['section_types'], mapping['objective_slugs']
+        )
+    ]
+    return MmapVectorIndex(vectors), documents, manifest
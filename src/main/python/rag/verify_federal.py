@@ -10,6 +10,8 @@ from datetime import datetime
 from dataclasses import dataclass
 from enum import Enum
 
+from domain.usecase.utils.legal_citations import extract_citations
+
 logger = logging.getLogger(__name__)
 
 class FederalDocumentType(Enum):
@@ -36,6 +38,14 @@ class FederalNorm:
     revoked_by: Optional[str] = None
     summary: Optional[str] = None
 
+# Tipos do extrator de citações considerados na verificação federal
+_FEDERAL_TYPES = {
+    'lei': FederalDocumentType.LEI_FEDERAL,
+    'decreto': FederalDocumentType.DECRETO_FEDERAL,
+    'medida_provisoria': FederalDocumentType.MEDIDA_PROVISORIA,
+    'lei_complementar': FederalDocumentType.LEI_COMPLEMENTAR,
+}
+
 class FederalNormVerifier:
     """Verificador de normas federais"""
     
@@ -141,49 +151,26 @@ class FederalNormVerifier:
     def _extract_federal_norms(self, text: str) -> List[Dict]:
         """Extrai normas federais específicas do texto"""
         federal_norms = []
-        text_lower = text.lower()
-        
-        # Padrões para diferentes tipos de normas federais
-        patterns = {
-            FederalDocumentType.LEI_FEDERAL: [
-                r'lei\s+(?:federal\s+)?n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
-                r'lei\s+(\d+(?:[\.\/\-]\d+)*)'
-            ],
-            FederalDocumentType.DECRETO_FEDERAL: [
-                r'decreto\s+(?:federal\s+)?n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)'
-            ],
-            FederalDocumentType.MEDIDA_PROVISORIA: [
-                r'medida\s+provis[óo]ria\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)',
-                r'mp\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)'
-            ],
-            FederalDocumentType.LEI_COMPLEMENTAR: [
-                r'lei\s+complementar\s+n[oº°]?\s*(\d+(?:[\.\/\-]\d+)*)'
-            ]
-        }
-        
-        for doc_type, type_patterns in patterns.items():
-            for pattern in type_patterns:
-                matches = re.finditer(pattern, text_lower, re.IGNORECASE)
-                
-                for match in matches:
-                    norm_number = match.group(1)
-                    
-                    # Verificar se é uma norma conhecida
-                    known_info = self.known_federal_laws.get(norm_number, {})
-                    
-                    federal_norm = {
-                        'type': doc_type,
-                        'number': norm_number,
-                        'full_match': match.group(0),
-                        'position': (match.start(), match.end()),
-                        'is_known': bool(known_info),
-                        'title': known_info.get('title', ''),
-                        'status': known_info.get('status', 'unknown'),
-                        'context': self._extract_norm_context(text, match.start(), match.end())
-                    }
-                    
-                    federal_norms.append(federal_norm)
-        
+        for citation in extract_citations(text):
+            doc_type = _FEDERAL_TYPES.get(citation.type)
+            # Qualificadores estadual/municipal/distrital excluem a citação
+            if doc_type is None or citation.scope not in (None, 'federal'):
+                continue
+
+            # Verificar se é uma norma conhecida
+            known_info = self.known_federal_laws.get(citation.key, {})
+
+            federal_norms.append({
+                'type': doc_type,
+                'number': citation.key,
+                'full_match': citation.text,
+                'position': (citation.start, citation.end),
+                'is_known': bool(known_info),
+                'title': known_info.get('title', ''),
+                'status': known_info.get('status', 'unknown'),
+                'context': self._extract_norm_context(text, citation.start, citation.end)
+            })
+
         return self._deduplicate_norms(federal_norms)
 
     def _identify_issuing_bodies(self, text: str) -> List[Dict]:
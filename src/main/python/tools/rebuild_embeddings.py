@@ -9,32 +9,24 @@ if SRC_DIR not in sys.path:
 from application.config.FlaskConfig import create_api
 from domain.interfaces.dataprovider.DatabaseConfig import db
 from domain.dto.KbDto import KbChunk
-from openai import OpenAI
-
-
-def get_embedding(client: OpenAI, text: str):
-    """Gera embedding usando OpenAI API"""
-    try:
-        response = client.embeddings.create(model="text-embedding-3-small", input=text)
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Erro ao gerar embedding: {e}")
-        return None
+from rag.embeddings import EmbeddingPipeline, write_embeddings_bulk
+from application.ai.llm_gateway import get_openai_client
 
 
 def main():
-    app = create_api()
-    client = OpenAI()
+    app = create_api(kb_bootstrap='off')
+    client = get_openai_client()
+    if client is None:
+        print("OPENAI_API_KEY não configurada.")
+        return
     with app.app_context():
-        chunks = db.session.query(KbChunk).filter(KbChunk.embedding == None).all()
+        chunks = db.session.query(KbChunk.id, KbChunk.content_text).filter(KbChunk.embedding == None).all()
         print(f"Encontrados {len(chunks)} chunks sem embedding.")
-        for chunk in chunks:
-            embedding = get_embedding(client, chunk.content_text)
-            if embedding:
-                chunk.embedding = embedding
-                db.session.add(chunk)
+        pipeline = EmbeddingPipeline(client)
+        embeddings = pipeline.embed_chunks(chunks)
+        write_embeddings_bulk(db.session, embeddings)
         db.session.commit()
-        print("Embeddings atualizados com sucesso!")
+        print(f"Embeddings atualizados com sucesso! ({len(embeddings)} chunks, {pipeline.stats['requests']} requisições)")
 
 
 if __name__ == "__main__":
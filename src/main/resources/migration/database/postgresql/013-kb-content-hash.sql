@@ -0,0 +1,20 @@
+-- ================================================
+-- Changeset 013: Add Content Hash Columns to Knowledge Base
+-- Description: Adds content hashes used by incremental ingestion
+-- Tables: kb_document, kb_chunk
+-- ================================================
+
+-- alter table section -------------------------------------------------
+
+ALTER TABLE kb_document ADD COLUMN IF NOT EXISTS content_hash varchar(64);
+ALTER TABLE kb_chunk ADD COLUMN IF NOT EXISTS content_hash varchar(64);
+
+-- create indexes section -------------------------------------------------
+
+CREATE INDEX IF NOT EXISTS idx_kb_document_filename ON kb_document (filename);
+CREATE INDEX IF NOT EXISTS idx_kb_chunk_content_hash ON kb_chunk (content_hash);
+
+-- create comments section -------------------------------------------------
+
+COMMENT ON COLUMN kb_document.content_hash IS 'SHA-256 of the source file or record; unchanged sources are skipped on ingestion';
+COMMENT ON COLUMN kb_chunk.content_hash IS 'SHA-256 of section type and chunk text; unchanged chunks keep their embeddings';
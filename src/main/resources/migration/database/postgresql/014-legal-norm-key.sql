@@ -0,0 +1,37 @@
+-- ================================================
+-- Changeset 014: Normalized Key for Legal Norm Cache
+-- Description: Adds the (tipo, numero, ano) key used by batched LexML lookups
+-- Tables: legal_norm_cache
+-- ================================================
+
+-- alter table section -------------------------------------------------
+
+ALTER TABLE legal_norm_cache ADD COLUMN IF NOT EXISTS norm_key varchar(120);
+
+-- backfill section -------------------------------------------------
+
+-- Entries cached without a LexML URN were stored as 'norma:<Tipo>:<numero>:<ano>';
+-- the most recently verified one wins when several map to the same key
+WITH candidates AS (
+    SELECT DISTINCT ON (norm_key) id, norm_key
+      FROM (SELECT id, last_verified_at,
+                   lower(replace(split_part(norm_urn, ':', 2), ' ', '_')) || ':' ||
+                   ltrim(replace(split_part(norm_urn, ':', 3), '.', ''), '0') || ':' ||
+                   split_part(norm_urn, ':', 4) AS norm_key
+              FROM legal_norm_cache
+             WHERE norm_key IS NULL
+               AND norm_urn ~ '^norma:[A-Za-z ]+:[0-9.]*[1-9][0-9.]*:[0-9]{4}$') keyed
+     ORDER BY norm_key, last_verified_at DESC
+)
+UPDATE legal_norm_cache t
+   SET norm_key = c.norm_key
+  FROM candidates c
+ WHERE t.id = c.id;
+
+-- create unique constraints section -------------------------------------------------
+
+CREATE UNIQUE INDEX IF NOT EXISTS uk_legal_norm_cache_norm_key ON legal_norm_cache (norm_key);
+
+-- create comments section -------------------------------------------------
+
+COMMENT ON COLUMN legal_norm_cache.norm_key IS 'Normalized tipo:numero:ano key; unique, used by batched cache lookups';
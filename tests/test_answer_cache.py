@@ -0,0 +1,122 @@
+"""
+Tests for the semantic response cache in front of generate_answer
+"""
+import os
+import sys
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from application.ai.answer_cache import (SemanticAnswerCache, parse_stage_thresholds, CACHE_REQUESTS,
+                                        CACHE_ENTRIES, CACHE_EVICTIONS)
+from application.services.telemetry import registry
+from application.ai.generator import generate_answer
+from rag.embeddings import StubEmbeddingClient
+
+REQUIREMENTS = [f"{n}. Requisito de manutenção preventiva número {n}" for n in range(1, 11)]
+
+
+class FakeChatClient:
+    """Cliente OpenAI simulado que devolve uma lista de requisitos em JSON"""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        self.calls += 1
+        content = json.dumps({'intro': 'Sugestão inicial', 'requirements': REQUIREMENTS}, ensure_ascii=False)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def rag(necessity, ids=(1, 2, 3, 4)):
+    return {'necessity': necessity, 'chunks': [{'id': i, 'text': f'trecho {i}'} for i in ids]}
+
+
+class TestSemanticAnswerCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.cache = SemanticAnswerCache(StubEmbeddingClient(dimension=256).vector,
+                                         thresholds={'collect_need': 0.9}, min_rag_overlap=0.5,
+                                         ttl=60, max_entries=2, clock=lambda: self.now)
+
+    def remember(self, necessity, result, stage='collect_need', context=None):
+        _, query = self.cache.lookup(stage, necessity, [], context or rag(necessity))
+        self.cache.store(query, result)
+
+    def test_match_by_stage_similarity_and_rag_overlap(self):
+        hits_before = CACHE_REQUESTS.value(stage='collect_need', result='hit')
+        misses_before = CACHE_REQUESTS.value(stage='collect_need', result='miss')
+        self.remember('Manutenção de ar-condicionado', {'requirements': ['1. Filtros']})
+
+        hit, _ = self.cache.lookup('collect_need', 'manutenção de ar condicionado', [], rag('x', ids=(1, 2, 3, 5)))
+        self.assertEqual(hit, {'requirements': ['1. Filtros']})
+
+        # Necessidade diferente, contexto RAG diferente ou estágio sem limiar: miss
+        self.assertIsNone(self.cache.lookup('collect_need', 'Locação de veículos', [], rag('x'))[0])
+        self.assertIsNone(self.cache.lookup('collect_need', 'Manutenção de ar-condicionado', [],
+                                            rag('x', ids=(7, 8, 9)))[0])
+        self.assertEqual(self.cache.lookup('refine', 'Manutenção de ar-condicionado', [], rag('x')), (None, None))
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 3))
+        self.assertEqual(stats['stages']['collect_need']['hit_rate'], 0.25)
+
+        # Mesmos números expostos em /metrics
+        self.assertEqual(CACHE_REQUESTS.value(stage='collect_need', result='hit'), hits_before + 1)
+        self.assertEqual(CACHE_REQUESTS.value(stage='collect_need', result='miss'), misses_before + 3)
+        self.assertEqual(CACHE_ENTRIES.value(), 1)
+        self.assertIn('etp_answer_cache_requests_total{stage="collect_need",result="hit"}', registry.render())
+
+    def test_ttl_and_size_bound(self):
+        lru_before, ttl_before = CACHE_EVICTIONS.value(reason='lru'), CACHE_EVICTIONS.value(reason='ttl')
+        self.remember('Manutenção de ar-condicionado', {'n': 1})
+        self.remember('Locação de veículos', {'n': 2})
+        self.remember('Serviços de limpeza predial', {'n': 3})
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.assertIsNone(self.cache.lookup('collect_need', 'Manutenção de ar-condicionado', [], rag('x'))[0])
+
+        self.now = 61
+        self.assertIsNone(self.cache.lookup('collect_need', 'Locação de veículos', [], rag('x'))[0])
+        self.assertEqual(self.cache.stats()['entries'], 0)
+        self.assertEqual(CACHE_ENTRIES.value(), 0)
+        self.assertEqual(CACHE_EVICTIONS.value(reason='lru'), lru_before + 1)
+        self.assertEqual(CACHE_EVICTIONS.value(reason='ttl'), ttl_before + 2)
+
+    def test_cached_result_is_a_copy(self):
+        self.remember('Locação de veículos', {'requirements': ['1. Seguro']})
+        hit, _ = self.cache.lookup('collect_need', 'Locação de veículos', [], rag('x'))
+        hit['requirements'].append('2. Alterado')
+        again, _ = self.cache.lookup('collect_need', 'Locação de veículos', [], rag('x'))
+        self.assertEqual(again, {'requirements': ['1. Seguro']})
+
+    def test_parse_stage_thresholds(self):
+        self.assertEqual(parse_stage_thresholds('collect_need:0.95, refine:0.97,bad,x:y'),
+                         {'collect_need': 0.95, 'refine': 0.97})
+
+
+class TestGenerateAnswerCache(unittest.TestCase):
+
+    def test_near_identical_necessity_skips_the_llm(self):
+        client = FakeChatClient()
+        cache = SemanticAnswerCache(StubEmbeddingClient(dimension=256).vector, thresholds={'collect_need': 0.9})
+
+        with patch('application.ai.generator.get_openai_client', return_value=client), \
+                patch('application.ai.generator.get_answer_cache', return_value=cache):
+            first = generate_answer('collect_need', [], 'Manutenção de ar-condicionado',
+                                    rag('Manutenção de ar-condicionado'))
+            second = generate_answer('collect_need', [], 'manutenção de ar condicionado',
+                                     rag('manutenção de ar condicionado'))
+
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(second, first)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Tests for the array-backed BM25 inverted index
+"""
+import os
+import sys
+import unittest
+import tempfile
+import shutil
+
+import numpy as np
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from rag.bm25_index import BM25Index, save_bm25_indices, load_bm25_indices
+
+try:
+    from rank_bm25 import BM25Okapi
+except ImportError:  # pragma: no cover
+    BM25Okapi = None
+
+CORPUS = [
+    "manutenção preventiva de aeronaves com disponibilidade mínima",
+    "locação de veículos com seguro total e manutenção inclusa",
+    "manutenção corretiva de equipamentos de informática",
+    "serviços de limpeza diária das dependências do órgão",
+    "contratação observará a lei 14133 de 2021",
+    "veículos utilitários para transporte de equipes de manutenção",
+]
+
+
+def tokenize(text):
+    return [t for t in text.lower().split() if len(t) > 2]
+
+
+class TestBM25Index(unittest.TestCase):
+    """Test BM25Index scoring, filtering and persistence"""
+
+    def setUp(self):
+        self.docs = [(100 + i, 1, 'frota' if 'veículos' in text else 'geral', tokenize(text))
+                     for i, text in enumerate(CORPUS)]
+        self.index = BM25Index.build(self.docs)
+
+    @unittest.skipIf(BM25Okapi is None, "rank_bm25 not installed")
+    def test_scores_match_rank_bm25(self):
+        reference = BM25Okapi([d[3] for d in self.docs])
+        for query in ["manutenção de veículos", "lei 14133", "limpeza limpeza órgão", "inexistente"]:
+            expected = reference.get_scores(tokenize(query))
+            docs, scores = self.index.scores_for(tokenize(query))
+            dense = np.zeros(len(self.docs))
+            dense[docs] = scores
+            np.testing.assert_allclose(dense, expected, rtol=1e-9, atol=1e-12)
+
+    def test_search_returns_top_k_in_score_order(self):
+        hits = self.index.search(tokenize("manutenção de veículos"), k=3)
+
+        self.assertEqual(len(hits), 3)
+        scores = [score for _, score in hits]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual({self.docs[i][0] for i, _ in hits[:2]}, {101, 105})
+
+    def test_search_filters_by_objective_slug(self):
+        hits = self.index.search(tokenize("manutenção"), k=5, objective_slug='frota')
+
+        self.assertEqual({self.docs[i][2] for i, _ in hits}, {'frota'})
+        self.assertEqual(self.index.search(tokenize("manutenção"), k=5, objective_slug='outro'), [])
+
+    def test_search_pads_with_zero_scores_like_full_ranking(self):
+        hits = self.index.search(tokenize("limpeza"), k=3)
+
+        self.assertEqual(hits[0][0], 3)
+        self.assertEqual([h[1] for h in hits[1:]], [0.0, 0.0])
+        self.assertEqual([h[0] for h in hits[1:]], [0, 1])
+
+    def test_save_and_load_memory_mapped(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            save_bm25_indices(test_dir, {'requisito': self.index, 'norma legal/2': self.index})
+            loaded = load_bm25_indices(test_dir)
+
+            self.assertEqual(set(loaded), {'requisito', 'norma legal/2'})
+            self.assertIsInstance(loaded['requisito'].posting_docs, np.memmap)
+            query = tokenize("manutenção de veículos")
+            self.assertEqual(loaded['requisito'].search(query, 4), self.index.search(query, 4))
+        finally:
+            shutil.rmtree(test_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
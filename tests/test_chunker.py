@@ -0,0 +1,143 @@
+"""
+Tests for the token-aware chunker shared by all ingestion paths
+"""
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from rag import chunker
+from rag.chunker import chunk_text, count_tokens, split_blocks, split_sentences
+
+
+SAMPLE = """1. OBJETIVO DA CONTRATAÇÃO
+A contratação observará a Lei 14.133/2021, art. 75, inciso II. O valor estimado é de R$ 1.250,00 por mês,
+com reajuste anual de 3.5 por cento. Conforme o art. 18 da lei, o estudo técnico preliminar é obrigatório.
+
+2. Requisitos
+a) atendimento em até 4 horas úteis;
+b) garantia mínima de 12 meses.
+"""
+
+
+class TestSentences(unittest.TestCase):
+
+    def test_does_not_split_on_law_numbers_decimals_or_abbreviations(self):
+        text = ("A contratação observará a Lei 14.133/2021, art. 75, inciso II. O valor é de R$ 1.250,00, "
+                "com reajuste de 3.5 por cento. Conforme o art. 18 da lei, o estudo é obrigatório.")
+        self.assertEqual(split_sentences(text), [
+            "A contratação observará a Lei 14.133/2021, art. 75, inciso II.",
+            "O valor é de R$ 1.250,00, com reajuste de 3.5 por cento.",
+            "Conforme o art. 18 da lei, o estudo é obrigatório.",
+        ])
+
+    def test_blocks_follow_headings_and_numbered_clauses(self):
+        blocks = split_blocks(SAMPLE)
+        self.assertEqual(blocks[0], ("1. OBJETIVO DA CONTRATAÇÃO", True))
+        # Linhas quebradas do mesmo parágrafo são unidas
+        self.assertIn("por mês, com reajuste", blocks[1][0])
+        self.assertEqual(blocks[2], ("2. Requisitos", True))
+        self.assertEqual([text for text, _ in blocks[3:]],
+                         ["a) atendimento em até 4 horas úteis;", "b) garantia mínima de 12 meses."])
+
+
+class TestChunkText(unittest.TestCase):
+
+    def test_short_text_is_returned_whole(self):
+        self.assertEqual(chunk_text("  Texto curto.  ", max_tokens=50), ["Texto curto."])
+        self.assertEqual(chunk_text("   "), [])
+
+    def test_chunks_respect_token_limit_and_sentence_boundaries(self):
+        sentences = [f"O item {i}.{i % 7} segue a Lei 14.133/2021 e o Decreto 10.024/2019 na manutenção."
+                     for i in range(60)]
+        chunks = chunk_text(" ".join(sentences), max_tokens=120, overlap_tokens=0)
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(count_tokens(chunk), 120)
+            self.assertTrue(chunk.endswith("manutenção."))
+        self.assertEqual(" ".join(chunks), " ".join(sentences))
+
+    def test_overlap_repeats_trailing_sentences(self):
+        sentences = [f"Frase {i} sobre o contrato de limpeza predial." for i in range(40)]
+        chunks = chunk_text(" ".join(sentences), max_tokens=60, overlap_tokens=15)
+
+        for previous, current in zip(chunks, chunks[1:]):
+            last_sentence = split_sentences(previous)[-1]
+            self.assertTrue(current.startswith(last_sentence))
+
+    def test_heading_starts_a_new_chunk(self):
+        chunks = chunk_text(SAMPLE * 3, max_tokens=80, overlap_tokens=20)
+        self.assertTrue(all(chunk.startswith(("1. OBJETIVO", "2. Requisitos")) for chunk in chunks))
+        self.assertFalse(any("2. Requisitos" in chunk and "OBJETIVO" in chunk for chunk in chunks))
+
+    def test_small_sections_are_merged_with_the_next_one(self):
+        text = "ANEXO I\nItem curto.\n\nANEXO II\n" + " ".join(
+            f"Frase {i} do anexo sobre a manutenção predial." for i in range(40))
+        chunks = chunk_text(text, max_tokens=120, overlap_tokens=0)
+        self.assertTrue(chunks[0].startswith("ANEXO I Item curto. ANEXO II Frase 0"))
+
+    def test_one_word_per_line_extraction_is_not_taken_as_headings(self):
+        words = ("ESTUDO TÉCNICO PRELIMINAR O presente estudo fundamenta a contratação de serviços "
+                 "de manutenção predial. A Lei 14.133/2021 orienta o planejamento.").split()
+        blocks = split_blocks("\n".join(words * 3))
+        self.assertEqual(len(blocks), 1)
+        self.assertFalse(blocks[0][1])
+
+    def test_oversized_sentence_is_split_by_words(self):
+        chunks = chunk_text("palavra " * 500, max_tokens=100, overlap_tokens=10)
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(count_tokens(chunk) <= 100 for chunk in chunks))
+
+    def test_word_longer_than_the_limit_is_cut_into_windows(self):
+        for encoding in (chunker._tiktoken_encoding(), None):
+            with self.subTest(tiktoken=encoding is not None), \
+                    patch.object(chunker, '_tiktoken_encoding', return_value=encoding):
+                chunks = chunk_text('a' * 5000, max_tokens=100, overlap_tokens=20)
+                self.assertGreater(len(chunks), 1)
+                self.assertTrue(all(count_tokens(chunk) <= 100 for chunk in chunks))
+                self.assertEqual("".join(chunks), 'a' * 5000)
+
+                blob = 'dGVzdGU' * 400
+                chunks = chunk_text(f"Segue o anexo codificado: {blob} fim do anexo.", max_tokens=100, overlap_tokens=20)
+                self.assertTrue(all(count_tokens(chunk) <= 100 for chunk in chunks))
+                self.assertTrue(chunks[0].startswith("Segue o anexo codificado:"))
+                self.assertTrue(chunks[-1].endswith("fim do anexo."))
+
+    def test_limits_come_from_environment(self):
+        text = " ".join(f"Frase número {i} do estudo técnico." for i in range(200))
+        with patch.dict(os.environ, {'CHUNK_MAX_TOKENS': '50', 'CHUNK_OVERLAP_TOKENS': '0'}):
+            small = chunk_text(text)
+        with patch.dict(os.environ, {'CHUNK_MAX_TOKENS': '500', 'CHUNK_OVERLAP_TOKENS': '0'}):
+            large = chunk_text(text)
+        self.assertGreater(len(small), len(large))
+        self.assertTrue(all(count_tokens(chunk) <= 50 for chunk in small))
+
+
+class TestTokenCount(unittest.TestCase):
+
+    def test_estimate_is_used_without_tiktoken(self):
+        with patch.object(chunker, '_tiktoken_encoding', return_value=None):
+            self.assertEqual(count_tokens(""), 0)
+            self.assertEqual(count_tokens("Lei 14.133/2021"), chunker.estimate_tokens("Lei 14.133/2021"))
+            self.assertGreater(count_tokens("manutenção preventiva"), 2)
+
+
+class TestIngestionPaths(unittest.TestCase):
+
+    def test_kb_upload_and_etp_ingestion_use_the_same_chunker(self):
+        from adapter.entrypoint.kb.KbController import chunk_text as kb_chunk_text
+        from rag.ingest_etps import ETPIngestor
+
+        text = SAMPLE * 10
+        ingestor = ETPIngestor.__new__(ETPIngestor)
+        self.assertEqual(kb_chunk_text(text, max_tokens=100), chunk_text(text, max_tokens=100))
+        self.assertEqual(ingestor._split_content(text, max_tokens=100),
+                         chunk_text(text, max_tokens=100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Tests for the single-query conversation listing (last-message preview and keyset pagination)
+"""
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from flask import Flask
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+from domain.repositories.ConversationRepository import ConversationRepo
+from adapter.entrypoint.etp.EtpDynamicController import etp_dynamic_bp
+
+
+class RecordingSession:
+    """Sessão que apenas registra as consultas emitidas"""
+
+    def __init__(self):
+        self.statements = []
+
+    def query(self, *entities):
+        session = self
+
+        class RecordingQuery(Query):
+            def all(self):
+                session.statements.append(self.statement)
+                return []
+
+        return RecordingQuery(entities)
+
+
+class TestConversationListQuery(unittest.TestCase):
+
+    def test_listing_is_one_lateral_query_with_keyset(self):
+        session = RecordingSession()
+        cursor = (datetime(2024, 5, 1, 12, 0), 'conv-9')
+        with patch('domain.repositories.ConversationRepository.db', SimpleNamespace(session=session)):
+            ConversationRepo.list_with_last_message('user-1', limit=21, before=cursor)
+
+        self.assertEqual(len(session.statements), 1)
+        sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+        self.assertIn('LEFT OUTER JOIN LATERAL', sql)
+        self.assertIn('(etp_conversations.updated_at, etp_conversations.id) <', sql)
+        self.assertIn('ORDER BY etp_conversations.updated_at DESC, etp_conversations.id DESC', sql)
+
+
+class TestConversationListEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(etp_dynamic_bp, url_prefix='/api/etp-dynamic')
+        self.client = app.test_client()
+        base = datetime(2024, 5, 1, 12, 0)
+        self.rows = [
+            (SimpleNamespace(id=f'conv-{n}', title=f'ETP {n}', created_at=base,
+                             updated_at=base - timedelta(minutes=n)), 'x' * (121 if n == 0 else 10))
+            for n in range(3)
+        ]
+
+    def test_page_with_previews_and_next_cursor(self):
+        with patch.object(ConversationRepo, 'list_with_last_message', return_value=self.rows) as listing:
+            response = self.client.get('/api/etp-dynamic/list?limit=2', headers={'X-User-Id': 'user-1'})
+
+        data = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['id'] for c in data['conversations']], ['conv-0', 'conv-1'])
+        self.assertEqual(data['conversations'][0]['preview'], 'x' * 120 + '...')
+        self.assertEqual(data['conversations'][1]['preview'], 'x' * 10)
+        self.assertEqual(data['next_cursor'], f"{self.rows[1][0].updated_at.isoformat()}|conv-1")
+        self.assertEqual(listing.call_args.kwargs['limit'], 3)
+
+        with patch.object(ConversationRepo, 'list_with_last_message', return_value=self.rows[2:]) as listing:
+            response = self.client.get('/api/etp-dynamic/list',
+                                       query_string={'limit': 2, 'cursor': data['next_cursor']})
+
+        self.assertIsNone(response.get_json()['next_cursor'])
+        self.assertEqual(listing.call_args.kwargs['before'], (self.rows[1][0].updated_at, 'conv-1'))
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/etp-dynamic/list?cursor=garbage')
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
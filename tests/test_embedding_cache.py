@@ -0,0 +1,69 @@
+"""
+Tests for the persistent embedding cache
+"""
+import os
+import sys
+import unittest
+import tempfile
+import shutil
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from rag.embedding_cache import EmbeddingCache, cache_key
+from rag.embeddings import EmbeddingPipeline, StubEmbeddingClient
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Test EmbeddingCache keys, persistence and LRU eviction"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'embeddings.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_key_is_stable_and_normalized(self):
+        self.assertEqual(cache_key('m', 'Lei  14.133\n'), cache_key('m', 'Lei 14.133'))
+        self.assertNotEqual(cache_key('m1', 'texto'), cache_key('m2', 'texto'))
+        # sha256 hex digest, independente de PYTHONHASHSEED
+        self.assertEqual(len(cache_key('m', 'texto')), 64)
+
+    def test_persists_across_instances(self):
+        EmbeddingCache(self.path).put('m', 'manutenção de ar-condicionado', [0.5, 0.25])
+
+        other = EmbeddingCache(self.path)
+        self.assertEqual(other.get('m', 'manutenção de ar-condicionado'), [0.5, 0.25])
+        self.assertIsNone(other.get('m', 'locação de veículos'))
+        self.assertEqual((other.hits, other.misses), (1, 1))
+
+    def test_lru_eviction_keeps_recently_used(self):
+        cache = EmbeddingCache(self.path, max_entries=20)
+        cache.put_many('m', [f't{i}' for i in range(20)], [[float(i)] for i in range(20)])
+        cache.get('m', 't0')  # t0 passa a ser o mais recente
+
+        cache.put('m', 'novo', [1.0])
+
+        self.assertLessEqual(len(cache), 20)
+        self.assertIsNotNone(cache.get('m', 't0'))
+        self.assertIsNone(cache.get('m', 't1'))
+        self.assertGreater(cache.stats()['evictions'], 0)
+
+    def test_pipeline_only_sends_cache_misses(self):
+        cache = EmbeddingCache(self.path)
+        client = StubEmbeddingClient(dimension=8)
+        EmbeddingPipeline(client, cache=cache).embed_texts(['a b', 'c d'])
+        self.assertEqual(client.calls, 1)
+
+        client = StubEmbeddingClient(dimension=8)
+        pipeline = EmbeddingPipeline(client, cache=cache)
+        vectors = pipeline.embed_texts(['a b', 'c d'])
+
+        self.assertEqual(client.calls, 0)
+        self.assertEqual(pipeline.stats['cache_hits'], 2)
+        self.assertTrue(all(v is not None for v in vectors))
+
+
+if __name__ == '__main__':
+    unittest.main()
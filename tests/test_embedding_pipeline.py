@@ -0,0 +1,84 @@
+"""
+Tests for the batched embedding pipeline
+"""
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from rag.embeddings import EmbeddingPipeline, StubEmbeddingClient
+
+
+class FlakyClient(StubEmbeddingClient):
+    """Stub client that fails the first N requests"""
+
+    def __init__(self, failures):
+        super().__init__(dimension=8)
+        self.failures = failures
+
+    def create(self, model=None, input=None, **kwargs):
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("rate limited")
+        return super().create(model=model, input=input)
+
+
+class TestEmbeddingPipeline(unittest.TestCase):
+    """Test EmbeddingPipeline batching, ordering and retries"""
+
+    def test_batches_respect_count_and_size_limits(self):
+        pipeline = EmbeddingPipeline(StubEmbeddingClient(dimension=8), batch_size=3, max_batch_chars=10)
+        texts = ["aaaa", "bbbb", "", "cccc", "dd", "e", "f", "g"]
+        batches = pipeline.make_batches(texts)
+
+        self.assertEqual([i for batch in batches for i in batch], [0, 1, 3, 4, 5, 6, 7])
+        for batch in batches:
+            self.assertLessEqual(len(batch), 3)
+            self.assertLessEqual(sum(len(texts[i]) for i in batch), 10)
+
+    def test_embed_texts_preserves_order_and_uses_few_requests(self):
+        client = StubEmbeddingClient(dimension=16)
+        pipeline = EmbeddingPipeline(client, batch_size=10, max_concurrency=3)
+        texts = [f"texto numero {i}" for i in range(35)] + [""]
+
+        vectors = pipeline.embed_texts(texts)
+
+        self.assertEqual(client.calls, 4)
+        self.assertIsNone(vectors[-1])
+        for text, vector in zip(texts[:-1], vectors[:-1]):
+            self.assertEqual(vector, client.vector(text).tolist())
+
+    def test_retries_with_backoff_then_succeeds(self):
+        client = FlakyClient(failures=2)
+        pipeline = EmbeddingPipeline(client, batch_size=5, max_retries=3, backoff_seconds=0)
+
+        vectors = pipeline.embed_texts(["um", "dois"])
+
+        self.assertTrue(all(v is not None for v in vectors))
+        self.assertEqual(pipeline.stats['retries'], 2)
+        self.assertEqual(pipeline.stats['failed_batches'], 0)
+
+    def test_exhausted_retries_leave_none(self):
+        client = FlakyClient(failures=10)
+        pipeline = EmbeddingPipeline(client, batch_size=5, max_retries=1, backoff_seconds=0)
+
+        vectors = pipeline.embed_texts(["um", "dois"])
+
+        self.assertEqual(vectors, [None, None])
+        self.assertEqual(pipeline.stats['failed_batches'], 1)
+
+    def test_embed_chunks_maps_by_id(self):
+        chunks = [SimpleNamespace(id=10, content_text="requisito a"),
+                  SimpleNamespace(id=11, content_text="   ")]
+        pipeline = EmbeddingPipeline(StubEmbeddingClient(dimension=8))
+
+        embeddings = pipeline.embed_chunks(chunks)
+
+        self.assertEqual(list(embeddings.keys()), [10])
+
+
+if __name__ == '__main__':
+    unittest.main()
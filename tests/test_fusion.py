@@ -0,0 +1,81 @@
+"""
+Tests for hybrid score fusion and the offline retrieval metrics
+"""
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from rag.fusion import FusionConfig, fuse_results, get_fusion_config, normalize_scores
+from rag.evaluation import recall_at_k, reciprocal_rank
+
+
+def bm25(*pairs):
+    return [{'chunk_id': cid, 'score': score, 'source': 'bm25'} for cid, score in pairs]
+
+
+def faiss(*pairs):
+    return [{'chunk_id': cid, 'score': score, 'source': 'faiss'} for cid, score in pairs]
+
+
+class TestFusion(unittest.TestCase):
+    """Test normalization methods, RRF and per-stage configuration"""
+
+    def setUp(self):
+        # BM25 com escala grande; o vetorial discorda na ordem
+        self.bm25 = bm25((1, 24.0), (2, 23.5), (3, 2.0))
+        self.faiss = faiss((3, 0.92), (4, 0.90), (1, 0.10))
+
+    def test_raw_is_dominated_by_bm25(self):
+        ranked = fuse_results(self.bm25, self.faiss, 4, FusionConfig(method='raw'))
+        self.assertEqual([r['chunk_id'] for r in ranked][:2], [1, 2])
+        self.assertAlmostEqual(ranked[0]['hybrid_score'], 0.7 * 24.0 + 0.3 * 0.10)
+
+    def test_minmax_gives_vector_scores_weight(self):
+        ranked = fuse_results(self.bm25, self.faiss, 4, FusionConfig(method='minmax', bm25_weight=0.5,
+                                                                       faiss_weight=0.5))
+        ids = [r['chunk_id'] for r in ranked]
+        # Chunk 3 (melhor vetorial, BM25 fraco) passa à frente do 2, ao contrário do raw
+        self.assertLess(ids.index(3), ids.index(2))
+        first = next(r for r in ranked if r['chunk_id'] == 1)
+        self.assertEqual((first['bm25_score'], first['faiss_score']), (24.0, 0.10))
+
+    def test_rrf_ignores_zero_score_bm25_padding(self):
+        results = bm25((1, 3.0), (2, 0.0))
+        ranked = fuse_results(results, faiss((3, 0.5)), 3, FusionConfig(method='rrf', rrf_k=60))
+        scores = {r['chunk_id']: r['hybrid_score'] for r in ranked}
+        self.assertAlmostEqual(scores[1], 1 / 61)
+        self.assertAlmostEqual(scores[3], 1 / 61)
+        self.assertEqual(scores[2], 0.0)
+
+    def test_normalize_constant_lists(self):
+        self.assertEqual(normalize_scores([0.0, 0.0], 'minmax').tolist(), [0.0, 0.0])
+        self.assertEqual(normalize_scores([2.0, 2.0], 'minmax').tolist(), [1.0, 1.0])
+        self.assertEqual(normalize_scores([2.0, 2.0], 'zscore').tolist(), [0.0, 0.0])
+
+    def test_stage_override_from_environment(self):
+        env = {'RAG_FUSION_METHOD': 'zscore', 'RAG_FUSION_STAGE_METHODS': 'legal_norms:rrf, summary:raw'}
+        with patch.dict(os.environ, env):
+            self.assertEqual(get_fusion_config('legal_norms').method, 'rrf')
+            self.assertEqual(get_fusion_config('summary').method, 'raw')
+            self.assertEqual(get_fusion_config('pca').method, 'zscore')
+            self.assertEqual(get_fusion_config('pca', method='minmax').method, 'minmax')
+        with patch.dict(os.environ, {'RAG_FUSION_METHOD': 'bogus'}):
+            self.assertEqual(get_fusion_config().method, 'minmax')
+
+
+class TestRetrievalMetrics(unittest.TestCase):
+
+    def test_recall_and_mrr(self):
+        retrieved = [5, 3, 9, 1]
+        self.assertEqual(recall_at_k(retrieved, [1, 3], 2), 0.5)
+        self.assertEqual(recall_at_k(retrieved, [1, 3], 4), 1.0)
+        self.assertEqual(reciprocal_rank(retrieved, [9, 1]), 1 / 3)
+        self.assertEqual(reciprocal_rank(retrieved, [7]), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Import-time budget: the app and its blueprints must import without the heavy optional
+dependencies (faiss, openai SDK, python-docx, PDF parsers), which are loaded on first use.
+
+The budget (sum of ``-X importtime`` self times) can be tuned with IMPORT_TIME_BUDGET_MS.
+"""
+import os
+import re
+import sys
+import subprocess
+import unittest
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+APP_IMPORTS = """
+import application.config.FlaskConfig
+import adapter.entrypoint.etp.EtpController
+import adapter.entrypoint.etp.EtpDynamicController
+import adapter.entrypoint.user.UserController
+import adapter.entrypoint.chat.ChatController
+import adapter.entrypoint.health.HealthController
+import adapter.entrypoint.admin.AdminController
+import adapter.entrypoint.kb.KbController
+import adapter.entrypoint.jobs.JobController
+import adapter.entrypoint.metrics.MetricsController
+"""
+
+# Carregados só quando usados (busca vetorial, chamadas ao LLM, exportação DOCX, ingestão de PDFs)
+DEFERRED = ('faiss', 'openai', 'docx', 'rapidfuzz', 'tiktoken', 'rank_bm25', 'PyPDF2', 'pypdf', 'fitz', 'pdfplumber')
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)')
+
+
+def profile_imports(code: str):
+    """Executa ``code`` num interpretador novo com -X importtime; retorna {módulo: tempo próprio em µs}"""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=SRC_DIR, env=env,
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise AssertionError(f"Falha ao importar:\n{result.stderr[-2000:]}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules[match.group(3)] = int(match.group(1))
+    return modules
+
+
+def deferred_in(modules):
+    return sorted({name.split('.')[0] for name in modules} & set(DEFERRED))
+
+
+class TestImportBudget(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app_modules = profile_imports(APP_IMPORTS)
+
+    def test_app_import_does_not_load_heavy_dependencies(self):
+        self.assertEqual(deferred_in(self.app_modules), [])
+
+    def test_app_import_within_budget(self):
+        budget_ms = float(os.getenv('IMPORT_TIME_BUDGET_MS', '2000'))
+        total_ms = sum(self.app_modules.values()) / 1000
+        slowest = sorted(self.app_modules.items(), key=lambda item: -item[1])[:10]
+        self.assertLess(total_ms, budget_ms,
+                        f"Importação do app levou {total_ms:.0f}ms (orçamento {budget_ms:.0f}ms); "
+                        f"mais lentos: {[(name, us // 1000) for name, us in slowest]}")
+
+    def test_retrieval_module_defers_faiss(self):
+        modules = profile_imports("import rag.retrieval")
+        self.assertEqual(deferred_in(modules), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+"""
+Tests for incremental knowledge-base ingestion (content hashing and chunk diff)
+"""
+import os
+import sys
+import json
+import shutil
+import unittest
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from flask import Flask
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+
+from domain.dto.EtpOrm import EtpSession
+from domain.dto.UserDto import User
+from domain.dto.KnowledgeBaseDto import KbDocument, KbChunk
+from domain.interfaces.dataprovider.DatabaseConfig import db
+from rag.ingest_etps import ETPIngestor, content_hash, file_hash
+
+
+@compiles(JSONB, 'sqlite')
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    # Coluna de embedding no banco em memória dos testes
+    return 'JSON'
+
+
+class FakeQuery:
+
+    def __init__(self, session):
+        self.session = session
+
+    def filter_by(self, **kwargs):
+        return self
+
+    def filter(self, *criteria):
+        return self
+
+    def all(self):
+        return list(self.session.chunks)
+
+    def delete(self, synchronize_session=None):
+        self.session.deleted = True
+        return 0
+
+
+class FakeSession:
+    """Sessão mínima: devolve os chunks existentes e registra inserções/remoções"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.added = []
+        self.deleted = False
+
+    def query(self, *entities):
+        return FakeQuery(self)
+
+    def add(self, obj):
+        self.added.append(obj)
+
+
+class TestIncrementalIngestion(unittest.TestCase):
+    """Test that unchanged chunks are kept and only new ones are inserted"""
+
+    def setUp(self):
+        self.ingestor = ETPIngestor.__new__(ETPIngestor)
+        self.ingestor._reset_ingest_stats()
+
+    def test_hashes_are_stable(self):
+        self.assertEqual(content_hash('requisito', 'texto'), content_hash('requisito', 'texto'))
+        self.assertNotEqual(content_hash('requisito', 'texto'), content_hash('norma_legal', 'texto'))
+
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(b'%PDF-1.4 conteudo')
+        try:
+            self.assertEqual(file_hash(f.name), file_hash(f.name))
+        finally:
+            os.unlink(f.name)
+
+    def test_sync_keeps_unchanged_chunks(self):
+        kept = SimpleNamespace(id=1, section_type='requisito', content_text='igual', content_hash=None)
+        stale = SimpleNamespace(id=2, section_type='requisito', content_text='antigo',
+                                content_hash=content_hash('requisito', 'antigo'))
+        session = FakeSession([kept, stale])
+        document = SimpleNamespace(id=10)
+
+        with patch('rag.ingest_etps.db', SimpleNamespace(session=session)):
+            total = self.ingestor._sync_document_chunks(
+                document, [('requisito', 'igual'), ('norma_legal', 'novo')], 'frota', 'doc')
+
+        self.assertEqual(total, 2)
+        self.assertEqual(kept.content_hash, content_hash('requisito', 'igual'))
+        self.assertEqual([chunk.content_text for chunk in session.added], ['novo'])
+        self.assertEqual(session.added[0].content_hash, content_hash('norma_legal', 'novo'))
+        self.assertTrue(session.deleted)
+        self.assertEqual(self.ingestor.changed_sections, {'requisito', 'norma_legal'})
+        self.assertEqual(self.ingestor.ingest_stats,
+                         {'skipped_documents': 0, 'kept_chunks': 1, 'added_chunks': 1, 'removed_chunks': 1,
+                          'removed_documents': 0})
+
+    def test_unchanged_document_touches_no_section(self):
+        chunk = SimpleNamespace(id=1, section_type='requisito', content_text='igual',
+                                content_hash=content_hash('requisito', 'igual'))
+        session = FakeSession([chunk])
+
+        with patch('rag.ingest_etps.db', SimpleNamespace(session=session)):
+            self.ingestor._sync_document_chunks(SimpleNamespace(id=10), [('requisito', 'igual')], 'frota', 'doc')
+
+        self.assertEqual(session.added, [])
+        self.assertFalse(session.deleted)
+        self.assertEqual(self.ingestor.changed_sections, set())
+
+
+class TestRemovedSources(unittest.TestCase):
+    """Documentos cujo arquivo foi apagado entre duas ingestões saem do banco e dos índices"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        # kb_document referencia etp_sessions, que referencia users
+        self.tables = [User.__table__, EtpSession.__table__, KbDocument.__table__, KbChunk.__table__]
+        db.metadata.create_all(db.engine, tables=self.tables)
+
+        self.test_dir = tempfile.mkdtemp()
+        self.ingestor = ETPIngestor.__new__(ETPIngestor)
+        self.ingestor.openai_client = None
+        self.ingestor.embeddings_provider = 'local'
+        self.ingestor.parsed_dir = Path(self.test_dir) / 'parsed'
+        self.ingestor.raw_pdfs_dir = Path(self.test_dir) / 'raw'
+        self.ingestor.parsed_dir.mkdir()
+        self.ingestor.raw_pdfs_dir.mkdir()
+        self.ingestor._reset_ingest_stats()
+
+    def tearDown(self):
+        db.session.remove()
+        db.metadata.drop_all(db.engine, tables=self.tables)
+        self.context.pop()
+        shutil.rmtree(self.test_dir)
+
+    def write_jsonl(self, name, *documents):
+        with open(self.ingestor.parsed_dir / f'{name}.jsonl', 'w', encoding='utf-8') as f:
+            for document in documents:
+                f.write(json.dumps(document, ensure_ascii=False) + '\n')
+
+    def ingest(self):
+        with patch.object(ETPIngestor, '_refresh_retrieval_indices'):
+            self.assertTrue(self.ingestor.ingest_pdfs_and_jsonl())
+
+    def test_deleted_file_removes_its_documents_and_chunks(self):
+        self.write_jsonl('frota', {'objective_slug': 'frota', 'need': 'Locação de veículos para a frota.',
+                                   'legal_framework': 'Lei 14.133/2021.'})
+        self.write_jsonl('limpeza', {'objective_slug': 'limpeza', 'requirements': 'Limpeza predial diária.'})
+        self.ingest()
+        self.assertEqual(db.session.query(KbDocument).count(), 2)
+        self.assertEqual(db.session.query(KbChunk).count(), 3)
+
+        os.unlink(self.ingestor.parsed_dir / 'frota.jsonl')
+        self.ingest()
+
+        self.assertEqual([document.filename for document in db.session.query(KbDocument).all()], ['limpeza'])
+        self.assertEqual({chunk.objective_slug for chunk in db.session.query(KbChunk).all()}, {'limpeza'})
+        # As seções dos chunks apagados são reconstruídas no BM25/FAISS
+        self.assertEqual(self.ingestor.changed_sections, {'necessidade', 'marco_legal'})
+        self.assertEqual(self.ingestor.ingest_stats['removed_documents'], 1)
+        self.assertEqual(self.ingestor.ingest_stats['removed_chunks'], 2)
+        self.assertEqual(self.ingestor.ingest_stats['skipped_documents'], 1)
+
+    def test_uploads_and_unreadable_files_are_kept(self):
+        self.write_jsonl('frota', {'objective_slug': 'frota', 'need': 'Locação de veículos para a frota.'})
+        self.ingest()
+        # Documento enviado pela API: sem content_hash, não pertence às pastas
+        upload = KbDocument(filename='edital.pdf', objective_slug='edital')
+        db.session.add(upload)
+        db.session.flush()
+        db.session.add(KbChunk(kb_document_id=upload.id, section_type='edital', content_text='Edital.',
+                               objective_slug='edital'))
+        db.session.commit()
+
+        with open(self.ingestor.parsed_dir / 'frota.jsonl', 'w', encoding='utf-8') as f:
+            f.write('{"objective_slug": "frota", "need": \n')
+        self.ingest()
+
+        self.assertEqual(sorted(document.filename for document in db.session.query(KbDocument).all()),
+                         ['edital.pdf', 'frota'])
+        self.assertEqual(self.ingestor.ingest_stats['removed_documents'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+"""
+Tests for the deterministic intent engine in front of LLM intent parsing
+"""
+import os
+import sys
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from application.nlu.intent_engine import IntentEngine, INTENT_RESOLUTIONS, normalize
+from application.services.telemetry import registry
+from domain.usecase.etp import requirements_interpreter
+from domain.usecase.etp.requirements_interpreter import parse_update_command
+from domain.usecase.etp.state_machine import is_user_confirmed
+
+REQUIREMENTS = [{'id': f'R{n}', 'text': f'Requisito {n}'} for n in range(1, 6)]
+
+
+class TestIntentEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = IntentEngine(min_confidence=0.8, enabled=True)
+
+    def classify(self, text):
+        match = self.engine.classify_requirements_command(text)
+        return match.intent, self.engine.resolves(match)
+
+    def test_unambiguous_commands_resolve_locally(self):
+        self.assertEqual(self.classify('Sem alterações, pode seguir'), ('confirm', True))
+        self.assertEqual(self.classify('Está bom'), ('confirm', True))
+        self.assertEqual(self.classify('remover 2 e 4'), ('remove', True))
+        self.assertEqual(self.classify('manter apenas R1, R3'), ('keep_only', True))
+        self.assertEqual(self.classify('altere o R3: Garantia mínima de 12 meses'), ('edit', True))
+        self.assertEqual(self.classify('adicionar: Treinamento da equipe'), ('add', True))
+        self.assertEqual(self.classify('recomeçar'), ('restart_necessity', True))
+        self.assertEqual(self.classify('Por que o R2 é necessário?'), ('ask', True))
+
+    def test_ambiguous_messages_escalate(self):
+        for text in ['tira a parte de manutenção', 'troca o 3 por algo sobre garantia',
+                     'remove o 2 e inclui um sobre treinamento', 'ok, mas o 3 não ficou bom?',
+                     'preciso de algo mais robusto']:
+            self.assertFalse(self.classify(text)[1], text)
+        # Confirmação com negação ou com conteúdo novo não confirma a lista sem o LLM
+        for text in ['não está correto, a necessidade é locação de veículos',
+                     'Certo. Agora preciso contratar serviço de limpeza predial',
+                     'manter o contrato de vigilância atual é o objetivo', 'não, ok', 'ok nao']:
+            self.assertEqual(self.classify(text), ('confirm', False), text)
+        # Pergunta que traz uma necessidade nova não é uma pergunta "pura"
+        for text in ['Na verdade preciso contratar locação de veículos, pode ser?',
+                     'E se a gente adquirir os equipamentos em vez de alugar?',
+                     'Seria possível incluir também a manutenção dos elevadores do prédio anexo?']:
+            self.assertFalse(self.classify(text)[1], text)
+        self.assertEqual(self.classify('O que é o PCA?'), ('ask', True))
+        self.assertEqual(self.classify('não entendi o R4'), ('ask', True))
+        self.assertFalse(IntentEngine(enabled=False).resolves(self.engine.classify_requirements_command('ok')))
+
+    def test_numbers_are_indices_only_after_a_verb_or_article(self):
+        for text in ['tirar o 3', 'remover itens 2, 3 e 5', 'manter só 1, 3 e 5', 'apagar R2 e R4']:
+            self.assertTrue(self.classify(text)[1], text)
+        # Número seguido de unidade é conteúdo do requisito, não índice
+        for text in ['remover o requisito que exige 5 anos de experiência',
+                     'retirar o requisito de garantia de 24 meses', 'tira o de 30 dias',
+                     'remover o 2 que exige 10% de desconto']:
+            self.assertEqual(self.classify(text), ('remove', False), text)
+
+    def test_normalize_and_helpers(self):
+        self.assertEqual(normalize('  Tá   BOM! '), 'ta bom!')
+        self.assertTrue(self.engine.is_vague_ack('Beleza'))
+        self.assertTrue(self.engine.is_uncertain('Não faço ideia do valor'))
+        self.assertTrue(self.engine.is_pending_request('pode deixar pendente'))
+        self.assertEqual(self.engine.select_number(' 3 '), 3)
+        self.assertTrue(is_user_confirmed('Sem alterações'))
+        self.assertFalse(is_user_confirmed('preciso trocar o fornecedor'))
+
+
+class TestParseUpdateCommand(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = IntentEngine(min_confidence=0.8, enabled=True)
+        patcher = patch('application.nlu.intent_engine.get_intent_engine', return_value=self.engine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_local_resolution_skips_the_llm(self):
+        local_before = INTENT_RESOLUTIONS.value(site='requirements_command', result='local')
+        with patch.object(requirements_interpreter, 'parse_intent_with_openai') as llm:
+            self.assertEqual(parse_update_command('remover 2', REQUIREMENTS)['items'], ['R2'])
+            edit = parse_update_command('alterar R3: Garantia de 12 meses', REQUIREMENTS)
+            self.assertEqual((edit['intent'], edit['new_text'], edit['regenerate']),
+                             ('edit', 'Garantia de 12 meses', False))
+            self.assertEqual(parse_update_command('confirmo', REQUIREMENTS)['intent'], 'confirm')
+        llm.assert_not_called()
+
+        stats = self.engine.stats()
+        self.assertEqual(stats['llm_calls_avoided'], 3)
+        self.assertEqual(stats['sites']['requirements_command'], {'resolved_locally': 3, 'escalated': 0})
+        self.assertEqual(INTENT_RESOLUTIONS.value(site='requirements_command', result='local'), local_before + 3)
+        self.assertIn('etp_intent_resolutions_total{site="requirements_command",result="local"}', registry.render())
+
+    def test_edit_without_delimited_text_goes_to_the_llm(self):
+        for text in ['alterar o 2 para exigir 24 meses de garantia', 'mudar o R4 para atendimento em 2 horas']:
+            self.assertIsNone(requirements_interpreter.parse_update_command_local(text, REQUIREMENTS, self.engine), text)
+
+        edit = requirements_interpreter.parse_update_command_local(
+            'alterar o 2 para "exigir 24 meses de garantia"', REQUIREMENTS, self.engine)
+        self.assertEqual((edit['items'], edit['new_text'], edit['regenerate']),
+                         (['R2'], 'exigir 24 meses de garantia', False))
+        # Números do texto novo não viram índices
+        edit = requirements_interpreter.parse_update_command_local(
+            'alterar R1: exigir 3 técnicos certificados', REQUIREMENTS, self.engine)
+        self.assertEqual((edit['items'], edit['new_text']), (['R1'], 'exigir 3 técnicos certificados'))
+
+    def test_quantity_is_not_taken_as_a_requirement_index(self):
+        self.assertIsNone(requirements_interpreter.parse_update_command_local(
+            'remover o requisito que exige 5 anos de experiência', REQUIREMENTS, self.engine))
+        self.assertIsNone(requirements_interpreter.parse_update_command_local(
+            'tirar o requisito de 2 anos de garantia', REQUIREMENTS, self.engine))
+        self.assertEqual(requirements_interpreter.parse_update_command_local(
+            'tirar o 3', REQUIREMENTS, self.engine)['items'], ['R3'])
+
+    def test_ambiguous_message_goes_to_the_llm(self):
+        openai_intent = {'intent': 'remove', 'targets': [2]}
+        with patch.object(requirements_interpreter, 'parse_intent_with_openai', return_value=openai_intent) as llm, \
+                patch.object(requirements_interpreter, 'convert_openai_intent_to_controller_format',
+                             return_value={'intent': 'remove', 'items': ['R2'], 'message': ''}):
+            result = parse_update_command('tira aquele de manutenção', REQUIREMENTS)
+        llm.assert_called_once()
+        self.assertEqual(result['items'], ['R2'])
+
+    def test_confirmation_with_new_need_goes_to_the_llm(self):
+        with patch.object(requirements_interpreter, 'parse_intent_with_openai', return_value=None) as llm:
+            parse_update_command('Certo. Agora preciso contratar serviço de limpeza predial', REQUIREMENTS)
+        llm.assert_called_once()
+        self.assertEqual(self.engine.stats()['llm_calls_avoided'], 0)
+        self.assertEqual(self.engine.stats()['llm_escalations'], 1)
+        self.assertGreaterEqual(INTENT_RESOLUTIONS.value(site='requirements_command', result='llm'), 1)
+
+
+
+class FakeAnalyzerClient:
+    """Cliente OpenAI simulado do analisador: sempre detecta uma nova necessidade"""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=json.dumps({'contains_need': True, 'need_description': 'Locação de veículos'}))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class TestAnalyzerShortcut(unittest.TestCase):
+
+    def setUp(self):
+        from adapter.entrypoint.etp import EtpDynamicController
+        self.controller = EtpDynamicController
+        self.client = FakeAnalyzerClient()
+        for patcher in (patch.object(EtpDynamicController, 'get_intent_engine',
+                                     return_value=IntentEngine(min_confidence=0.8, enabled=True)),
+                        patch.object(EtpDynamicController, '_ensure_initialized'),
+                        patch.object(EtpDynamicController, 'etp_generator', SimpleNamespace(client=self.client),
+                                     create=True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_question_with_a_new_need_reaches_the_analyzer(self):
+        result = self.controller.call_analyzer_prompt(
+            'Na verdade preciso contratar locação de veículos, pode ser?', [], 'Manutenção predial')
+        self.assertEqual(self.client.calls, 1)
+        self.assertTrue(result['contains_need'])
+
+    def test_unambiguous_command_skips_the_analyzer(self):
+        result = self.controller.call_analyzer_prompt('remover 2 e 4', [], 'Manutenção predial')
+        self.assertEqual(self.client.calls, 0)
+        self.assertFalse(result['contains_need'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+"""
+Tests for the background job queue (SQLite backend) and the async variants of the generation endpoints
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from flask import Blueprint, Flask, jsonify, request
+
+from application.services import job_queue
+from application.services.job_queue import JobError, JobQueue, JobStore
+from adapter.entrypoint.jobs import JobController
+from adapter.entrypoint.jobs.JobController import async_job, jobs_bp
+
+
+def wait_for(queue, job_id, statuses=('succeeded', 'failed', 'cancelled'), timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} ainda em {queue.get(job_id)['status']}")
+
+
+class QueueTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.store = JobStore.sqlite(os.path.join(self.tmp, 'jobs.sqlite3'))
+        self.handlers = {}
+
+    def make_queue(self, **kwargs):
+        options = dict(workers=2, per_user_limit=2, max_attempts=3, retry_backoff=0, poll_interval=0.05)
+        options.update(kwargs)
+        self.queue = JobQueue(self.store, handlers=self.handlers, **options)
+        return self.queue
+
+    def tearDown(self):
+        if getattr(self, 'queue', None):
+            self.queue.stop()
+        self.store.engine.dispose()
+        shutil.rmtree(self.tmp)
+
+
+class TestJobQueue(QueueTestCase):
+
+    def test_success_and_retries(self):
+        attempts = []
+
+        def flaky(payload, context):
+            attempts.append(payload['n'])
+            if len(attempts) < 3:
+                raise RuntimeError('timeout do LLM')
+            return {'doubled': payload['n'] * 2}
+
+        def invalid(payload, context):
+            raise JobError('Sessão não encontrada', result={'status': 404}, retryable=False)
+
+        self.handlers.update(flaky=flaky, invalid=invalid)
+        queue = self.make_queue()
+
+        job = wait_for(queue, queue.submit('flaky', {'n': 21}, user_id='u1')['id'])
+        self.assertEqual((job['status'], job['attempts'], job['result']), ('succeeded', 3, {'doubled': 42}))
+
+        job = wait_for(queue, queue.submit('invalid', {}, user_id='u1')['id'])
+        self.assertEqual((job['status'], job['attempts'], job['result']), ('failed', 1, {'status': 404}))
+
+        with self.assertRaises(ValueError):
+            queue.submit('unknown', {})
+
+    def test_per_user_concurrency_cap(self):
+        running = {'u1': 0, 'u2': 0}
+        peak = {'u1': 0, 'u2': 0}
+        lock = threading.Lock()
+
+        def slow(payload, context):
+            user = payload['user']
+            with lock:
+                running[user] += 1
+                peak[user] = max(peak[user], running[user])
+            time.sleep(0.1)
+            with lock:
+                running[user] -= 1
+
+        self.handlers['slow'] = slow
+        queue = self.make_queue(workers=3, per_user_limit=1)
+        jobs = [queue.submit('slow', {'user': 'u1'}, user_id='u1') for _ in range(3)]
+        jobs.append(queue.submit('slow', {'user': 'u2'}, user_id='u2'))
+
+        for job in jobs:
+            self.assertEqual(wait_for(queue, job['id'])['status'], 'succeeded')
+        self.assertEqual(peak, {'u1': 1, 'u2': 1})
+
+    def test_cancellation(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking(payload, context):
+            started.set()
+            release.wait(5)
+            context.raise_if_cancelled()
+            return {'done': True}
+
+        self.handlers['blocking'] = blocking
+        queue = self.make_queue(workers=1)
+        running = queue.submit('blocking', {}, user_id='u1')
+        waiting = queue.submit('blocking', {}, user_id='u1')
+        self.assertTrue(started.wait(5))
+
+        self.assertEqual(queue.cancel(waiting['id'])['status'], 'cancelled')
+        self.assertTrue(queue.cancel(running['id'])['cancel_requested'])
+        release.set()
+
+        self.assertEqual(wait_for(queue, running['id'])['status'], 'cancelled')
+        self.assertIsNone(queue.get(waiting['id'])['started_at'])
+
+
+class TestAsyncEndpoints(QueueTestCase):
+
+    def setUp(self):
+        super().setUp()
+        calls = self.calls = []
+        bp = Blueprint('fake_etp', __name__)
+
+        @bp.route('/session/<session_id>/generate', methods=['POST'])
+        @async_job('test.generate')
+        def generate(session_id):
+            calls.append((session_id, request.get_json(), request.headers.get('X-User-Id')))
+            if session_id == 'missing':
+                return jsonify({'success': False, 'error': 'Sessão não encontrada'}), 404
+            return jsonify({'success': True, 'etp_content': f'# ETP {session_id}'})
+
+        self.app = Flask(__name__)
+        self.app.register_blueprint(bp, url_prefix='/api/etp')
+        self.app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+        self.client = self.app.test_client()
+
+        self.handlers.update(job_queue._handlers)
+        queue = self.make_queue(app=self.app)
+        patcher = patch.object(JobController, 'get_job_queue', return_value=queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, session_id, user='user-1', **headers):
+        return self.client.post(f'/api/etp/session/{session_id}/generate', json={'final': True},
+                                headers={'X-User-Id': user, **headers})
+
+    def test_sync_by_default(self):
+        response = self.post('s1')
+        self.assertEqual(response.get_json(), {'success': True, 'etp_content': '# ETP s1'})
+
+    def test_job_id_status_and_result(self):
+        response = self.post('s1', Prefer='respond-async')
+        self.assertEqual(response.status_code, 202)
+        data = response.get_json()
+        self.assertEqual(data['status_url'], f"/api/jobs/{data['job_id']}")
+
+        wait_for(self.queue, data['job_id'])
+        status = self.client.get(data['status_url'], headers={'X-User-Id': 'user-1'}).get_json()
+        self.assertEqual(status['status'], 'succeeded')
+        result = self.client.get(data['result_url'], headers={'X-User-Id': 'user-1'})
+        self.assertEqual(result.get_json(), {'success': True, 'etp_content': '# ETP s1'})
+        self.assertEqual(self.calls, [('s1', {'final': True}, 'user-1')])
+
+        # Jobs de outros usuários não são expostos
+        self.assertEqual(self.client.get(data['status_url'], headers={'X-User-Id': 'user-2'}).status_code, 404)
+
+    def test_failed_job_returns_endpoint_error_over_sse(self):
+        data = self.client.post('/api/etp/session/missing/generate?async=true', json={},
+                                headers={'X-User-Id': 'user-1'}).get_json()
+
+        with patch.object(JobController, 'JOB_EVENTS_POLL_SECONDS', 0.02):
+            body = self.client.get(data['events_url'], headers={'X-User-Id': 'user-1'}).get_data(as_text=True)
+
+        events = [(block.split('\n')[0][len('event: '):], json.loads(block.split('\n')[1][len('data: '):]))
+                  for block in body.strip().split('\n\n') if not block.startswith(':')]
+        self.assertEqual(events[0][0], 'status')
+        self.assertEqual(events[-1], ('error', {'status': 404, 'success': False, 'error': 'Sessão não encontrada'}))
+        # 4xx não é repetido
+        self.assertEqual(len(self.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
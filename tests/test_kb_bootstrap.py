@@ -0,0 +1,119 @@
+"""
+Tests for the background knowledge-base bootstrap and the /api/ready endpoint
+"""
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from flask import Flask
+
+from domain.interfaces.dataprovider.DatabaseConfig import db
+from application.services import kb_bootstrap
+from application.services.kb_bootstrap import KbBootstrap, init_kb_bootstrap
+from adapter.entrypoint.health.HealthController import health_bp
+
+
+class TestKbBootstrap(unittest.TestCase):
+
+    def test_background_mode_returns_before_the_steps_finish(self):
+        release = threading.Event()
+        calls = []
+
+        def slow_step():
+            release.wait(5)
+            calls.append('knowledge_base')
+            return True
+
+        bootstrap = KbBootstrap(mode='background', steps=[('knowledge_base', slow_step),
+                                                          ('indices', lambda: calls.append('indices') or True)])
+        bootstrap.start()
+
+        self.assertFalse(bootstrap.finished)
+        self.assertIn(bootstrap.status()['state'], ('pending', 'running'))
+        release.set()
+        self.assertTrue(bootstrap.wait(5))
+        self.assertEqual(calls, ['knowledge_base', 'indices'])
+        self.assertEqual(bootstrap.status()['state'], 'ready')
+        self.assertEqual(set(bootstrap.status()['steps']), {'knowledge_base', 'indices'})
+
+    def test_failed_step_degrades_without_skipping_the_others(self):
+        def broken():
+            raise RuntimeError('banco indisponível')
+
+        calls = []
+        bootstrap = KbBootstrap(mode='sync', steps=[('knowledge_base', broken),
+                                                    ('indices', lambda: calls.append('indices') or True)])
+        bootstrap.start()
+
+        self.assertTrue(bootstrap.finished)
+        self.assertEqual(calls, ['indices'])
+        status = bootstrap.status()
+        self.assertEqual(status['state'], 'degraded')
+        self.assertEqual(status['steps']['knowledge_base']['error'], 'banco indisponível')
+
+    def test_sync_mode_runs_inline_once(self):
+        calls = []
+        bootstrap = KbBootstrap(mode='sync', steps=[('knowledge_base', lambda: calls.append(1) or True)])
+        bootstrap.start()
+        bootstrap.start()
+        self.assertEqual(calls, [1])
+        self.assertEqual(bootstrap.status()['state'], 'ready')
+
+    def test_off_mode_is_finished_without_running_steps(self):
+        bootstrap = KbBootstrap(mode='off', steps=[('knowledge_base', lambda: self.fail('não deveria rodar'))])
+        bootstrap.start()
+        self.assertTrue(bootstrap.finished)
+        self.assertEqual(bootstrap.status()['state'], 'disabled')
+
+    def test_invalid_mode_falls_back_to_background(self):
+        self.assertEqual(KbBootstrap(mode='eager', steps=[]).mode, 'background')
+
+
+class TestReadyEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.app.register_blueprint(health_bp, url_prefix='/api')
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        kb_bootstrap._bootstrap = None
+
+    def test_ready_only_after_bootstrap_finishes(self):
+        release = threading.Event()
+        bootstrap = kb_bootstrap._bootstrap = KbBootstrap(
+            app=self.app, mode='background', steps=[('knowledge_base', lambda: release.wait(5))])
+        bootstrap.start()
+
+        with patch.object(kb_bootstrap, 'kb_status', return_value={'available': True, 'documents': 3, 'chunks': 40}):
+            response = self.client.get('/api/ready')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.get_json()['status'], 'starting')
+
+            release.set()
+            self.assertTrue(bootstrap.wait(5))
+            response = self.client.get('/api/ready')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body['bootstrap']['state'], 'ready')
+        self.assertEqual(body['knowledge_base']['chunks'], 40)
+        self.assertIn('loaded', body['indices'])
+
+    def test_not_ready_when_database_does_not_answer(self):
+        init_kb_bootstrap(self.app, mode='off')
+        # Banco em memória sem as tabelas da base de conhecimento
+        response = self.client.get('/api/ready')
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.get_json()['knowledge_base']['available'])
+
+
+if __name__ == '__main__':
+    unittest.main()
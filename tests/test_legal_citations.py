@@ -0,0 +1,62 @@
+"""
+Tests for the shared single-pass legal citation extractor and its call sites
+"""
+import os
+import sys
+import unittest
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'knowledge'))
+
+from domain.usecase.utils.legal_citations import extract_citations
+from rag.legal_norms import LegalNormProcessor, LegalNormType, LegalScope
+from rag.verify_federal import FederalDocumentType, FederalNormVerifier
+
+TEXT = (
+    "A contratação observará a Lei nº 14.133, de 1º de abril de 2021, o Decreto n.º 10.024/2019, "
+    "a IN SEGES/ME nº 65/2021, a Lei Complementar 123/2006 e a Lei Estadual 123/19. "
+    "Reforça-se a Lei 14.133/2021. O total de 15 itens e o player mp3 não são normas."
+)
+
+
+class TestLegalCitations(unittest.TestCase):
+
+    def test_typed_normalized_citations(self):
+        found = [(c.type, c.number, c.year, c.scope) for c in extract_citations(TEXT)]
+        self.assertEqual(found, [
+            ('lei', '14133', '2021', None),
+            ('decreto', '10024', '2019', None),
+            ('instrucao_normativa', '65', '2021', None),
+            ('lei_complementar', '123', '2006', None),
+            ('lei', '123', '2019', 'estadual'),
+            ('lei', '14133', '2021', None),
+        ])
+
+    def test_unique_and_labels(self):
+        labels = [c.label for c in extract_citations(TEXT, unique=True)]
+        self.assertEqual(labels, ['Lei 14.133/2021', 'Decreto 10.024/2019', 'Instrução Normativa 65/2021',
+                                  'Lei Complementar 123/2006', 'Lei Estadual 123/2019'])
+        self.assertEqual(extract_citations('MP 1.047 e EC 95/2016')[0].key, '1047')
+
+    def test_call_sites_share_the_extractor(self):
+        norms = LegalNormProcessor().extract_legal_norms(TEXT)
+        self.assertEqual(len(norms), 5)
+        self.assertEqual(norms[3]['type'], LegalNormType.LEI_COMPLEMENTAR)
+        self.assertEqual(norms[4]['scope'], LegalScope.ESTADUAL)
+
+        federal = FederalNormVerifier()._extract_federal_norms(TEXT)
+        self.assertEqual([(n['type'], n['number']) for n in federal], [
+            (FederalDocumentType.LEI_FEDERAL, '14133/2021'),
+            (FederalDocumentType.DECRETO_FEDERAL, '10024/2019'),
+            (FederalDocumentType.LEI_COMPLEMENTAR, '123/2006'),
+        ])
+        self.assertTrue(federal[0]['is_known'])
+
+        from parse_etps import extract_citations as kb_citations
+        self.assertEqual(kb_citations("Conforme Lei Federal nº 14.133/2021 e Decreto 10.024 de 2019."),
+                         ['Lei 14.133/2021', 'Decreto 10.024/2019'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Tests for batched LexML resolution against a local fake SRU server
+"""
+import os
+import sys
+import threading
+import unittest
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from flask import Flask
+
+from domain.interfaces.dataprovider.DatabaseConfig import db
+from domain.dto.KbDto import LegalNormCache
+from domain.usecase.etp import verify_federal
+from domain.usecase.etp.verify_federal import norm_key, resolve_lexml, resolve_lexml_batch
+
+FOUND = {'14133': ('urn:lex:br:federal:lei:2021-04-01;14133', 'Lei nº 14.133, de 1º de abril de 2021'),
+         '10024': ('urn:lex:br:federal:decreto:2019-09-20;10024', 'Decreto nº 10.024, de 20 de setembro de 2019')}
+
+SRU_RESPONSE = """<?xml version="1.0" encoding="UTF-8"?>
+<srw:searchRetrieveResponse xmlns:srw="http://www.loc.gov/zing/srw/" xmlns:marc="http://www.loc.gov/MARC21/slim">
+  <srw:numberOfRecords>{count}</srw:numberOfRecords>
+  <srw:records>{records}</srw:records>
+</srw:searchRetrieveResponse>"""
+
+SRU_RECORD = """<srw:record><srw:recordData><marc:record>
+  <marc:datafield tag="024"><marc:subfield code="a">{urn}</marc:subfield></marc:datafield>
+  <marc:datafield tag="245"><marc:subfield code="a">{label}</marc:subfield></marc:datafield>
+</marc:record></srw:recordData></srw:record>"""
+
+
+class FakeSRUHandler(BaseHTTPRequestHandler):
+    """Responde como o SRU do LexML: registro para as normas conhecidas, zero registros para as demais"""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)['query'][0]
+        numero = query.split('dc.identifier="')[1].split('"')[0].replace('.', '')
+        with self.server.lock:
+            self.server.queries.append(numero)
+        if numero in FOUND:
+            urn, label = FOUND[numero]
+            body = SRU_RESPONSE.format(count=1, records=SRU_RECORD.format(urn=urn, label=label))
+        else:
+            body = SRU_RESPONSE.format(count=0, records='')
+        payload = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestLexmlBatch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeSRUHandler)
+        cls.server.lock = threading.Lock()
+        cls.server.queries = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.queries.clear()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        LegalNormCache.__table__.create(db.engine)
+
+        patcher = patch.object(verify_federal, 'LEXML_SRU_URL', f'http://127.0.0.1:{self.server.server_port}/sru')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        db.session.remove()
+        LegalNormCache.__table__.drop(db.engine)
+        self.context.pop()
+
+    def test_norm_key(self):
+        self.assertEqual(norm_key('Lei', '14.133', 2021), 'lei:14133:2021')
+        self.assertEqual(norm_key('Instrução  Normativa', '065', '2021'), 'instrucao_normativa:65:2021')
+
+    def test_batch_resolves_concurrently_and_caches(self):
+        norms = [('Lei', '14.133', 2021), ('Decreto', '10.024', 2019), ('Lei', '99999', 2020), ('Lei', '14133', 2021)]
+        results = resolve_lexml_batch(norms, max_workers=4)
+
+        self.assertEqual([r['status'] for r in results], ['vigente', 'vigente', 'não encontrada', 'vigente'])
+        self.assertEqual(results[0]['urn'], FOUND['14133'][0])
+        self.assertEqual(results[0], results[3])
+        self.assertEqual(sorted(self.server.queries), ['10024', '14133', '99999'])
+
+        rows = {row.norm_key: row for row in LegalNormCache.query.all()}
+        self.assertEqual(set(rows), {'lei:14133:2021', 'decreto:10024:2019', 'lei:99999:2020'})
+        self.assertEqual(rows['lei:99999:2020'].norm_urn, 'norma:lei:99999:2020')
+
+        # Segunda chamada: tudo vem do cache, inclusive a entrada negativa
+        self.server.queries.clear()
+        again = resolve_lexml_batch(norms)
+        self.assertEqual(self.server.queries, [])
+        self.assertTrue(all(r['cached'] for r in again))
+        self.assertEqual((again[2]['urn'], again[2]['verified']), (None, False))
+        self.assertTrue(again[1]['verified'])
+
+    def test_expired_negative_entry_is_refreshed(self):
+        resolve_lexml('Lei', '99999', 2020)
+        row = LegalNormCache.query.filter_by(norm_key='lei:99999:2020').one()
+        row.last_verified_at = datetime.utcnow() - timedelta(days=2)
+        db.session.commit()
+
+        self.server.queries.clear()
+        result = resolve_lexml('Lei', '99999', 2020)
+        self.assertEqual((result['status'], result['cached']), ('não encontrada', False))
+        self.assertEqual(self.server.queries, ['99999'])
+        self.assertEqual(LegalNormCache.query.count(), 1)
+
+    def test_network_errors_are_not_cached(self):
+        with patch.object(verify_federal, 'LEXML_SRU_URL', 'http://127.0.0.1:9/sru'):
+            result = resolve_lexml('Lei', '14133', 2021)
+        self.assertEqual(result['status'], 'status desconhecido')
+        self.assertIn('erro', result['metadados'])
+        self.assertEqual(LegalNormCache.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests for the process-wide LLM gateway (shared connection pool, per-call timeouts, mock transport)
+"""
+import os
+import sys
+import json
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from application.ai import llm_gateway
+from application.ai.llm_gateway import LLMGateway, configure_llm_gateway, get_llm_gateway, get_openai_client
+from application.ai.hybrid_models import OpenAIChatConsultive, OpenAIIntentParser
+
+
+class MockLLM:
+    """Transporte simulado: registra as requisições e responde como /chat/completions"""
+
+    def __init__(self, content='resposta'):
+        self.content = content
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return httpx.Response(200, json={
+            'id': 'cmpl-1', 'object': 'chat.completion', 'created': 0, 'model': 'gpt-test',
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': self.content}}],
+        })
+
+
+class TestLLMGateway(unittest.TestCase):
+
+    def setUp(self):
+        self.mock = MockLLM()
+        configure_llm_gateway(api_key='sk-test', base_url='http://llm.local/v1',
+                              transport=httpx.MockTransport(self.mock))
+
+    def tearDown(self):
+        get_llm_gateway().close()
+        llm_gateway._gateway = None
+
+    def test_call_sites_share_one_connection_pool(self):
+        gateway = get_llm_gateway()
+        client = get_openai_client()
+
+        self.assertIs(client, get_openai_client())
+        self.assertIs(client._client, gateway.http)
+        self.assertIs(get_openai_client(api_key='sk-other')._client, gateway.http)
+
+        OpenAIChatConsultive().generate('Pergunta')
+        client.chat.completions.create(model='gpt-test', messages=[{'role': 'user', 'content': 'oi'}])
+
+        self.assertEqual([r.url.path for r in self.mock.requests], ['/v1/chat/completions'] * 2)
+        self.assertIs(get_llm_gateway().http, gateway.http)
+
+    def test_per_call_timeouts(self):
+        OpenAIChatConsultive().generate('Pergunta')
+        get_openai_client(timeout=7).chat.completions.create(
+            model='gpt-test', messages=[{'role': 'user', 'content': 'oi'}])
+
+        self.assertEqual(self.mock.requests[0].extensions['timeout']['read'], 60)
+        self.assertEqual(self.mock.requests[1].extensions['timeout']['read'], 7)
+        self.assertEqual(self.mock.requests[0].headers['authorization'], 'Bearer sk-test')
+
+    def test_intent_parser_json_mode(self):
+        self.mock.content = json.dumps({'intent': 'add', 'text': 'novo item'})
+        result = OpenAIIntentParser().parse('Inclua um requisito sobre garantia estendida')
+
+        self.assertEqual(result, {'intent': 'add', 'text': 'novo item'})
+        payload = json.loads(self.mock.requests[0].content)
+        self.assertEqual(payload['response_format'], {'type': 'json_object'})
+
+    def test_without_api_key_there_is_no_openai_client(self):
+        self.assertIsNone(LLMGateway(api_key='', transport=httpx.MockTransport(self.mock)).openai_client())
+
+    def test_environment_key_is_read_on_each_use(self):
+        gateway = configure_llm_gateway(base_url='http://llm.local/v1', transport=httpx.MockTransport(self.mock))
+        with patch.dict(os.environ, {'OPENAI_API_KEY': 'sk-first'}):
+            first = gateway.openai_client()
+            self.assertTrue(gateway.configured)
+        with patch.dict(os.environ, {'OPENAI_API_KEY': 'sk-rotated'}):
+            rotated = get_openai_client()
+            rotated.chat.completions.create(model='gpt-test', messages=[{'role': 'user', 'content': 'oi'}])
+        self.assertIsNot(first, rotated)
+        self.assertEqual(self.mock.requests[-1].headers['authorization'], 'Bearer sk-rotated')
+
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertFalse(gateway.configured)
+            self.assertIsNone(get_openai_client())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Tests for stale-while-revalidate of the legal norm cache and the periodic sweep
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from flask import Flask
+
+from domain.interfaces.dataprovider.DatabaseConfig import db
+from domain.dto.KbDto import LegalNormCache
+from domain.usecase.etp import verify_federal
+from domain.usecase.etp.verify_federal import resolve_lexml, resolve_lexml_batch
+from application.services import norm_refresher
+from application.services.norm_refresher import NormRefresher, count_cited_norms
+from test_lexml_batch import FakeSRUHandler
+
+
+class TestNormRefresher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeSRUHandler)
+        cls.server.lock = threading.Lock()
+        cls.server.queries = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.queries.clear()
+        # Banco em arquivo: a thread do refresher usa outra conexão
+        fd, self.db_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{self.db_path}'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        LegalNormCache.__table__.create(db.engine)
+
+        patcher = patch.object(verify_federal, 'LEXML_SRU_URL', f'http://127.0.0.1:{self.server.server_port}/sru')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.context.pop()
+        os.unlink(self.db_path)
+
+    def _expire(self, key):
+        row = LegalNormCache.query.filter_by(norm_key=key).one()
+        row.last_verified_at = datetime.utcnow() - timedelta(days=30)
+        db.session.commit()
+        return row.last_verified_at
+
+    def test_stale_entry_is_served_and_revalidated_in_background(self):
+        resolve_lexml('Lei', '14133', 2021)
+        expired_at = self._expire('lei:14133:2021')
+        self.server.queries.clear()
+
+        refresher = NormRefresher(app=self.app, initial_delay=3600, sources=[])
+        self.addCleanup(refresher.stop)
+        with patch.object(norm_refresher, '_refresher', refresher):
+            result = resolve_lexml_batch([('Lei', '14133', 2021)])[0]
+
+        self.assertTrue(result['cached'])
+        self.assertTrue(result['stale'])
+        self.assertTrue(result['revalidating'])
+        self.assertEqual(result['urn'], 'urn:lex:br:federal:lei:2021-04-01;14133')
+
+        deadline = time.monotonic() + 5
+        while refresher.stats()['refreshed'] < 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(self.server.queries, ['14133'])
+        db.session.remove()
+        row = LegalNormCache.query.filter_by(norm_key='lei:14133:2021').one()
+        self.assertGreater(row.last_verified_at, expired_at)
+
+    def test_stale_entry_is_fetched_synchronously_without_refresher(self):
+        resolve_lexml('Lei', '14133', 2021)
+        self._expire('lei:14133:2021')
+        self.server.queries.clear()
+
+        result = resolve_lexml_batch([('Lei', '14133', 2021)])[0]
+        self.assertFalse(result['cached'])
+        self.assertNotIn('stale', result)
+        self.assertEqual(self.server.queries, ['14133'])
+
+    def test_count_cited_norms(self):
+        counts = count_cited_norms([
+            {'normas': ['Lei nº 14.133/2021', 'Lei Estadual 123/2019', 'Portaria 5/2020']},
+            [{'tipo': 'Lei', 'numero': '14133', 'ano': '2021'}],
+            'Conforme o Decreto 10.024/2019 e a Lei 14.133, de 1º de abril de 2021.',
+            None,
+        ])
+        self.assertEqual(counts[('Lei', '14133', 2021)], 3)
+        self.assertEqual(counts[('Decreto', '10024', 2019)], 1)
+        self.assertEqual(len(counts), 2)
+
+    def test_sweep_refreshes_most_cited_norms_due(self):
+        resolve_lexml('Decreto', '10024', 2019)
+        self.server.queries.clear()
+
+        kb = [{'normas': ['Lei 14.133/2021', 'Decreto 10.024/2019']}] * 3 + ['Lei 99999/2020']
+        sessions = [{'resposta': 'Lei 14.133/2021'}]
+        refresher = NormRefresher(app=self.app, interval=3600, top_n=2,
+                                  sources=[lambda: kb, lambda: sessions])
+        due = refresher.sweep()
+
+        # Decreto 10.024 está em cache e não expira antes da próxima varredura; Lei 99999 fica fora do top 2
+        self.assertEqual(due, [('Lei', '14133', 2021)])
+        self.assertEqual(self.server.queries, ['14133'])
+        self.assertEqual(refresher.stats()['sweeps'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
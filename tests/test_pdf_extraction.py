@@ -0,0 +1,124 @@
+"""
+Tests for the parallel PDF extraction service
+"""
+import os
+import sys
+import shutil
+import unittest
+import tempfile
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from application.services import pdf_extraction
+from application.services.pdf_extraction import PdfExtractor, PageText
+from rag.ingest_etps import ETPIngestor
+
+
+def make_pdf(path, page_texts):
+    """Gera um PDF mínimo com uma linha de texto por página"""
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(len(page_texts))), len(page_texts)),
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(page_texts):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    out = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    with open(path, "w", encoding="latin-1") as f:
+        f.write(out)
+
+
+class TestPdfExtraction(unittest.TestCase):
+    """Test inline and pooled extraction, page order, failures and timeouts"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.first = os.path.join(self.tmp, 'a.pdf')
+        self.second = os.path.join(self.tmp, 'b.pdf')
+        make_pdf(self.first, [f'Pagina {n}' for n in range(1, 6)])
+        make_pdf(self.second, ['Unica pagina'])
+        self.broken = os.path.join(self.tmp, 'broken.pdf')
+        with open(self.broken, 'wb') as f:
+            f.write(b'isto nao e um pdf')
+
+    def tearDown(self):
+        pdf_extraction.close_worker_pools()
+        shutil.rmtree(self.tmp)
+
+    def assert_extracted(self, results):
+        self.assertEqual(list(results), [self.first, self.broken, self.second])
+        self.assertEqual([p.strip() for p in results[self.first].pages],
+                         [f'Pagina {n}' for n in range(1, 6)])
+        self.assertEqual(results[self.second].text.strip(), 'Unica pagina')
+        self.assertFalse(results[self.broken].ok)
+        self.assertEqual(results[self.broken].pages, [])
+
+    def test_inline_extraction(self):
+        for engine in ('pypdf2', 'pdfplumber'):
+            extractor = PdfExtractor(engine=engine, max_workers=1, pages_per_task=2)
+            self.assert_extracted(extractor.extract_files([self.first, self.broken, self.second]))
+
+    def test_pooled_extraction_and_page_streaming(self):
+        extractor = PdfExtractor(max_workers=2, pages_per_task=2, memory_limit_mb=0)
+        self.assert_extracted(extractor.extract_files([self.first, self.broken, self.second]))
+
+        pages = list(extractor.iter_pages([self.first]))
+        self.assertTrue(all(isinstance(page, PageText) for page in pages))
+        self.assertEqual(sorted(page.page_number for page in pages), [1, 2, 3, 4, 5])
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), 'requer mkfifo')
+    def test_file_timeout_does_not_block_other_files(self):
+        # Abrir um FIFO sem escritor bloqueia o worker indefinidamente
+        stuck = os.path.join(self.tmp, 'stuck.pdf')
+        os.mkfifo(stuck)
+        extractor = PdfExtractor(max_workers=2, file_timeout=2, memory_limit_mb=0)
+        results = extractor.extract_files([stuck, self.second])
+
+        self.assertTrue(results[stuck].timed_out)
+        self.assertEqual(results[self.second].text.strip(), 'Unica pagina')
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), 'requer mkfifo')
+    def test_pool_is_reused_until_a_file_times_out(self):
+        extractor = PdfExtractor(max_workers=2, file_timeout=2, memory_limit_mb=0)
+        extractor.extract_files([self.second])
+        pools = list(pdf_extraction._pools.values())
+        self.assertEqual(len(pools), 1)
+        self.assertEqual(pools[0].users, 0)
+
+        # Nova extração (ex.: outro upload) usa os mesmos workers
+        PdfExtractor(max_workers=2, file_timeout=2, memory_limit_mb=0).extract_files([self.first])
+        self.assertEqual(list(pdf_extraction._pools.values()), pools)
+
+        # Um worker preso descarta o pool; a extração seguinte cria outro
+        stuck = os.path.join(self.tmp, 'stuck.pdf')
+        os.mkfifo(stuck)
+        self.assertTrue(extractor.extract_files([stuck])[stuck].timed_out)
+        self.assertTrue(pools[0].retired)
+        self.assertEqual(pdf_extraction._pools, {})
+
+        results = extractor.extract_files([self.second])
+        self.assertEqual(results[self.second].text.strip(), 'Unica pagina')
+        self.assertIsNot(next(iter(pdf_extraction._pools.values())), pools[0])
+
+    def test_ingestor_page_markers(self):
+        text = ETPIngestor._format_pdf_pages(['primeira', '', 'terceira'])
+        self.assertIn('--- Página 1 ---\nprimeira', text)
+        self.assertIn('--- Página 3 ---\nterceira', text)
+        self.assertNotIn('Página 2', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,13 +4,18 @@ Tests for preview_builder service
 import os
 import sys
 import unittest
+import re
 import tempfile
 import shutil
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
 
 # Add src path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
 
-from application.services.preview_builder import build_preview
+from application.services.preview_builder import build_preview, generate_etp_multipass, section_stream
+from application.services.preview_cache import PreviewSectionCache
 
 
 class TestPreviewBuilder(unittest.TestCase):
@@ -179,5 +184,130 @@ class TestPreviewBuilder(unittest.TestCase):
             self.fail(f"Path validation failed: {e}")
 
 
+
+class FakeCompletions:
+    """
+    Cliente OpenAI simulado; a passagem 2 falha uma vez.
+
+    Com ``parties``, a primeira chamada de cada passagem espera numa barreira até que
+    ``parties`` chamadas estejam em andamento ao mesmo tempo (se forem sequenciais, a
+    barreira expira e a chamada falha), e as passagens respondem da última para a primeira.
+    """
+
+    def __init__(self, parties=0):
+        self.calls = {}
+        self.prompts = {}
+        self.lock = threading.Lock()
+        self.barrier = threading.Barrier(parties, timeout=5) if parties else None
+        self.answered = {first: threading.Event() for first in (1, 5, 8, 9, 13)}
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, messages, **kwargs):
+        first = int(re.search(r'[Gg]ere (?:APENAS )?(?:as seções|a seção) (?:finais )?(\d+)', messages[-1]['content']).group(1))
+        with self.lock:
+            self.calls[first] = self.calls.get(first, 0) + 1
+            self.prompts[first] = messages[-1]['content']
+            attempt = self.calls[first]
+        if self.barrier and attempt == 1:
+            self.barrier.wait()
+        if first == 5 and attempt == 1:
+            raise RuntimeError('timeout')
+        if self.barrier:
+            for later, answered in self.answered.items():
+                if later > first:
+                    answered.wait(5)
+        self.answered[first].set()
+        message = SimpleNamespace(content=f'## Seções a partir de {first}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class TestMultipassGeneration(unittest.TestCase):
+    """Test that multipass passes run concurrently and are assembled in section order"""
+
+    def test_passes_run_concurrently_in_section_order(self):
+        client = FakeCompletions(parties=5)
+        finished = []
+        context = {'necessity': 'Manutenção de frota', 'requirements': [], 'answers': {}}
+
+        with patch('application.services.preview_builder.get_openai_client', return_value=client), \
+                patch('application.services.preview_builder.get_preview_cache', return_value=None), \
+                patch.dict(os.environ, {'PREVIEW_MULTIPASS_WORKERS': '5'}):
+            with section_stream(lambda index, title, content: finished.append(index)):
+                document = generate_etp_multipass(context)
+
+        positions = [document.index(f'## Seções a partir de {n}') for n in (1, 5, 8, 9, 13)]
+        self.assertEqual(positions, sorted(positions))
+        # Só a passagem que falhou é repetida
+        self.assertEqual(client.calls, {1: 1, 5: 2, 8: 1, 9: 1, 13: 1})
+        self.assertEqual(sorted(finished), [0, 1, 2, 3, 4])
+        self.assertNotEqual(finished, [0, 1, 2, 3, 4])
+        # As cinco passagens estiveram em andamento ao mesmo tempo (a barreira não expirou)
+        self.assertFalse(client.barrier.broken)
+
+
+class TestSectionMemoization(unittest.TestCase):
+    """Test that only the passes whose inputs changed are regenerated"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = PreviewSectionCache(path=os.path.join(self.cache_dir, 'sections.sqlite3'))
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def generate(self, answers):
+        client = FakeCompletions()
+        sections = []
+        context = {'necessity': 'Manutenção de frota', 'requirements': [{'text': 'Garantia de 12 meses'}],
+                   'answers': answers}
+        with patch('application.services.preview_builder.get_openai_client', return_value=client), \
+                patch('application.services.preview_builder.get_preview_cache', return_value=self.cache):
+            document = generate_etp_multipass(context, on_section=lambda index, title, content: sections.append(index))
+        self.client = client
+        return client.calls, sorted(sections), document
+
+    def test_each_pass_gets_the_inputs_its_sections_use(self):
+        answers = {'pca': 'Sim', 'legal_norms': 'Lei 14.133/2021', 'qty_value': '10 veículos',
+                   'installment': 'Lote único', 'selected_strategies': [{'titulo': 'Pregão eletrônico'}]}
+        self.generate(answers)
+
+        prompts = self.client.prompts
+        self.assertEqual(sorted(prompts), [1, 5, 8, 9, 13])
+        for prompt in prompts.values():
+            for expected in ('Manutenção de frota', 'Pregão eletrônico', 'Lei 14.133/2021', '10 veículos',
+                             'Garantia de 12 meses'):
+                self.assertIn(expected, prompt)
+        # Parcelamento só na seção 8 e no mapa de riscos/conclusão; PCA fora de 5-8
+        self.assertEqual([first for first in sorted(prompts) if 'Parcelamento: Lote único' in prompts[first]], [8, 13])
+        self.assertEqual([first for first in sorted(prompts) if 'PCA: Sim' in prompts[first]], [1, 9, 13])
+
+    def test_only_dependent_passes_are_regenerated(self):
+        answers = {'pca': 'Sim', 'qty_value': '10 veículos', 'installment': 'Lote único'}
+        first_calls, sections, first_document = self.generate(answers)
+        self.assertEqual(first_calls, {1: 1, 5: 2, 8: 1, 9: 1, 13: 1})
+        self.assertEqual(sections, [0, 1, 2, 3, 4])
+
+        calls, sections, document = self.generate(answers)
+        self.assertEqual(calls, {})
+        self.assertEqual(sections, [0, 1, 2, 3, 4])
+        self.assertEqual(document, first_document)
+
+        # Parcelamento só entra na seção 8 e nas seções 13-14
+        calls, sections, _ = self.generate({**answers, 'installment': 'Dois lotes'})
+        self.assertEqual(calls, {8: 1, 13: 1})
+        self.assertEqual(sections, [0, 1, 2, 3, 4])
+        self.assertEqual(self.cache.stats()['hits'], 8)
+
+    def test_error_placeholder_is_not_cached(self):
+        client = FakeCompletions()
+        with patch.object(client, 'create', side_effect=RuntimeError('timeout')), \
+                patch('application.services.preview_builder.get_openai_client', return_value=client), \
+                patch('application.services.preview_builder.get_preview_cache', return_value=self.cache):
+            generate_etp_multipass({'necessity': 'Frota', 'requirements': [], 'answers': {}})
+
+        calls, _, _ = self.generate({})
+        self.assertEqual(calls, {1: 1, 5: 2, 8: 1, 9: 1, 13: 1})
+
+
 if __name__ == '__main__':
     unittest.main()
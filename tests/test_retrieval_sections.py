@@ -0,0 +1,92 @@
+"""
+Tests for single-query multi-section retrieval
+"""
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from rag.retrieval import RAGRetrieval
+from rag.bm25_index import BM25Index
+from rag.embeddings import StubEmbeddingClient
+from rag.vector_index import MmapVectorIndex, partition_order
+
+CHUNKS = [
+    (1, 'necessidade', 'frota', "necessidade de manutenção da frota de veículos oficiais"),
+    (2, 'necessidade', 'geral', "necessidade de limpeza das dependências"),
+    (3, 'requisito', 'frota', "veículos com manutenção preventiva inclusa"),
+    (4, 'requisito', 'geral', "equipe de limpeza com supervisão diária"),
+    (5, 'estrategia', 'frota', "locação de veículos com manutenção pelo fornecedor"),
+    (6, 'estrategia', 'geral', "terceirização dos serviços de limpeza"),
+]
+
+
+class FakeSession:
+    """Sessão mínima para _fill_contents: registra quantas consultas foram feitas"""
+
+    def __init__(self, contents):
+        self.contents = contents
+        self.queries = 0
+
+    def query(self, *columns):
+        self.queries += 1
+        return self
+
+    def filter(self, *criteria):
+        return self
+
+    def all(self):
+        return [SimpleNamespace(id=cid, content_text=text) for cid, text in self.contents.items()]
+
+
+class TestSearchSections(unittest.TestCase):
+    """Test that search_sections embeds once and matches per-section search"""
+
+    def setUp(self):
+        self.client = StubEmbeddingClient(dimension=32)
+        retrieval = RAGRetrieval.__new__(RAGRetrieval)
+        retrieval.openai_client = self.client
+        retrieval.embedding_cache = None
+        retrieval.db_session = FakeSession({cid: text for cid, _, _, text in CHUNKS})
+
+        retrieval.bm25_indices = {}
+        for section in ('necessidade', 'requisito', 'estrategia'):
+            docs = [(cid, 1, slug, retrieval._tokenize(text)) for cid, sec, slug, text in CHUNKS if sec == section]
+            retrieval.bm25_indices[section] = BM25Index.build(docs)
+
+        documents = [{'chunk_id': cid, 'document_id': 1, 'section_type': sec, 'section_title': sec,
+                      'objective_slug': slug} for cid, sec, slug, _ in CHUNKS]
+        vectors = np.vstack([self.client.vector(text) for _, _, _, text in CHUNKS]).astype(np.float32)
+        order = partition_order(documents)
+        retrieval._set_faiss_index(MmapVectorIndex(vectors[order]), [documents[i] for i in order])
+        self.retrieval = retrieval
+
+    def test_single_embedding_and_content_query(self):
+        sections = ['necessidade', 'estrategia', 'requisito']
+        results = self.retrieval.search_sections("manutenção de veículos", sections, k=1)
+
+        self.assertEqual(self.client.calls, 1)
+        self.assertEqual(self.retrieval.db_session.queries, 1)
+        self.assertEqual(list(results), sections)
+        self.assertEqual([r['chunk_id'] for s in sections for r in results[s]], [1, 5, 3])
+        self.assertTrue(all(r['content'] for s in sections for r in results[s]))
+
+    def test_matches_single_section_search(self):
+        batched = self.retrieval.search_sections("limpeza diária", ['requisito', 'estrategia'], k=2)
+        for section in ('requisito', 'estrategia'):
+            single = self.retrieval._hybrid_search(section, '', "limpeza diária", 2)
+            self.assertEqual([r['chunk_id'] for r in batched[section]], [r['chunk_id'] for r in single])
+            self.assertEqual([r['hybrid_score'] for r in batched[section]], [r['hybrid_score'] for r in single])
+
+    def test_objective_filter(self):
+        results = self.retrieval.search_requirements('geral', "manutenção de veículos", k=3)
+        self.assertEqual([r['chunk_id'] for r in results], [4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Tests for token streaming through the LLM gateway and the SSE variants of the chat endpoints
+"""
+import os
+import sys
+import json
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from flask import Flask, jsonify, request
+
+from application.ai import llm_gateway
+from application.ai.llm_gateway import complete_chat, configure_llm_gateway, get_llm_gateway, token_stream
+from adapter.entrypoint.etp import EtpDynamicController
+from adapter.entrypoint.etp.EtpDynamicController import etp_dynamic_bp
+
+TOKENS = ['Requisitos', ' para', ' a', ' frota']
+
+
+def streaming_llm(request: httpx.Request) -> httpx.Response:
+    """Responde como /chat/completions: em SSE quando stream=True, senão em JSON"""
+    payload = json.loads(request.content)
+    if not payload.get('stream'):
+        return httpx.Response(200, json={
+            'id': 'c', 'object': 'chat.completion', 'created': 0, 'model': 'gpt-test',
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': ''.join(TOKENS)}}],
+        })
+    lines = []
+    for token in TOKENS:
+        chunk = {'id': 'c', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'gpt-test',
+                 'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]}
+        lines.append(f"data: {json.dumps(chunk)}\n\n")
+    lines.append("data: [DONE]\n\n")
+    return httpx.Response(200, headers={'content-type': 'text/event-stream'},
+                          content=''.join(lines).encode())
+
+
+def parse_sse(body: str):
+    events = []
+    for block in body.split('\n\n'):
+        lines = [line for line in block.split('\n') if line and not line.startswith(':')]
+        if lines:
+            event = lines[0][len('event: '):]
+            events.append((event, json.loads(lines[1][len('data: '):])))
+    return events
+
+
+class TestTokenStreaming(unittest.TestCase):
+
+    def setUp(self):
+        configure_llm_gateway(api_key='sk-test', base_url='http://llm.local/v1',
+                              transport=httpx.MockTransport(streaming_llm))
+
+    def tearDown(self):
+        get_llm_gateway().close()
+        llm_gateway._gateway = None
+
+    def test_gateway_chat_streams_inside_token_stream(self):
+        received = []
+        messages = [{'role': 'user', 'content': 'oi'}]
+        with token_stream(received.append):
+            text = get_llm_gateway().chat(messages, model='gpt-test')
+            parsed = get_llm_gateway().chat(messages, model='gpt-test', stream_tokens=False)
+
+        self.assertEqual(received, TOKENS)
+        self.assertEqual(text, ''.join(TOKENS))
+        self.assertEqual(parsed, ''.join(TOKENS))
+
+    def test_complete_chat_uses_sdk_streaming_only_with_a_sink(self):
+        client = get_llm_gateway().openai_client()
+        messages = [{'role': 'user', 'content': 'oi'}]
+        self.assertEqual(complete_chat(client, model='gpt-test', messages=messages), ''.join(TOKENS))
+
+        received = []
+        with token_stream(received.append):
+            text = complete_chat(client, model='gpt-test', messages=messages)
+        self.assertEqual((received, text), (TOKENS, ''.join(TOKENS)))
+
+    def test_stream_endpoint_sends_tokens_then_final_payload(self):
+        def fake_chat_stage():
+            data = request.get_json()
+            text = get_llm_gateway().chat([{'role': 'user', 'content': data['message']}], model='gpt-test')
+            return jsonify({'success': True, 'ai_response': text, 'stage': 'collect_need'})
+
+        def failing_view():
+            return jsonify({'success': False, 'error': 'Mensagem é obrigatória'}), 400
+
+        app = Flask(__name__)
+        app.register_blueprint(etp_dynamic_bp, url_prefix='/api/etp-dynamic')
+        client = app.test_client()
+
+        with patch.object(EtpDynamicController, 'chat_stage_based', fake_chat_stage):
+            response = client.post('/api/etp-dynamic/chat-stage/stream', json={'message': 'frota'})
+            events = parse_sse(response.get_data(as_text=True))
+
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual([data['text'] for event, data in events if event == 'token'], TOKENS)
+        self.assertEqual(events[-1], ('done', {'status': 200, 'success': True,
+                                               'ai_response': ''.join(TOKENS), 'stage': 'collect_need'}))
+
+        with patch.object(EtpDynamicController, 'etp_conversation', failing_view):
+            response = client.post('/api/etp-dynamic/conversation/stream', json={})
+            events = parse_sse(response.get_data(as_text=True))
+        self.assertEqual(events, [('error', {'status': 400, 'success': False, 'error': 'Mensagem é obrigatória'})])
+
+
+if __name__ == '__main__':
+    unittest.main()
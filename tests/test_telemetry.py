@@ -0,0 +1,163 @@
+"""
+Tests for per-request spans, the Prometheus-style registry and the /metrics endpoint
+"""
+import os
+import sys
+import json
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from flask import Flask, Response, jsonify
+from sqlalchemy import text
+
+from domain.interfaces.dataprovider.DatabaseConfig import db
+from application.ai import llm_gateway
+from application.ai.llm_gateway import configure_llm_gateway, get_llm_gateway, get_openai_client
+from application.services import telemetry
+from application.services.telemetry import MetricsRegistry, init_telemetry, set_stage, span, traced
+from adapter.entrypoint.metrics.MetricsController import metrics_bp
+
+
+def chat_response(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={
+        'id': 'cmpl-1', 'object': 'chat.completion', 'created': 0, 'model': 'gpt-test',
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': 'ok'}}],
+        'usage': {'prompt_tokens': 120, 'completion_tokens': 30, 'total_tokens': 150},
+    })
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_renders_counters_and_cumulative_histograms(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('demo_total', 'Demo', ('endpoint',))
+        histogram = registry.histogram('demo_seconds', 'Demo', ('endpoint',), buckets=(0.1, 1.0))
+        counter.inc(endpoint='a')
+        counter.inc(2, endpoint='a')
+        histogram.observe(0.05, endpoint='a')
+        histogram.observe(0.5, endpoint='a')
+        histogram.observe(5, endpoint='a')
+
+        output = registry.render()
+
+        self.assertIn('# TYPE demo_total counter', output)
+        self.assertIn('demo_total{endpoint="a"} 3', output)
+        self.assertIn('demo_seconds_bucket{endpoint="a",le="0.1"} 1', output)
+        self.assertIn('demo_seconds_bucket{endpoint="a",le="1"} 2', output)
+        self.assertIn('demo_seconds_bucket{endpoint="a",le="+Inf"} 3', output)
+        self.assertIn('demo_seconds_count{endpoint="a"} 3', output)
+        self.assertIs(registry.counter('demo_total', 'Demo', ('endpoint',)), counter)
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.counter('demo_total', 'Demo', ('endpoint',)).inc(endpoint='a"b')
+        self.assertIn('demo_total{endpoint="a\\"b"} 1', registry.render())
+
+
+class TestRequestTelemetry(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        init_telemetry(self.app)
+        self.app.register_blueprint(metrics_bp)
+
+        @traced('retrieval.test')
+        def retrieve():
+            db.session.execute(text('SELECT 1')).scalar()
+            db.session.execute(text('SELECT 2')).scalar()
+
+        @self.app.route('/telemetry-stage', methods=['POST'])
+        def stage_view():
+            set_stage('legal_norms')
+            retrieve()
+            with span('render.test'):
+                pass
+            return jsonify({'success': True})
+
+        @self.app.route('/telemetry-stream')
+        def stream_view():
+            return Response(iter(['a', 'b']), mimetype='text/event-stream')
+
+        self.client = self.app.test_client()
+        configure_llm_gateway(api_key='sk-test', base_url='http://llm.local/v1',
+                              transport=httpx.MockTransport(chat_response))
+
+    def tearDown(self):
+        get_llm_gateway().close()
+        llm_gateway._gateway = None
+
+    def test_request_metrics_are_labelled_by_endpoint_and_stage(self):
+        labels = dict(endpoint='stage_view', method='POST', status='200', stage='legal_norms')
+        before = telemetry.REQUESTS.value(**labels)
+
+        self.assertEqual(self.client.post('/telemetry-stage').status_code, 200)
+
+        self.assertEqual(telemetry.REQUESTS.value(**labels), before + 1)
+        self.assertGreaterEqual(telemetry.REQUEST_DURATION.count(**labels), 1)
+        self.assertGreaterEqual(telemetry.SPAN_DURATION.count(span='retrieval.test', endpoint='stage_view',
+                                                              stage='legal_norms'), 1)
+
+        output = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('etp_requests_total{endpoint="stage_view",method="POST",status="200",stage="legal_norms"}',
+                      output)
+        self.assertIn('etp_span_duration_seconds_bucket{span="render.test",endpoint="stage_view"', output)
+
+    def test_slow_request_logs_span_tree_with_db_and_llm_details(self):
+        @self.app.route('/telemetry-llm')
+        def llm_view():
+            with span('generator.test'):
+                get_llm_gateway().chat([{'role': 'user', 'content': 'oi'}], model='gpt-test')
+                get_openai_client().chat.completions.create(model='gpt-test',
+                                                            messages=[{'role': 'user', 'content': 'oi'}])
+            with self.app.app_context():
+                db.session.execute(text('SELECT 1')).scalar()
+            return jsonify({'success': True})
+
+        tokens_before = telemetry.LLM_TOKENS.value(operation='chat', model='gpt-test', type='prompt')
+        with patch.dict(os.environ, {'SLOW_REQUEST_MS': '0'}), \
+                self.assertLogs(telemetry.logger, level='WARNING') as logs:
+            self.client.get('/telemetry-llm')
+
+        self.assertEqual(telemetry.LLM_TOKENS.value(operation='chat', model='gpt-test', type='prompt'),
+                         tokens_before + 240)
+        tree = json.loads(logs.output[-1].split('ms ', 1)[1])
+        self.assertEqual(tree['name'], 'request')
+        generator = tree['children'][0]
+        self.assertEqual(generator['name'], 'generator.test')
+        self.assertEqual([child['name'] for child in generator['children']], ['llm.chat', 'llm.chat'])
+        self.assertEqual(generator['children'][0]['attrs']['prompt_tokens'], 120)
+        self.assertEqual(generator['children'][0]['attrs']['completion_tokens'], 30)
+        self.assertEqual(tree['attrs']['db_queries'], 1)
+        self.assertGreaterEqual(telemetry.SLOW_REQUESTS.value(endpoint='llm_view'), 1)
+
+    def test_streamed_response_is_measured_until_the_body_closes(self):
+        labels = dict(endpoint='stream_view', method='GET', status='200', stage='')
+        before = telemetry.REQUESTS.value(**labels)
+
+        response = self.client.get('/telemetry-stream', buffered=False)
+        self.assertEqual(telemetry.REQUESTS.value(**labels), before)
+        self.assertEqual(response.get_data(as_text=True), 'ab')
+        response.close()
+
+        self.assertEqual(telemetry.REQUESTS.value(**labels), before + 1)
+
+    def test_spans_outside_requests_only_feed_the_histogram(self):
+        before = telemetry.SPAN_DURATION.count(span='background.test', endpoint='', stage='')
+        with span('background.test') as current:
+            self.assertIsNone(current.trace)
+        self.assertEqual(telemetry.SPAN_DURATION.count(span='background.test', endpoint='', stage=''), before + 1)
+
+    def test_metrics_endpoint_can_be_disabled(self):
+        with patch.dict(os.environ, {'METRICS_ENABLED': 'false'}):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
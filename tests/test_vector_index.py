@@ -0,0 +1,123 @@
+"""
+Tests for the persisted, memory-mapped vector index
+"""
+import os
+import sys
+import json
+import unittest
+import tempfile
+import shutil
+
+import numpy as np
+import faiss
+
+# Add src path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+from rag.vector_index import (MmapVectorIndex, save_vector_index, load_vector_index, manifest_is_current,
+                              content_checksum, partition_order, partition_rows, MANIFEST_FILE)
+
+
+class TestVectorIndex(unittest.TestCase):
+    """Test save/load roundtrip, manifest validation and search parity with FAISS"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(42)
+        self.vectors = rng.standard_normal((200, 32)).astype(np.float32)
+        faiss.normalize_L2(self.vectors)
+        self.documents = [
+            {'chunk_id': i + 1, 'document_id': 1, 'section_type': 'requisito' if i % 2 else 'norma_legal',
+             'objective_slug': 'slug', 'content': f'chunk {i}'}
+            for i in range(200)
+        ]
+        self.checksum = content_checksum([(d['chunk_id'], d['content']) for d in self.documents])
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_search_matches_faiss_flat_ip(self):
+        flat = faiss.IndexFlatIP(32)
+        flat.add(self.vectors)
+        queries = self.vectors[:5] + 0.01
+
+        expected_scores, expected_ids = flat.search(queries, 10)
+        scores, ids = MmapVectorIndex(self.vectors).search(queries, 10)
+
+        np.testing.assert_array_equal(ids, expected_ids)
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+    def test_roundtrip_is_memory_mapped(self):
+        self.assertTrue(save_vector_index(self.test_dir, self.vectors, self.documents, 'model-x', self.checksum))
+
+        index, documents, manifest = load_vector_index(self.test_dir)
+
+        self.assertIsInstance(index.vectors, np.memmap)
+        self.assertEqual(index.ntotal, 200)
+        self.assertEqual(index.d, 32)
+        self.assertEqual(documents[3]['chunk_id'], 4)
+        self.assertEqual(documents[3]['section_type'], 'requisito')
+        self.assertEqual(manifest['embedding_model'], 'model-x')
+
+    def test_manifest_validation(self):
+        save_vector_index(self.test_dir, self.vectors, self.documents, 'model-x', self.checksum)
+        _, _, manifest = load_vector_index(self.test_dir)
+        current = {'chunk_count': 200, 'content_checksum': self.checksum}
+
+        self.assertTrue(manifest_is_current(manifest, current, 'model-x'))
+        self.assertFalse(manifest_is_current(manifest, current, 'model-y'))
+        self.assertFalse(manifest_is_current(manifest, {**current, 'chunk_count': 201}, 'model-x'))
+        changed = content_checksum([(d['chunk_id'], d['content'] + '!') for d in self.documents])
+        self.assertFalse(manifest_is_current(manifest, {**current, 'content_checksum': changed}, 'model-x'))
+
+    def test_inconsistent_manifest_is_rejected(self):
+        save_vector_index(self.test_dir, self.vectors, self.documents, 'model-x', self.checksum)
+        path = os.path.join(self.test_dir, MANIFEST_FILE)
+        with open(path) as f:
+            manifest = json.load(f)
+        manifest['dimension'] = 64
+        with open(path, 'w') as f:
+            json.dump(manifest, f)
+
+        self.assertIsNone(load_vector_index(self.test_dir))
+
+    def test_checksum_is_order_independent(self):
+        items = [(2, 'b'), (1, 'a')]
+        self.assertEqual(content_checksum(items), content_checksum(list(reversed(items))))
+
+
+    def test_filtered_search_returns_k_rows_of_section(self):
+        order = partition_order(self.documents)
+        documents = [self.documents[i] for i in order]
+        index = MmapVectorIndex(self.vectors[order])
+        rows = partition_rows(documents)[('requisito', '')]
+
+        # Partição contígua após a ordenação
+        self.assertEqual(rows[-1] - rows[0] + 1, rows.size)
+
+        query = self.vectors[:1]
+        scores, indices = index.search(query, 20, rows=rows)
+        self.assertEqual(len(indices[0]), 20)
+        self.assertTrue(all(documents[i]['section_type'] == 'requisito' for i in indices[0]))
+
+        exact = rows[np.argsort(-(index.vectors[rows] @ query[0]))[:20]]
+        self.assertEqual(list(indices[0]), list(exact))
+
+        # Linhas não contíguas (fancy indexing) produzem o mesmo resultado
+        scattered = np.concatenate([rows[1::2], rows[::2]])
+        _, same = index.search(query, 20, rows=np.sort(scattered)[::-1].copy())
+        self.assertEqual(set(same[0]), set(indices[0]))
+
+    def test_partition_rows_by_objective(self):
+        docs = [{'chunk_id': 1, 'section_type': 'requisito', 'objective_slug': 'a'},
+                {'chunk_id': 2, 'section_type': 'requisito', 'objective_slug': ''},
+                {'chunk_id': 3, 'section_type': 'requisito', 'objective_slug': 'b'}]
+        rows = partition_rows(docs)
+
+        self.assertEqual(list(rows[('requisito', '')]), [0, 1, 2])
+        self.assertEqual(list(rows[('requisito', 'a')]), [0])
+        self.assertNotIn(('norma_legal', ''), rows)
+
+
+if __name__ == '__main__':
+    unittest.main()